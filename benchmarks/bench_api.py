@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+"""
+API压力测试
+用合成的 1万/10万/100万 部电影数据启动 Flask API，用 asyncio 客户端按固定速率
+(开环，延迟从计划发送时刻算起，不会因服务变慢而少发请求)发送混合请求，
+按接口统计吞吐、延迟直方图、百分位数和错误率，并按SLO给出结论
+
+用法:
+    python benchmarks/bench_api.py --sizes 10000,100000 --rps 50 --duration 20
+    python benchmarks/bench_api.py --mix movies=60,search=20,recommendations=10,download=10 \
+        --slo p95=200,p99=500,error_rate=0.01 --compare benchmarks/results/api_abc1234_....json
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import RESULTS_DIR, latency_summary, write_results, compare_results
+
+# 延迟直方图的桶上界(毫秒)
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+GENRES = ["动作", "喜剧", "爱情", "科幻", "恐怖", "动画", "剧情", "战争", "纪录片", "犯罪", "悬疑"]
+COUNTRIES = ["中国大陆", "中国香港", "中国台湾", "美国", "韩国", "日本", "英国", "法国", "印度"]
+TITLE_WORDS = ["流浪", "地球", "速度", "激情", "星际", "穿越", "黑客", "帝国", "功夫", "熊猫", "寻梦",
+               "环游", "釜山", "药神", "子弹", "首富", "长津", "湖", "战狼", "哪吒", "唐人街", "探案"]
+PEOPLE = ["张艺谋", "陈凯歌", "诺兰", "斯皮尔伯格", "吴京", "沈腾", "周星驰", "汤姆·汉克斯", "宋康昊", "是枝裕和"]
+
+COMPARE_METRICS = {
+    "throughput": "higher",
+    "p50_ms": "lower",
+    "p95_ms": "lower",
+    "p99_ms": "lower",
+    "error_rate": "lower",
+}
+
+
+def generate_dataset(size, path, seed=42):
+    """
+    生成合成电影数据，格式与 API 的 movies_cache.json 相同
+
+    逐条写出，生成100万部电影时不需要先在内存中构造整个列表
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i in range(size):
+            title = "".join(rng.sample(TITLE_WORDS, rng.randint(2, 3))) + str(i)
+            movie = {
+                "id": f"movie_{i}",
+                "title": title,
+                "year": str(rng.randint(1980, 2025)),
+                "category": rng.choice(GENRES),
+                "genre": "/".join(rng.sample(GENRES, 2)),
+                "country": rng.choice(COUNTRIES),
+                "director": rng.choice(PEOPLE),
+                "actors": ", ".join(rng.sample(PEOPLE, 3)),
+                "score": f"{rng.uniform(3, 9.8):.1f}/10",
+                "summary": "".join(rng.choices(TITLE_WORDS, k=20)),
+                "download_link": f"magnet:?xt=urn:btih:{rng.getrandbits(160):040x}",
+                "source": rng.choice(["电影天堂", "豆瓣电影"]),
+            }
+            f.write(("," if i else "") + json.dumps(movie, ensure_ascii=False))
+        f.write("]")
+
+
+def prepare_dataset(size):
+    """返回包含 movies_cache.json 的数据目录，已生成过的数据直接复用"""
+    data_dir = os.path.join(RESULTS_DIR, "datasets", f"movies_{size}")
+    cache_file = os.path.join(data_dir, "movies_cache.json")
+    if not os.path.exists(cache_file):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"生成 {size} 部电影的合成数据...")
+        start = time.perf_counter()
+        generate_dataset(size, cache_file + ".tmp")
+        os.replace(cache_file + ".tmp", cache_file)
+        print(f"数据生成完成，耗时 {time.perf_counter() - start:.1f} 秒")
+    return data_dir
+
+
+def _serve(data_dir, port, ready):
+    """在子进程中运行 Flask API，客户端和服务端不争用同一个GIL"""
+    import logging
+    from werkzeug.serving import make_server
+    from dytt8.api import api_server
+
+    api_server.data_dir = data_dir
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    api_server.logger.setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", port, api_server.app, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _Connection:
+    """最简 HTTP/1.1 keep-alive 连接，只支持带 Content-Length 的 GET 响应"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self.writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n\r\n".encode())
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("连接已关闭")
+            status = int(status_line.split()[1])
+            length, close = None, False
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin1").partition(":")
+                name = name.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "connection" and value.strip().lower() == "close":
+                    close = True
+            body = await self.reader.readexactly(length) if length is not None else await self.reader.read()
+            if close or length is None:
+                self.close()
+            return status, len(body)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class QueryMix:
+    """按权重随机生成各接口的请求路径"""
+
+    def __init__(self, weights, dataset_size, seed=7):
+        self.rng = random.Random(seed)
+        self.size = dataset_size
+        self.endpoints = list(weights)
+        self.weights = [weights[name] for name in self.endpoints]
+
+    def _movies(self):
+        params = {"page": self.rng.randint(1, 50), "page_size": 20,
+                  "sort_by": self.rng.choice(["year", "score", "title"])}
+        if self.rng.random() < 0.3:
+            params["category"] = self.rng.choice(GENRES)
+        return "/movies?" + urlencode(params)
+
+    def _search(self):
+        return "/movies/search?" + urlencode({"q": self.rng.choice(TITLE_WORDS + PEOPLE)})
+
+    def _recommendations(self):
+        return "/recommendations?" + urlencode({
+            "count": 10,
+            "genres": ",".join(self.rng.sample(GENRES, 2)),
+            "year_range": self.rng.choice(["不限", "2020-至今", "2010-2020"]),
+        })
+
+    def _download(self):
+        # 约5%的请求查询不存在的ID
+        movie_id = self.rng.randrange(self.size) if self.rng.random() > 0.05 else self.size + 1
+        return f"/movies/download/movie_{movie_id}"
+
+    def next(self):
+        endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+        return endpoint, getattr(self, f"_{endpoint}")()
+
+
+async def run_load(host, port, mix, rps, duration, concurrency, timeout):
+    """
+    按固定速率发送请求
+
+    返回:
+        list: (接口, 状态码, 延迟秒数) 记录，状态码0表示连接错误或超时
+    """
+    pool = asyncio.Queue()
+    for _ in range(concurrency):
+        pool.put_nowait(_Connection(host, port))
+    records = []
+
+    async def one(endpoint, path, scheduled):
+        connection = await pool.get()
+        try:
+            status, _ = await asyncio.wait_for(connection.get(path), timeout)
+        except Exception:
+            connection.close()
+            status = 0
+        finally:
+            pool.put_nowait(connection)
+        records.append((endpoint, status, time.perf_counter() - scheduled))
+
+    loop_start = time.perf_counter()
+    tasks = []
+    for i in range(int(rps * duration)):
+        scheduled = loop_start + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint, path = mix.next()
+        tasks.append(asyncio.ensure_future(one(endpoint, path, scheduled)))
+    await asyncio.gather(*tasks)
+    return records, time.perf_counter() - loop_start
+
+
+def summarize(records, elapsed):
+    """按接口汇总吞吐、错误率、百分位数和直方图"""
+    by_endpoint = {}
+    for endpoint, status, latency in records:
+        by_endpoint.setdefault(endpoint, []).append((status, latency))
+    by_endpoint["all"] = [(status, latency) for _, status, latency in records]
+
+    summary = {}
+    for endpoint, items in by_endpoint.items():
+        latencies = [latency for _, latency in items]
+        errors = sum(1 for status, _ in items if status == 0 or status >= 500)
+        histogram = {f"<={bucket}ms": 0 for bucket in HISTOGRAM_BUCKETS_MS}
+        histogram["+inf"] = 0
+        for latency in latencies:
+            ms = latency * 1000
+            bucket = next((f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS if ms <= b), "+inf")
+            histogram[bucket] += 1
+        result = {
+            "requests": len(items),
+            "throughput": round((len(items) - errors) / elapsed, 2) if elapsed else 0.0,
+            "errors": errors,
+            "client_errors": sum(1 for status, _ in items if 400 <= status < 500),
+            "error_rate": round(errors / len(items), 4) if items else 0.0,
+        }
+        result.update(latency_summary(latencies))
+        result["histogram"] = histogram
+        summary[endpoint] = result
+    return summary
+
+
+def check_slo(summary, slo):
+    """检查SLO，返回 {接口: [未达标项]}"""
+    failures = {}
+    for endpoint, result in summary.items():
+        failed = []
+        for metric, limit in slo.items():
+            key = "error_rate" if metric == "error_rate" else f"{metric}_ms"
+            value = result.get(key)
+            if value is not None and value > limit:
+                failed.append(f"{key}={value} > {limit}")
+        if failed:
+            failures[endpoint] = failed
+    return failures
+
+
+def _parse_pairs(text, cast=float):
+    pairs = {}
+    for item in filter(None, text.split(",")):
+        name, _, value = item.partition("=")
+        pairs[name.strip()] = cast(value)
+    return pairs
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='API压力测试')
+    parser.add_argument('--sizes', default="10000", help='数据集大小，逗号分隔，如 10000,100000,1000000')
+    parser.add_argument('--rps', type=float, default=20, help='每秒请求数')
+    parser.add_argument('--duration', type=float, default=15, help='每个数据集的测试时长(秒)')
+    parser.add_argument('--concurrency', type=int, default=32, help='最大并发连接数')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时(秒)')
+    parser.add_argument('--mix', default="movies=50,search=25,recommendations=10,download=15",
+                        help='请求权重')
+    parser.add_argument('--slo', default="p95=500,p99=1000,error_rate=0.01", help='SLO阈值(毫秒/比例)')
+    parser.add_argument('--output', help='结果JSON路径')
+    parser.add_argument('--compare', help='用于比较的基线结果JSON')
+    parser.add_argument('--threshold', type=float, default=0.1, help='视为退化的相对变化')
+    args = parser.parse_args()
+
+    weights = _parse_pairs(args.mix)
+    slo = _parse_pairs(args.slo)
+    results = {}
+    slo_failures = 0
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        data_dir = prepare_dataset(size)
+        port = _free_port()
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=_serve, args=(data_dir, port, ready), daemon=True)
+        server.start()
+        if not ready.wait(60):
+            print("API服务器启动失败")
+            server.terminate()
+            continue
+
+        print(f"\n=== {size} 部电影: {args.rps} 请求/秒, {args.duration} 秒 ===")
+        mix = QueryMix(weights, size)
+        try:
+            records, elapsed = asyncio.run(
+                run_load("127.0.0.1", port, mix, args.rps, args.duration, args.concurrency, args.timeout)
+            )
+        finally:
+            server.terminate()
+            server.join()
+
+        summary = summarize(records, elapsed)
+        failures = check_slo(summary, slo)
+        print(f"{'接口':<18}{'请求':>7}{'吞吐/秒':>9}{'错误率':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}  SLO")
+        for endpoint, result in summary.items():
+            verdict = "未达标: " + "; ".join(failures[endpoint]) if endpoint in failures else "达标"
+            print(f"{endpoint:<18}{result['requests']:>7}{result['throughput']:>9}{result['error_rate']:>8.2%}"
+                  f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}  {verdict}")
+            results[f"{size}/{endpoint}"] = result
+        slo_failures += len(failures)
+
+    write_results("api", results, args.output)
+
+    if args.compare:
+        regressions = compare_results(args.compare, results, COMPARE_METRICS, args.threshold)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能退化")
+            sys.exit(1)
+    if slo_failures:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+导入耗时基准测试
+每次在新的解释器中导入模块或运行命令，统计冷启动耗时的百分位数，
+并列出被连带导入的重量级依赖(pandas、selenium、pyarrow 等)，便于发现又被提前导入的模块
+
+用法:
+    python benchmarks/bench_imports.py --repeat 10
+    python benchmarks/bench_imports.py --budget 200 --compare benchmarks/results/imports_abc1234_....json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import REPO_ROOT, latency_summary, write_results, compare_results
+
+# 名称 -> 要导入的模块；"-m 模块 参数" 形式的为整条命令(含解释器启动)的耗时
+TARGETS = {
+    "dytt8": "dytt8",
+    "dytt8.core": "dytt8.core",
+    "base_scraper": "dytt8.scrapers.base_scraper",
+    "recommender": "dytt8.recommender.recommender",
+    "api_server": "dytt8.api.api_server",
+    "gui": "dytt8.gui.gui",
+    "gui app": "dytt8.gui.app",
+    "cli --help": "-m dytt8 --help",
+    "full --help": "-m dytt8.main_full --help",
+}
+
+# 只应在真正使用时才导入的依赖
+HEAVY_MODULES = ("pandas", "numpy", "selenium", "webdriver_manager", "pyarrow", "PIL", "requests", "bs4", "lxml")
+
+COMPARE_METRICS = {"p50_ms": "lower"}
+
+# 在子进程中执行: 导入模块并输出耗时和已加载的重量级依赖
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module):
+    """在新解释器中导入模块，返回 (秒, 连带导入的重量级依赖)"""
+    output = subprocess.check_output(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+    )
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    return result["seconds"], result["heavy"]
+
+
+def measure_command(arguments):
+    """运行一条命令，返回墙钟耗时(秒)，包括解释器启动"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + arguments.split(), cwd=REPO_ROOT,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start, None
+
+
+def run(targets, repeat):
+    results = {}
+    for name, target in targets.items():
+        measure = measure_command if target.startswith("-m ") else measure_import
+        samples, heavy = [], None
+        try:
+            for _ in range(repeat):
+                seconds, heavy = measure(target)
+                samples.append(seconds)
+        except (subprocess.CalledProcessError, ValueError) as e:
+            print(f"{name:<16}失败: {e}")
+            results[name] = {"error": str(e)}
+            continue
+        results[name] = dict(latency_summary(samples), heavy=heavy)
+        loaded = ", ".join(heavy) if heavy else ("-" if heavy is not None else "")
+        print(f"{name:<16}{results[name]['p50_ms']:>10}{results[name]['max_ms']:>10}  {loaded}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入耗时基准测试')
+    parser.add_argument('--targets', help=f"逗号分隔的测试项，可用: {', '.join(TARGETS)}")
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数')
+    parser.add_argument('--budget', type=float, help='p50 超过该毫秒数时以非零状态退出')
+    parser.add_argument('--output', help='结果JSON路径')
+    parser.add_argument('--compare', help='用于比较的基线结果JSON')
+    parser.add_argument('--threshold', type=float, default=0.1, help='视为退化的相对变化')
+    args = parser.parse_args()
+
+    targets = TARGETS
+    if args.targets:
+        targets = {name: TARGETS[name] for name in args.targets.split(",")}
+
+    print(f"{'测试项':<14}{'p50(ms)':>10}{'max(ms)':>10}  连带导入的重量级依赖")
+    results = run(targets, args.repeat)
+    write_results("imports", results, args.output)
+
+    if args.compare:
+        regressions = compare_results(args.compare, results, COMPARE_METRICS, args.threshold)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能退化")
+            sys.exit(1)
+    if args.budget is not None:
+        over = [name for name, result in results.items() if result.get("p50_ms", 0) > args.budget]
+        if over:
+            print(f"超过 {args.budget}ms 预算: {', '.join(over)}")
+            sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
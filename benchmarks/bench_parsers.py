@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+HTML解析后端基准测试
+用同一套提取规则解析保存的详情页语料，对比 bs4 / lxml / selectolax 的
+吞吐(页/秒)和峰值内存。每个后端在独立子进程中运行，峰值内存互不影响
+
+用法:
+    python benchmarks/bench_parsers.py --corpus 保存的详情页目录 --repeat 20
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dytt8.scrapers.parser_backends import BACKENDS
+from dytt8.scrapers import dytt8_scraper, douban_scraper
+from dytt8.utils.encoding import decode_html
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 未提供语料目录时使用的示例页面
+SAMPLE_DYTT8_PAGE = """<html><head><meta charset="gb2312"><script>var a = 1;</script></head><body>
+<div class="title_all"><h1>2023年动作《速度与激情10》BD中英双字</h1>
+<a href="/">首页</a><a href="/html/gndy/">最新电影</a><a>MKV</a><a>2.5GB</a>
+<a href="magnet:?xt=urn:btih:0123456789abcdef0123456789abcdef01234567">磁力链接</a></div>
+<div id="Zoom"><img src="cover.jpg" /><br />◎译　　名　速度与激情10<br />◎片　　名　Fast X<br />
+◎年　　代　2023<br />◎产　　地　美国<br />◎类　　别　动作/犯罪<br />◎语　　言　英语<br />
+◎上映日期　2023-05-17(中国大陆)<br />◎豆瓣评分　6.0/10 from 100,000 users<br />
+◎片　　长　141分钟<br />◎导　　演　路易斯·莱特里尔<br />◎主　　演　范·迪塞尔<br />
+　　　　　　米歇尔·罗德里格兹<br />　　　　　　杰森·斯坦森<br />◎简　　介<br /><br />
+　　唐老大一家在经历了无数次的冒险之后，面临着前所未有的敌人……<br /></div>
+""" + "<div class='co_content2'><ul>" + "<li><a href='/x.html'>相关电影</a></li>" * 200 + "</ul></div></body></html>"
+
+SAMPLE_DOUBAN_PAGE = """<html><body><div id="content">
+<h1><span property="v:itemreviewed">肖申克的救赎 The Shawshank Redemption</span> <span class="year">(1994)</span></h1>
+<div id="info"><span><span class="pl">导演</span>: <a rel="v:directedBy">弗兰克·德拉邦特</a></span><br/>
+<span class="actor"><span class="pl">主演</span>: <span class="attrs"><a>蒂姆·罗宾斯</a> / <a>摩根·弗里曼</a> / <a>鲍勃·冈顿</a></span></span><br/>
+<span class="pl">类型:</span> <span property="v:genre">剧情</span> / <span property="v:genre">犯罪</span><br/>
+<span class="pl">制片国家/地区:</span> 美国<br/>
+<span class="pl">语言:</span> 英语<br/>
+<span property="v:initialReleaseDate">1994-09-10(多伦多电影节)</span><br/>
+<span property="v:runtime">142分钟</span><br/></div>
+<strong property="v:average">9.7</strong>
+<span property="v:summary">一场谋杀案使银行家安迪蒙冤入狱……</span>
+""" + "<div class='comment'><p>短评内容</p></div>" * 300 + "</div></body></html>"
+
+
+def load_corpus(corpus_dir):
+    """
+    读取语料目录，按页面内容区分电影天堂和豆瓣详情页
+
+    返回:
+        list: (站点, HTML文本, URL) 列表
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "**", "*.htm*"), recursive=True)):
+        with open(path, 'rb') as f:
+            html = decode_html(f.read())
+        site = "douban" if "v:itemreviewed" in html else "dytt8"
+        pages.append((site, html, path))
+    return pages
+
+
+def _max_rss_kb():
+    """当前进程的峰值常驻内存(KB)"""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回KB
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _run_backend(backend, pages, repeat, result_queue):
+    """在子进程中用指定后端解析全部语料"""
+    parsers = {"dytt8": dytt8_scraper.parse_detail_page, "douban": douban_scraper.parse_detail_page}
+    # 预热: 完成导入和XPath编译，不计入结果
+    for site, html, url in pages:
+        parsers[site](html, url, backend=backend)
+
+    rss_before = _max_rss_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for site, html, url in pages:
+            parsers[site](html, url, backend=backend)
+    elapsed = time.perf_counter() - start
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result_queue.put({
+        "backend": backend,
+        "pages": len(pages) * repeat,
+        "seconds": elapsed,
+        "pages_per_sec": len(pages) * repeat / elapsed if elapsed else 0.0,
+        "python_peak_kb": py_peak // 1024,
+        "rss_peak_kb": _max_rss_kb(),
+        "rss_growth_kb": _max_rss_kb() - rss_before,
+    })
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='HTML解析后端基准测试')
+    parser.add_argument('--corpus', help='保存的详情页目录 (*.html)')
+    parser.add_argument('--repeat', type=int, default=20, help='重复次数')
+    parser.add_argument('--backends', default=",".join(BACKENDS), help='要测试的后端，逗号分隔')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else []
+    if not pages:
+        print("未找到语料，使用内置示例页面")
+        pages = [("dytt8", SAMPLE_DYTT8_PAGE, "dytt8_sample"), ("douban", SAMPLE_DOUBAN_PAGE, "douban_sample")]
+
+    print(f"语料页数: {len(pages)}, 重复次数: {args.repeat}")
+    print(f"{'后端':<12}{'页/秒':>10}{'Python峰值(KB)':>16}{'RSS峰值(KB)':>14}{'RSS增长(KB)':>14}")
+
+    for backend in args.backends.split(","):
+        if backend not in BACKENDS:
+            print(f"{backend:<12} 不可用，跳过")
+            continue
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_run_backend, args=(backend, pages, args.repeat, result_queue))
+        process.start()
+        result = result_queue.get()
+        process.join()
+        print(f"{result['backend']:<12}{result['pages_per_sec']:>10.1f}{result['python_peak_kb']:>16}"
+              f"{result['rss_peak_kb']:>14}{result['rss_growth_kb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
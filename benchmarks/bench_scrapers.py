@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+爬虫端到端基准测试
+让每个爬虫引擎在本地回放服务器上抓取录制好的网页归档，统计:
+页/秒、单页延迟 p50/p95/p99、CPU秒数(含 chromedriver/Chrome 子进程)、
+进程树峰值内存和传输字节数，结果写入JSON，可与之前提交的结果比较
+
+用法:
+    # 先在真实抓取时录制语料
+    DYTT8_RECORD_ARCHIVE=corpus.warc.gz python -m dytt8 ...
+    # 再离线回放测试
+    python benchmarks/bench_scrapers.py --archive corpus.warc.gz
+    python benchmarks/bench_scrapers.py --archive corpus.warc.gz --engines scrapers.Dytt8Scraper \
+        --compare benchmarks/results/scrapers_abc1234_20250101_120000.json
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import traceback
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import ResourceSampler, latency_summary, write_results, compare_results
+
+
+def _run_movie_scraper(pages, limit):
+    from dytt8.core import MovieScraper
+    scraper = MovieScraper(headless=True)
+    return scraper.scrape_latest_movies(max_pages=pages)
+
+
+def _run_movie_scraper_v2(pages, limit):
+    from dytt8.core import MovieScraperV2
+    scraper = MovieScraperV2(headless=True, disable_images=True)
+    movies = scraper.scrape_latest_movies(limit=limit)
+    for movie in movies:
+        movie.update(scraper.get_movie_details(movie["link"]))
+    return movies
+
+
+def _run_simple_scraper(pages, limit):
+    from dytt8.core import SimpleMovieScraper
+    scraper = SimpleMovieScraper(headless=True)
+    movies = scraper.browse_movies_by_category("最新电影")[:limit]
+    for movie in movies:
+        movie.update(scraper.get_movie_details(movie["link"]) or {})
+    return movies
+
+
+def _run_movie_finder(pages, limit):
+    from dytt8.core import MovieFinder
+    finder = MovieFinder(headless=True)
+    return finder.get_hot_movies(limit=limit)
+
+
+def _run_dytt8_scraper(pages, limit):
+    from dytt8.scrapers.dytt8_scraper import Dytt8Scraper
+    return Dytt8Scraper(pages=pages, delay=0).scrape()
+
+
+def _run_douban_scraper(pages, limit):
+    from dytt8.scrapers.douban_scraper import DoubanScraper
+    return DoubanScraper(pages=pages, delay=0).scrape()
+
+
+ENGINES = {
+    "MovieScraper": _run_movie_scraper,
+    "MovieScraperV2": _run_movie_scraper_v2,
+    "SimpleMovieScraper": _run_simple_scraper,
+    "MovieFinder": _run_movie_finder,
+    "scrapers.Dytt8Scraper": _run_dytt8_scraper,
+    "DoubanScraper": _run_douban_scraper,
+}
+
+# 比较基线时关注的指标及其方向
+COMPARE_METRICS = {
+    "pages_per_sec": "higher",
+    "p50_ms": "lower",
+    "p95_ms": "lower",
+    "p99_ms": "lower",
+    "cpu_seconds": "lower",
+    "peak_rss_mb": "lower",
+}
+
+
+def run_engine(name, archive_path, pages, limit, result_queue):
+    """
+    在子进程中运行单个引擎，保证内存和CPU统计互不干扰
+
+    回放设置通过环境变量传给爬虫内部创建的驱动和会话
+    """
+    os.environ["DYTT8_REPLAY_ARCHIVE"] = archive_path
+    os.environ["DYTT8_REPLAY_OVER_HTTP"] = "1"
+    from dytt8.utils import page_archive
+
+    latencies = []
+    page_archive.fetch_listeners.append(lambda url, elapsed: latencies.append(elapsed))
+
+    sampler = ResourceSampler().start()
+    start = time.perf_counter()
+    error = None
+    items = 0
+    try:
+        items = len(ENGINES[name](pages, limit) or [])
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    wall = time.perf_counter() - start
+    resources = sampler.stop()
+
+    server = page_archive.replay_server()
+    server_stats = server.stats if server else {"requests": 0, "not_found": 0, "bytes_sent": 0}
+
+    result = {
+        "error": error,
+        "items": items,
+        "pages": len(latencies),
+        "wall_seconds": round(wall, 3),
+        "pages_per_sec": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "requests": server_stats["requests"],
+        "not_found": server_stats["not_found"],
+        "bytes_transferred": server_stats["bytes_sent"],
+    }
+    result.update(latency_summary(latencies))
+    result.update(resources)
+    result_queue.put(result)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='爬虫端到端基准测试')
+    parser.add_argument('--archive', required=True, help='录制的网页归档 (*.warc.gz)')
+    parser.add_argument('--engines', default=",".join(ENGINES), help='要测试的引擎，逗号分隔')
+    parser.add_argument('--pages', type=int, default=2, help='列表页数')
+    parser.add_argument('--limit', type=int, default=20, help='最多抓取的详情页数')
+    parser.add_argument('--output', help='结果JSON路径')
+    parser.add_argument('--compare', help='用于比较的基线结果JSON')
+    parser.add_argument('--threshold', type=float, default=0.1, help='视为退化的相对变化')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"归档文件不存在: {args.archive}")
+        sys.exit(1)
+    archive_path = os.path.abspath(args.archive)
+
+    results = {}
+    for name in args.engines.split(","):
+        if name not in ENGINES:
+            print(f"未知引擎: {name}，可用: {', '.join(ENGINES)}")
+            continue
+        print(f"\n=== {name} ===")
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=run_engine, args=(name, archive_path, args.pages, args.limit, result_queue)
+        )
+        process.start()
+        process.join()
+        try:
+            results[name] = result_queue.get(timeout=5)
+        except queue.Empty:
+            results[name] = {"error": f"子进程异常退出，退出码 {process.exitcode}"}
+
+    print(f"\n{'引擎':<24}{'页/秒':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+          f"{'CPU(s)':>9}{'RSS(MB)':>9}{'字节':>12}")
+    for name, result in results.items():
+        if result.get("error"):
+            print(f"{name:<24} 失败: {result['error']}")
+            continue
+        print(f"{name:<24}{result['pages_per_sec']:>8}{result['p50_ms'] or '-':>10}{result['p95_ms'] or '-':>10}"
+              f"{result['p99_ms'] or '-':>10}{result['cpu_seconds']:>9}{result['peak_rss_mb']:>9}"
+              f"{result['bytes_transferred']:>12}")
+
+    write_results("scrapers", results, args.output)
+
+    if args.compare:
+        regressions = compare_results(args.compare, results, COMPARE_METRICS, args.threshold)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能退化")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
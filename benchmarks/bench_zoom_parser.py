@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+◎ 字段解析微基准测试
+对比旧版逐字段 re.search 与 dytt8.utils.zoom_parser 单次扫描在详情页语料上的耗时
+
+用法:
+    python benchmarks/bench_zoom_parser.py --corpus 保存的详情页目录 --repeat 200
+"""
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dytt8.utils.zoom_parser import extract_movie_metadata
+
+# 未提供语料目录时使用的示例描述
+SAMPLE_DESCRIPTION = """◎译　　名　速度与激情10/速激10
+◎片　　名　Fast X
+◎年　　代　2023
+◎产　　地　美国
+◎类　　别　动作/犯罪
+◎语　　言　英语
+◎字　　幕　中英双字
+◎上映日期　2023-05-17(中国大陆)/2023-05-19(美国)
+◎IMDb评分　5.8/10 from 95,123 users
+◎豆瓣评分　6.0/10 from 100,000 users
+◎片　　长　141分钟
+◎导　　演　路易斯·莱特里尔 Louis Leterrier
+◎编　　剧　丹·马佐 Dan Mazeau
+　　　　　　贾斯汀·林 Justin Lin
+◎主　　演　范·迪塞尔 Vin Diesel
+　　　　　　米歇尔·罗德里格兹 Michelle Rodriguez
+　　　　　　杰森·斯坦森 Jason Statham
+◎简　　介
+
+　　唐老大一家在经历了无数次的冒险之后，面临着前所未有的敌人……
+"""
+
+
+def legacy_extract(description):
+    """旧版 MovieScraperV2.get_movie_details 中的四次 re.search 提取"""
+    details = {}
+    director_match = re.search(r'导　　演(.*?)(?:\n|$)', description)
+    if director_match:
+        details["director"] = director_match.group(1).strip()
+    actors_match = re.search(r'主　　演(.*?)(?:◎|$)', description, re.DOTALL)
+    if actors_match:
+        actors_text = actors_match.group(1).strip()
+        details["actors"] = [actor.strip() for actor in actors_text.split('\n') if actor.strip()]
+    rating_match = re.search(r'(?:豆瓣评分|IMDB评分)[^\d]*([\d\.]+)', description)
+    if rating_match:
+        details["rating"] = rating_match.group(1).strip()
+    date_match = re.search(r'上映日期(.*?)(?:\n|$)', description)
+    if date_match:
+        details["release_date"] = date_match.group(1).strip()
+    return details
+
+
+def load_corpus(corpus_dir):
+    """读取语料目录中保存的详情页，返回 div#Zoom 的文本列表"""
+    from bs4 import BeautifulSoup
+
+    descriptions = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "**", "*.htm*"), recursive=True)):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        soup = BeautifulSoup(raw, 'lxml')
+        zoom = soup.select_one("div#Zoom")
+        if zoom:
+            descriptions.append(zoom.get_text("\n"))
+    return descriptions
+
+
+def run_benchmark(func, descriptions, repeat):
+    """对语料重复执行提取函数，返回每页平均耗时(微秒)和提取的字段总数"""
+    field_count = sum(len(func(d)) for d in descriptions)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for description in descriptions:
+            func(description)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(descriptions)) * 1e6, field_count
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='◎ 字段解析微基准测试')
+    parser.add_argument('--corpus', help='保存的详情页目录 (*.html)')
+    parser.add_argument('--repeat', type=int, default=200, help='重复次数')
+    args = parser.parse_args()
+
+    descriptions = load_corpus(args.corpus) if args.corpus else []
+    if not descriptions:
+        print("未找到语料，使用内置示例描述")
+        descriptions = [SAMPLE_DESCRIPTION]
+
+    print(f"语料页数: {len(descriptions)}, 重复次数: {args.repeat}")
+    for name, func in [("legacy re.search x4", legacy_extract),
+                       ("zoom_parser", extract_movie_metadata)]:
+        per_page, fields = run_benchmark(func, descriptions, args.repeat)
+        per_field = per_page * len(descriptions) / fields if fields else 0
+        print(f"{name:<22} {per_page:8.2f} µs/页  {per_field:6.2f} µs/字段  提取字段数: {fields}")
+
+
+if __name__ == "__main__":
+    main()
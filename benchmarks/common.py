@@ -0,0 +1,209 @@
+"""
+基准测试公共工具
+百分位数、进程资源采样(含 Chrome 等子进程)，以及可跨提交比较的 JSON 结果读写
+"""
+import os
+import sys
+import json
+import math
+import platform
+import threading
+import subprocess
+from datetime import datetime
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def percentile(values, pct):
+    """
+    最近秩法计算百分位数
+
+    参数:
+        values (list): 数值列表
+        pct (float): 百分位 (0-100)
+
+    返回:
+        float: 百分位数，列表为空时返回None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    # 最近秩: 不小于 pct% 的最小秩；先乘后除，避免 0.95 * 20 这类浮点误差
+    rank = max(1, math.ceil(pct * len(ordered) / 100.0))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(seconds):
+    """把延迟列表(秒)汇总为毫秒的 p50/p95/p99/max"""
+    summary = {"count": len(seconds)}
+    for name, pct in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99), ("max_ms", 100)):
+        value = percentile(seconds, pct)
+        summary[name] = round(value * 1000, 2) if value is not None else None
+    return summary
+
+
+class ResourceSampler:
+    """
+    在后台线程中周期性采样当前进程及其所有子进程(chromedriver、Chrome)的
+    常驻内存和CPU时间，记录RSS总和的峰值
+
+    未安装 psutil 时退化为 getrusage，只能统计本进程和已回收的子进程
+    """
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak_rss = 0
+        self._cpu = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_times = None
+
+    def _sample(self):
+        process = psutil.Process()
+        try:
+            processes = [process] + process.children(recursive=True)
+        except psutil.Error:
+            processes = [process]
+        total_rss = 0
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    total_rss += proc.memory_info().rss
+                    cpu = proc.cpu_times()
+                    # 子进程退出后保留最后一次采样的CPU时间
+                    self._cpu[proc.pid] = cpu.user + cpu.system
+            except psutil.Error:
+                continue
+        self.peak_rss = max(self.peak_rss, total_rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """开始采样"""
+        self._start_times = os.times()
+        if PSUTIL_AVAILABLE:
+            self._sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止采样
+
+        返回:
+            dict: cpu_seconds, peak_rss_mb, rss_source
+        """
+        if self._thread is not None:
+            self._sample()
+            self._stop.set()
+            self._thread.join()
+            cpu_seconds = sum(self._cpu.values())
+            peak_rss = self.peak_rss
+            source = "psutil (process tree)"
+        else:
+            end = os.times()
+            cpu_seconds = sum(end[:4]) - sum(self._start_times[:4])
+            peak_rss = 0
+            if resource is not None:
+                scale = 1 if sys.platform == "darwin" else 1024
+                peak_rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+            source = "getrusage (self + reaped children)"
+        return {
+            "cpu_seconds": round(cpu_seconds, 3),
+            "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+            "rss_source": source,
+        }
+
+
+def git_commit():
+    """当前提交的短哈希，不在git仓库中时返回None"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, results, output=None):
+    """
+    写入JSON结果，附带提交、时间和运行环境信息
+
+    参数:
+        name (str): 基准测试名称，用作默认文件名前缀
+        results (dict): 测试结果
+        output (str): 输出路径，默认为 benchmarks/results/<name>_<commit>_<时间>.json
+
+    返回:
+        str: 结果文件路径
+    """
+    commit = git_commit()
+    document = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{name}_{commit or 'nogit'}_{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到: {output}")
+    return output
+
+
+def compare_results(baseline_path, current, metrics, threshold=0.1):
+    """
+    与基线结果比较，打印变化并返回退化项
+
+    参数:
+        baseline_path (str): 基线JSON文件
+        current (dict): 本次的 results
+        metrics (dict): 指标名 -> "higher"(越大越好) 或 "lower"(越小越好)
+        threshold (float): 超过该相对变化视为退化
+
+    返回:
+        list: 退化项描述
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n与基线比较: {baseline_path} (提交 {baseline.get('commit')})")
+
+    regressions = []
+    for key, result in current.items():
+        old = baseline.get("results", {}).get(key)
+        if not old or result.get("error") or old.get("error"):
+            continue
+        for metric, better in metrics.items():
+            old_value, new_value = old.get(metric), result.get(metric)
+            if not old_value or new_value is None:
+                continue
+            change = (new_value - old_value) / old_value
+            worse = change < -threshold if better == "higher" else change > threshold
+            flag = "  <-- 退化" if worse else ""
+            print(f"  {key:<28}{metric:<16}{old_value:>12} -> {new_value:<12}{change:+.1%}{flag}")
+            if worse:
+                regressions.append(f"{key}.{metric} {change:+.1%}")
+    return regressions
+
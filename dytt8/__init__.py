@@ -9,6 +9,12 @@ __email__ = "ai@example.com"
 __license__ = "MIT"
 __url__ = "https://github.com/yourusername/dytt8"
 
-# 导出主要接口
-# 暂时注释掉，避免导入错误
-# from dytt8.core import MovieScraper, MovieFinder
+# 导出主要接口，第一次访问时才导入 dytt8.core 中的爬虫 (PEP 562)
+_CORE_EXPORTS = ("MovieScraper", "MovieFinder")
+
+
+def __getattr__(name):
+    if name in _CORE_EXPORTS:
+        from dytt8 import core
+        return getattr(core, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
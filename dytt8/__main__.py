@@ -5,6 +5,7 @@
 """
 import os
 import sys
+import argparse
 import importlib.util
 import subprocess
 
@@ -34,19 +35,20 @@ def print_menu():
 
 def check_environment():
     """检查环境是否配置正确"""
-    try:
-        import selenium
-        print(f"✓ 已安装Selenium: 版本 {selenium.__version__}")
-    except ImportError:
+    # 只检查是否安装，不导入 selenium(导入需要数百毫秒，脚本在子进程中运行)
+    if importlib.util.find_spec("selenium") is None:
         print("✗ 未安装Selenium，请运行: pip install -r requirements.txt")
         return False
-    
+    from importlib.metadata import version, PackageNotFoundError
     try:
-        from selenium import webdriver
-        print("✓ 已导入WebDriver")
-    except ImportError:
+        print(f"✓ 已安装Selenium: 版本 {version('selenium')}")
+    except PackageNotFoundError:
+        print("✓ 已安装Selenium")
+    
+    if importlib.util.find_spec("selenium.webdriver") is None:
         print("✗ WebDriver导入失败")
         return False
+    print("✓ 已找到WebDriver")
     
     chrome_version = None
     try:
@@ -84,8 +86,19 @@ def run_script(script_name):
         print(f"运行脚本时出错: {e}")
 
 
-def main():
+def parse_args(argv=None):
+    """解析命令行参数，目前只提供 --help"""
+    parser = argparse.ArgumentParser(
+        prog="dytt8",
+        description="电影天堂工具集: 显示菜单，选择要运行的爬虫、搜索或修复脚本",
+        epilog="图形界面: dytt8-gui；全部功能(API、调度、推荐): dytt8-full --help"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """主函数"""
+    parse_args(argv)
     clear_screen()
     print_header()
     
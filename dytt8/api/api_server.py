@@ -10,9 +10,11 @@ import threading
 import logging
 from datetime import datetime
 import argparse
-from flask import Flask, request, jsonify, send_file
+import time
+from flask import Flask, request, jsonify, send_file, g, Response
 from flask_cors import CORS
-import pandas as pd
+
+from dytt8.utils import covers, dataset, links, metrics, profiling, tracing
 
 # 配置日志
 logging.basicConfig(
@@ -32,9 +34,72 @@ CORS(app)  # 启用跨域请求支持
 
 # 全局变量
 scheduled_jobs = {}  # 存储正在运行的任务
+job_traces = {}  # 任务ID -> 耗时追踪，仅保存运行中的任务，结束后摘要写入任务结果
 data_dir = os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(data_dir, exist_ok=True)
 
+# 运行指标
+REQUESTS = metrics.counter('dytt8_http_requests_total', '按路由统计的请求数', ('method', 'route', 'status'))
+REQUEST_LATENCY = metrics.histogram('dytt8_http_request_duration_seconds', '按路由统计的请求耗时', ('route',))
+def _dataset_metrics():
+    """API 当前提供的电影数据(数据集或电影缓存)的条数和版本，使用已缓存的电影列表"""
+    try:
+        source, version = _movies_version()
+        if source is None:
+            return {'size': 0, 'version': 0}
+        # 同一版本的各种列组合行数相同，有缓存时不再读取；没有时数据集只读取标题列
+        with _movies_lock:
+            size = next((len(movies) for key, movies in _movies_cache.items() if key[:2] == (source, version)), None)
+        if size is None:
+            size = len(_cached_movies(['title'] if source == 'dataset' else None)[1])
+        return {'size': size, 'version': int(version)}
+    except Exception as e:
+        logger.error(f"读取电影数据指标失败: {e}")
+        return {'size': 0, 'version': 0}
+
+def _job_states():
+    states = {}
+    for job in list(scheduled_jobs.values()):
+        states[job.get('status', 'unknown')] = states.get(job.get('status', 'unknown'), 0) + 1
+    return states
+
+metrics.gauge('dytt8_dataset_movies', 'API 当前电影数据中的电影数').set_function(lambda: _dataset_metrics()['size'])
+metrics.gauge('dytt8_dataset_version', 'API 当前电影数据的版本(修改时间戳)').set_function(lambda: _dataset_metrics()['version'])
+metrics.gauge('dytt8_jobs', '按状态统计的爬取任务数', ('status',)).set_function(_job_states)
+metrics.gauge('dytt8_job_queue_depth', '正在运行的爬取任务数').set_function(lambda: _job_states().get('running', 0))
+
+PROFILE_HEADER = 'X-Dytt8-Profile'  # 值为 1/true (cProfile) 或 sample (采样)
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+    mode = profiling.parse_mode(request.headers.get(PROFILE_HEADER))
+    if mode:
+        # 多线程服务器中同时处理的其他请求不计入本次剖析
+        g.profile = profiling.profile(f"request_{request.endpoint or 'unknown'}", mode,
+                                      current_thread_only=True).__enter__()
+
+@app.after_request
+def _record_request(response):
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    start = g.get('request_start')
+    if start is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route)
+    REQUESTS.inc(request.method, route, response.status_code)
+    run_profile = g.pop('profile', None)
+    if run_profile is not None:
+        run_profile.__exit__(None, None, None)
+        if run_profile.file:
+            response.headers['X-Dytt8-Profile-File'] = os.path.basename(run_profile.file)
+    return response
+
+@app.teardown_request
+def _stop_profile(exc):
+    # 请求异常结束、未经过 after_request 时也要停止剖析
+    run_profile = g.pop('profile', None)
+    if run_profile is not None:
+        run_profile.__exit__(None, None, None)
+
 @app.route('/', methods=['GET'])
 def index():
     """API首页"""
@@ -45,10 +110,18 @@ def index():
             {'path': '/movies', 'method': 'GET', 'description': '获取电影列表'},
             {'path': '/movies/search', 'method': 'GET', 'description': '搜索电影'},
             {'path': '/movies/download/<movie_id>', 'method': 'GET', 'description': '获取电影下载链接'},
+            {'path': '/links/<infohash>', 'method': 'GET', 'description': '共用同一 infohash 的电影'},
+            {'path': '/links/largest', 'method': 'GET', 'description': '指定清晰度中最大的版本(resolution, title)'},
+            {'path': '/movies/<movie_id>/cover', 'method': 'GET', 'description': '获取电影封面(size=thumb 为缩略图)'},
+            {'path': '/covers/<digest>', 'method': 'GET', 'description': '按内容摘要获取封面，可长期缓存'},
             {'path': '/recommendations', 'method': 'GET', 'description': '获取电影推荐'},
             {'path': '/scrape', 'method': 'POST', 'description': '启动爬取任务'},
             {'path': '/tasks', 'method': 'GET', 'description': '获取所有任务'},
             {'path': '/tasks/<task_id>', 'method': 'GET', 'description': '获取任务详情'},
+            {'path': '/tasks/<task_id>/runs', 'method': 'GET', 'description': '获取任务运行历史'},
+            {'path': '/metrics', 'method': 'GET', 'description': 'Prometheus 运行指标'},
+            {'path': '/profiles', 'method': 'GET', 'description': '列出剖析文件'},
+            {'path': '/profiles/<name>', 'method': 'GET', 'description': '查看或下载剖析文件'},
         ]
     })
 
@@ -152,15 +225,8 @@ def search_movies():
 def get_download_link(movie_id):
     """获取电影下载链接"""
     try:
-        # 加载电影数据
-        movies = _load_movies()
-        
         # 查找对应的电影
-        movie = None
-        for m in movies:
-            if m.get('id', '') == movie_id:
-                movie = m
-                break
+        movie = _find_movie(movie_id, columns=['title', 'download_link', 'download_links'])
         
         if not movie:
             return jsonify({'error': '未找到指定电影'}), 404
@@ -173,13 +239,97 @@ def get_download_link(movie_id):
         return jsonify({
             'movie_id': movie_id,
             'title': movie.get('title', ''),
-            'download_link': download_link
+            'download_link': download_link,
+            'download_links': links.movie_links(movie)
         })
         
     except Exception as e:
         logger.error(f"获取下载链接失败: {e}")
         return jsonify({'error': str(e)}), 500
 
+# /links/largest 单次返回的最大条数
+LINKS_MAX_LIMIT = 100
+
+@app.route('/links/largest', methods=['GET'])
+def get_largest_link():
+    """指定清晰度中文件最大的版本"""
+    try:
+        resolution = request.args.get('resolution', '1080p')
+        # 无法解析时使用默认值，超出范围时截断
+        limit = min(max(request.args.get('limit', 1, type=int), 1), LINKS_MAX_LIMIT)
+        found = links.get_index().largest(resolution, title=request.args.get('title'), limit=limit)
+        return jsonify({'resolution': resolution, 'count': len(found), 'links': found})
+        
+    except Exception as e:
+        logger.error(f"查询下载链接失败: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/links/<infohash>', methods=['GET'])
+def get_movies_by_infohash(infohash):
+    """共用同一 infohash 的电影"""
+    try:
+        normalized = links.normalize_infohash(infohash)
+        if normalized is None:
+            return jsonify({'error': 'infohash 应为40位十六进制或32位 base32'}), 400
+        movies = links.get_index().movies_by_infohash(infohash)
+        return jsonify({'infohash': normalized, 'count': len(movies), 'movies': movies})
+        
+    except Exception as e:
+        logger.error(f"查询 infohash 失败: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# 封面URL可能随重新爬取而变化，按电影ID访问的封面缓存一天；按摘要访问的内容不会变化
+COVER_MAX_AGE = 86400
+IMMUTABLE_MAX_AGE = 365 * 86400
+
+def _send_cover(cover, size, max_age, immutable=False):
+    """
+    发送封面或缩略图，ETag 为内容摘要
+
+    客户端带 If-None-Match 时直接返回 304，不生成缩略图；缩略图生成失败时返回 502
+    """
+    thumb = size == 'thumb' and covers.PILLOW_AVAILABLE
+    etag = f"{cover.digest}-{size}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+    else:
+        try:
+            path = covers.get_cache().thumbnail(cover) if thumb else cover.path
+        except Exception as e:
+            logger.error(f"生成缩略图失败: {cover.digest}: {e}")
+            return jsonify({'error': f'生成缩略图失败: {e}'}), 502
+        response = send_file(path, mimetype='image/jpeg' if thumb else cover.mime, etag=etag,
+                             conditional=True, max_age=max_age)
+    response.headers['Cache-Control'] = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+    response.headers['Content-Location'] = f"/covers/{cover.digest}?size={size}"
+    return response
+
+@app.route('/movies/<movie_id>/cover', methods=['GET'])
+def get_movie_cover(movie_id):
+    """获取电影封面，第一次请求时下载并缓存到本地"""
+    size = request.args.get('size', 'thumb')
+    movie = _find_movie(movie_id, columns=['title', 'cover_image'])
+    if not movie:
+        return jsonify({'error': '未找到指定电影'}), 404
+    url = movie.get('cover_image')
+    if not url:
+        return jsonify({'error': '该电影没有封面'}), 404
+    try:
+        cover = covers.get_cache().get(url)
+    except Exception as e:
+        logger.error(f"获取封面失败: {url}: {e}")
+        return jsonify({'error': f'获取封面失败: {e}'}), 502
+    return _send_cover(cover, size, COVER_MAX_AGE)
+
+@app.route('/covers/<digest>', methods=['GET'])
+def get_cover(digest):
+    """按内容摘要获取已缓存的封面"""
+    cover = covers.get_cache().by_digest(digest)
+    if cover is None:
+        return jsonify({'error': '未找到指定封面'}), 404
+    return _send_cover(cover, request.args.get('size', 'thumb'), IMMUTABLE_MAX_AGE, immutable=True)
+
 @app.route('/recommendations', methods=['GET'])
 def get_recommendations():
     """获取电影推荐"""
@@ -192,14 +342,14 @@ def get_recommendations():
         regions = request.args.get('regions', '').split(',') if request.args.get('regions') else []
         
         # 导入推荐系统
-        from recommender import MovieRecommender
+        from dytt8.recommender.recommender import MovieRecommender
         
-        # 初始化推荐系统
-        recommender = MovieRecommender()
+        # 初始化推荐系统，与其他接口使用同一份电影数据
+        recommender = MovieRecommender(movies=_load_movies(columns=MovieRecommender.COLUMNS))
         
-        # 设置用户偏好
+        # 设置用户偏好（仅对本次请求有效）
         if genres or year_range != '不限' or regions:
-            recommender.set_preferences(genres=genres, year_range=year_range, regions=regions)
+            recommender.set_preferences(genres=genres, year_range=year_range, regions=regions, persist=False)
         
         # 获取推荐
         recommendations = recommender.get_recommendations(count=count, source=source)
@@ -228,6 +378,11 @@ def start_scrape():
         category = data.get('category', '最新电影')
         save_format = data.get('format', 'csv')
         async_run = data.get('async', True)  # 是否异步运行
+        profile = profiling.parse_mode(data.get('profile'))  # true 或 "sample"
+        resume = bool(data.get('resume', False))  # 从上次中断的断点继续
+        
+        if save_format == 'parquet' and not dataset.PARQUET_AVAILABLE:
+            return jsonify({'error': 'parquet 格式需要安装 pyarrow'}), 400
         
         # 启动爬取过程
         if async_run:
@@ -236,10 +391,17 @@ def start_scrape():
             
             def run_scraper():
                 try:
-                    result = _execute_scrape(source, pages, delay, category, save_format)
+                    result = _execute_scrape(source, pages, delay, category, save_format, job_id=job_id,
+                                             profile=profile, resume=resume)
                     scheduled_jobs[job_id] = {'status': 'completed', 'result': result}
                 except Exception as e:
-                    scheduled_jobs[job_id] = {'status': 'failed', 'error': str(e)}
+                    job = {'status': 'failed', 'error': str(e)}
+                    if job_id in job_traces:
+                        job['trace'] = job_traces[job_id].summary()
+                    scheduled_jobs[job_id] = job
+                finally:
+                    # 结果中已包含追踪摘要
+                    job_traces.pop(job_id, None)
             
             # 创建并启动线程
             thread = threading.Thread(target=run_scraper)
@@ -257,7 +419,7 @@ def start_scrape():
             
         else:
             # 同步运行
-            result = _execute_scrape(source, pages, delay, category, save_format)
+            result = _execute_scrape(source, pages, delay, category, save_format, profile=profile, resume=resume)
             
             return jsonify({
                 'status': 'completed',
@@ -272,14 +434,10 @@ def start_scrape():
 def get_tasks():
     """获取所有任务"""
     try:
-        # 导入任务调度器
-        from scheduler import TaskScheduler
+        # 只读取任务配置，不为每个请求创建调度器和执行器
+        from dytt8.scheduler.scheduler import read_tasks
         
-        # 初始化调度器
-        scheduler = TaskScheduler()
-        
-        # 获取所有任务
-        tasks = scheduler.get_all_tasks()
+        tasks = read_tasks()
         
         return jsonify({
             'count': len(tasks),
@@ -294,14 +452,9 @@ def get_tasks():
 def get_task(task_id):
     """获取任务详情"""
     try:
-        # 导入任务调度器
-        from scheduler import TaskScheduler
-        
-        # 初始化调度器
-        scheduler = TaskScheduler()
+        from dytt8.scheduler.scheduler import read_tasks
         
-        # 获取任务
-        task = scheduler.get_task(task_id)
+        task = next((item for item in read_tasks() if item['id'] == task_id), None)
         
         if not task:
             return jsonify({'error': '未找到指定任务'}), 404
@@ -312,69 +465,215 @@ def get_task(task_id):
         logger.error(f"获取任务详情失败: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/tasks/<task_id>/runs', methods=['GET'])
+def get_task_runs(task_id):
+    """获取任务的运行历史（状态、等待时间和耗时）"""
+    try:
+        from dytt8.scheduler.scheduler import read_tasks, read_run_history
+        
+        if not any(item['id'] == task_id for item in read_tasks()):
+            return jsonify({'error': '未找到指定任务'}), 404
+        
+        limit = int(request.args.get('limit', 50))
+        runs = read_run_history(task_id, limit=limit)
+        return jsonify({'count': len(runs), 'runs': runs})
+        
+    except Exception as e:
+        logger.error(f"获取运行历史失败: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/jobs/<job_id>', methods=['GET'])
 def get_job_status(job_id):
     """获取异步任务状态"""
     if job_id not in scheduled_jobs:
         return jsonify({'error': '未找到指定任务'}), 404
     
-    return jsonify(scheduled_jobs[job_id])
+    job = dict(scheduled_jobs[job_id])
+    if job_id in job_traces:
+        job['trace'] = job_traces[job_id].summary()
+    return jsonify(job)
 
-def _load_movies():
-    """加载电影数据"""
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 文本格式的运行指标"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/profiles', methods=['GET'])
+def get_profiles():
+    """列出剖析文件，最新的在前"""
+    profiles = profiling.list_profiles()
+    return jsonify({'count': len(profiles), 'profiles': profiles})
+
+# /profiles/<name> 单次返回的最多函数数
+PROFILE_MAX_LIMIT = 500
+
+@app.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """查看剖析文件中耗时最多的函数，download=1 时下载原文件"""
+    if name != os.path.basename(name) or name not in {item['name'] for item in profiling.list_profiles()}:
+        return jsonify({'error': '未找到指定剖析文件'}), 404
+    path = os.path.join(profiling.DEFAULT_PROFILE_DIR, name)
+    if request.args.get('download') in ('1', 'true'):
+        return send_file(path, as_attachment=True)
     try:
-        # 查找最新的电影数据文件
-        data_file = os.path.join(data_dir, "movies_cache.json")
-        
-        if os.path.exists(data_file):
-            with open(data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        
-        # 如果没有缓存文件，查找CSV文件
-        csv_files = [f for f in os.listdir(os.path.dirname(__file__)) if f.endswith('.csv') and ('movies' in f or 'dytt' in f)]
-        
-        if not csv_files:
-            return []
-        
-        # 按修改时间排序，取最新的文件
-        latest_file = max(csv_files, key=lambda f: os.path.getmtime(os.path.join(os.path.dirname(__file__), f)))
-        latest_file_path = os.path.join(os.path.dirname(__file__), latest_file)
+        limit = int(request.args.get('limit', 30))
+    except ValueError:
+        return jsonify({'error': 'limit 应为整数'}), 400
+    # 超出范围时截断
+    limit = min(max(limit, 1), PROFILE_MAX_LIMIT)
+    sort = request.args.get('sort', 'cumulative')
+    try:
+        return jsonify({'name': name, 'functions': profiling.top_functions(path, limit=limit, sort=sort)})
+    except Exception as e:
+        logger.error(f"读取剖析文件失败: {name}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# 已读取的电影数据: (来源, 版本, 列) -> 电影列表，数据变化后整体丢弃；按ID的索引同样按键缓存
+_movies_cache = {}
+_movies_index = {}
+_movies_lock = threading.Lock()
+
+def _movies_version():
+    """
+    当前电影数据的来源和版本(修改时间)
+
+    返回:
+        tuple: ('dataset', 最新分片的修改时间) / ('cache', 缓存文件的修改时间) / (None, None)
+    """
+    data_file = os.path.join(data_dir, "movies_cache.json")
+    dataset_mtime = dataset.version(os.path.join(data_dir, "dataset")) if dataset.PARQUET_AVAILABLE else None
+    try:
+        cache_mtime = os.path.getmtime(data_file)
+    except OSError:
+        cache_mtime = None
+    # Parquet 数据集比电影缓存新时从数据集读取
+    if dataset_mtime is not None and (cache_mtime is None or dataset_mtime >= cache_mtime):
+        return 'dataset', dataset_mtime
+    if cache_mtime is not None:
+        return 'cache', cache_mtime
+    return None, None
+
+def _load_movies(columns=None):
+    """
+    加载电影数据，columns 指定只读取的列(仅数据集；电影缓存和CSV只有一份完整列表，供所有调用方共用)
+    
+    读取结果按数据的版本缓存，数据集或缓存文件不变时不再重复读取；
+    返回列表的浅拷贝，调用方可以排序，但不应修改其中的电影字典
+    """
+    try:
+        return list(_cached_movies(columns)[1])
         
-        # 读取CSV文件
-        df = pd.read_csv(latest_file_path)
-        movies = df.to_dict('records')
+    except Exception as e:
+        logger.error(f"加载电影数据失败: {e}")
+        return []
+
+def _cached_movies(columns=None):
+    """当前版本的缓存键和电影列表(未拷贝)，未缓存时读取"""
+    source, version = _movies_version()
+    # 只有数据集能按列读取，其他来源不论 columns 都使用同一份列表
+    key = (source, version, tuple(columns) if columns and source == 'dataset' else None)
+    with _movies_lock:
+        movies = _movies_cache.get(key)
+    if movies is None:
+        movies = _read_movies(source, columns)
+        if source is not None:
+            with _movies_lock:
+                for old in [k for k in _movies_cache if k[:2] != key[:2]]:
+                    del _movies_cache[old]
+                    _movies_index.pop(old, None)
+                _movies_cache[key] = movies
+    return key, movies
+
+def _find_movie(movie_id, columns=None):
+    """
+    按ID查找电影，使用按数据版本缓存的索引
+
+    返回:
+        dict: 找不到或加载失败时返回None
+    """
+    try:
+        key, movies = _cached_movies(columns)
+        with _movies_lock:
+            index = _movies_index.get(key)
+            if index is None:
+                index = {movie.get('id'): movie for movie in movies}
+                if key in _movies_cache:
+                    _movies_index[key] = index
+        return index.get(movie_id)
         
-        # 为每部电影添加ID
+    except Exception as e:
+        logger.error(f"加载电影数据失败: {e}")
+        return None
+
+def _read_movies(source, columns=None):
+    """从数据集、电影缓存或最新的CSV文件读取电影数据"""
+    data_file = os.path.join(data_dir, "movies_cache.json")
+    if source == 'dataset':
+        movies = dataset.read_movies(os.path.join(data_dir, "dataset"), columns=columns)
         for i, movie in enumerate(movies):
             movie['id'] = f"movie_{i}"
-        
-        # 保存到缓存
-        os.makedirs(data_dir, exist_ok=True)
-        with open(data_file, 'w', encoding='utf-8') as f:
-            json.dump(movies, f, ensure_ascii=False, indent=2)
-        
         return movies
-        
-    except Exception as e:
-        logger.error(f"加载电影数据失败: {e}")
+    
+    if source == 'cache':
+        with open(data_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    # 如果没有缓存文件，查找CSV文件
+    csv_files = [f for f in os.listdir(os.path.dirname(__file__)) if f.endswith('.csv') and ('movies' in f or 'dytt' in f)]
+    
+    if not csv_files:
         return []
+    
+    # 按修改时间排序，取最新的文件
+    latest_file = max(csv_files, key=lambda f: os.path.getmtime(os.path.join(os.path.dirname(__file__), f)))
+    latest_file_path = os.path.join(os.path.dirname(__file__), latest_file)
+    
+    # 读取CSV文件；pandas 导入较慢，只在没有缓存和数据集时加载
+    import pandas as pd
+    df = pd.read_csv(latest_file_path)
+    movies = df.to_dict('records')
+    
+    # 为每部电影添加ID
+    for i, movie in enumerate(movies):
+        movie['id'] = f"movie_{i}"
+    
+    # 保存到缓存
+    os.makedirs(data_dir, exist_ok=True)
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(movies, f, ensure_ascii=False, indent=2)
+    
+    return movies
 
-def _execute_scrape(source, pages, delay, category, save_format):
-    """执行爬取过程"""
+def _execute_scrape(source, pages, delay, category, save_format, job_id=None, profile=None, resume=False):
+    """执行爬取过程，各阶段耗时记入追踪并随结果返回；profile 不为None时同时生成剖析文件"""
+    run_trace = tracing.trace(job_id or f"scrape_{source}")
+    if job_id:
+        job_traces[job_id] = run_trace
+    run_profile = profiling.profile(job_id or f"scrape_{source}", profile)
+    with run_trace, run_profile:
+        result = _run_scrape(source, pages, delay, category, save_format, resume)
+    result['trace'] = run_trace.summary()
+    result['trace_file'] = run_trace.file
+    if run_profile.file:
+        result['profile_file'] = os.path.basename(run_profile.file)
+    return result
+
+def _run_scrape(source, pages, delay, category, save_format, resume=False):
+    """运行爬虫并更新电影缓存，resume 为True时从断点继续"""
     try:
         if source == 'dytt8':
             # 导入爬虫
-            from scrapers.dytt8_scraper import Dytt8Scraper
+            from dytt8.scrapers.dytt8_scraper import Dytt8Scraper
             
             # 初始化爬虫
-            scraper = Dytt8Scraper(pages=pages, delay=delay, category=category, headless=True)
+            scraper = Dytt8Scraper(pages=pages, delay=delay, category=category, headless=True, resume=resume)
             
         elif source == 'douban':
             # 导入爬虫
-            from scrapers.douban_scraper import DoubanScraper
+            from dytt8.scrapers.douban_scraper import DoubanScraper
             
             # 初始化爬虫
-            scraper = DoubanScraper(pages=pages, delay=delay, category=category, headless=True)
+            scraper = DoubanScraper(pages=pages, delay=delay, category=category, headless=True, resume=resume)
             
         else:
             raise ValueError(f"不支持的数据源: {source}")
@@ -388,10 +687,15 @@ def _execute_scrape(source, pages, delay, category, save_format):
         
         saved_file = scraper.save_results(format=save_format, output_dir=output_dir)
         
-        # 更新缓存
+        # 更新缓存；parquet 格式已写入数据集，由 _load_movies 直接读取
         movies = scraper.get_results()
         
-        if movies:
+        # 下载链接写入 links 索引
+        index = links.get_index()
+        index.write_many(movies)
+        index.flush()
+        
+        if movies and save_format != 'parquet':
             # 为每部电影添加ID
             for i, movie in enumerate(movies):
                 movie['id'] = f"movie_{i}"
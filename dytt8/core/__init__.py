@@ -1,16 +1,40 @@
 """
 电影天堂工具集 - 核心模块
 提供电影爬取和搜索的核心功能
+
+各爬虫依赖 selenium，导入较慢；这里只登记导出名，第一次访问时才导入对应模块 (PEP 562)
 """
+import importlib
 
-# 导入并导出主要类
-from dytt8.core.dytt8_scraper import Dytt8Scraper as MovieScraper
-from dytt8.core.dytt8_movie_finder import MovieFinder
-from dytt8.core.dytt8_scraper_v2 import Dytt8Scraper as MovieScraperV2
-from dytt8.core.dytt8_simple import SimpleDyttScraper as SimpleMovieScraper
+# 导出名 -> (模块, 属性)
+_EXPORTS = {
+    "MovieScraper": ("dytt8.core.dytt8_scraper", "Dytt8Scraper"),
+    "MovieFinder": ("dytt8.core.dytt8_movie_finder", "MovieFinder"),
+    "MovieScraperV2": ("dytt8.core.dytt8_scraper_v2", "Dytt8Scraper"),
+    "SimpleMovieScraper": ("dytt8.core.dytt8_simple", "SimpleDyttScraper"),
+}
 
 # 为了向后兼容，提供别名
-Scraper = MovieScraper
-ScraperV2 = MovieScraperV2
-Finder = MovieFinder
-SimpleScraper = SimpleMovieScraper
+_ALIASES = {
+    "Scraper": "MovieScraper",
+    "ScraperV2": "MovieScraperV2",
+    "Finder": "MovieFinder",
+    "SimpleScraper": "SimpleMovieScraper",
+}
+
+__all__ = list(_EXPORTS) + list(_ALIASES)
+
+
+def __getattr__(name):
+    target = _EXPORTS.get(_ALIASES.get(name, name))
+    if target is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = target
+    value = getattr(importlib.import_module(module_name), attribute)
+    # 缓存到模块全局，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -5,7 +5,6 @@
 """
 import os
 import sys
-import time
 import re
 from urllib.parse import quote
 
@@ -23,6 +22,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+from dytt8.utils import tracing
+from dytt8.utils.encoding import fix_mojibake
+from dytt8.utils.zoom_parser import extract_movie_metadata
+
 
 class MovieFinder:
     """电影查找器类"""
@@ -44,22 +47,14 @@ class MovieFinder:
     
     def fix_encoding(self, text):
         """修复中文乱码问题"""
-        if not text:
-            return ""
-        
-        # 尝试不同的编码方式
-        try:
-            return text.encode('latin1').decode('utf-8')
-        except:
-            try:
-                return text.encode('latin1').decode('gbk')
-            except:
-                return text
+        return fix_mojibake(text)
     
+    @tracing.traced("open_website")
     def open_website(self):
         """打开电影天堂网站"""
         try:
-            self.driver.get(self.base_url)
+            with tracing.span("navigate"):
+                self.driver.get(self.base_url)
             # 等待页面加载完成
             WebDriverWait(self.driver, 10).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
@@ -70,6 +65,7 @@ class MovieFinder:
             print(f"✗ 打开网站失败: {e}")
             return False
     
+    @tracing.traced("search")
     def search_movie(self, movie_name):
         """搜索特定电影"""
         if not self.open_website():
@@ -121,25 +117,27 @@ class MovieFinder:
                     
                     if search_button:
                         safe_click(self.driver, search_button)
-                        time.sleep(2)  # 等待搜索结果加载
+                        tracing.sleep(2)  # 等待搜索结果加载
                     else:
                         # 尝试按回车键提交搜索
                         search_input.submit()
-                        time.sleep(2)
+                        tracing.sleep(2)
                 
                 # 如果没有找到搜索框或无法提交搜索，使用备用方法
                 else:
                     # 备用搜索方法：某些网站使用GET方式搜索，使用URL直接搜索
                     search_url = f"{self.base_url}/plusSearch.php?q={quote(movie_name)}"
-                    self.driver.get(search_url)
-                    time.sleep(2)
+                    with tracing.span("navigate"):
+                        self.driver.get(search_url)
+                    tracing.sleep(2)
             
             except Exception as e:
                 print(f"使用搜索框搜索失败: {e}")
                 # 备用搜索方法：某些网站使用GET方式搜索，使用URL直接搜索
                 search_url = f"{self.base_url}/plus/search.php?kwtype=0&searchtype=title&keyword={quote(movie_name)}"
-                self.driver.get(search_url)
-                time.sleep(2)
+                with tracing.span("navigate"):
+                    self.driver.get(search_url)
+                tracing.sleep(2)
             
             # 收集搜索结果
             search_results = []
@@ -195,13 +193,15 @@ class MovieFinder:
             print(f"搜索电影时出错: {e}")
             return []
     
+    @tracing.traced("get_movie_details")
     def get_download_links(self, movie_info):
         """获取电影下载链接"""
         try:
             print(f"正在获取《{movie_info['title']}》的下载链接...")
             
             # 访问电影详情页
-            self.driver.get(movie_info["link"])
+            with tracing.span("navigate"):
+                self.driver.get(movie_info["link"])
             
             # 等待页面加载
             WebDriverWait(self.driver, 10).until(
@@ -252,6 +252,9 @@ class MovieFinder:
                 "description": description
             })
             
+            # 从描述中提取导演、主演、评分等结构化字段
+            movie_info.update(extract_movie_metadata(description))
+            
             return movie_info
         
         except Exception as e:
@@ -259,6 +262,7 @@ class MovieFinder:
             movie_info["download_links"] = []
             return movie_info
     
+    @tracing.traced("list_page")
     def get_hot_movies(self, limit=10):
         """获取热门电影"""
         if not self.open_website():
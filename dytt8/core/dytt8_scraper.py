@@ -6,7 +6,6 @@
 import os
 import sys
 import time
-import csv
 import re
 from datetime import datetime
 from urllib.parse import urljoin
@@ -25,13 +24,25 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+from dytt8.utils import links, rate_control, retry, tracing
+from dytt8.utils.checkpoint import Checkpoint
+from dytt8.utils.sinks import CSVSink
+from dytt8.utils.encoding import fix_mojibake
+from dytt8.utils.zoom_parser import extract_movie_metadata
+
 
 class Dytt8Scraper:
     """电影天堂网站爬虫类"""
     
-    def __init__(self, headless=True, disable_images=True):
-        """初始化爬虫"""
+    def __init__(self, headless=True, disable_images=True, driver=None):
+        """初始化爬虫，传入 driver 时复用已有的 WebDriver"""
         self.base_url = "https://www.dytt8.com/"
+        if driver is not None:
+            # 使用外部提供的驱动(如调度器的驱动池)，由提供方负责关闭
+            self.driver = driver
+            self._owns_driver = False
+            return
+        self._owns_driver = True
         self.driver = setup_chrome_driver(headless=headless, disable_images=disable_images)
         # 解决中文乱码问题的配置
         self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
@@ -40,17 +51,19 @@ class Dytt8Scraper:
         
     def __del__(self):
         """析构函数 - 确保浏览器关闭"""
-        if hasattr(self, 'driver'):
+        if hasattr(self, 'driver') and getattr(self, '_owns_driver', True):
             self.driver.quit()
     
+    @tracing.traced("open_website")
     def open_website(self):
         """打开电影天堂网站"""
         try:
-            self.driver.get(self.base_url)
-            # 等待页面加载完成
-            WebDriverWait(self.driver, 10).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )
+            with tracing.span("navigate"):
+                self.driver.get(self.base_url)
+                # 等待页面加载完成
+                WebDriverWait(self.driver, 10).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete"
+                )
             print("成功打开电影天堂网站")
             return True
         except Exception as e:
@@ -59,20 +72,7 @@ class Dytt8Scraper:
     
     def fix_encoding(self, text):
         """修复中文乱码问题"""
-        if not text:
-            return ""
-        
-        # 尝试不同的编码方式
-        try:
-            # 对于某些特殊情况下的编码修复
-            return text.encode('latin1').decode('utf-8')
-        except:
-            try:
-                # 对于某些特殊情况下的编码修复
-                return text.encode('latin1').decode('gbk')
-            except:
-                # 如果无法修复，则返回原始文本
-                return text
+        return fix_mojibake(text)
     
     def extract_movie_info(self, movie_element):
         """从电影元素中提取信息"""
@@ -104,9 +104,18 @@ class Dytt8Scraper:
             print(f"提取电影信息时出错: {e}")
             return None
     
+    @tracing.traced("get_movie_details")
     def get_movie_details(self, movie_info):
-        """访问电影详情页获取更多信息"""
+        """访问电影详情页获取更多信息，超时等临时错误按退避重试，仍失败时返回原信息"""
         try:
+            return retry.RetryPolicy().call(self._fetch_movie_details, movie_info, description=movie_info["link"])
+        except Exception as e:
+            print(f"获取电影详情时出错({retry.classify(e)}): {e}")
+            return movie_info
+    
+    def _fetch_movie_details(self, movie_info):
+        """访问电影详情页获取更多信息，页面打开失败时抛出异常"""
+        with tracing.span("navigate"):
             # 访问电影详情页
             self.driver.get(movie_info["link"])
             
@@ -114,79 +123,112 @@ class Dytt8Scraper:
             WebDriverWait(self.driver, 10).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
-            
-            # 提取下载链接 (多种可能的选择器适应网站不同版面)
-            download_link = None
-            selectors = [
-                "//a[contains(@href, 'magnet:')]",
-                "//a[contains(@href, 'thunder:')]",
-                "//a[contains(@href, 'ed2k:')]",
-                "//a[contains(@href, '.torrent')]",
-                "//a[contains(text(), '下载')]",
-                "//a[contains(text(), '磁力')]",
-                "//a[contains(text(), '迅雷')]",
-                "//td[@bgcolor='#fdfddf']/a"
-            ]
-            
-            for selector in selectors:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, selector)
-                    if elements:
-                        download_link = elements[0].get_attribute("href")
-                        break
-                except:
-                    continue
-            
-            # 提取电影描述信息
-            description = ""
-            try:
-                # 尝试找到包含电影描述的元素
-                desc_element = self.driver.find_element(By.XPATH, "//div[@id='Zoom']")
-                if desc_element:
-                    description = desc_element.text
-                    description = self.fix_encoding(description)
-            except:
-                pass
-            
-            # 提取封面图片URL
-            cover_image = ""
+        
+        # 提取下载链接 (多种可能的选择器适应网站不同版面)
+        download_link = None
+        selectors = [
+            "//a[contains(@href, 'magnet:')]",
+            "//a[contains(@href, 'thunder:')]",
+            "//a[contains(@href, 'ed2k:')]",
+            "//a[contains(@href, '.torrent')]",
+            "//a[contains(text(), '下载')]",
+            "//a[contains(text(), '磁力')]",
+            "//a[contains(text(), '迅雷')]",
+            "//td[@bgcolor='#fdfddf']/a"
+        ]
+        
+        for selector in selectors:
             try:
-                img_elements = self.driver.find_elements(By.XPATH, "//div[@id='Zoom']//img")
-                if img_elements:
-                    cover_image = img_elements[0].get_attribute("src")
+                elements = self.driver.find_elements(By.XPATH, selector)
+                if elements:
+                    download_link = elements[0].get_attribute("href")
+                    break
             except:
-                pass
-            
-            # 更新电影信息
-            movie_info.update({
-                "download_link": download_link,
-                "description": description,
-                "cover_image": cover_image
-            })
-            
-            return movie_info
-        except Exception as e:
-            print(f"获取电影详情时出错: {e}")
-            return movie_info
+                continue
+        
+        # 页面中的全部下载链接
+        try:
+            download_links = links.extract_links(self.driver.page_source)
+        except Exception:
+            download_links = []
+        if not download_link and download_links:
+            download_link = download_links[0]["url"]
+        
+        # 提取电影描述信息
+        description = ""
+        try:
+            # 尝试找到包含电影描述的元素
+            desc_element = self.driver.find_element(By.XPATH, "//div[@id='Zoom']")
+            if desc_element:
+                description = desc_element.text
+                description = self.fix_encoding(description)
+        except:
+            pass
+        
+        # 提取封面图片URL
+        cover_image = ""
+        try:
+            img_elements = self.driver.find_elements(By.XPATH, "//div[@id='Zoom']//img")
+            if img_elements:
+                cover_image = img_elements[0].get_attribute("src")
+        except:
+            pass
+        
+        # 更新电影信息
+        movie_info.update({
+            "download_link": download_link,
+            "download_links": download_links,
+            "description": description,
+            "cover_image": cover_image
+        })
+        
+        # 从描述中提取导演、主演、评分等结构化字段
+        movie_info.update(extract_movie_metadata(description))
+        
+        return movie_info
+    
+    @tracing.traced("scrape_latest_movies")
+    def scrape_latest_movies(self, max_pages=3, category=None, resume=False, sink=None):
+        """
+        抓取最新电影列表
+        
+        每抓完一个列表页或详情页都会记入断点(dytt8/data/checkpoints)，
+        resume 为True时从上次中断的位置继续，已获取的详情不再重复抓取；
+        传入 sink (dytt8.utils.sinks) 时每得到一部电影的详情就立即写出
+        """
+        checkpoint = Checkpoint(f"dytt8_selenium_{category or '最新电影'}", resume=resume)
+        try:
+            return self._scrape_latest_movies(max_pages, category, checkpoint, sink)
+        finally:
+            checkpoint.finish()
     
-    def scrape_latest_movies(self, max_pages=3, category=None):
-        """抓取最新电影列表"""
-        all_movies = []
-        current_page = 1
+    def _scrape_latest_movies(self, max_pages, category, checkpoint, sink=None):
+        """按断点位置抓取列表页和详情页"""
+        all_movies = list(checkpoint.items)
+        current_page = checkpoint.page + 1
         
         # 打开网站
         if not self.open_website():
             return all_movies
         
-        # 如果指定了类别，先切换到相应类别
-        if category:
+        if checkpoint.stage == "detail":
+            # 列表已在上次收集完毕
+            current_page = max_pages + 1
+        elif checkpoint.page_url:
+            # 直接打开上次中断时的下一个列表页
+            with tracing.span("navigate"):
+                self.driver.get(checkpoint.page_url)
+            tracing.sleep(2)
+        elif category:
+            # 如果指定了类别，先切换到相应类别
             try:
                 # 尝试按类别筛选
                 category_links = self.driver.find_elements(By.XPATH, f"//a[contains(text(), '{category}')]")
                 if category_links:
-                    safe_click(self.driver, category_links[0])
+                    with tracing.span("navigate"):
+                        safe_click(self.driver, category_links[0])
                     # 等待页面加载
-                    time.sleep(2)
+                    tracing.sleep(2)
                 else:
                     print(f"找不到类别: {category}")
             except Exception as e:
@@ -197,62 +239,65 @@ class Dytt8Scraper:
             while current_page <= max_pages:
                 print(f"正在抓取第 {current_page} 页...")
                 
-                # 找到电影列表
-                movie_elements = []
-                try:
-                    # 尝试不同的选择器找到电影列表
-                    selectors = [
-                        "//div[@class='co_content8']//td//a[contains(@href, '.html')]",
-                        "//div[@class='co_content8']//table//a[contains(@href, '.html')]",
-                        "//a[contains(@href, '.html')]"
-                    ]
+                with tracing.span("list_page"):
+                    # 找到电影列表
+                    movie_elements = []
+                    try:
+                        # 尝试不同的选择器找到电影列表
+                        selectors = [
+                            "//div[@class='co_content8']//td//a[contains(@href, '.html')]",
+                            "//div[@class='co_content8']//table//a[contains(@href, '.html')]",
+                            "//a[contains(@href, '.html')]"
+                        ]
                     
-                    for selector in selectors:
-                        movie_elements = self.driver.find_elements(By.XPATH, selector)
-                        if movie_elements:
-                            break
-                except:
-                    pass
+                        for selector in selectors:
+                            movie_elements = self.driver.find_elements(By.XPATH, selector)
+                            if movie_elements:
+                                break
+                    except:
+                        pass
                 
-                # 如果找不到电影元素，则退出循环
-                if not movie_elements:
-                    print("找不到电影列表元素")
-                    break
+                    # 如果找不到电影元素，则退出循环
+                    if not movie_elements:
+                        print("找不到电影列表元素")
+                        break
                 
-                # 处理找到的电影元素
-                for element in movie_elements:
-                    try:
-                        # 排除导航链接
-                        href = element.get_attribute("href")
-                        if not href or "index.html" in href or "list" in href:
-                            continue
+                    # 处理找到的电影元素
+                    for element in movie_elements:
+                        try:
+                            # 排除导航链接
+                            href = element.get_attribute("href")
+                            if not href or "index.html" in href or "list" in href:
+                                continue
                         
-                        # 创建基本电影信息
-                        movie = {
-                            "title": self.fix_encoding(element.text),
-                            "link": href
-                        }
+                            # 创建基本电影信息
+                            movie = {
+                                "title": self.fix_encoding(element.text),
+                                "link": href
+                            }
                         
-                        # 检查是否是有效的电影条目
-                        if movie["title"] and len(movie["title"]) > 2:
-                            # 尝试提取年份
-                            year_match = re.search(r'(20\d{2}|19\d{2})', movie["title"])
-                            movie["year"] = year_match.group(0) if year_match else "未知年份"
+                            # 检查是否是有效的电影条目
+                            if movie["title"] and len(movie["title"]) > 2:
+                                # 尝试提取年份
+                                year_match = re.search(r'(20\d{2}|19\d{2})', movie["title"])
+                                movie["year"] = year_match.group(0) if year_match else "未知年份"
                             
-                            all_movies.append(movie)
+                                all_movies.append(movie)
                             
-                            # 如果收集了足够多的电影，可以提前退出
-                            if len(all_movies) >= 30:
-                                break
-                    except Exception as e:
-                        print(f"处理电影元素时出错: {e}")
+                                # 如果收集了足够多的电影，可以提前退出
+                                if len(all_movies) >= 30:
+                                    break
+                        except Exception as e:
+                            print(f"处理电影元素时出错: {e}")
                 
                 # 尝试点击下一页
                 try:
                     next_page = self.driver.find_element(By.XPATH, "//a[contains(text(), '下一页')]")
                     if next_page:
-                        safe_click(self.driver, next_page)
-                        time.sleep(2)  # 等待新页面加载
+                        with tracing.span("navigate"):
+                            safe_click(self.driver, next_page)
+                        tracing.sleep(2)  # 等待新页面加载
+                        checkpoint.set_position(page=current_page, page_url=self.driver.current_url, items=all_movies)
                         current_page += 1
                     else:
                         break
@@ -261,22 +306,46 @@ class Dytt8Scraper:
                     break
             
             # 获取详细信息（仅处理前10部电影以节省时间）
-            detailed_movies = []
-            for i, movie in enumerate(all_movies[:10]):
-                print(f"正在获取电影详情 {i+1}/10: {movie['title']}")
-                detailed_info = self.get_movie_details(movie)
-                detailed_movies.append(detailed_info)
-                # 短暂暂停以减轻服务器负担
-                time.sleep(1)
+            selected = all_movies[:10]
+            checkpoint.add_urls(movie["link"] for movie in selected)
+            checkpoint.set_position(stage="detail", items=all_movies)
+            # 请求间隔由限速器按站点的响应时间自适应调整，初始为1秒
+            rate = rate_control.get_controller()
+            todo = [movie for movie in selected if checkpoint.result(movie["link"]) is None]
+            if sink is not None:
+                sink.write_many(checkpoint.result(movie["link"]) for movie in selected
+                                if checkpoint.result(movie["link"]) is not None)
+            
+            def fetch(movie):
+                print(f"正在获取电影详情 {selected.index(movie) + 1}/{len(selected)}: {movie['title']}")
+                with rate.slot(movie["link"], initial_delay=1.0, max_concurrency=1):
+                    return self._fetch_movie_details(movie)
+            
+            def done(movie, detailed_info):
+                if sink is not None:
+                    sink.write(detailed_info)
+                checkpoint.mark(movie["link"], "done", detailed_info)
+                checkpoint.save()
             
-            return detailed_movies
+            def failed(movie, error):
+                if sink is not None:
+                    sink.write(movie)
+                checkpoint.mark(movie["link"], "failed")
+            
+            # 出错的详情页放回队列末尾重试，最终失败的保留列表信息并在断点中标记为失败
+            retry.run_queue(todo, fetch, on_success=done, on_failure=failed,
+                            key=lambda movie: movie["link"])
+            rate.save()
+            
+            return [checkpoint.result(movie["link"]) or movie for movie in selected]
         
         except Exception as e:
             print(f"抓取电影列表时出错: {e}")
             return all_movies
     
+    @tracing.traced("export")
     def save_to_csv(self, movies, filename=None):
-        """将电影信息保存到CSV文件"""
+        """将电影信息保存到CSV文件，逐行写入并定期落盘"""
         if not movies:
             print("没有电影数据可保存")
             return False
@@ -290,17 +359,11 @@ class Dytt8Scraper:
             # 确定要保存的字段
             fieldnames = ["title", "year", "link", "download_link", "description", "cover_image"]
             
-            # 写入CSV文件
-            with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for movie in movies:
-                    # 只保存特定字段
-                    row = {field: movie.get(field, "") for field in fieldnames}
-                    writer.writerow(row)
+            # 写入CSV文件，只保存特定字段
+            with CSVSink(filename, fieldnames=fieldnames) as sink:
+                sink.write_many(movies)
             
-            print(f"成功保存 {len(movies)} 部电影信息到 {filename}")
+            print(f"成功保存 {sink.count} 部电影信息到 {filename}")
             return True
         
         except Exception as e:
@@ -4,8 +4,6 @@
 """
 import os
 import sys
-import time
-import csv
 import re
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
@@ -21,21 +19,35 @@ from selenium.common.exceptions import (
     StaleElementReferenceException
 )
 
+from dytt8.utils import links, retry, tracing
+from dytt8.utils.encoding import fix_mojibake
+from dytt8.utils.page_archive import instrument_driver
+from dytt8.utils.sinks import CSVSink
+from dytt8.utils.zoom_parser import extract_movie_metadata
+
 
 class Dytt8Scraper:
     """电影天堂爬虫 - 兼容版"""
     
-    def __init__(self, headless: bool = False, disable_images: bool = False):
+    def __init__(self, headless: bool = False, disable_images: bool = False, driver=None):
         """
         初始化爬虫
         
         Args:
             headless: 是否使用无头模式（无浏览器界面）
             disable_images: 是否禁用图片加载以提高性能
+            driver: 复用已有的 WebDriver，为None时新建
         """
         self.base_url = "https://www.dytt8.com/"
         self.results = []
         
+        if driver is not None:
+            # 使用外部提供的驱动(如调度器的驱动池)，由提供方负责关闭
+            self.driver = driver
+            self._owns_driver = False
+            return
+        self._owns_driver = True
+        
         # 设置Chrome选项
         options = ChromeOptions()
         if headless:
@@ -59,33 +71,27 @@ class Dytt8Scraper:
         
         # 直接使用Selenium 4的新特性，自动管理驱动程序
         print("正在初始化Chrome浏览器...")
-        self.driver = webdriver.Chrome(options=options)
+        with tracing.span("driver_setup"):
+            self.driver = instrument_driver(webdriver.Chrome(options=options))
         print("Chrome浏览器初始化成功!")
     
     def __del__(self):
         """析构函数 - 确保浏览器关闭"""
-        if hasattr(self, 'driver'):
+        if hasattr(self, 'driver') and getattr(self, '_owns_driver', True):
             print("关闭浏览器...")
             self.driver.quit()
     
     def fix_encoding(self, text: str) -> str:
         """修复中文乱码问题"""
-        if not text:
-            return ""
-        
-        try:
-            return text.encode('latin1').decode('utf-8')
-        except:
-            try:
-                return text.encode('latin1').decode('gbk')
-            except:
-                return text
+        return fix_mojibake(text)
     
+    @tracing.traced("open_website")
     def open_website(self) -> bool:
         """打开电影天堂网站"""
         try:
             print(f"正在访问电影天堂网站: {self.base_url}")
-            self.driver.get(self.base_url)
+            with tracing.span("navigate"):
+                self.driver.get(self.base_url)
             
             # 等待页面加载
             WebDriverWait(self.driver, 15).until(
@@ -98,12 +104,14 @@ class Dytt8Scraper:
             print(f"打开网站失败: {e}")
             return False
     
-    def browse_movies_by_category(self, category: str = "最新电影") -> List[Dict[str, Any]]:
+    @tracing.traced("list_page")
+    def browse_movies_by_category(self, category: str = "最新电影", sink=None) -> List[Dict[str, Any]]:
         """
         按类别浏览电影
         
         Args:
             category: 电影类别，如"最新电影"、"国内电影"等
+            sink: 流式输出(dytt8.utils.sinks)，每获取一部电影的详情就立即写入
             
         Returns:
             包含电影信息的字典列表
@@ -126,7 +134,7 @@ class Dytt8Scraper:
                         print(f"找到类别: {link_text}")
                         link.click()
                         category_found = True
-                        time.sleep(2)  # 等待页面加载
+                        tracing.sleep(2)  # 等待页面加载
                         break
             except Exception as e:
                 print(f"查找类别时出错: {e}")
@@ -175,13 +183,16 @@ class Dytt8Scraper:
                 details = self.get_movie_details(movie['link'])
                 movie.update(details)
                 movies_with_details.append(movie)
-                time.sleep(1)  # 避免请求过于频繁
+                if sink is not None:
+                    sink.write(movie)
+                tracing.sleep(1)  # 避免请求过于频繁
             
             return movies_with_details
         except Exception as e:
             print(f"浏览电影类别时出错: {e}")
             return []
     
+    @tracing.traced("search")
     def search_movie(self, keyword: str) -> List[Dict[str, Any]]:
         """
         搜索电影
@@ -200,8 +211,9 @@ class Dytt8Scraper:
             
             # 使用网站URL直接搜索
             search_url = f"{self.base_url}/plus/search.php?kwtype=0&searchtype=title&keyword={keyword}"
-            self.driver.get(search_url)
-            time.sleep(2)  # 等待搜索结果加载
+            with tracing.span("navigate"):
+                self.driver.get(search_url)
+            tracing.sleep(2)  # 等待搜索结果加载
             
             # 收集搜索结果
             results = []
@@ -246,7 +258,7 @@ class Dytt8Scraper:
                 details = self.get_movie_details(result['link'])
                 result.update(details)
                 results_with_details.append(result)
-                time.sleep(1)  # 避免请求过于频繁
+                tracing.sleep(1)  # 避免请求过于频繁
             
             return results_with_details
             
@@ -254,6 +266,7 @@ class Dytt8Scraper:
             print(f"搜索电影时出错: {e}")
             return []
     
+    @tracing.traced("get_movie_details")
     def get_movie_details(self, movie_link: str) -> Dict[str, Any]:
         """
         获取电影详情
@@ -267,12 +280,15 @@ class Dytt8Scraper:
         try:
             print(f"获取电影详情: {movie_link}")
             
-            self.driver.get(movie_link)
-            time.sleep(2)  # 等待页面加载
+            with tracing.span("navigate"):
+                # 超时、连接中断等临时错误按退避重试
+                retry.RetryPolicy().call(self.driver.get, movie_link, description=movie_link)
+            tracing.sleep(2)  # 等待页面加载
             
             # 初始化结果字典
             details = {
                 "download_link": "",
+                "download_links": [],
                 "description": "",
                 "cover_image": "",
                 "director": "",
@@ -292,6 +308,10 @@ class Dytt8Scraper:
                     td_elements = self.driver.find_elements(By.XPATH, "//td[@bgcolor='#fdfddf']/a")
                     if td_elements:
                         details["download_link"] = td_elements[0].get_attribute("href")
+                # 页面中的全部下载链接
+                details["download_links"] = links.extract_links(self.driver.page_source)
+                if not details["download_link"] and details["download_links"]:
+                    details["download_link"] = details["download_links"][0]["url"]
             except Exception as e:
                 print(f"获取下载链接时出错: {e}")
             
@@ -302,29 +322,9 @@ class Dytt8Scraper:
                     description = self.fix_encoding(desc_elements[0].text)
                     details["description"] = description
                     
-                    # 尝试从描述中提取更多信息
+                    # 尝试从描述中提取更多信息（导演、主演、评分、上映日期、译名、片长等）
                     try:
-                        # 提取导演
-                        director_match = re.search(r'导　　演(.*?)(?:\n|$)', description)
-                        if director_match:
-                            details["director"] = director_match.group(1).strip()
-                        
-                        # 提取主演
-                        actors_match = re.search(r'主　　演(.*?)(?:◎|$)', description, re.DOTALL)
-                        if actors_match:
-                            actors_text = actors_match.group(1).strip()
-                            actors = [actor.strip() for actor in actors_text.split('\n') if actor.strip()]
-                            details["actors"] = actors
-                        
-                        # 提取评分
-                        rating_match = re.search(r'(?:豆瓣评分|IMDB评分)[^\d]*([\d\.]+)', description)
-                        if rating_match:
-                            details["rating"] = rating_match.group(1).strip()
-                        
-                        # 提取上映日期
-                        date_match = re.search(r'上映日期(.*?)(?:\n|$)', description)
-                        if date_match:
-                            details["release_date"] = date_match.group(1).strip()
+                        details.update(extract_movie_metadata(description))
                     except Exception as e:
                         print(f"提取电影元数据时出错: {e}")
             except Exception as e:
@@ -341,7 +341,7 @@ class Dytt8Scraper:
             return details
             
         except Exception as e:
-            print(f"获取电影详情时出错: {e}")
+            print(f"获取电影详情时出错({retry.classify(e)}): {e}")
             return {"download_link": "", "description": "", "cover_image": ""}
     
     def scrape_latest_movies(self, limit: int = 20) -> List[Dict[str, Any]]:
@@ -356,6 +356,7 @@ class Dytt8Scraper:
         """
         return self.browse_movies_by_category("最新电影")[:limit]
     
+    @tracing.traced("export")
     def export_to_csv(self, movies: List[Dict[str, Any]], filename: str = "movies.csv") -> str:
         """
         将电影信息导出到CSV文件
@@ -377,16 +378,11 @@ class Dytt8Scraper:
             
             print(f"正在导出 {len(movies)} 部电影信息到 {filepath}")
             
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                fieldnames = ["title", "year", "director", "rating", "download_link", 
-                             "description", "cover_image", "category", "release_date"]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for movie in movies:
-                    # 只写入指定的字段
-                    movie_data = {field: movie.get(field, "") for field in fieldnames}
-                    writer.writerow(movie_data)
+            fieldnames = ["title", "year", "director", "rating", "download_link", 
+                         "description", "cover_image", "category", "release_date"]
+            # 只写入指定的字段，逐行写入并定期落盘
+            with CSVSink(filepath, fieldnames=fieldnames) as sink:
+                sink.write_many(movies)
             
             print(f"电影信息已成功导出到 {filepath}")
             return filepath
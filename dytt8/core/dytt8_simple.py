@@ -4,7 +4,6 @@
 """
 import os
 import sys
-import time
 import re
 from datetime import datetime
 
@@ -14,14 +13,26 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from dytt8.utils import links, tracing
+from dytt8.utils.encoding import fix_mojibake
+from dytt8.utils.page_archive import instrument_driver
+from dytt8.utils.zoom_parser import extract_movie_metadata
+
 
 class SimpleDyttScraper:
     """简化版电影天堂爬虫"""
     
-    def __init__(self, headless=False):
-        """初始化爬虫"""
+    def __init__(self, headless=False, driver=None):
+        """初始化爬虫，传入 driver 时复用已有的 WebDriver"""
         self.base_url = "https://www.dytt8.com/"
         
+        if driver is not None:
+            # 使用外部提供的驱动(如调度器的驱动池)，由提供方负责关闭
+            self.driver = driver
+            self._owns_driver = False
+            return
+        self._owns_driver = True
+        
         # 设置Chrome选项
         options = Options()
         if headless:
@@ -44,33 +55,27 @@ class SimpleDyttScraper:
         
         # 使用Selenium 4的新特性，自动管理驱动程序
         print("正在初始化Chrome浏览器...")
-        self.driver = webdriver.Chrome(options=options)
+        with tracing.span("driver_setup"):
+            self.driver = instrument_driver(webdriver.Chrome(options=options))
         print("Chrome浏览器初始化成功!")
     
     def __del__(self):
         """析构函数 - 确保浏览器关闭"""
-        if hasattr(self, 'driver'):
+        if hasattr(self, 'driver') and getattr(self, '_owns_driver', True):
             print("关闭浏览器...")
             self.driver.quit()
     
     def fix_encoding(self, text):
         """修复中文乱码问题"""
-        if not text:
-            return ""
-        
-        try:
-            return text.encode('latin1').decode('utf-8')
-        except:
-            try:
-                return text.encode('latin1').decode('gbk')
-            except:
-                return text
+        return fix_mojibake(text)
     
+    @tracing.traced("open_website")
     def open_website(self):
         """打开电影天堂网站"""
         try:
             print(f"正在访问电影天堂网站: {self.base_url}")
-            self.driver.get(self.base_url)
+            with tracing.span("navigate"):
+                self.driver.get(self.base_url)
             
             # 等待页面加载
             WebDriverWait(self.driver, 15).until(
@@ -83,6 +88,7 @@ class SimpleDyttScraper:
             print(f"✗ 打开网站失败: {e}")
             return False
     
+    @tracing.traced("list_page")
     def browse_movies_by_category(self, category="最新电影"):
         """按类别浏览电影"""
         if not self.open_website():
@@ -102,7 +108,7 @@ class SimpleDyttScraper:
                         print(f"找到类别: {link_text}")
                         link.click()
                         category_found = True
-                        time.sleep(2)  # 等待页面加载
+                        tracing.sleep(2)  # 等待页面加载
                         break
             except Exception as e:
                 print(f"查找类别时出错: {e}")
@@ -151,6 +157,7 @@ class SimpleDyttScraper:
             print(f"浏览电影类别时出错: {e}")
             return []
     
+    @tracing.traced("search")
     def search_movie(self, keyword):
         """搜索电影"""
         if not self.open_website():
@@ -161,8 +168,9 @@ class SimpleDyttScraper:
             
             # 使用网站URL直接搜索
             search_url = f"{self.base_url}/plus/search.php?kwtype=0&searchtype=title&keyword={keyword}"
-            self.driver.get(search_url)
-            time.sleep(2)  # 等待搜索结果加载
+            with tracing.span("navigate"):
+                self.driver.get(search_url)
+            tracing.sleep(2)  # 等待搜索结果加载
             
             # 收集搜索结果
             results = []
@@ -204,16 +212,20 @@ class SimpleDyttScraper:
             print(f"搜索电影时出错: {e}")
             return []
     
+    @tracing.traced("get_movie_details")
     def get_movie_details(self, movie_link):
         """获取电影详情"""
         try:
             print(f"正在获取电影详情: {movie_link}")
             
-            self.driver.get(movie_link)
-            time.sleep(2)  # 等待页面加载
+            with tracing.span("navigate"):
+            
+                self.driver.get(movie_link)
+            tracing.sleep(2)  # 等待页面加载
             
             # 获取下载链接
             download_link = ""
+            download_links = []
             try:
                 # 查找下载链接
                 link_elements = self.driver.find_elements(By.XPATH, "//a[contains(@href, 'magnet:') or contains(@href, 'ed2k:') or contains(@href, 'thunder:')]")
@@ -224,6 +236,10 @@ class SimpleDyttScraper:
                     td_elements = self.driver.find_elements(By.XPATH, "//td[@bgcolor='#fdfddf']/a")
                     if td_elements:
                         download_link = td_elements[0].get_attribute("href")
+                # 页面中的全部下载链接
+                download_links = links.extract_links(self.driver.page_source)
+                if not download_link and download_links:
+                    download_link = download_links[0]["url"]
             except Exception as e:
                 print(f"获取下载链接时出错: {e}")
             
@@ -236,11 +252,17 @@ class SimpleDyttScraper:
             except Exception as e:
                 print(f"获取电影描述时出错: {e}")
             
-            return {
+            details = {
                 "download_link": download_link,
+                "download_links": download_links,
                 "description": description
             }
             
+            # 从描述中提取导演、主演、评分等结构化字段
+            details.update(extract_movie_metadata(description))
+            
+            return details
+            
         except Exception as e:
             print(f"获取电影详情时出错: {e}")
             return {"download_link": "", "description": ""}
@@ -5,7 +5,6 @@
 """
 import os
 import sys
-import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 import subprocess
@@ -13,14 +12,10 @@ import importlib.util
 import re
 import time
 import random
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+
+from dytt8.gui.table import VirtualTable
+from dytt8.gui.tasks import OutputBuffer, TaskRunner, UIDispatcher
+from dytt8.scheduler.executor import kill_process_tree, popen_kwargs
 
 class MovieToolkitGUI:
     def __init__(self, root):
@@ -39,6 +34,16 @@ class MovieToolkitGUI:
         except:
             pass  # 图标加载失败则忽略
             
+        # 标题 -> 封面URL，第一次查看详情时加载
+        self._cover_index = None
+        
+        # 后台任务在线程池中执行，界面更新经队列回到主线程按帧处理
+        self.ui = UIDispatcher(self.root)
+        self.tasks = TaskRunner(self.ui)
+        self._scrape_token = None
+        self._search_token = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # 创建主框架
         self.main_frame = ttk.Frame(self.root, padding="10")
         self.main_frame.pack(fill=tk.BOTH, expand=True)
@@ -86,6 +91,9 @@ class MovieToolkitGUI:
         self.init_scheduler_tab()
         self.init_settings_tab()
         
+        # 日志按帧批量写入控件
+        self.output = OutputBuffer(self.ui, self.output_text)
+        
         # 创建状态栏
         self.status_var = tk.StringVar()
         self.status_var.set("准备就绪")
@@ -143,7 +151,8 @@ class MovieToolkitGUI:
         self.save_option_var = tk.StringVar(value="csv")
         ttk.Radiobutton(save_frame, text="CSV", variable=self.save_option_var, value="csv").grid(column=1, row=0, sticky=tk.W, padx=(0, 5))
         ttk.Radiobutton(save_frame, text="Excel", variable=self.save_option_var, value="excel").grid(column=2, row=0, sticky=tk.W, padx=(0, 5))
-        ttk.Radiobutton(save_frame, text="JSON", variable=self.save_option_var, value="json").grid(column=3, row=0, sticky=tk.W)
+        ttk.Radiobutton(save_frame, text="JSON", variable=self.save_option_var, value="json").grid(column=3, row=0, sticky=tk.W, padx=(0, 5))
+        ttk.Radiobutton(save_frame, text="Parquet", variable=self.save_option_var, value="parquet").grid(column=4, row=0, sticky=tk.W)
         
         ttk.Label(save_frame, text="保存路径:").grid(column=0, row=1, sticky=tk.W, padx=(0, 5), pady=(10, 0))
         
@@ -200,31 +209,27 @@ class MovieToolkitGUI:
         result_frame = ttk.LabelFrame(frame, text="搜索结果")
         result_frame.pack(fill=tk.BOTH, expand=True)
         
-        # 创建表格
-        columns = ("title", "year", "category", "format", "size")
-        self.result_tree = ttk.Treeview(result_frame, columns=columns, show="headings")
-        
-        # 定义列
-        self.result_tree.heading("title", text="电影名称")
-        self.result_tree.heading("year", text="年份")
-        self.result_tree.heading("category", text="类别")
-        self.result_tree.heading("format", text="格式")
-        self.result_tree.heading("size", text="大小")
-        
-        self.result_tree.column("title", width=300)
-        self.result_tree.column("year", width=60)
-        self.result_tree.column("category", width=80)
-        self.result_tree.column("format", width=60)
-        self.result_tree.column("size", width=80)
-        
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.result_tree.yview)
-        self.result_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # 结果筛选
+        filter_frame = ttk.Frame(result_frame)
+        filter_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(filter_frame, text="筛选:").pack(side=tk.LEFT)
+        self.result_filter_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.result_filter_var, width=30).pack(side=tk.LEFT, padx=5)
+        
+        # 创建表格，只渲染可见行，点击表头排序
+        table_frame = ttk.Frame(result_frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        self.result_table = VirtualTable(
+            table_frame,
+            columns=("title", "year", "category", "format", "size"),
+            headings=("电影名称", "年份", "类别", "格式", "大小"),
+            widths=(300, 60, 80, 60, 80),
+            dispatcher=self.ui
+        )
+        self.result_filter_var.trace_add("write", lambda *args: self.result_table.filter(self.result_filter_var.get()))
         
         # 双击打开下载链接
-        self.result_tree.bind("<Double-1>", self.open_download_link)
+        self.result_table.bind("<Double-1>", self.open_download_link)
         
         # 状态标签
         self.finder_status_var = tk.StringVar(value="请输入电影名称进行搜索")
@@ -307,32 +312,16 @@ class MovieToolkitGUI:
         result_frame = ttk.LabelFrame(frame, text="为您推荐的电影")
         result_frame.pack(fill=tk.BOTH, expand=True)
         
-        columns = ("rank", "title", "year", "rating", "reason", "source")
-        self.recommend_tree = ttk.Treeview(result_frame, columns=columns, show="headings")
-        
-        # 定义列
-        self.recommend_tree.heading("rank", text="#")
-        self.recommend_tree.heading("title", text="电影名称")
-        self.recommend_tree.heading("year", text="年份")
-        self.recommend_tree.heading("rating", text="评分")
-        self.recommend_tree.heading("reason", text="推荐理由")
-        self.recommend_tree.heading("source", text="数据来源")
-        
-        self.recommend_tree.column("rank", width=30)
-        self.recommend_tree.column("title", width=250)
-        self.recommend_tree.column("year", width=60)
-        self.recommend_tree.column("rating", width=60)
-        self.recommend_tree.column("reason", width=250)
-        self.recommend_tree.column("source", width=80)
-        
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.recommend_tree.yview)
-        self.recommend_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.recommend_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.recommend_table = VirtualTable(
+            result_frame,
+            columns=("rank", "title", "year", "rating", "reason", "source"),
+            headings=("#", "电影名称", "年份", "评分", "推荐理由", "数据来源"),
+            widths=(30, 250, 60, 60, 250, 80),
+            dispatcher=self.ui
+        )
         
         # 双击查看详情
-        self.recommend_tree.bind("<Double-1>", self.show_movie_details)
+        self.recommend_table.bind("<Double-1>", self.show_movie_details)
     
     def init_scheduler_tab(self):
         """初始化定时任务选项卡"""
@@ -515,7 +504,7 @@ class MovieToolkitGUI:
         ttk.Label(save_frame, text="默认保存格式:").grid(row=0, column=0, sticky=tk.W)
         
         self.default_format_var = tk.StringVar(value="csv")
-        formats = ["csv", "excel", "json"]
+        formats = ["csv", "excel", "json", "parquet"]
         ttk.Combobox(save_frame, values=formats, textvariable=self.default_format_var, width=10).grid(row=0, column=1, padx=5)
         
         ttk.Label(save_frame, text="默认保存路径:").grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
@@ -659,11 +648,14 @@ class MovieToolkitGUI:
             return False
     
     def write_to_output(self, text):
-        """写入输出区域"""
-        self.output_text.config(state=tk.NORMAL)
-        self.output_text.insert(tk.END, text + "\n")
-        self.output_text.see(tk.END)
-        self.output_text.config(state=tk.DISABLED)
+        """写入输出区域，可在任意线程调用"""
+        self.output.write(text)
+    
+    def on_close(self):
+        """关闭窗口时取消后台任务"""
+        self.tasks.shutdown()
+        self.ui.close()
+        self.root.destroy()
     
     def browse_save_path(self):
         """浏览保存路径"""
@@ -732,9 +724,7 @@ class MovieToolkitGUI:
         self.stop_btn.config(state=tk.NORMAL)
         
         # 清空输出区域
-        self.output_text.config(state=tk.NORMAL)
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.config(state=tk.DISABLED)
+        self.output.clear()
         
         # 获取参数
         scraper_version = self.scraper_var.get()
@@ -751,79 +741,97 @@ class MovieToolkitGUI:
         self.write_to_output(f"页数: {pages}, 延迟: {delay}秒, 类别: {category}")
         self.write_to_output(f"保存格式: {save_format}, 路径: {save_path}")
         
-        # 在新线程中运行爬虫
-        threading.Thread(target=self.run_scraper, args=(
-            scraper_version, pages, delay, category, save_format, save_path
-        )).start()
+        # 在后台线程中运行爬虫，停止按钮通过取消令牌终止子进程
+        self._scrape_token = self.tasks.submit(
+            self.run_scraper, scraper_version, pages, delay, category, save_format, save_path,
+            on_done=self._scraping_finished, on_error=self._scraping_failed, on_cancel=self._scraping_stopped
+        )
     
-    def run_scraper(self, version, pages, delay, category, save_format, save_path):
-        """在线程中运行爬虫"""
-        try:
-            # 根据不同版本选择不同脚本
-            script_name = ""
-            if version == "v1":
-                script_name = "dytt8_scraper.py"
-            elif version == "v2":
-                script_name = "dytt8_scraper_v2.py"
-            elif version == "simple":
-                script_name = "dytt8_simple.py"
-            
-            # 构建脚本路径
-            script_path = os.path.join(os.path.dirname(__file__), script_name)
-            
-            # 构建命令行参数
-            cmd_args = [
-                sys.executable,
-                script_path,
-                "--pages", str(pages),
-                "--delay", str(delay),
-                "--category", category,
-                "--format", save_format,
-                "--output", save_path
-            ]
-            
-            # 运行子进程
-            process = subprocess.Popen(
-                cmd_args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            # 读取输出
-            for line in iter(process.stdout.readline, ''):
-                if line:
-                    self.write_to_output(line.strip())
-            
-            process.stdout.close()
-            return_code = process.wait()
-            
-            if return_code == 0:
-                self.write_to_output("爬取完成!")
-                self.status_var.set("爬取完成")
-            else:
-                self.write_to_output(f"爬取过程中出错，返回代码: {return_code}")
-                self.status_var.set("爬取出错")
-            
-        except Exception as e:
-            self.write_to_output(f"发生错误: {e}")
-            self.status_var.set("爬取出错")
+    def run_scraper(self, token, version, pages, delay, category, save_format, save_path):
+        """
+        在后台线程中运行爬虫子进程
+        
+        返回:
+            int: 子进程返回代码
+        """
+        # 根据不同版本选择不同脚本
+        script_name = ""
+        if version == "v1":
+            script_name = "dytt8_scraper.py"
+        elif version == "v2":
+            script_name = "dytt8_scraper_v2.py"
+        elif version == "simple":
+            script_name = "dytt8_simple.py"
+        
+        # 构建脚本路径
+        script_path = os.path.join(os.path.dirname(__file__), script_name)
+        
+        # 构建命令行参数
+        cmd_args = [
+            sys.executable,
+            script_path,
+            "--pages", str(pages),
+            "--delay", str(delay),
+            "--category", category,
+            "--format", save_format,
+            "--output", save_path
+        ]
+        
+        # 运行子进程，自成进程组，停止时连同浏览器一起终止
+        process = subprocess.Popen(
+            cmd_args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1,
+            **popen_kwargs()
+        )
+        token.on_cancel(lambda: kill_process_tree(process))
         
-        finally:
-            # 恢复按钮状态
-            self.start_btn.config(state=tk.NORMAL)
-            self.stop_btn.config(state=tk.DISABLED)
+        # 读取输出
+        for line in iter(process.stdout.readline, ''):
+            if line:
+                self.write_to_output(line.strip())
+        
+        process.stdout.close()
+        return process.wait()
     
-    def stop_scraping(self):
-        """停止爬取"""
-        self.write_to_output("正在尝试停止爬取...")
-        # 这里需要实现停止子进程的逻辑
-        # 暂时实现为简单的状态更新
+    def _scraping_finished(self, return_code):
+        """爬取结束(主线程)"""
+        if return_code == 0:
+            self.write_to_output("爬取完成!")
+            self.status_var.set("爬取完成")
+        else:
+            self.write_to_output(f"爬取过程中出错，返回代码: {return_code}")
+            self.status_var.set("爬取出错")
+        self._reset_scrape_buttons()
+    
+    def _scraping_failed(self, error):
+        self.write_to_output(f"发生错误: {error}")
+        self.status_var.set("爬取出错")
+        self._reset_scrape_buttons()
+    
+    def _scraping_stopped(self):
+        self.write_to_output("爬取已停止")
         self.status_var.set("已停止")
+        self._reset_scrape_buttons()
+    
+    def _reset_scrape_buttons(self):
+        self._scrape_token = None
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
     
+    def stop_scraping(self):
+        """停止爬取: 取消后台任务并终止爬虫子进程"""
+        self.write_to_output("正在尝试停止爬取...")
+        if self._scrape_token is None:
+            self._scraping_stopped()
+            return
+        self.stop_btn.config(state=tk.DISABLED)
+        # 终止子进程可能需要几秒，放到后台线程中
+        token = self._scrape_token
+        self.tasks.submit(lambda _: token.cancel())
+    
     def search_movie(self):
         """搜索电影"""
         query = self.search_var.get().strip()
@@ -831,83 +839,82 @@ class MovieToolkitGUI:
             self.finder_status_var.set("请输入电影名称进行搜索")
             return
         
-        # 清空现有结果
-        for item in self.result_tree.get_children():
-            self.result_tree.delete(item)
+        # 取消上一次搜索并清空现有结果
+        if self._search_token is not None:
+            self._search_token.cancel()
+        self.result_table.clear()
         
         self.finder_status_var.set("正在搜索...")
         
-        # 在新线程中运行搜索
-        threading.Thread(target=self.run_search, args=(query,)).start()
+        # 在后台线程中运行搜索，结果分批插入表格
+        self._search_token = self.tasks.submit(
+            self.run_search, query,
+            on_done=self.finder_status_var.set,
+            on_error=lambda e: self.finder_status_var.set(f"发生错误: {e}")
+        )
     
-    def run_search(self, query):
-        """在线程中运行搜索"""
-        try:
-            # 构建脚本路径
-            script_path = os.path.join(os.path.dirname(__file__), "dytt8_movie_finder.py")
-            
-            # 构建命令行参数
-            cmd_args = [
-                sys.executable,
-                script_path,
-                "--query", query,
-                "--json"  # 以JSON格式输出便于解析
-            ]
-            
-            # 运行子进程
-            process = subprocess.Popen(
-                cmd_args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            
-            stdout, stderr = process.communicate()
-            
-            if process.returncode == 0:
-                # 解析JSON结果
-                import json
-                try:
-                    results = json.loads(stdout)
-                    if results:
-                        for i, movie in enumerate(results, 1):
-                            self.result_tree.insert("", "end", values=(
-                                movie.get("title", "未知"),
-                                movie.get("year", ""),
-                                movie.get("category", ""),
-                                movie.get("format", ""),
-                                movie.get("size", "")
-                            ), tags=(json.dumps(movie),))
-                        self.finder_status_var.set(f"共找到 {len(results)} 个结果")
-                    else:
-                        self.finder_status_var.set("未找到相关电影")
-                except json.JSONDecodeError:
-                    self.finder_status_var.set("解析结果失败")
-            else:
-                self.finder_status_var.set(f"搜索出错: {stderr}")
+    def run_search(self, token, query):
+        """
+        在后台线程中运行搜索
+        
+        返回:
+            str: 搜索状态说明
+        """
+        # 构建脚本路径
+        script_path = os.path.join(os.path.dirname(__file__), "dytt8_movie_finder.py")
+        
+        # 构建命令行参数
+        cmd_args = [
+            sys.executable,
+            script_path,
+            "--query", query,
+            "--json"  # 以JSON格式输出便于解析
+        ]
         
-        except Exception as e:
-            self.finder_status_var.set(f"发生错误: {e}")
+        # 运行子进程
+        process = subprocess.Popen(
+            cmd_args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            **popen_kwargs()
+        )
+        token.on_cancel(lambda: kill_process_tree(process))
+        
+        stdout, stderr = process.communicate()
+        token.check()
+        
+        if process.returncode != 0:
+            return f"搜索出错: {stderr}"
+        
+        # 解析JSON结果
+        import json
+        try:
+            results = json.loads(stdout)
+        except json.JSONDecodeError:
+            return "解析结果失败"
+        if not results:
+            return "未找到相关电影"
+        token.check()
+        for movie in results:
+            movie.setdefault("title", "未知")
+        self.result_table.add_many(results)
+        return f"共找到 {len(results)} 个结果"
     
     def open_download_link(self, event):
         """打开下载链接"""
-        selected_item = self.result_tree.selection()
-        if not selected_item:
+        movie_data = self.result_table.selected()
+        if not movie_data:
             return
         
-        # 获取电影数据
         try:
-            import json
-            tags = self.result_tree.item(selected_item[0], "tags")
-            if tags:
-                movie_data = json.loads(tags[0])
-                download_link = movie_data.get("download_link")
-                if download_link:
-                    # 尝试打开浏览器
-                    import webbrowser
-                    webbrowser.open(download_link)
-                else:
-                    messagebox.showinfo("提示", "没有可用的下载链接")
+            download_link = movie_data.get("download_link")
+            if download_link:
+                # 尝试打开浏览器
+                import webbrowser
+                webbrowser.open(download_link)
+            else:
+                messagebox.showinfo("提示", "没有可用的下载链接")
         except Exception as e:
             messagebox.showerror("错误", f"无法打开下载链接: {e}")
     
@@ -928,8 +935,7 @@ class MovieToolkitGUI:
     def get_recommendations(self):
         """获取电影推荐"""
         # 清空现有推荐
-        for item in self.recommend_tree.get_children():
-            self.recommend_tree.delete(item)
+        self.recommend_table.clear()
         
         # 收集用户喜好
         genres = [genre for genre, var in self.genre_vars.items() if var.get()]
@@ -968,25 +974,20 @@ class MovieToolkitGUI:
             filtered_movies = sample_movies
         
         # 显示推荐结果
-        for i, movie in enumerate(filtered_movies, 1):
-            self.recommend_tree.insert("", "end", values=(
-                i, movie[0], movie[1], movie[2], movie[3], movie[4]
-            ))
+        self.recommend_table.add_many(
+            {"rank": i, "title": movie[0], "year": movie[1], "rating": movie[2], "reason": movie[3], "source": movie[4]}
+            for i, movie in enumerate(filtered_movies, 1)
+        )
     
     def show_movie_details(self, event):
         """显示电影详情"""
-        selected_item = self.recommend_tree.selection()
-        if not selected_item:
-            return
-        
-        # 获取电影数据
-        values = self.recommend_tree.item(selected_item[0], "values")
-        if values:
-            title = values[1]
-            year = values[2]
-            rating = values[3]
-            reason = values[4]
-            source = values[5]
+        movie = self.recommend_table.selected()
+        if movie:
+            title = movie.get("title", "")
+            year = movie.get("year", "")
+            rating = movie.get("rating", "")
+            reason = movie.get("reason", "")
+            source = movie.get("source", "")
             
             # 显示详情对话框
             detail_window = tk.Toplevel(self.root)
@@ -998,6 +999,11 @@ class MovieToolkitGUI:
             content_frame = ttk.Frame(detail_window, padding="20")
             content_frame.pack(fill=tk.BOTH, expand=True)
             
+            # 封面在后台线程中从本地缓存加载，第一次查看时才下载
+            poster_label = ttk.Label(content_frame, text="封面加载中...")
+            poster_label.pack(side=tk.RIGHT, anchor=tk.N, padx=(10, 0))
+            self.tasks.submit(self._load_poster, title, poster_label)
+            
             # 电影信息
             ttk.Label(content_frame, text=title, font=("Arial", 16, "bold")).pack(anchor=tk.W)
             ttk.Label(content_frame, text=f"年份: {year}").pack(anchor=tk.W, pady=(10, 0))
@@ -1017,6 +1023,46 @@ class MovieToolkitGUI:
             ttk.Button(btn_frame, text="关闭", command=detail_window.destroy, width=10).pack(side=tk.RIGHT)
             ttk.Button(btn_frame, text="搜索此电影", command=lambda: self.search_specific_movie(title), width=15).pack(side=tk.LEFT)
     
+    def _cover_url(self, title):
+        """按标题查找封面URL"""
+        if self._cover_index is None:
+            from dytt8.recommender.recommender import MovieRecommender
+            self._cover_index = {movie.get('title'): movie.get('cover_image')
+                                 for movie in MovieRecommender().movies_data if movie.get('cover_image')}
+        return self._cover_index.get(title)
+    
+    def _load_poster(self, token, title, label):
+        """在后台线程中获取封面缩略图，完成后回到主线程显示"""
+        try:
+            from dytt8.utils import covers
+            url = self._cover_url(title)
+            if not url:
+                self.ui.post(lambda: label.winfo_exists() and label.config(text="暂无封面"))
+                return
+            path = covers.get_cache().thumbnail(url)
+        except Exception as e:
+            print(f"加载封面失败: {e}")
+            self.ui.post(lambda: label.winfo_exists() and label.config(text="封面加载失败"))
+            return
+        self.ui.post(self._show_poster, label, path)
+    
+    def _show_poster(self, label, path):
+        """显示封面图片"""
+        if not label.winfo_exists():
+            return
+        try:
+            from PIL import Image, ImageTk
+            image = ImageTk.PhotoImage(Image.open(path))
+        except ImportError:
+            # 没有 Pillow 时只能显示 PNG/GIF
+            try:
+                image = tk.PhotoImage(file=path)
+            except tk.TclError:
+                label.config(text="显示封面需要安装 Pillow")
+                return
+        label.config(image=image, text="")
+        label.image = image  # 保留引用，避免图片被回收
+    
     def search_specific_movie(self, title):
         """搜索特定电影"""
         # 切换到搜索选项卡
@@ -1129,38 +1175,42 @@ class MovieToolkitGUI:
     def fix_chrome_driver(self):
         """修复ChromeDriver"""
         self.write_to_output("正在修复ChromeDriver...")
+        self.tasks.submit(self._run_fix_chrome_driver, on_done=self._fix_chrome_driver_finished,
+                          on_error=self._fix_chrome_driver_failed)
+    
+    def _run_fix_chrome_driver(self, token):
+        """在后台线程中运行修复脚本，返回子进程返回代码"""
+        # 构建脚本路径
+        script_path = os.path.join(os.path.dirname(__file__), "fix_webdriver_manager.py")
+        
+        # 运行修复脚本
+        process = subprocess.Popen(
+            [sys.executable, script_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1
+        )
         
-        try:
-            # 构建脚本路径
-            script_path = os.path.join(os.path.dirname(__file__), "fix_webdriver_manager.py")
-            
-            # 运行修复脚本
-            process = subprocess.Popen(
-                [sys.executable, script_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            # 读取输出
-            for line in iter(process.stdout.readline, ''):
-                if line:
-                    self.write_to_output(line.strip())
-            
-            process.stdout.close()
-            return_code = process.wait()
-            
-            if return_code == 0:
-                self.write_to_output("ChromeDriver修复完成!")
-                messagebox.showinfo("成功", "ChromeDriver已成功修复")
-            else:
-                self.write_to_output(f"修复过程中出错，返回代码: {return_code}")
-                messagebox.showerror("错误", "ChromeDriver修复失败")
-            
-        except Exception as e:
-            self.write_to_output(f"发生错误: {e}")
-            messagebox.showerror("错误", f"修复过程中出错: {e}")
+        # 读取输出
+        for line in iter(process.stdout.readline, ''):
+            if line:
+                self.write_to_output(line.strip())
+        
+        process.stdout.close()
+        return process.wait()
+    
+    def _fix_chrome_driver_finished(self, return_code):
+        if return_code == 0:
+            self.write_to_output("ChromeDriver修复完成!")
+            messagebox.showinfo("成功", "ChromeDriver已成功修复")
+        else:
+            self.write_to_output(f"修复过程中出错，返回代码: {return_code}")
+            messagebox.showerror("错误", "ChromeDriver修复失败")
+    
+    def _fix_chrome_driver_failed(self, error):
+        self.write_to_output(f"发生错误: {error}")
+        messagebox.showerror("错误", f"修复过程中出错: {error}")
 
 def main():
     """主函数"""
@@ -0,0 +1,288 @@
+"""
+虚拟化结果表格
+电影数据保存在 RowStore 中(行ID -> 电影字典)，Treeview 只包含当前可见的几十行，
+滚动时按偏移量重新填充；排序使用按列缓存的有序索引，筛选使用预先计算的小写检索文本，
+上万行结果也不会卡住界面
+
+用法:
+    table = VirtualTable(frame, columns=("title", "year"), headings=("电影名称", "年份"), dispatcher=ui)
+    table.add_many(movies)      # 可在后台线程调用
+    table.sort_by("year")       # 点击表头也会排序
+    table.filter("科幻")
+    movie = table.selected()
+"""
+import re
+import bisect
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+# 表头和每行的默认高度(像素)，用于计算可见行数
+HEADER_HEIGHT = 25
+ROW_HEIGHT = 20
+
+_NUMBER = re.compile(r"\s*(-?\d+(?:\.\d+)?)\s*([KMGT]i?B)?", re.IGNORECASE)
+_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def sort_key(value):
+    """
+    排序键: 以数字开头的值(年份、评分、1.5GB 等大小)按数值排在前面，其余按文本排序
+    """
+    text = "" if value is None else str(value)
+    match = _NUMBER.match(text)
+    if match:
+        number = float(match.group(1))
+        if match.group(2):
+            number *= _UNITS[match.group(2)[0].upper()]
+        return (0, number, text)
+    return (1, 0, text)
+
+
+class RowStore:
+    """
+    表格的数据: 行ID -> 电影字典，当前视图为按排序和筛选得到的行ID列表
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.rows = {}
+        self.order = []
+        self.sort_column = None
+        self.reverse = False
+        self.query = ""
+        self._ids = []
+        self._next_id = 0
+        self._indexes = {}
+        self._index_keys = {}
+        self._search = {}
+
+    def __len__(self):
+        return len(self.order)
+
+    def get(self, row_id):
+        return self.rows.get(row_id)
+
+    def values(self, row_id):
+        """一行在表格中显示的值"""
+        movie = self.rows[row_id]
+        return tuple("" if movie.get(column) is None else movie.get(column) for column in self.columns)
+
+    def extend(self, movies):
+        """追加电影"""
+        added = []
+        for movie in movies:
+            row_id = f"r{self._next_id}"
+            self._next_id += 1
+            self.rows[row_id] = movie
+            self._search[row_id] = " ".join(str(value) for value in self.values(row_id)).lower()
+            added.append(row_id)
+        self._ids.extend(added)
+        if self.sort_column is None:
+            self._drop_indexes()
+            # 未排序时新行追加在末尾，不必重建视图
+            self.order.extend(row_id for row_id in added if self._matches(row_id))
+        else:
+            # 只把新行插入当前排序列的索引，不重新排序；其他列的索引下次排序时再建
+            self._drop_indexes(keep=self.sort_column)
+            self._insert(self.sort_column, added)
+            self._refresh()
+        return added
+
+    def _drop_indexes(self, keep=None):
+        for column in [column for column in self._indexes if column != keep]:
+            del self._indexes[column]
+            del self._index_keys[column]
+
+    def _insert(self, column, row_ids):
+        """把新行按排序键插入已缓存的索引，相同键的行保持追加顺序"""
+        if column not in self._indexes:
+            return
+        index, keys = self._indexes[column], self._index_keys[column]
+        for row_id in row_ids:
+            key = sort_key(self.rows[row_id].get(column))
+            position = bisect.bisect_right(keys, key)
+            keys.insert(position, key)
+            index.insert(position, row_id)
+
+    def clear(self):
+        self.rows.clear()
+        self.order = []
+        self._ids = []
+        self._drop_indexes()
+        self._search.clear()
+
+    def index(self, column):
+        """按某列升序排列的行ID，数据不变时重复使用"""
+        if column not in self._indexes:
+            keyed = sorted(((sort_key(self.rows[row_id].get(column)), row_id) for row_id in self._ids),
+                           key=lambda item: item[0])
+            self._index_keys[column] = [key for key, _ in keyed]
+            self._indexes[column] = [row_id for _, row_id in keyed]
+        return self._indexes[column]
+
+    def sort(self, column, reverse=None):
+        """
+        按列排序；reverse 为None时再次点击同一列切换升降序
+        """
+        if reverse is None:
+            reverse = not self.reverse if column == self.sort_column else False
+        self.sort_column, self.reverse = column, reverse
+        self._refresh()
+
+    def filter(self, query):
+        """只显示任一列包含 query 的行(不区分大小写)"""
+        self.query = (query or "").strip().lower()
+        self._refresh()
+
+    def _matches(self, row_id):
+        return not self.query or self.query in self._search[row_id]
+
+    def _refresh(self):
+        ids = self.index(self.sort_column) if self.sort_column else self._ids
+        if self.reverse:
+            ids = reversed(ids)
+        self.order = [row_id for row_id in ids if self._matches(row_id)] if self.query else list(ids)
+
+
+class VirtualTable:
+    """
+    只渲染可见行的 Treeview，自带滚动条；点击表头排序
+    """
+
+    def __init__(self, parent, columns, headings, widths=None, dispatcher=None):
+        """
+        Args:
+            parent: 父控件，表格和滚动条 pack 到其中
+            columns: 电影字典中要显示的字段
+            headings: 表头文字
+            widths: 列宽
+            dispatcher: UIDispatcher，后台线程调用 add_many 时经它回到主线程
+        """
+        self.store = RowStore(columns)
+        self.dispatcher = dispatcher
+        self.offset = 0
+        self.visible = 10
+        self.headings = dict(zip(columns, headings))
+
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", height=self.visible)
+        for index, column in enumerate(columns):
+            self.tree.heading(column, text=self.headings[column], command=lambda c=column: self.sort_by(c))
+            if widths:
+                self.tree.column(column, width=widths[index])
+
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3) or "break")
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible) or "break")
+
+    def __len__(self):
+        return len(self.store)
+
+    def bind(self, sequence, callback):
+        self.tree.bind(sequence, callback)
+
+    def add_many(self, movies):
+        """追加电影，可在任意线程调用"""
+        movies = list(movies)
+        if self.dispatcher is not None and threading.current_thread() is not threading.main_thread():
+            self.dispatcher.post(self.add_many, movies)
+            return
+        self.store.extend(movies)
+        self.render()
+
+    def clear(self):
+        self.store.clear()
+        self.offset = 0
+        self.render()
+
+    def sort_by(self, column, reverse=None):
+        self.store.sort(column, reverse)
+        for name, text in self.headings.items():
+            arrow = (" ▼" if self.store.reverse else " ▲") if name == column else ""
+            self.tree.heading(name, text=text + arrow)
+        self.render()
+
+    def filter(self, query):
+        self.store.filter(query)
+        self.offset = 0
+        self.render()
+
+    def selected(self):
+        """
+        选中的电影
+
+        Returns:
+            dict: 没有选中时返回None
+        """
+        selection = self.tree.selection()
+        return self.store.get(selection[0]) if selection else None
+
+    def scroll(self, rows):
+        self._move_to(self.offset + rows)
+
+    def _move_to(self, offset):
+        offset = max(0, min(int(offset), len(self.store) - self.visible))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def render(self):
+        """用当前偏移处的行重新填充 Treeview，保留仍可见的选中行"""
+        self.offset = max(0, min(self.offset, len(self.store) - self.visible))
+        window = self.store.order[self.offset:self.offset + self.visible]
+        selection = [row_id for row_id in self.tree.selection() if row_id in window]
+        self.tree.delete(*self.tree.get_children())
+        for row_id in window:
+            self.tree.insert("", "end", iid=row_id, values=self.store.values(row_id))
+        if selection:
+            self.tree.selection_set(selection)
+        total = len(self.store)
+        if total <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + len(window)) / total)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._move_to(float(amount) * len(self.store))
+        elif action == "scroll":
+            self.scroll(int(amount) * (self.visible if unit == "pages" else 1))
+
+    def _on_wheel(self, event):
+        # Windows 每格 delta 为120，macOS 为1
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-3 * step)
+        return "break"
+
+    def _on_resize(self, event):
+        visible = max(1, (event.height - HEADER_HEIGHT) // ROW_HEIGHT)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def _on_arrow(self, step):
+        """方向键移出可见区域时滚动一行"""
+        selection = self.tree.selection()
+        children = self.tree.get_children()
+        if not selection or not children:
+            return None
+        edge = children[-1] if step > 0 else children[0]
+        if selection[0] != edge:
+            return None
+        position = self.offset + (len(children) - 1 if step > 0 else 0) + step
+        if not 0 <= position < len(self.store):
+            return "break"
+        self.scroll(step)
+        row_id = self.store.order[position]
+        self.tree.selection_set(row_id)
+        self.tree.focus(row_id)
+        return "break"
@@ -4,7 +4,6 @@
 """
 import os
 import sys
-import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
 import subprocess
@@ -14,17 +13,21 @@ import time
 # 确保能找到dytt8模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from dytt8.gui.tasks import CancelToken, OutputBuffer, TaskRunner, UIDispatcher
+
 class ScraperTab:
     def __init__(self, parent):
         self.parent = parent
         self.frame = ttk.Frame(parent, padding="10")
         
-        # 爬虫线程
-        self.scraper_thread = None
-        self.running = False
+        # 爬虫在后台线程中运行，界面更新经队列回到主线程；token 为当前爬取的取消令牌
+        self.ui = UIDispatcher(self.frame)
+        self.tasks = TaskRunner(self.ui, workers=2)
+        self.token = None
         
         # 初始化组件
         self.init_components()
+        self.output = OutputBuffer(self.ui, self.output_text)
     
     def init_components(self):
         """初始化抓取选项卡组件"""
@@ -66,7 +69,8 @@ class ScraperTab:
         self.save_option_var = tk.StringVar(value="csv")
         ttk.Radiobutton(save_frame, text="CSV", variable=self.save_option_var, value="csv").grid(column=1, row=0, sticky=tk.W, padx=(0, 5))
         ttk.Radiobutton(save_frame, text="Excel", variable=self.save_option_var, value="excel").grid(column=2, row=0, sticky=tk.W, padx=(0, 5))
-        ttk.Radiobutton(save_frame, text="JSON", variable=self.save_option_var, value="json").grid(column=3, row=0, sticky=tk.W)
+        ttk.Radiobutton(save_frame, text="JSON", variable=self.save_option_var, value="json").grid(column=3, row=0, sticky=tk.W, padx=(0, 5))
+        ttk.Radiobutton(save_frame, text="Parquet", variable=self.save_option_var, value="parquet").grid(column=4, row=0, sticky=tk.W)
         
         ttk.Label(save_frame, text="保存路径:").grid(column=0, row=1, sticky=tk.W, padx=(0, 5), pady=(10, 0))
         
@@ -107,12 +111,14 @@ class ScraperTab:
         if path:
             self.save_path_var.set(path)
     
+    @property
+    def running(self):
+        """当前是否有未被取消的爬取"""
+        return self.token is not None and not self.token.cancelled
+    
     def write_to_output(self, text):
-        """写入输出区域"""
-        self.output_text.config(state=tk.NORMAL)
-        self.output_text.insert(tk.END, text + "\n")
-        self.output_text.see(tk.END)
-        self.output_text.config(state=tk.DISABLED)
+        """写入输出区域，可在任意线程调用"""
+        self.output.write(text)
     
     def start_scraping(self):
         """开始爬取电影数据"""
@@ -127,12 +133,9 @@ class ScraperTab:
         # 更新UI状态
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
-        self.running = True
         
         # 清空输出区域
-        self.output_text.config(state=tk.NORMAL)
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.config(state=tk.DISABLED)
+        self.output.clear()
         
         # 显示开始信息
         self.write_to_output(f"开始爬取电影数据")
@@ -143,15 +146,20 @@ class ScraperTab:
         self.write_to_output(f"保存路径: {save_path}")
         self.write_to_output("-" * 40)
         
-        # 启动爬虫线程，避免UI冻结
-        self.scraper_thread = threading.Thread(
-            target=self._run_scraper,
-            args=(scraper_type, pages, delay, category, save_format, save_path)
+        # 在后台线程中运行爬虫，避免UI冻结；令牌先于任务创建，爬虫线程开始时即可检查
+        self.token = CancelToken()
+        self.tasks.submit(
+            self._run_scraper, scraper_type, pages, delay, category, save_format, save_path,
+            on_done=self._finished, on_cancel=self._finished, token=self.token
         )
-        self.scraper_thread.daemon = True
-        self.scraper_thread.start()
     
-    def _run_scraper(self, scraper_type, pages, delay, category, save_format, save_path):
+    def _finished(self, result=None):
+        """爬取结束后恢复按钮状态(主线程)"""
+        self.token = None
+        self.start_btn.config(state=tk.NORMAL)
+        self.stop_btn.config(state=tk.DISABLED)
+    
+    def _run_scraper(self, token, scraper_type, pages, delay, category, save_format, save_path):
         """在后台线程中运行爬虫"""
         try:
             # 根据选择的爬虫类型，导入相应的爬虫模块
@@ -192,11 +200,6 @@ class ScraperTab:
                     self._run_simulated_scraper(pages, delay, category, save_format, save_path)
         except Exception as e:
             self.write_to_output(f"爬虫运行出错: {str(e)}")
-        finally:
-            # 恢复UI状态
-            self.running = False
-            self.frame.after(0, lambda: self.start_btn.config(state=tk.NORMAL))
-            self.frame.after(0, lambda: self.stop_btn.config(state=tk.DISABLED))
     
     def _run_standard_scraper(self, scraper, pages, delay, category, save_format, save_path):
         """运行标准版爬虫"""
@@ -226,7 +229,7 @@ class ScraperTab:
                 # 页面间延迟
                 if page < pages and self.running:
                     self.write_to_output(f"等待 {delay} 秒后抓取下一页...")
-                    time.sleep(delay)
+                    self.token.sleep(delay)
             except Exception as e:
                 self.write_to_output(f"抓取第 {page} 页时出错: {str(e)}")
         
@@ -286,7 +289,7 @@ class ScraperTab:
                     # 页面间延迟
                     if page < pages and self.running:
                         self.write_to_output(f"等待 {delay} 秒后抓取下一页...")
-                        time.sleep(delay)
+                        self.token.sleep(delay)
                 except Exception as e:
                     self.write_to_output(f"抓取第 {page} 页时出错: {str(e)}")
                     self.write_to_output("尝试继续抓取下一页...")
@@ -323,6 +326,13 @@ class ScraperTab:
     
     def _run_simulated_scraper(self, pages, delay, category, save_format, save_path):
         """运行模拟爬虫（当实际爬虫无法使用时）"""
+        # 设置了回放归档时，用录制的真实页面代替随机数据
+        from dytt8.utils.page_archive import active_mode
+        mode, archive = active_mode()
+        if mode == "replay":
+            self._run_replay_scraper(archive, pages, category, save_format, save_path)
+            return
+        
         self.write_to_output("使用模拟爬虫...")
         self.write_to_output("警告: 这只是演示数据，不是真实抓取结果!")
         
@@ -374,15 +384,16 @@ class ScraperTab:
                 all_movies.append(movie)
                 self.write_to_output(f"  发现电影: {movie_title} - {movie_category} - {movie_rating}分")
                 
-                # 模拟爬取延迟
-                time.sleep(0.2)
+                # 模拟爬取延迟，停止时立即结束
+                if self.token.sleep(0.2):
+                    break
             
             self.write_to_output(f"第 {page} 页成功抓取 {movies_count} 部电影")
             
             # 页面间延迟
             if page < pages and self.running:
                 self.write_to_output(f"等待 {delay} 秒后抓取下一页...")
-                time.sleep(delay)
+                self.token.sleep(delay)
         
         # 保存结果
         if all_movies:
@@ -390,12 +401,34 @@ class ScraperTab:
         else:
             self.write_to_output("没有抓取到任何电影数据")
     
+    def _run_replay_scraper(self, archive, pages, category, save_format, save_path):
+        """从网页归档离线回放抓取（不访问网络，结果可重复）"""
+        from dytt8.scrapers.dytt8_scraper import Dytt8Scraper
+        
+        self.write_to_output(f"从网页归档回放: {archive.path} ({len(archive)} 个页面)")
+        scraper = Dytt8Scraper(pages=pages, delay=0, category=category)
+        movies = scraper.scrape()
+        
+        for i, movie in enumerate(movies[:3]):
+            self.write_to_output(f"  {i+1}. {movie['title']} - {movie.get('category', 'N/A')} - {movie.get('score', 'N/A')}")
+        if len(movies) > 3:
+            self.write_to_output(f"  ... 还有 {len(movies)-3} 部电影")
+        
+        if movies:
+            self._save_movies(movies, save_format, save_path)
+        else:
+            self.write_to_output("归档中没有找到该类别的页面")
+    
     def _save_movies(self, movies, save_format, save_path):
         """保存电影数据到指定格式的文件"""
         if not movies:
             self.write_to_output("没有电影数据可保存")
             return
         
+        if save_format == "parquet":
+            self._save_to_parquet(movies, save_path)
+            return
+        
         timestamp = time.strftime('%Y%m%d_%H%M%S')
         filename = f"movies_{timestamp}.{save_format}"
         filepath = os.path.join(save_path, filename)
@@ -414,7 +447,7 @@ class ScraperTab:
     
     def _save_to_csv(self, movies, filepath):
         """保存电影数据到CSV文件"""
-        import csv
+        from dytt8.utils.sinks import CSVSink
         
         self.write_to_output(f"正在保存到CSV文件: {filepath}")
         
@@ -425,11 +458,9 @@ class ScraperTab:
             else:
                 fieldnames = ["title", "category", "rating", "year", "url", "download_url"]
             
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for movie in movies:
-                    writer.writerow(movie)
+            # 逐行写入并定期落盘
+            with CSVSink(filepath, fieldnames=fieldnames) as sink:
+                sink.write_many(movies)
             
             self.write_to_output(f"CSV文件保存成功: {filepath}")
         except Exception as e:
@@ -462,6 +493,23 @@ class ScraperTab:
             self.write_to_output(f"保存Excel文件时出错: {str(e)}")
             raise
 
+    def _save_to_parquet(self, movies, save_path):
+        """保存电影数据到 Parquet 数据集(save_path/dataset，按数据源/分类/日期分区)"""
+        from dytt8.utils import dataset
+        
+        if not dataset.PARQUET_AVAILABLE:
+            self.write_to_output("错误: 保存Parquet需要安装pyarrow")
+            self.write_to_output("请执行: pip install pyarrow")
+            return
+        
+        try:
+            source = "douban" if "douban" in str(movies[0].get("source_url", "")) else "dytt8"
+            path = dataset.write_movies(movies, os.path.join(save_path, "dataset"), source,
+                                        self.category_var.get(), "movies")
+            self.write_to_output(f"成功保存 {len(movies)} 部电影信息到Parquet数据集: {path}")
+        except Exception as e:
+            self.write_to_output(f"保存Parquet文件时出错: {str(e)}")
+    
     def _save_to_json(self, movies, filepath):
         """保存电影数据到JSON文件"""
         import json
@@ -479,8 +527,8 @@ class ScraperTab:
     
     def stop_scraping(self):
         """停止爬取"""
-        if not hasattr(self, 'running') or not self.running:
+        if not self.running:
             return
         
         self.write_to_output("正在停止爬取...")
-        self.running = False 
\ No newline at end of file
+        self.token.cancel() 
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+GUI 后台任务层
+Tk 控件只能在主线程中操作。耗时工作交给线程池执行，工作线程通过 UIDispatcher.post
+把界面更新放入线程安全的队列，主线程每帧(约16ms)用 after 取出执行，每帧最多占用
+frame_budget 秒，其余时间留给 Tk 重绘和响应输入；大量日志按帧合并写入文本控件
+
+用法:
+    ui = UIDispatcher(root)
+    tasks = TaskRunner(ui)
+    output = OutputBuffer(ui, output_text)
+
+    def work(token, query):
+        for movie in search(query):
+            token.check()
+            output.write(movie["title"])
+
+    token = tasks.submit(work, "流浪地球", on_done=lambda result: ...)
+    token.cancel()   # 停止按钮
+"""
+import time
+import queue
+import logging
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 60fps: 每帧16ms，其中最多8ms用于处理队列
+FRAME_INTERVAL_MS = 16
+FRAME_BUDGET = 0.008
+
+
+class TaskCancelled(Exception):
+    """任务已被取消"""
+
+
+class CancelToken:
+    """
+    取消令牌，工作线程在步骤之间检查；取消时调用登记的回调(如终止子进程)
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """取消任务，回调在调用 cancel 的线程中执行"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"取消回调出错: {e}")
+
+    def on_cancel(self, callback):
+        """登记取消时调用的函数；已取消时立即调用"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self):
+        """已取消时抛出 TaskCancelled"""
+        if self._event.is_set():
+            raise TaskCancelled()
+
+    def sleep(self, seconds):
+        """
+        可被取消打断的等待
+
+        Returns:
+            bool: 等待期间是否被取消
+        """
+        return self._event.wait(seconds)
+
+
+class UIDispatcher:
+    """
+    主线程的更新队列，任意线程可以 post，主线程按帧预算执行
+    """
+
+    def __init__(self, widget, frame_budget=FRAME_BUDGET, interval=FRAME_INTERVAL_MS):
+        """
+        Args:
+            widget: 任一 Tk 控件，用于 after 调度
+            frame_budget: 每帧处理队列的最长时间(秒)
+            interval: 两帧之间的间隔(毫秒)
+        """
+        self.widget = widget
+        self.frame_budget = frame_budget
+        self.interval = interval
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self.widget.after(self.interval, self._tick)
+
+    def post(self, callback, *args):
+        """在主线程中执行 callback(*args)，可在任意线程调用"""
+        self._queue.put((callback, args))
+
+    def drain(self):
+        """
+        执行队列中的更新，直到队列为空或用完本帧预算
+
+        Returns:
+            int: 执行的更新数
+        """
+        deadline = time.perf_counter() + self.frame_budget
+        done = 0
+        while time.perf_counter() < deadline:
+            try:
+                callback, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.exception(f"界面更新出错: {e}")
+            done += 1
+        return done
+
+    def _tick(self):
+        if self._closed:
+            return
+        self.drain()
+        try:
+            self.widget.after(self.interval, self._tick)
+        except Exception:
+            # 窗口已销毁
+            self._closed = True
+
+    def close(self):
+        self._closed = True
+
+
+class TaskRunner:
+    """
+    后台任务线程池，任务结果和异常回到主线程处理
+    """
+
+    def __init__(self, dispatcher, workers=4):
+        self.dispatcher = dispatcher
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gui-task")
+        self._tokens = set()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_cancel=None, token=None):
+        """
+        在线程池中执行 fn(token, *args)
+
+        Args:
+            on_done: 完成后在主线程中调用 on_done(result)
+            on_error: 出错时在主线程中调用 on_error(exception)，为None时记录日志
+            on_cancel: 任务因取消而结束时在主线程中调用
+            token: 取消令牌，默认新建
+
+        Returns:
+            CancelToken
+        """
+        token = token or CancelToken()
+        with self._lock:
+            self._tokens.add(token)
+
+        def run():
+            try:
+                result = fn(token, *args)
+            except Exception as e:
+                # 取消时终止子进程等操作也可能让任务以异常结束
+                if token.cancelled or isinstance(e, TaskCancelled):
+                    if on_cancel:
+                        self.dispatcher.post(on_cancel)
+                elif on_error:
+                    self.dispatcher.post(on_error, e)
+                else:
+                    logger.exception(f"后台任务出错: {e}")
+            else:
+                # 已取消的任务不再更新界面
+                if token.cancelled:
+                    if on_cancel:
+                        self.dispatcher.post(on_cancel)
+                elif on_done:
+                    self.dispatcher.post(on_done, result)
+            finally:
+                with self._lock:
+                    self._tokens.discard(token)
+
+        self._pool.submit(run)
+        return token
+
+    def cancel_all(self):
+        with self._lock:
+            tokens = list(self._tokens)
+        for token in tokens:
+            token.cancel()
+
+    def shutdown(self):
+        """取消全部任务，不等待线程结束"""
+        self.cancel_all()
+        self._pool.shutdown(wait=False)
+
+
+class OutputBuffer:
+    """
+    日志输出缓冲，任意线程 write，每帧一次性写入文本控件，只保留最近 max_lines 行
+    """
+
+    def __init__(self, dispatcher, text, max_lines=5000):
+        self.dispatcher = dispatcher
+        self.text = text
+        self.max_lines = max_lines
+        self._lines = []
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def write(self, line):
+        with self._lock:
+            self._lines.append(line)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.dispatcher.post(self._flush)
+
+    def _flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+            self._scheduled = False
+        if not lines:
+            return
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, "\n".join(lines) + "\n")
+        # 超出上限时删除最早的行
+        excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+
+    def clear(self):
+        with self._lock:
+            self._lines = []
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.config(state=tk.DISABLED)
+
@@ -5,18 +5,39 @@
 """
 import os
 import json
-import pandas as pd
-import numpy as np
 import re
+import heapq
 from collections import Counter
 import pickle
 from datetime import datetime
 
+from dytt8.utils import dataset
+
 class MovieRecommender:
     """电影推荐系统类"""
     
-    def __init__(self):
-        """初始化推荐系统"""
+    # 年代范围选项 -> (起始年份, 结束年份)
+    YEAR_RANGES = {
+        "2020-至今": (2020, 9999),
+        "2010-2020": (2010, 2020),
+        "2000-2010": (2000, 2010),
+        "2000-至今": (2000, 9999),
+        "90年代": (1990, 1999),
+        "80年代": (1980, 1989),
+        "更早": (0, 1979),
+    }
+    
+    # 推荐用到的字段，读取 Parquet 数据集时只解码这些列
+    COLUMNS = ("id", "title", "year", "score", "rating", "category", "genre", "genres",
+               "country", "region", "source", "source_url", "cover_image")
+    
+    def __init__(self, movies=None):
+        """
+        初始化推荐系统
+        
+        参数:
+            movies (list): 候选电影列表，为None时从数据目录加载
+        """
         self.movies_data = []
         self.user_preferences = {}
         self.watch_history = []
@@ -26,7 +47,10 @@ class MovieRecommender:
         os.makedirs(os.path.join(os.path.dirname(__file__), "data"), exist_ok=True)
         
         # 加载电影数据
-        self._load_movie_data()
+        if movies is not None:
+            self.movies_data = list(movies)
+        else:
+            self._load_movie_data()
         
         # 加载保存的模型
         self._load_model()
@@ -35,4 +59,172 @@ class MovieRecommender:
         """加载电影数据"""
         print("加载电影数据...")
         
-        # 
\ No newline at end of file
+        # 优先使用API服务器的数据(Parquet 数据集与电影缓存中较新的一个)，其次使用数据目录中的数据集或最新的CSV文件
+        package_dir = os.path.dirname(os.path.dirname(__file__))
+        cache_file = os.path.join(package_dir, "api", "data", "movies_cache.json")
+        api_dataset = os.path.join(package_dir, "api", "data", "dataset")
+        cache_mtime = os.path.getmtime(cache_file) if os.path.exists(cache_file) else None
+        if dataset.available(api_dataset) and (cache_mtime is None or dataset.latest_mtime(api_dataset) >= cache_mtime):
+            self._load_dataset(api_dataset)
+            return
+        if cache_mtime is not None:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.movies_data = json.load(f)
+            print(f"已加载 {len(self.movies_data)} 部电影")
+            return
+        
+        if dataset.available():
+            self._load_dataset(dataset.DEFAULT_DATASET_DIR)
+            return
+        
+        data_dir = os.path.join(package_dir, "data")
+        csv_files = [os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith('.csv')] \
+            if os.path.isdir(data_dir) else []
+        if not csv_files:
+            print("没有找到电影数据")
+            return
+        
+        latest_file = max(csv_files, key=os.path.getmtime)
+        import pandas as pd
+        self.movies_data = pd.read_csv(latest_file).fillna('').to_dict('records')
+        print(f"已从 {latest_file} 加载 {len(self.movies_data)} 部电影")
+    
+    def _load_dataset(self, root):
+        """从 Parquet 数据集加载，只读取推荐用到的列"""
+        self.movies_data = dataset.read_movies(root, columns=self.COLUMNS)
+        print(f"已从 {root} 加载 {len(self.movies_data)} 部电影")
+    
+    def _load_model(self):
+        """加载保存的用户喜好和观看历史"""
+        if not os.path.exists(self.model_file):
+            return
+        try:
+            with open(self.model_file, 'rb') as f:
+                model = pickle.load(f)
+            self.user_preferences = model.get('preferences', {})
+            self.watch_history = model.get('history', [])
+        except Exception as e:
+            print(f"加载推荐模型失败: {e}")
+    
+    def _save_model(self):
+        """保存用户喜好和观看历史"""
+        with open(self.model_file, 'wb') as f:
+            pickle.dump({
+                'preferences': self.user_preferences,
+                'history': self.watch_history,
+                'updated': datetime.now().isoformat()
+            }, f)
+    
+    def set_preferences(self, genres=None, year_range='不限', regions=None, persist=True):
+        """
+        设置用户喜好
+        
+        参数:
+            genres (list): 喜欢的类型
+            year_range (str): 年代范围
+            regions (list): 喜欢的地区
+            persist (bool): 是否保存到模型文件（API按请求传入的喜好不保存）
+        """
+        self.user_preferences = {
+            'genres': [g for g in (genres or []) if g],
+            'year_range': year_range,
+            'regions': [r for r in (regions or []) if r]
+        }
+        if persist:
+            self._save_model()
+    
+    def add_to_history(self, title):
+        """记录已看过的电影，之后不再推荐"""
+        if title and title not in self.watch_history:
+            self.watch_history.append(title)
+            self._save_model()
+    
+    @staticmethod
+    def _parse_score(movie):
+        """把 '8.5/10'、'8.5' 等评分转换为数值"""
+        match = re.search(r'\d+(?:\.\d+)?', str(movie.get('score') or movie.get('rating') or ''))
+        return float(match.group(0)) if match else 0.0
+    
+    @staticmethod
+    def _movie_source(movie):
+        """判断电影来自豆瓣还是电影天堂"""
+        source = f"{movie.get('source', '')} {movie.get('source_url', '')}".lower()
+        return "douban" if "douban" in source or "豆瓣" in source else "dytt"
+    
+    def _score_movie(self, movie, genres, year_range, regions):
+        """
+        计算推荐分数
+        
+        返回:
+            tuple: (分数, 推荐理由)，不符合年代范围时分数为None
+        """
+        score = self._parse_score(movie)
+        reasons = []
+        
+        if year_range:
+            year_match = re.search(r'(19|20)\d{2}', str(movie.get('year', '')))
+            if not year_match:
+                return None, ""
+            year = int(year_match.group(0))
+            if not year_range[0] <= year <= year_range[1]:
+                return None, ""
+        
+        movie_genres = f"{movie.get('genre', '')} {movie.get('category', '')}"
+        matched_genres = [g for g in genres if g in movie_genres]
+        if matched_genres:
+            score += 2 * len(matched_genres)
+            reasons.append(f"符合您的{'、'.join(matched_genres)}喜好")
+        
+        country = str(movie.get('country', ''))
+        matched_regions = [r for r in regions if r in country or r.replace('中国', '') in country]
+        if matched_regions:
+            score += 1
+            reasons.append(f"符合您的地区偏好({'、'.join(matched_regions)})")
+        
+        if not reasons:
+            reasons.append("高分推荐" if score >= 8 else "近期热门")
+        return score, "，".join(reasons)
+    
+    def get_recommendations(self, count=10, source='all'):
+        """
+        获取推荐电影
+        
+        参数:
+            count (int): 推荐数量
+            source (str): 数据来源 (all, douban, dytt)
+        
+        返回:
+            list: 推荐电影列表，按推荐分数从高到低排列
+        """
+        genres = self.user_preferences.get('genres', [])
+        regions = self.user_preferences.get('regions', [])
+        year_range = self.YEAR_RANGES.get(self.user_preferences.get('year_range', '不限'))
+        watched = set(self.watch_history)
+        if source == 'dytt8':
+            source = 'dytt'
+        
+        candidates = []
+        for index, movie in enumerate(self.movies_data):
+            if movie.get('title') in watched:
+                continue
+            if source != 'all' and self._movie_source(movie) != source:
+                continue
+            score, reason = self._score_movie(movie, genres, year_range, regions)
+            if score is not None:
+                candidates.append((score, -index, movie, reason))
+        
+        # 只需要前 count 个，使用堆而不是对全部候选排序
+        top = heapq.nlargest(count, candidates, key=lambda c: (c[0], c[1]))
+        return [
+            {
+                'id': movie.get('id', ''),
+                'title': movie.get('title', ''),
+                'year': str(movie.get('year', '')),
+                'score': movie.get('score') or movie.get('rating', ''),
+                'reason': reason,
+                'source': "豆瓣" if self._movie_source(movie) == "douban" else "电影天堂",
+                'recommend_score': round(score, 2),
+                'cover_image': movie.get('cover_image', '')
+            }
+            for score, _, movie, reason in top
+        ]
@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+"""
+定时任务执行器
+固定数量的工作线程执行到期任务，按任务类型限制并发，
+同一任务上次运行尚未结束时按重叠策略处理，超时终止任务启动的进程树(含 Chrome)，
+每次运行的排队、开始、结束时间和耗时写入运行历史
+"""
+import os
+import sys
+import json
+import signal
+import time
+import threading
+import subprocess
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger('movie_scheduler')
+
+# 重叠策略: 同一任务上次运行尚未结束(或仍在排队)时如何处理新的一次
+OVERLAP_SKIP = 'skip'  # 放弃本次
+OVERLAP_QUEUE = 'queue'  # 排在上次之后运行(每个任务最多排队一次)
+OVERLAP_CANCEL = 'cancel'  # 终止上次，运行本次
+OVERLAP_POLICIES = (OVERLAP_SKIP, OVERLAP_QUEUE, OVERLAP_CANCEL)
+
+# 各任务类型默认的并发上限和超时(秒)
+DEFAULT_TYPE_LIMITS = {'scrape': 1, 'recommend': 2}
+DEFAULT_TIMEOUTS = {'scrape': 3 * 3600, 'recommend': 600}
+
+
+def _is_alive(process):
+    if hasattr(process, 'is_alive'):  # multiprocessing.Process
+        return process.is_alive()
+    return process.poll() is None
+
+
+def _wait(process, timeout):
+    if hasattr(process, 'join'):
+        process.join(timeout)
+    else:
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def kill_process_tree(process, grace=5):
+    """
+    终止进程及其所有子进程(chromedriver、Chrome)
+
+    参数:
+        process: subprocess.Popen 或 multiprocessing.Process，
+                 POSIX 上需自成进程组(start_new_session=True 或在子进程中 os.setsid())
+        grace (float): 发送 SIGTERM 后等待的秒数，超时再 SIGKILL
+    """
+    if not _is_alive(process):
+        return
+    if sys.platform == 'win32':
+        subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)], capture_output=True)
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        # 子进程尚未建立自己的进程组，只能终止它本身
+        process.kill()
+        _wait(process, grace)
+        return
+    _wait(process, grace)
+    if _is_alive(process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        _wait(process, grace)
+
+
+def popen_kwargs():
+    """让子进程自成一个进程组，便于超时或取消时整组终止"""
+    if sys.platform == 'win32':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def load_history(history_file, limit=500):
+    """
+    读取运行历史文件中最近的 limit 条记录，最早的在前
+
+    返回:
+        deque: 文件不存在或无法读取时为空
+    """
+    runs = deque(maxlen=limit)
+    if not history_file or not os.path.exists(history_file):
+        return runs
+    try:
+        with open(history_file, 'r', encoding='utf-8') as f:
+            for line in deque(f, maxlen=limit):
+                if line.strip():
+                    runs.append(json.loads(line))
+    except (OSError, ValueError) as e:
+        logger.error(f"加载运行历史失败: {e}")
+    return runs
+
+
+class TaskCancelled(Exception):
+    """任务被取消或超时"""
+
+
+class RunContext:
+    """
+    一次运行的上下文，任务函数通过它登记启动的子进程、检查是否已被取消
+    """
+
+    def __init__(self, run):
+        self.run = run
+        self.cancel_event = threading.Event()
+        self.reason = None
+        self.timed_out = False
+        self._processes = []
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def register_process(self, process):
+        """登记子进程，取消时整组终止；已取消时立即终止"""
+        with self._lock:
+            self._processes.append(process)
+        if self.cancelled:
+            kill_process_tree(process)
+
+    def on_cancel(self, callback):
+        """登记取消时调用的函数(如关闭卡死的浏览器)；已取消时立即调用"""
+        with self._lock:
+            self._callbacks.append(callback)
+        if self.cancelled:
+            callback()
+
+    def check(self):
+        """已取消时抛出 TaskCancelled，供进程内任务在步骤之间调用"""
+        if self.cancelled:
+            raise TaskCancelled(self.reason)
+
+    def expire(self, timeout):
+        """超时: 取消运行并标记为 timeout"""
+        self.timed_out = True
+        self.cancel(f"超过 {timeout} 秒未完成")
+
+    def cancel(self, reason='cancelled'):
+        """取消运行并终止登记的子进程"""
+        if self.cancel_event.is_set():
+            return
+        self.reason = reason
+        self.cancel_event.set()
+        with self._lock:
+            processes = list(self._processes)
+            callbacks = list(self._callbacks)
+        for process in processes:
+            try:
+                kill_process_tree(process)
+            except OSError as e:
+                logger.warning(f"终止进程 {process.pid} 失败: {e}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"取消回调执行失败: {e}")
+
+
+class TaskExecutor:
+    """有界的任务执行器"""
+
+    def __init__(self, max_workers=4, type_limits=None, timeouts=None, history_file=None, history_size=500):
+        """
+        初始化执行器
+
+        参数:
+            max_workers (int): 工作线程数，即同时运行的任务总数上限
+            type_limits (dict): 任务类型 -> 并发上限，未列出的类型只受 max_workers 限制
+            timeouts (dict): 任务类型 -> 默认超时(秒)，任务参数 timeout 优先
+            history_file (str): 运行历史文件(JSON Lines)，为None时只保存在内存
+            history_size (int): 内存中保留的历史条数
+        """
+        self.max_workers = max_workers
+        self.type_limits = dict(DEFAULT_TYPE_LIMITS if type_limits is None else type_limits)
+        self.timeouts = dict(DEFAULT_TIMEOUTS if timeouts is None else timeouts)
+        self.history_file = history_file
+        self._history = deque(maxlen=history_size)
+        self._pending = deque()
+        self._running = {}  # 任务ID -> RunContext
+        self._type_counts = {}
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._workers = []
+        self._history.extend(load_history(history_file, history_size))
+
+    @property
+    def closed(self):
+        return self._shutdown
+
+    def _record(self, run):
+        """写入一条运行历史（调用方需持有 self._cond）"""
+        self._history.append(run)
+        if self.history_file:
+            try:
+                with open(self.history_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(run, ensure_ascii=False) + '\n')
+            except OSError as e:
+                logger.error(f"保存运行历史失败: {e}")
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"task-worker-{len(self._workers) + 1}")
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, task, function, planned=None):
+        """
+        提交一次任务运行
+
+        参数:
+            task (dict): 任务信息，task_params 中的 overlap / timeout 控制重叠策略和超时
+            function (callable): 执行函数，调用方式为 function(task, planned, context)
+            planned (str): 计划运行时间
+
+        返回:
+            dict: 本次运行的记录，被跳过时 status 为 'skipped'
+        """
+        task_id = task['id']
+        params = task.get('task_params') or {}
+        policy = params.get('overlap', OVERLAP_SKIP)
+        if policy not in OVERLAP_POLICIES:
+            logger.warning(f"任务 {task_id} 的重叠策略无效: {policy}，按 {OVERLAP_SKIP} 处理")
+            policy = OVERLAP_SKIP
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("任务执行器已关闭")
+            run = {
+                'run_id': f"{task_id}#{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
+                'task_id': task_id,
+                'type': task['type'],
+                'planned': planned,
+                'queued_at': datetime.now().isoformat(timespec='milliseconds'),
+                'started': None,
+                'finished': None,
+                'wait_seconds': None,
+                'duration_seconds': None,
+                'status': 'queued',
+                'error': None,
+            }
+            queued = [item for item in self._pending if item[0]['task_id'] == task_id]
+            busy = task_id in self._running or queued
+
+            if busy and (policy == OVERLAP_SKIP or (policy == OVERLAP_QUEUE and queued)):
+                run['status'] = 'skipped'
+                run['error'] = '上次运行尚未结束'
+                self._record(run)
+                logger.info(f"任务 {task_id} 上次运行尚未结束，跳过本次")
+                return run
+
+            if busy and policy == OVERLAP_CANCEL:
+                for item in queued:
+                    self._pending.remove(item)
+                    item[0]['status'] = 'cancelled'
+                    item[0]['error'] = '被新的运行取代'
+                    self._record(item[0])
+                if task_id in self._running:
+                    logger.info(f"任务 {task_id} 上次运行尚未结束，终止上次运行")
+                    # 终止进程可能需要数秒，放到锁外
+                    threading.Thread(target=self._running[task_id].cancel, args=('被新的运行取代',),
+                                     daemon=True).start()
+
+            self._pending.append((run, task, function))
+            self._ensure_workers()
+            self._cond.notify_all()
+        return run
+
+    def _next_runnable(self):
+        """取出第一个类型未满且同一任务没有在运行的条目（调用方需持有 self._cond）"""
+        for item in self._pending:
+            run = item[0]
+            limit = self.type_limits.get(run['type'])
+            if limit is not None and self._type_counts.get(run['type'], 0) >= limit:
+                continue
+            if run['task_id'] in self._running:
+                continue
+            self._pending.remove(item)
+            return item
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                item = self._next_runnable()
+                while item is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    item = self._next_runnable()
+                run, task, function = item
+                context = RunContext(run)
+                self._running[run['task_id']] = context
+                self._type_counts[run['type']] = self._type_counts.get(run['type'], 0) + 1
+            self._execute(run, task, function, context)
+            with self._cond:
+                del self._running[run['task_id']]
+                self._type_counts[run['type']] -= 1
+                self._record(run)
+                self._cond.notify_all()
+
+    def _execute(self, run, task, function, context):
+        params = task.get('task_params') or {}
+        timeout = params.get('timeout', self.timeouts.get(run['type']))
+        timer = None
+        if timeout:
+            timer = threading.Timer(float(timeout), context.expire, args=(timeout,))
+            timer.daemon = True
+            timer.start()
+
+        started = datetime.now()
+        run['started'] = started.isoformat(timespec='milliseconds')
+        run['wait_seconds'] = round((started - datetime.fromisoformat(run['queued_at'])).total_seconds(), 3)
+        run['status'] = 'running'
+        try:
+            function(task, run['planned'], context)
+            run['status'] = 'success'
+        except Exception as e:
+            run['error'] = str(e)
+            run['status'] = 'failed'
+        finally:
+            if timer is not None:
+                timer.cancel()
+            finished = datetime.now()
+            run['finished'] = finished.isoformat(timespec='milliseconds')
+            run['duration_seconds'] = round((finished - started).total_seconds(), 3)
+        if context.cancelled:
+            run['status'] = 'timeout' if context.timed_out else 'cancelled'
+            run['error'] = context.reason
+        logger.info(f"任务 {run['task_id']} 运行结束: {run['status']}，耗时 {run['duration_seconds']} 秒")
+
+    def cancel(self, task_id):
+        """
+        取消任务正在进行和排队中的运行
+
+        返回:
+            bool: 是否有运行被取消
+        """
+        with self._cond:
+            found = False
+            for item in [item for item in self._pending if item[0]['task_id'] == task_id]:
+                self._pending.remove(item)
+                item[0]['status'] = 'cancelled'
+                item[0]['error'] = '手动取消'
+                self._record(item[0])
+                found = True
+            context = self._running.get(task_id)
+        if context is not None:
+            context.cancel('手动取消')
+            found = True
+        return found
+
+    def running(self):
+        """正在运行的任务记录"""
+        with self._cond:
+            return [dict(context.run) for context in self._running.values()]
+
+    def pending(self):
+        """排队中的任务记录"""
+        with self._cond:
+            return [dict(item[0]) for item in self._pending]
+
+    def history(self, task_id=None, limit=50):
+        """
+        运行历史，最新的在前
+
+        参数:
+            task_id (str): 只返回该任务的记录
+            limit (int): 最多返回条数
+        """
+        with self._cond:
+            runs = [run for run in reversed(self._history) if task_id is None or run['task_id'] == task_id]
+        return [dict(run) for run in runs[:limit]]
+
+    def shutdown(self, cancel_running=False, wait=True, timeout=30):
+        """
+        关闭执行器，丢弃排队中的运行
+
+        参数:
+            cancel_running (bool): 是否取消正在进行的运行
+            wait (bool): 是否等待工作线程结束
+            timeout (float): 等待所有工作线程的最长时间(秒)，为None时一直等待；
+                             超时后仍在运行的线程在后台结束并照常记录历史
+        """
+        with self._cond:
+            self._shutdown = True
+            while self._pending:
+                run = self._pending.popleft()[0]
+                run['status'] = 'cancelled'
+                run['error'] = '执行器已关闭'
+                self._record(run)
+            contexts = list(self._running.values())
+            self._cond.notify_all()
+        if cancel_running:
+            for context in contexts:
+                context.cancel('执行器已关闭')
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for worker in self._workers:
+                worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            alive = sum(worker.is_alive() for worker in self._workers)
+            if alive:
+                logger.warning(f"{alive} 个工作线程在 {timeout} 秒内未结束，不再等待")
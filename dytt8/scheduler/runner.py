@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+"""
+调度任务的爬取执行
+进程内模式: 直接调用爬虫类，复用驱动池中已启动的 Chrome 和共享的 HTTP 会话，
+            免去每次运行的解释器启动、selenium/pandas 导入和浏览器冷启动
+子进程模式: 仅用于隔离，一个常驻的工作进程通过管道接收任务，
+            进程内同样使用驱动池；崩溃、超时或取消后下次运行时重建
+"""
+import os
+import atexit
+import threading
+import logging
+import multiprocessing
+
+from dytt8.utils import profiling
+
+logger = logging.getLogger('movie_scheduler')
+
+
+# 执行函数 fn(params, driver, session, sink, context) 返回尚未写入 sink 的电影；
+# sink 为None(json/excel 格式)时返回全部结果。使用浏览器的爬虫取消时由驱动池关闭浏览器，
+# 其他爬虫通过 context.on_cancel 自行停止
+
+
+def _run_movie_scraper(params, driver, session, sink=None, context=None):
+    from dytt8.core import MovieScraper
+    scraper = MovieScraper(driver=driver)
+    movies = scraper.scrape_latest_movies(max_pages=params.get('pages', 3), category=params.get('category'),
+                                          resume=params.get('resume', False), sink=sink)
+    return [] if sink is not None else movies
+
+
+def _run_movie_scraper_v2(params, driver, session, sink=None, context=None):
+    from dytt8.core import MovieScraperV2
+    scraper = MovieScraperV2(driver=driver)
+    movies = scraper.browse_movies_by_category(params.get('category', '最新电影'), sink=sink)
+    return [] if sink is not None else movies
+
+
+def _run_simple_scraper(params, driver, session, sink=None, context=None):
+    from dytt8.core import SimpleMovieScraper
+    scraper = SimpleMovieScraper(driver=driver)
+    return scraper.browse_movies_by_category(params.get('category', '最新电影'))
+
+
+def _run_http_scraper(params, driver, session, sink=None, context=None):
+    from dytt8.scrapers.dytt8_scraper import Dytt8Scraper
+    scraper = Dytt8Scraper(pages=params.get('pages', 3), delay=params.get('delay', 2.0),
+                           category=params.get('category', '最新电影'), session=session,
+                           resume=params.get('resume', False))
+    if context is not None:
+        # 没有浏览器可关闭，取消或超时时停止流水线，未完成的URL留在断点中
+        context.on_cancel(scraper.stop)
+    if sink is not None:
+        scraper.stream_to(sink, keep_results=False)
+    return scraper.scrape()
+
+
+def _run_douban_scraper(params, driver, session, sink=None, context=None):
+    from dytt8.scrapers.douban_scraper import DoubanScraper
+    scraper = DoubanScraper(pages=params.get('pages', 3), delay=params.get('delay', 2.0),
+                            category=params.get('category', '热门'), driver=driver,
+                            resume=params.get('resume', False))
+    if sink is not None:
+        scraper.stream_to(sink, keep_results=False)
+    return scraper.scrape()
+
+
+# 任务参数 version -> (执行函数, 是否需要浏览器)
+SCRAPERS = {
+    'v1': (_run_movie_scraper, True),
+    'v2': (_run_movie_scraper_v2, True),
+    'simple': (_run_simple_scraper, True),
+    'http': (_run_http_scraper, False),
+    'douban': (_run_douban_scraper, True),
+}
+
+
+def quit_driver(driver, timeout=10):
+    """
+    关闭浏览器；quit() 在浏览器卡死时可能一直阻塞，超时后直接终止 chromedriver 进程
+    """
+    closer = threading.Thread(target=driver.quit, daemon=True)
+    closer.start()
+    closer.join(timeout)
+    if closer.is_alive():
+        service = getattr(driver, 'service', None)
+        process = getattr(service, 'process', None)
+        if process is not None:
+            logger.warning("浏览器未响应，终止 chromedriver 进程")
+            process.kill()
+
+
+class DriverPool:
+    """
+    Chrome 驱动池，运行之间保留空闲的浏览器供下次复用
+    """
+
+    def __init__(self, size=1, headless=True, disable_images=True, factory=None):
+        """
+        初始化驱动池
+
+        参数:
+            size (int): 最多保留的空闲驱动数
+            headless (bool): 是否使用无头模式
+            disable_images (bool): 是否禁用图片加载
+            factory (callable): 创建驱动的函数，默认使用 setup_chrome_driver
+        """
+        self.size = size
+        self.headless = headless
+        self.disable_images = disable_images
+        self.factory = factory or self._create
+        self._idle = []
+        self._discarded = set()
+        self._lock = threading.Lock()
+
+    def _create(self):
+        from dytt8.utils.utils import setup_chrome_driver
+        return setup_chrome_driver(headless=self.headless, disable_images=self.disable_images)
+
+    @staticmethod
+    def _alive(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """取出一个可用的驱动，没有空闲驱动时新建"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                driver = self._idle.pop()
+            if self._alive(driver):
+                return driver
+            logger.info("驱动池中的浏览器已失效，丢弃")
+            quit_driver(driver)
+        return self.factory()
+
+    def release(self, driver, broken=False):
+        """
+        归还驱动，出错或池已满时关闭
+
+        参数:
+            driver: 取出的驱动
+            broken (bool): 本次使用中是否出错，出错的驱动不再复用
+        """
+        with self._lock:
+            if id(driver) in self._discarded:
+                self._discarded.discard(id(driver))
+                return
+            if not broken and len(self._idle) < self.size:
+                self._idle.append(driver)
+                return
+        quit_driver(driver)
+
+    def discard(self, driver):
+        """关闭正在使用的驱动(如任务超时卡在浏览器中)，之后的 release 不再处理它"""
+        with self._lock:
+            self._discarded.add(id(driver))
+        quit_driver(driver)
+
+    def close(self):
+        """关闭所有空闲驱动"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            quit_driver(driver)
+
+    def __len__(self):
+        return len(self._idle)
+
+
+class InProcessRunner:
+    """在当前进程中运行爬虫，复用驱动池和HTTP会话"""
+
+    def __init__(self, pool_size=1, headless=True, driver_factory=None):
+        self.drivers = DriverPool(pool_size, headless=headless, factory=driver_factory)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """共享的 requests 会话，连接池在运行之间保持"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from dytt8.scrapers.dytt8_scraper import HEADERS
+                from dytt8.utils.page_archive import instrument_session
+                self._session = requests.Session()
+                self._session.headers.update(HEADERS)
+                instrument_session(self._session)
+            return self._session
+
+    def run(self, params, context=None):
+        """
+        执行一次爬取并保存结果
+
+        参数:
+            params (dict): 任务参数 (version, pages, delay, category, format, output, resume, links_db)
+            context (RunContext): 运行上下文，取消或超时时关闭正在使用的浏览器或停止 HTTP 爬虫
+
+        返回:
+            dict: version, count, file
+        """
+        from dytt8.scrapers.base_scraper import open_output, save_movies
+        from dytt8.utils.links import LinkIndex
+        from dytt8.utils.sinks import Tee, remove_output
+
+        version = params.get('version', 'v2')
+        if version not in SCRAPERS:
+            raise ValueError(f"不支持的爬虫版本: {version}，可用: {', '.join(SCRAPERS)}")
+        function, needs_driver = SCRAPERS[version]
+
+        driver = self.drivers.acquire() if needs_driver else None
+        if driver is not None and context is not None:
+            context.on_cancel(lambda: self.drivers.discard(driver))
+        save_format = params.get('format', 'csv')
+        output_dir = params.get('output', os.getcwd())
+        name = f"scheduled_{version}_movies"
+        # 可流式写入的格式边爬边写，中途失败时已写出的部分保留在文件中
+        source = params.get('source') or ('douban' if version == 'douban' else 'dytt8')
+        sink = open_output(save_format, output_dir, name, source=source, category=params.get('category'))
+        # 下载链接同时写入 links 索引
+        index = LinkIndex(params.get('links_db'))
+        target = Tee(sink, index) if sink is not None else None
+        broken = False
+        try:
+            movies = function(params, driver, self.session if not needs_driver else None, target, context) or []
+            if target is not None:
+                target.write_many(movies)
+            else:
+                index.write_many(movies)
+        except Exception:
+            broken = True
+            raise
+        finally:
+            if driver is not None:
+                self.drivers.release(driver, broken=broken)
+            if target is not None:
+                target.close()
+            else:
+                index.close()
+        if context is not None:
+            context.check()
+
+        if sink is None:
+            saved_file = save_movies(movies, save_format, output_dir, name,
+                                     source=source, category=params.get('category'))
+            return {'version': version, 'count': len(movies), 'file': saved_file}
+        if not sink.count:
+            print("没有爬取结果可保存")
+            remove_output(sink.path)
+            return {'version': version, 'count': 0, 'file': None}
+        print(f"已保存 {sink.count} 条结果到 {sink.path}")
+        return {'version': version, 'count': sink.count, 'file': sink.path}
+
+    def close(self):
+        """关闭驱动池和会话"""
+        self.drivers.close()
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+def _worker_main(conn, pool_size, headless):
+    """常驻工作进程: 逐个接收任务，在进程内运行并返回结果"""
+    if hasattr(os, 'setsid'):
+        # 自成进程组，父进程终止时可连同 chromedriver/Chrome 一起结束
+        os.setsid()
+    runner = InProcessRunner(pool_size, headless)
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                break
+            if job is None:
+                break
+            params, profile_name, profile_mode = job
+            try:
+                with profiling.profile(profile_name or 'scrape', profile_mode):
+                    result = runner.run(params)
+                conn.send(('ok', result))
+            except Exception as e:
+                conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        runner.close()
+
+
+class WorkerProcess:
+    """
+    常驻的爬虫工作进程，通过管道接收任务，一次只运行一个
+    """
+
+    def __init__(self, pool_size=1, headless=True):
+        self.pool_size = pool_size
+        self.headless = headless
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+        # 调度器是多线程的，fork 可能复制到被其他线程持有的锁，使用 spawn 启动
+        self._mp = multiprocessing.get_context('spawn')
+        self._atexit_registered = False
+
+    def _start(self):
+        parent_conn, child_conn = self._mp.Pipe()
+        # 不能是守护进程: 爬虫在进程内用 CrawlPipeline 的进程池解析，守护进程不允许创建子进程；
+        # 退出时由 close() 通知工作进程结束，atexit 保证解释器退出前调用
+        self._process = self._mp.Process(target=_worker_main, args=(child_conn, self.pool_size, self.headless),
+                                         name="dytt8-scrape-worker")
+        self._process.start()
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+        child_conn.close()
+        self._conn = parent_conn
+        logger.info(f"爬虫工作进程已启动: {self._process.pid}")
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def run(self, params, context=None, profile_name=None, profile_mode=None):
+        """
+        在工作进程中执行一次爬取
+
+        参数:
+            params (dict): 任务参数
+            context (RunContext): 运行上下文，取消或超时时终止整个工作进程(含 Chrome)
+            profile_name (str): 剖析文件名
+            profile_mode (str): 剖析方式，为None时不剖析
+
+        返回:
+            dict: version, count, file
+        """
+        from dytt8.scheduler.executor import TaskCancelled
+
+        with self._lock:
+            if not self.alive:
+                self._start()
+            process = self._process
+            if context is not None:
+                context.register_process(process)
+            self._conn.send((params, profile_name, profile_mode))
+            while True:
+                try:
+                    if self._conn.poll(0.5):
+                        status, payload = self._conn.recv()
+                        break
+                except (EOFError, OSError):
+                    status, payload = 'error', '工作进程意外退出'
+                    break
+                if not process.is_alive():
+                    status, payload = 'error', f"工作进程意外退出，退出码 {process.exitcode}"
+                    break
+            if context is not None and context.cancelled:
+                self._reset()
+                raise TaskCancelled(context.reason)
+            if status != 'ok':
+                if not process.is_alive():
+                    self._reset()
+                raise RuntimeError(payload)
+            return payload
+
+    def _reset(self):
+        from dytt8.scheduler.executor import kill_process_tree
+        if self._process is not None:
+            kill_process_tree(self._process)
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def close(self, timeout=10):
+        """通知工作进程退出，超时后终止"""
+        with self._lock:
+            if self.alive:
+                try:
+                    self._conn.send(None)
+                except OSError:
+                    pass
+                self._process.join(timeout)
+            self._reset()
@@ -4,15 +4,18 @@
 实现自动抓取和更新推荐
 """
 import os
-import sys
 import time
 import json
+import heapq
+import itertools
 import threading
-import schedule
 from datetime import datetime, timedelta
-import subprocess
 import logging
 
+from dytt8.utils import metrics, profiling
+from dytt8.scheduler.executor import TaskExecutor, load_history
+from dytt8.scheduler.runner import InProcessRunner, WorkerProcess
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -25,22 +28,78 @@ logging.basicConfig(
 
 logger = logging.getLogger('movie_scheduler')
 
+MAX_WAIT = 300  # 调度线程单次最长等待(秒)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+CONFIG_FILE = os.path.join(DATA_DIR, "scheduler.json")
+HISTORY_FILE = os.path.join(DATA_DIR, "task_history.jsonl")
+
+
+def read_tasks(config_file=CONFIG_FILE):
+    """只读取任务配置，不创建调度器和执行器(供 API 等只查询的调用方使用)"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def read_run_history(task_id=None, limit=50, history_file=HISTORY_FILE):
+    """只读取运行历史，最新的在前，字段同 TaskScheduler.get_run_history"""
+    runs = [run for run in reversed(load_history(history_file)) if task_id is None or run['task_id'] == task_id]
+    return runs[:limit]
+
 class TaskScheduler:
     """定时任务管理器"""
     
-    def __init__(self):
-        """初始化任务管理器"""
+    def __init__(self, max_workers=4, type_limits=None, execution_mode='inprocess', driver_pool_size=1):
+        """
+        初始化任务管理器
+        
+        参数:
+            max_workers (int): 同时运行的任务总数上限
+            type_limits (dict): 任务类型 -> 并发上限，默认爬取1个、推荐2个
+            execution_mode (str): 爬取任务的默认执行方式，inprocess 或 subprocess，任务参数 mode 优先
+            driver_pool_size (int): 运行之间保留的空闲浏览器数
+        """
         self.tasks = []
-        self.config_file = os.path.join(os.path.dirname(__file__), "data", "scheduler.json")
+        self.config_file = CONFIG_FILE
         self.stop_event = threading.Event()
         self.thread = None
         
+        # 按下次运行时间排序的小顶堆: (时间戳, 序号, 任务ID, 版本)
+        # 任务修改或删除时版本递增，堆中旧条目随之失效，弹出时跳过
+        self._heap = []
+        self._versions = {}
+        self._seq = itertools.count()
+        # 保护任务列表和堆；增删改任务时通知调度线程重新计算等待时间
+        self._cond = threading.Condition()
+        
         # 创建数据目录
         os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
         
+        # 爬取执行器按需创建，浏览器和工作进程在运行之间保留
+        self.execution_mode = execution_mode
+        self.driver_pool_size = driver_pool_size
+        self._runner = None
+        self._worker = None
+        self._runner_lock = threading.Lock()
+        
+        # 到期任务交给执行器，调度线程只负责计时
+        self.max_workers = max_workers
+        self.type_limits = type_limits
+        self.executor = self._create_executor()
+        
         # 加载任务配置
         self._load_tasks()
     
+    def _create_executor(self, history_file=HISTORY_FILE):
+        return TaskExecutor(
+            max_workers=self.max_workers,
+            type_limits=self.type_limits,
+            history_file=history_file
+        )
+    
     def _load_tasks(self):
         """加载任务配置"""
         if os.path.exists(self.config_file):
@@ -53,10 +112,12 @@ class TaskScheduler:
                 self.tasks = []
     
     def _save_tasks(self):
-        """保存任务配置"""
+        """保存任务配置（仅在任务发生变化时调用），先写临时文件再替换，避免写到一半的配置"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
+            temp_file = self.config_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
                 json.dump(self.tasks, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.config_file)
             logger.info("已保存任务配置")
         except Exception as e:
             logger.error(f"保存任务配置失败: {e}")
@@ -75,8 +136,13 @@ class TaskScheduler:
         返回:
             str: 任务ID
         """
-        # 生成任务ID
+        # 生成任务ID，同一秒内添加多个任务时加序号区分
         task_id = f"{task_type}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        existing = {task['id'] for task in self.tasks}
+        suffix = 1
+        while task_id in existing:
+            suffix += 1
+            task_id = f"{task_type}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{suffix}"
         
         # 创建任务记录
         task = {
@@ -91,15 +157,17 @@ class TaskScheduler:
             'next_run': self._calculate_next_run(schedule_type, time_params)
         }
         
-        # 添加到任务列表
-        self.tasks.append(task)
-        
-        # 保存配置
-        self._save_tasks()
-        
-        # 如果任务是激活状态，立即安排它
-        if active and self.thread and self.thread.is_alive():
-            self._schedule_task(task)
+        with self._cond:
+            # 添加到任务列表
+            self.tasks.append(task)
+            
+            # 保存配置
+            self._save_tasks()
+            
+            # 如果任务是激活状态，立即安排它
+            if active and self.thread and self.thread.is_alive():
+                self._schedule_task(task)
+                self._cond.notify()
         
         logger.info(f"已添加任务: {task_id} ({task_type})")
         return task_id
@@ -115,31 +183,30 @@ class TaskScheduler:
         返回:
             bool: 是否成功
         """
-        for i, task in enumerate(self.tasks):
-            if task['id'] == task_id:
-                # 更新字段
-                for key, value in kwargs.items():
-                    if key in task:
-                        task[key] = value
-                
-                # 如果更新了时间参数，重新计算下次运行时间
-                if 'time_params' in kwargs or 'schedule_type' in kwargs:
-                    schedule_type = kwargs.get('schedule_type', task['schedule_type'])
-                    time_params = kwargs.get('time_params', task['time_params'])
-                    task['next_run'] = self._calculate_next_run(schedule_type, time_params)
-                
-                # 保存配置
-                self._save_tasks()
-                
-                # 如果调度器正在运行，更新调度
-                if self.thread and self.thread.is_alive():
-                    # 清除现有任务
-                    schedule.clear()
-                    # 重新安排所有任务
-                    self._schedule_all_tasks()
-                
-                logger.info(f"已更新任务: {task_id}")
-                return True
+        with self._cond:
+            for task in self.tasks:
+                if task['id'] == task_id:
+                    # 更新字段
+                    for key, value in kwargs.items():
+                        if key in task:
+                            task[key] = value
+                    
+                    # 如果更新了时间参数，重新计算下次运行时间
+                    if 'time_params' in kwargs or 'schedule_type' in kwargs:
+                        schedule_type = kwargs.get('schedule_type', task['schedule_type'])
+                        time_params = kwargs.get('time_params', task['time_params'])
+                        task['next_run'] = self._calculate_next_run(schedule_type, time_params)
+                    
+                    # 如果调度器正在运行，重新安排该任务（停用的任务只使旧条目失效）
+                    if self.thread and self.thread.is_alive():
+                        self._schedule_task(task)
+                        self._cond.notify()
+                    
+                    # 保存配置
+                    self._save_tasks()
+                    
+                    logger.info(f"已更新任务: {task_id}")
+                    return True
         
         logger.warning(f"未找到任务: {task_id}")
         return False
@@ -154,23 +221,19 @@ class TaskScheduler:
         返回:
             bool: 是否成功
         """
-        for i, task in enumerate(self.tasks):
-            if task['id'] == task_id:
-                # 删除任务
-                del self.tasks[i]
-                
-                # 保存配置
-                self._save_tasks()
-                
-                # 如果调度器正在运行，更新调度
-                if self.thread and self.thread.is_alive():
-                    # 清除现有任务
-                    schedule.clear()
-                    # 重新安排所有任务
-                    self._schedule_all_tasks()
-                
-                logger.info(f"已删除任务: {task_id}")
-                return True
+        with self._cond:
+            for i, task in enumerate(self.tasks):
+                if task['id'] == task_id:
+                    # 删除任务，堆中的条目因版本不匹配而失效
+                    del self.tasks[i]
+                    self._versions.pop(task_id, None)
+                    self._cond.notify()
+                    
+                    # 保存配置
+                    self._save_tasks()
+                    
+                    logger.info(f"已删除任务: {task_id}")
+                    return True
         
         logger.warning(f"未找到任务: {task_id}")
         return False
@@ -194,6 +257,37 @@ class TaskScheduler:
                 return task
         return None
     
+    def run_task_now(self, task_id):
+        """
+        立即运行一次任务（遵循并发上限和重叠策略）
+        
+        返回:
+            dict: 本次运行的记录，未找到任务时返回None
+        """
+        task = self.get_task(task_id)
+        if task is None:
+            logger.warning(f"未找到任务: {task_id}")
+            return None
+        # 计划时间为提交时刻，调度延迟不会按任务的下次运行时间计算
+        return self.executor.submit(task, self._execute_task, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    
+    def cancel_task_runs(self, task_id):
+        """取消任务正在进行和排队中的运行，正在运行的爬虫进程及其 Chrome 会被终止"""
+        return self.executor.cancel(task_id)
+    
+    def get_run_history(self, task_id=None, limit=50):
+        """
+        获取运行历史，最新的在前
+        
+        参数:
+            task_id (str): 只返回该任务的记录
+            limit (int): 最多返回条数
+        
+        返回:
+            list: 每条包含 run_id, status, planned, queued_at, started, finished, wait_seconds, duration_seconds, error
+        """
+        return self.executor.history(task_id, limit)
+    
     def _calculate_next_run(self, schedule_type, time_params):
         """
         计算下次运行时间
@@ -258,91 +352,88 @@ class TaskScheduler:
         
         return next_run.strftime('%Y-%m-%d %H:%M:%S') if next_run else None
     
-    def _execute_task(self, task):
+    def _execute_task(self, task, planned=None, context=None):
         """
-        执行任务
+        执行任务（在执行器的工作线程中运行），失败时抛出异常，由执行器记入运行历史
         
         参数:
             task (dict): 任务信息
+            planned (str): 本次计划运行时间，默认取任务的 next_run
+            context (RunContext): 执行器提供的运行上下文，用于登记子进程和响应取消
         """
         task_id = task['id']
         task_type = task['type']
         task_params = task['task_params']
         
+        # 记录实际开始时间与计划时间之差
+        planned = planned or task.get('next_run')
+        if planned:
+            planned = datetime.strptime(planned, '%Y-%m-%d %H:%M:%S')
+            metrics.SCHEDULER_LAG.observe(max(0.0, (datetime.now() - planned).total_seconds()), task_type)
+        
         logger.info(f"开始执行任务: {task_id} ({task_type})")
         
+        # task_params 中的 profile 为 true/"sample" 时生成剖析文件
+        profile_mode = profiling.parse_mode(task_params.get('profile'))
+        
         try:
             if task_type == 'scrape':
                 # 执行爬取任务
-                self._execute_scrape_task(task_params)
+                self._execute_scrape_task(task_params, context, profile_name=task_id, profile_mode=profile_mode)
             elif task_type == 'recommend':
                 # 执行推荐更新任务
-                self._execute_recommend_task(task_params)
+                with profiling.profile(task_id, profile_mode):
+                    self._execute_recommend_task(task_params)
+                if context is not None:
+                    context.check()
             else:
                 logger.warning(f"未知任务类型: {task_type}")
                 return
             
             # 更新任务状态
-            task['last_run'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            task['next_run'] = self._calculate_next_run(task['schedule_type'], task['time_params'])
-            self._save_tasks()
+            with self._cond:
+                task['last_run'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             logger.info(f"任务 {task_id} 执行完成")
             
         except Exception as e:
             logger.error(f"任务 {task_id} 执行失败: {e}")
+            raise
+        finally:
+            # 下次运行时间在派发时已更新，这里一并保存
+            with self._cond:
+                self._save_tasks()
     
-    def _execute_scrape_task(self, params):
+    def _execute_scrape_task(self, params, context=None, profile_name=None, profile_mode=None):
         """
         执行爬取任务
         
+        参数 mode 为 inprocess 时在当前进程中调用爬虫类，复用驱动池和HTTP会话；
+        为 subprocess 时交给常驻的工作进程，只用于需要隔离的任务
+        
         参数:
-            params (dict): 任务参数
+            params (dict): 任务参数 (version, pages, delay, category, format, output, mode)
+            context (RunContext): 运行上下文，超时或取消时关闭浏览器或终止工作进程
+            profile_name (str): 剖析文件名
+            profile_mode (str): 剖析方式，为None时不剖析
         """
-        # 从参数中获取爬取配置
-        version = params.get('version', 'v2')
-        pages = params.get('pages', 3)
-        delay = params.get('delay', 2.0)
-        category = params.get('category', '最新电影')
-        save_format = params.get('format', 'csv')
-        save_path = params.get('output', os.getcwd())
-        
-        # 映射版本到脚本名
-        script_map = {
-            'v1': 'dytt8_scraper.py',
-            'v2': 'dytt8_scraper_v2.py',
-            'simple': 'dytt8_simple.py'
-        }
-        
-        script_name = script_map.get(version, 'dytt8_scraper_v2.py')
-        script_path = os.path.join(os.path.dirname(__file__), script_name)
-        
-        # 构建命令
-        cmd = [
-            sys.executable,
-            script_path,
-            '--pages', str(pages),
-            '--delay', str(delay),
-            '--category', category,
-            '--format', save_format,
-            '--output', save_path,
-            '--headless'  # 确保无头模式运行
-        ]
-        
-        # 执行命令
-        logger.info(f"执行命令: {' '.join(cmd)}")
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            logger.info(f"爬取任务输出: {result.stdout}")
-            if result.stderr:
-                logger.warning(f"爬取任务错误: {result.stderr}")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"爬取任务失败: {e}")
-            if e.stdout:
-                logger.info(f"输出: {e.stdout}")
-            if e.stderr:
-                logger.error(f"错误: {e.stderr}")
-            raise
+        mode = params.get('mode', self.execution_mode)
+        logger.info(f"执行爬取任务: 版本 {params.get('version', 'v2')}，模式 {mode}")
+        
+        if mode == 'subprocess':
+            with self._runner_lock:
+                if self._worker is None:
+                    self._worker = WorkerProcess(pool_size=self.driver_pool_size)
+            result = self._worker.run(params, context, profile_name, profile_mode)
+        else:
+            with self._runner_lock:
+                if self._runner is None:
+                    self._runner = InProcessRunner(pool_size=self.driver_pool_size)
+            with profiling.profile(profile_name or 'scrape', profile_mode):
+                result = self._runner.run(params, context)
+        
+        logger.info(f"爬取任务完成: {result['count']} 部电影，保存到 {result['file']}")
+        return result
     
     def _execute_recommend_task(self, params):
         """
@@ -357,7 +448,7 @@ class TaskScheduler:
         
         # 导入推荐系统
         try:
-            from recommender import MovieRecommender
+            from dytt8.recommender.recommender import MovieRecommender
             
             # 初始化推荐系统
             recommender = MovieRecommender()
@@ -389,76 +480,55 @@ class TaskScheduler:
     
     def _schedule_task(self, task):
         """
-        安排任务
+        把任务的下次运行时间放入堆中（调用方需持有 self._cond）
         
         参数:
             task (dict): 任务信息
-        """
-        if not task['active']:
-            return
         
+        返回:
+            bool: 是否重新计算了 next_run（原时间已过期或缺失）
+        """
         task_id = task['id']
-        schedule_type = task['schedule_type']
-        time_params = task['time_params']
-        
-        # 根据不同的调度类型设置任务
-        if schedule_type == 'hourly':
-            minute = int(time_params.get('minute', 0))
-            schedule.every().hour.at(f":{minute:02d}").do(self._execute_task, task)
-            logger.info(f"任务 {task_id} 已安排为每小时 {minute:02d} 分执行")
-            
-        elif schedule_type == 'daily':
-            hour = int(time_params.get('hour', 0))
-            minute = int(time_params.get('minute', 0))
-            schedule.every().day.at(f"{hour:02d}:{minute:02d}").do(self._execute_task, task)
-            logger.info(f"任务 {task_id} 已安排为每天 {hour:02d}:{minute:02d} 执行")
-            
-        elif schedule_type == 'weekly':
-            weekday = int(time_params.get('weekday', 0))
-            hour = int(time_params.get('hour', 0))
-            minute = int(time_params.get('minute', 0))
-            
-            # 映射星期几
-            weekday_map = {
-                0: schedule.every().monday,
-                1: schedule.every().tuesday,
-                2: schedule.every().wednesday,
-                3: schedule.every().thursday,
-                4: schedule.every().friday,
-                5: schedule.every().saturday,
-                6: schedule.every().sunday
-            }
-            
-            weekday_name = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"][weekday]
-            
-            if weekday in weekday_map:
-                weekday_map[weekday].at(f"{hour:02d}:{minute:02d}").do(self._execute_task, task)
-                logger.info(f"任务 {task_id} 已安排为每周{weekday_name} {hour:02d}:{minute:02d} 执行")
-                
-        elif schedule_type == 'monthly':
-            day = int(time_params.get('day', 1))
-            hour = int(time_params.get('hour', 0))
-            minute = int(time_params.get('minute', 0))
-            
-            # schedule库不直接支持每月调度，我们使用自定义的检查方法
-            def monthly_job():
-                now = datetime.now()
-                if now.day == day:
-                    # 今天是目标日期，检查时间
-                    target_time = now.replace(hour=hour, minute=minute, second=0)
-                    if now.timestamp() >= target_time.timestamp() and now.timestamp() < target_time.timestamp() + 60:
-                        # 现在是目标时间的一分钟内，执行任务
-                        self._execute_task(task)
-            
-            # 每小时检查一次
-            schedule.every().hour.do(monthly_job)
-            logger.info(f"任务 {task_id} 已安排为每月 {day} 日 {hour:02d}:{minute:02d} 执行")
+        version = self._versions.get(task_id, 0) + 1
+        self._versions[task_id] = version
+        if not task['active']:
+            return False
+        
+        changed = False
+        due = None
+        if task.get('next_run'):
+            due = datetime.strptime(task['next_run'], '%Y-%m-%d %H:%M:%S').timestamp()
+        if due is None or due < time.time():
+            # 调度器未运行期间错过的时间不补跑，直接安排到下一次
+            try:
+                task['next_run'] = self._calculate_next_run(task['schedule_type'], task['time_params'])
+            except (ValueError, TypeError) as e:
+                logger.error(f"任务 {task_id} 的时间参数无效: {e}")
+                return False
+            if not task['next_run']:
+                logger.warning(f"任务 {task_id} 的调度类型未知: {task['schedule_type']}")
+                return False
+            due = datetime.strptime(task['next_run'], '%Y-%m-%d %H:%M:%S').timestamp()
+            changed = True
+        
+        heapq.heappush(self._heap, (due, next(self._seq), task_id, version))
+        
+        # 频繁修改任务会留下大量失效条目，超过有效条目数两倍时重建堆
+        if len(self._heap) > 2 * len(self.tasks) + 64:
+            self._heap = [entry for entry in self._heap if self._versions.get(entry[2]) == entry[3]]
+            heapq.heapify(self._heap)
+        
+        logger.info(f"任务 {task_id} 已安排在 {task['next_run']} 执行")
+        return changed
     
     def _schedule_all_tasks(self):
-        """安排所有活动任务"""
+        """安排所有活动任务（调用方需持有 self._cond）"""
+        self._heap = []
+        self._versions = {}
+        changed = False
         for task in self.tasks:
-            if task['active']:
-                self._schedule_task(task)
+            changed = self._schedule_task(task) or changed
+        return changed
     
     def start(self):
         """启动任务调度器"""
@@ -469,11 +539,10 @@ class TaskScheduler:
         # 重置停止标志
         self.stop_event.clear()
         
-        # 清除所有已安排的任务
-        schedule.clear()
-        
-        # 安排所有活动任务
-        self._schedule_all_tasks()
+        # 安排所有活动任务，过期的下次运行时间被更新时保存一次
+        with self._cond:
+            if self._schedule_all_tasks():
+                self._save_tasks()
         
         # 创建并启动调度线程
         self.thread = threading.Thread(target=self._run_scheduler)
@@ -488,39 +557,78 @@ class TaskScheduler:
             logger.warning("任务调度器未在运行")
             return
         
-        # 设置停止标志
-        self.stop_event.set()
+        # 设置停止标志并唤醒调度线程
+        with self._cond:
+            self.stop_event.set()
+            self._cond.notify_all()
         
         # 等待线程结束
         self.thread.join(timeout=5)
         self.thread = None
         
-        # 清除所有已安排的任务
-        schedule.clear()
+        with self._cond:
+            self._heap = []
+            self._versions = {}
+        
+        # 先取消并等待正在进行的运行，再关闭它们可能正在使用的浏览器和工作进程；
+        # 换上新的执行器，停止后仍可手动运行任务
+        self.executor.shutdown(cancel_running=True, wait=True)
+        self.executor = self._create_executor(self.executor.history_file)
+        
+        # 关闭保留的浏览器和工作进程
+        with self._runner_lock:
+            if self._runner is not None:
+                self._runner.close()
+                self._runner = None
+            if self._worker is not None:
+                self._worker.close()
+                self._worker = None
         
         logger.info("任务调度器已停止")
     
+    def _next_due_tasks(self):
+        """
+        等待到堆顶任务到期，返回所有到期的任务及其计划时间（调用方需持有 self._cond）
+        
+        返回:
+            list: (任务, 计划时间) 列表，调度器停止时返回空列表
+        """
+        while not self.stop_event.is_set():
+            now = time.time()
+            due = []
+            index = None
+            while self._heap and self._heap[0][0] <= now:
+                _, _, task_id, version = heapq.heappop(self._heap)
+                if self._versions.get(task_id) != version:
+                    continue
+                if index is None:
+                    index = {item['id']: item for item in self.tasks}
+                task = index.get(task_id)
+                if task is None:
+                    continue
+                planned = task['next_run']
+                # 先安排下一次，长时间运行的任务不会推迟后续调度
+                task['next_run'] = None
+                self._schedule_task(task)
+                due.append((task, planned))
+            if due:
+                return due
+            # 睡到下一个任务到期，或被增删改任务唤醒；
+            # 等待按单调时钟计时，最长等待 MAX_WAIT 秒以便发现系统时间的调整
+            timeout = min(self._heap[0][0] - now, MAX_WAIT) if self._heap else None
+            self._cond.wait(timeout)
+        return []
+    
     def _run_scheduler(self):
         """运行调度器（在单独的线程中执行）"""
         logger.info("调度器线程已启动")
         
-        while not self.stop_event.is_set():
-            # 运行所有待执行的任务
-            schedule.run_pending()
-            
-            # 更新任务的下次运行时间
-            now = datetime.now()
-            for task in self.tasks:
-                if task['active'] and task['next_run']:
-                    next_run = datetime.strptime(task['next_run'], '%Y-%m-%d %H:%M:%S')
-                    if next_run < now:
-                        # 计算新的下次运行时间
-                        task['next_run'] = self._calculate_next_run(task['schedule_type'], task['time_params'])
-            
-            # 保存更新后的任务
-            self._save_tasks()
-            
-            # 休息一段时间，避免CPU过载
-            time.sleep(30)
+        while True:
+            with self._cond:
+                due = self._next_due_tasks()
+            if not due:
+                break
+            for task, planned in due:
+                self.executor.submit(task, self._execute_task, planned)
         
-        logger.info("调度器线程已停止") 
\ No newline at end of file
+        logger.info("调度器线程已停止")
@@ -3,15 +3,106 @@
 基础爬虫类 - 为所有电影来源网站提供通用接口
 """
 from abc import ABC, abstractmethod
-import pandas as pd
 import os
 import json
 from datetime import datetime
 
+from dytt8.utils import dataset, sinks, tracing
+from dytt8.utils.checkpoint import Checkpoint
+from dytt8.utils.retry import FailureBudget, RetryPolicy
+
+def output_path(format, output_dir=None, name="movies"):
+    """
+    按格式生成带时间戳的输出路径
+    
+    参数:
+        format (str): 保存格式
+        output_dir (str): 输出目录，默认为当前目录
+        name (str): 文件名前缀，后接时间戳
+    
+    返回:
+        str: 输出路径
+    """
+    output_dir = output_dir or os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = {"json": ".json", "excel": ".xlsx"}.get(format) or sinks.EXTENSIONS.get(format, ".csv")
+    return os.path.join(output_dir, f"{name}_{timestamp}{extension}")
+
+def dataset_dir(output_dir=None):
+    """parquet 格式的数据集根目录: 输出目录下的 dataset/"""
+    return os.path.join(output_dir or os.getcwd(), "dataset")
+
+def open_output(format, output_dir=None, name="movies", source=None, category=None):
+    """
+    为支持流式写入的格式打开输出
+    
+    参数:
+        format (str): 保存格式 (csv, ndjson, sqlite, parquet)
+        output_dir (str): 输出目录，默认为当前目录
+        name (str): 文件名前缀，后接时间戳
+        source (str): 数据源，parquet 格式按数据源/分类/日期分区
+        category (str): 分类
+    
+    返回:
+        Sink: 流式输出，json/excel 等需要一次写入的格式返回None
+    """
+    if format not in sinks.SINKS:
+        return None
+    if format == "parquet":
+        return dataset.open_partition(dataset_dir(output_dir), source, category, name)
+    return sinks.open_sink(format, output_path(format, output_dir, name))
+
+def save_movies(movies, format="csv", output_dir=None, name="movies", source=None, category=None):
+    """
+    把电影列表保存为文件
+    
+    参数:
+        movies (list): 电影信息字典列表
+        format (str): 保存格式 (csv, excel, json, ndjson, sqlite, parquet)
+        output_dir (str): 输出目录，默认为当前目录
+        name (str): 文件名前缀，后接时间戳
+        source (str): 数据源，parquet 格式写入 output_dir/dataset/ 下按数据源/分类/日期划分的分区
+        category (str): 分类
+    
+    返回:
+        str: 保存的文件路径(parquet 为分区目录)，没有结果时返回None
+    """
+    if not movies:
+        print("没有爬取结果可保存")
+        return None
+    
+    if format == "parquet":
+        filepath = dataset.write_movies(movies, dataset_dir(output_dir), source, category, name)
+        print(f"已保存 {len(movies)} 条结果到 {filepath}")
+        return filepath
+    
+    filepath = output_path(format, output_dir, name)
+    
+    if format in ("ndjson", "sqlite"):
+        with sinks.open_sink(format, filepath) as sink:
+            sink.write_many(movies)
+    elif format == "json":
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(movies, f, ensure_ascii=False, indent=2)
+    else:
+        # pandas 导入较慢，只在保存表格时加载
+        import pandas as pd
+        if format == "excel":
+            pd.DataFrame(movies).to_excel(filepath, index=False)
+        else:
+            pd.DataFrame(movies).to_csv(filepath, index=False, encoding='utf-8-sig')
+    
+    print(f"已保存 {len(movies)} 条结果到 {filepath}")
+    return filepath
+
 class BaseScraper(ABC):
     """电影爬虫基类"""
     
-    def __init__(self, pages=3, delay=2.0, category="最新电影"):
+    # 数据源名称，用于断点和数据集分区
+    source = None
+    
+    def __init__(self, pages=3, delay=2.0, category="最新电影", resume=False):
         """
         初始化爬虫
         
@@ -19,6 +110,85 @@ class BaseScraper(ABC):
             pages (int): 爬取页数
             delay (float): 爬取延迟(秒)
             category (str): 电影类别
+            resume (bool): 是否从上次中断的断点继续
         """
         self.pages = pages
-        self.delay 
\ No newline at end of file
+        self.delay = delay
+        self.category = category
+        self.resume = resume
+        self.checkpoint = None
+        # 抓取出错时的重试策略和本次运行的失败预算(每次 scrape 重新计数)
+        self.retry = RetryPolicy()
+        self.budget = FailureBudget()
+        self.results = []
+        # 流式输出: 每得到一部电影立即写入，不保留结果时内存占用与爬取规模无关
+        self.sink = None
+        self.keep_results = True
+    
+    @abstractmethod
+    def scrape(self):
+        """
+        执行爬取操作
+        
+        返回:
+            list: 电影信息字典列表
+        """
+        pass
+    
+    def stream_to(self, sink, keep_results=True):
+        """
+        把之后得到的每部电影立即写入 sink
+        
+        参数:
+            sink (Sink): 流式输出，见 dytt8.utils.sinks
+            keep_results (bool): 是否同时保留在 self.results 中；为False时
+                scrape() 返回空列表，断点中也只记录URL状态不保存结果
+        """
+        self.sink = sink
+        self.keep_results = keep_results
+    
+    def _open_checkpoint(self, source):
+        """
+        打开本次爬取的断点，同一数据源和分类共用一个断点文件
+        
+        参数:
+            source (str): 数据源名称
+        
+        返回:
+            Checkpoint: 断点，resume 为True时已载入上次的进度和结果
+        """
+        self.checkpoint = Checkpoint(f"{source}_{self.category}", resume=self.resume)
+        self.results = self.checkpoint.results if self.keep_results else []
+        if self.sink is not None:
+            # 断点中已有的结果也写入本次输出
+            self.sink.write_many(self.checkpoint.results)
+        return self.checkpoint
+    
+    def _store_result(self, movie):
+        """存储阶段: 保存或写出结果，并在断点中标记该URL已完成"""
+        if self.keep_results:
+            self.results.append(movie)
+        if self.sink is not None:
+            self.sink.write(movie)
+        if self.checkpoint is not None:
+            self.checkpoint.mark(movie.get("source_url"), "done", movie if self.keep_results else None)
+            self.checkpoint.save()
+    
+    def get_results(self):
+        """获取爬取结果"""
+        return self.results
+    
+    @tracing.traced("export")
+    def save_results(self, format="csv", output_dir=None):
+        """
+        保存爬取结果
+        
+        参数:
+            format (str): 保存格式 (csv, excel, json, ndjson, sqlite, parquet)
+            output_dir (str): 输出目录，默认为当前目录
+        
+        返回:
+            str: 保存的文件路径，没有结果时返回None
+        """
+        return save_movies(self.results, format, output_dir, f"{self.__class__.__name__.lower()}_movies",
+                           source=self.source, category=self.category)
\ No newline at end of file
@@ -0,0 +1,654 @@
+#!/usr/bin/env python
+"""
+分布式抓取协调器
+URL 待抓队列(frontier)、去重、按主机限速和租约都保存在一个 SQLite 文件中，
+工作进程领取 URL、抓取解析后把结果和新发现的链接交回
+
+- 去重: URL 是主键，重复添加被忽略
+- 按主机限速: 每个主机记录下次允许请求的时间，一次领取同一主机最多分配一个 URL
+- 租约: 领取的 URL 在租约到期前不会再分配；工作进程崩溃后租约过期，URL 自动回到队列，
+  超过最大尝试次数的 URL 标记为失败
+- 多机: `serve` 把 frontier 通过 HTTP 提供给其他主机，工作进程用 RemoteFrontier 访问，
+  接口与本地 Frontier 相同
+
+吞吐量随工作进程数线性增长，上限是各主机限速间隔决定的请求速率
+
+用法:
+    python -m dytt8.scrapers.coordinator seed --db crawl.db --source dytt8 --category 最新电影 --pages 50
+    python -m dytt8.scrapers.coordinator serve --db crawl.db --port 8765
+    python -m dytt8.scrapers.coordinator work --coordinator http://10.0.0.5:8765 --processes 4
+    python -m dytt8.scrapers.coordinator stats --db crawl.db
+    python -m dytt8.scrapers.coordinator export --db crawl.db --format csv
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import contextlib
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlencode, parse_qs
+
+from dytt8.utils import metrics, retry as retry_module
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "crawl_frontier.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    source TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    meta TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_urls_status ON urls (status, priority DESC, available_at);
+CREATE INDEX IF NOT EXISTS idx_urls_lease ON urls (status, lease_expires);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    delay REAL NOT NULL,
+    next_allowed REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    url TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    data TEXT NOT NULL,
+    worker TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class Frontier:
+    """基于 SQLite 的待抓队列，可被同一台机器上的多个进程同时使用"""
+
+    def __init__(self, path=DEFAULT_DB, host_delay=1.0, max_attempts=3):
+        """
+        初始化队列
+
+        参数:
+            path (str): SQLite 文件路径
+            host_delay (float): 同一主机两次请求之间的默认间隔(秒)
+            max_attempts (int): 每个 URL 的最大尝试次数(含租约过期)
+        """
+        self.path = path
+        self.host_delay = host_delay
+        self.max_attempts = max_attempts
+        self.retry_policy = retry_module.RetryPolicy(max_attempts, base=2.0, cap=300.0)
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db().executescript(SCHEMA)
+
+    def _db(self):
+        """每个线程一个连接，WAL 模式允许读写并发"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """写事务，BEGIN IMMEDIATE 保证领取 URL 时不会被其他进程同时分配"""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def add(self, items, priority=0):
+        """
+        加入待抓URL，已存在的URL被忽略
+
+        参数:
+            items (list): 每项为 dict(url, source, kind, meta) 或 (url, source, kind, meta) 元组
+            priority (int): 优先级，越大越先分配
+
+        返回:
+            int: 新加入的URL数
+        """
+        rows = []
+        for item in items:
+            if isinstance(item, dict):
+                url, source, kind, meta = item["url"], item["source"], item["kind"], item.get("meta")
+            else:
+                url, source, kind, meta = (tuple(item) + (None,))[:4]
+            rows.append((url, urlsplit(url).hostname or "", source, kind,
+                         json.dumps(meta, ensure_ascii=False) if meta is not None else None, priority))
+        if not rows:
+            return 0
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO urls (url, host, source, kind, meta, priority) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return db.total_changes - before
+
+    def set_host_delay(self, host, delay):
+        """设置某个主机的请求间隔(秒)"""
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO hosts (host, delay) VALUES (?, ?) ON CONFLICT(host) DO UPDATE SET delay = excluded.delay",
+                (host, delay)
+            )
+
+    def _reclaim(self, db, now):
+        """租约过期的URL回到队列，超过尝试次数的标记为失败"""
+        db.execute(
+            "UPDATE urls SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, error = COALESCE(error, '租约过期') "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now)
+        )
+
+    def lease(self, worker, count=1, lease_seconds=60):
+        """
+        领取待抓URL，同一主机在一次领取中最多分配一个，且需已过限速间隔
+
+        参数:
+            worker (str): 工作进程ID
+            count (int): 最多领取数
+            lease_seconds (float): 租约时长，到期未完成的URL会重新分配
+
+        返回:
+            dict: tasks (url, source, kind, meta, attempts 列表)、
+                  retry_after (没有可分配URL时建议等待的秒数)、done (队列已全部完成)
+        """
+        now = time.time()
+        tasks = []
+        with self._transaction() as db:
+            self._reclaim(db, now)
+            candidates = db.execute(
+                "SELECT u.url, u.host, u.source, u.kind, u.meta, u.attempts FROM urls u "
+                "LEFT JOIN hosts h ON h.host = u.host "
+                "WHERE u.status = 'pending' AND u.available_at <= ? AND COALESCE(h.next_allowed, 0) <= ? "
+                "ORDER BY u.priority DESC, u.rowid LIMIT ?",
+                (now, now, count * 32)
+            ).fetchall()
+            hosts = set()
+            for row in candidates:
+                if row["host"] in hosts:
+                    continue
+                hosts.add(row["host"])
+                db.execute(
+                    "UPDATE urls SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE url = ?",
+                    (worker, now + lease_seconds, row["url"])
+                )
+                db.execute(
+                    "INSERT INTO hosts (host, delay, next_allowed) VALUES (?, ?, ?) "
+                    "ON CONFLICT(host) DO UPDATE SET next_allowed = ? + hosts.delay",
+                    (row["host"], self.host_delay, now + self.host_delay, now)
+                )
+                tasks.append({
+                    "url": row["url"],
+                    "source": row["source"],
+                    "kind": row["kind"],
+                    "meta": json.loads(row["meta"]) if row["meta"] else {},
+                    "attempts": row["attempts"] + 1,
+                })
+                if len(tasks) >= count:
+                    break
+
+            retry_after = None
+            done = False
+            if not tasks:
+                retry_after, done = self._idle_hint(db, now)
+        return {"tasks": tasks, "retry_after": retry_after, "done": done}
+
+    def _idle_hint(self, db, now):
+        """没有可分配URL时，距离下一个URL可分配的秒数"""
+        active = db.execute(
+            "SELECT COUNT(*) FROM urls WHERE status IN ('pending', 'leased')"
+        ).fetchone()[0]
+        if not active:
+            return None, True
+        candidates = [
+            db.execute("SELECT MIN(available_at) FROM urls WHERE status = 'pending'").fetchone()[0],
+            db.execute(
+                "SELECT MIN(h.next_allowed) FROM hosts h JOIN urls u ON u.host = h.host WHERE u.status = 'pending'"
+            ).fetchone()[0],
+            db.execute("SELECT MIN(lease_expires) FROM urls WHERE status = 'leased'").fetchone()[0],
+        ]
+        upcoming = [value for value in candidates if value is not None and value > now]
+        soonest = min(upcoming) if upcoming else now + 1
+        return min(max(soonest - now, 0.05), 5.0), False
+
+    def renew(self, url, worker, lease_seconds=60):
+        """延长租约，租约已不属于该工作进程时返回False"""
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE urls SET lease_expires = ? WHERE url = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, url, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, url, worker, result=None, links=None):
+        """
+        交回抓取结果
+
+        参数:
+            url (str): 领取的URL
+            worker (str): 工作进程ID
+            result (dict): 解析出的电影信息，可为None
+            links (list): 新发现的URL，格式同 add()
+
+        返回:
+            bool: 是否接受；租约已过期并被重新分配时返回False，结果被丢弃
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT source FROM urls WHERE url = ? AND status = 'leased' AND lease_owner = ?",
+                (url, worker)
+            ).fetchone()
+            if row is None:
+                return False
+            db.execute(
+                "UPDATE urls SET status = 'done', lease_owner = NULL, lease_expires = NULL, error = NULL WHERE url = ?",
+                (url,)
+            )
+            if result is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO results (url, source, data, worker, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, row["source"], json.dumps(result, ensure_ascii=False), worker, time.time())
+                )
+        if links:
+            self.add(links)
+        return True
+
+    def fail(self, url, worker, error, retry=True):
+        """
+        报告抓取失败，未超过尝试次数时按带抖动的指数退避重新排队(排在其他URL之后)
+
+        返回:
+            bool: 是否接受(租约仍属于该工作进程)
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts FROM urls WHERE url = ? AND status = 'leased' AND lease_owner = ?",
+                (url, worker)
+            ).fetchone()
+            if row is None:
+                return False
+            if retry and row["attempts"] < self.max_attempts:
+                db.execute(
+                    "UPDATE urls SET status = 'pending', lease_owner = NULL, lease_expires = NULL, "
+                    "available_at = ?, error = ? WHERE url = ?",
+                    (now + self.retry_policy.backoff(row["attempts"]), str(error)[:500], url)
+                )
+            else:
+                db.execute(
+                    "UPDATE urls SET status = 'failed', lease_owner = NULL, lease_expires = NULL, error = ? WHERE url = ?",
+                    (str(error)[:500], url)
+                )
+        return True
+
+    def stats(self):
+        """
+        队列状态
+
+        返回:
+            dict: 各状态的URL数、结果数、各主机的待抓数
+        """
+        db = self._db()
+        statuses = {row[0]: row[1] for row in db.execute("SELECT status, COUNT(*) FROM urls GROUP BY status")}
+        hosts = {row[0]: row[1] for row in db.execute(
+            "SELECT host, COUNT(*) FROM urls WHERE status = 'pending' GROUP BY host")}
+        results = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"urls": statuses, "pending_by_host": hosts, "results": results}
+
+    def results(self, source=None):
+        """所有已抓取的电影信息"""
+        query = "SELECT data FROM results"
+        args = ()
+        if source:
+            query += " WHERE source = ?"
+            args = (source,)
+        return [json.loads(row[0]) for row in self._db().execute(query + " ORDER BY fetched_at", args)]
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class RemoteFrontier:
+    """通过 HTTP 访问其他主机上的协调器，接口与 Frontier 相同"""
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def _call(self, method, **kwargs):
+        response = self._session.post(f"{self.base_url}/{method}", json=kwargs, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["result"]
+
+    def add(self, items, priority=0):
+        return self._call("add", items=items, priority=priority)
+
+    def lease(self, worker, count=1, lease_seconds=60):
+        return self._call("lease", worker=worker, count=count, lease_seconds=lease_seconds)
+
+    def renew(self, url, worker, lease_seconds=60):
+        return self._call("renew", url=url, worker=worker, lease_seconds=lease_seconds)
+
+    def complete(self, url, worker, result=None, links=None):
+        return self._call("complete", url=url, worker=worker, result=result, links=links)
+
+    def fail(self, url, worker, error, retry=True):
+        return self._call("fail", url=url, worker=worker, error=error, retry=retry)
+
+    def stats(self):
+        return self._call("stats")
+
+    def close(self):
+        self._session.close()
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    """把 POST /<方法> 的 JSON 参数转发给 Frontier"""
+
+    frontier = None
+    METHODS = ("add", "lease", "renew", "complete", "fail", "stats")
+
+    def do_POST(self):
+        method = self.path.strip("/")
+        if method not in self.METHODS:
+            self._reply(404, {"error": f"未知方法: {method}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            kwargs = json.loads(self.rfile.read(length) or b"{}")
+            self._reply(200, {"result": getattr(self.frontier, method)(**kwargs)})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        if self.path.strip("/") == "stats":
+            self._reply(200, {"result": self.frontier.stats()})
+        else:
+            self._reply(404, {"error": "未知路径"})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CoordinatorServer:
+    """把 Frontier 提供给其他主机的 HTTP 服务器"""
+
+    def __init__(self, frontier, host="0.0.0.0", port=8765):
+        handler = type("CoordinatorHandler", (_CoordinatorHandler,), {"frontier": frontier})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+# ---------------------------------------------------------------------------
+# 数据源: 生成种子URL，并把领取的URL抓取解析为 (结果, 新链接)
+# ---------------------------------------------------------------------------
+
+DOUBAN_LIST_API = "https://movie.douban.com/j/search_subjects"
+DOUBAN_PAGE_SIZE = 20
+
+
+def seed_urls(source, category=None, pages=3):
+    """
+    生成分类列表首页作为种子
+
+    参数:
+        source (str): dytt8 或 douban
+        category (str): 分类
+        pages (int): 最多跟随的列表页数
+
+    返回:
+        list: 可直接传给 Frontier.add 的条目
+    """
+    if source == "dytt8":
+        from dytt8.scrapers.dytt8_scraper import CATEGORY_PATHS
+        path = CATEGORY_PATHS.get(category or "最新电影", CATEGORY_PATHS["最新电影"])
+        return [{"url": "https://www.dytt8.net" + path, "source": source, "kind": "list",
+                 "meta": {"page": 1, "pages": pages}}]
+    if source == "douban":
+        # 豆瓣分类页由脚本加载，直接使用其数据接口分页
+        tag = category or "热门"
+        return [{"url": f"{DOUBAN_LIST_API}?{urlencode({'type': 'movie', 'tag': tag, 'page_limit': DOUBAN_PAGE_SIZE, 'page_start': page * DOUBAN_PAGE_SIZE})}",
+                 "source": source, "kind": "list", "meta": {"page": page + 1, "pages": pages}}
+                for page in range(pages)]
+    raise ValueError(f"不支持的数据源: {source}")
+
+
+def process_task(task, session):
+    """
+    抓取并解析一个领取的URL
+
+    参数:
+        task (dict): lease() 返回的条目
+        session (requests.Session): HTTP 会话
+
+    返回:
+        tuple: (电影信息或None, 新发现的URL列表)
+    """
+    from dytt8.utils.encoding import decode_response
+
+    url, source, kind, meta = task["url"], task["source"], task["kind"], task.get("meta") or {}
+    try:
+        response = session.get(url, timeout=15)
+    except Exception:
+        metrics.PAGES.inc(source, "failed")
+        raise
+    if response.status_code != 200:
+        metrics.PAGES.inc(source, "failed")
+        raise retry_module.FetchError(f"状态码 {response.status_code}",
+                                      retry_module.classify_status(response.status_code), response.status_code)
+    metrics.PAGES.inc(source, "fetched")
+
+    if source == "dytt8":
+        from dytt8.scrapers.dytt8_scraper import parse_list_page, parse_detail_page
+        html = decode_response(response)
+        if kind == "detail":
+            return parse_detail_page(html, url), []
+        detail_urls, next_url = parse_list_page(html, url)
+        links = [{"url": href, "source": source, "kind": "detail"} for href in detail_urls]
+        if next_url and meta.get("page", 1) < meta.get("pages", 1):
+            links.append({"url": next_url, "source": source, "kind": "list",
+                          "meta": {"page": meta.get("page", 1) + 1, "pages": meta["pages"]}})
+        return None, links
+
+    if source == "douban":
+        from dytt8.scrapers.douban_scraper import parse_detail_page
+        if kind == "detail":
+            return parse_detail_page(response.text, url), []
+        subjects = response.json().get("subjects", [])
+        return None, [{"url": subject["url"], "source": source, "kind": "detail"}
+                      for subject in subjects if subject.get("url")]
+
+    raise ValueError(f"不支持的数据源: {source}")
+
+
+def run_worker(frontier, worker_id=None, batch=1, lease_seconds=60, stop_event=None, process=process_task,
+               budget=None):
+    """
+    工作进程主循环: 领取 → 抓取解析 → 交回，队列全部完成时退出
+
+    参数:
+        frontier: Frontier 或 RemoteFrontier
+        worker_id (str): 工作进程ID，默认为 主机名-进程号-随机串
+        batch (int): 每次领取的URL数
+        lease_seconds (float): 租约时长
+        stop_event (threading.Event): 设置后在当前批次结束时退出
+        process (callable): 抓取解析函数 process(task, session) -> (结果, 新链接)
+        budget (FailureBudget): 失败预算，超出后工作进程退出(未处理的租约到期后由其他工作进程领取)
+
+    返回:
+        dict: completed, failed, rejected (租约已失效而被丢弃的结果数)
+    """
+    import requests
+    from dytt8.scrapers.dytt8_scraper import HEADERS
+    from dytt8.utils.page_archive import instrument_session
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    instrument_session(session)
+    counts = {"completed": 0, "failed": 0, "rejected": 0}
+    budget = budget or retry_module.FailureBudget(minimum=50)
+
+    while (stop_event is None or not stop_event.is_set()) and not budget.exhausted:
+        leased = frontier.lease(worker_id, count=batch, lease_seconds=lease_seconds)
+        if not leased["tasks"]:
+            if leased["done"]:
+                break
+            time.sleep(leased["retry_after"] or 1.0)
+            continue
+        for task in leased["tasks"]:
+            try:
+                result, links = process(task, session)
+            except Exception as e:
+                counts["failed"] += 1
+                kind = retry_module.classify(e)
+                budget.record(kind)
+                # 不可重试的错误(如404、解析失败)直接标记为失败
+                frontier.fail(task["url"], worker_id, f"{kind}: {type(e).__name__}: {e}",
+                              retry=kind in retry_module.RETRYABLE)
+                if budget.exhausted:
+                    break
+                continue
+            if frontier.complete(task["url"], worker_id, result, links):
+                counts["completed"] += 1
+            else:
+                counts["rejected"] += 1
+
+    session.close()
+    print(f"工作进程 {worker_id} 退出: {counts}")
+    return counts
+
+
+def _worker_process(coordinator, db, batch, lease_seconds):
+    frontier = RemoteFrontier(coordinator) if coordinator else Frontier(db)
+    run_worker(frontier, batch=batch, lease_seconds=lease_seconds)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="分布式抓取协调器")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = subparsers.add_parser("seed", help="加入种子URL")
+    seed_parser.add_argument("--db", default=DEFAULT_DB, help="SQLite 文件")
+    seed_parser.add_argument("--source", choices=["dytt8", "douban"], default="dytt8", help="数据源")
+    seed_parser.add_argument("--category", help="分类")
+    seed_parser.add_argument("--pages", type=int, default=3, help="列表页数")
+    seed_parser.add_argument("--delay", type=float, help="该数据源主机的请求间隔(秒)")
+
+    serve_parser = subparsers.add_parser("serve", help="通过HTTP向其他主机提供队列")
+    serve_parser.add_argument("--db", default=DEFAULT_DB, help="SQLite 文件")
+    serve_parser.add_argument("--host", default="0.0.0.0", help="监听地址")
+    serve_parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    serve_parser.add_argument("--host-delay", type=float, default=1.0, help="默认的主机请求间隔(秒)")
+
+    work_parser = subparsers.add_parser("work", help="启动工作进程")
+    work_parser.add_argument("--db", default=DEFAULT_DB, help="本机 SQLite 文件(不使用 --coordinator 时)")
+    work_parser.add_argument("--coordinator", help="协调器地址，如 http://10.0.0.5:8765")
+    work_parser.add_argument("--processes", type=int, default=1, help="工作进程数")
+    work_parser.add_argument("--batch", type=int, default=1, help="每次领取的URL数")
+    work_parser.add_argument("--lease", type=float, default=60, help="租约时长(秒)")
+
+    stats_parser = subparsers.add_parser("stats", help="查看队列状态")
+    stats_parser.add_argument("--db", default=DEFAULT_DB, help="SQLite 文件")
+
+    export_parser = subparsers.add_parser("export", help="导出抓取结果")
+    export_parser.add_argument("--db", default=DEFAULT_DB, help="SQLite 文件")
+    export_parser.add_argument("--source", help="只导出该数据源")
+    export_parser.add_argument("--format", default="csv", choices=["csv", "json", "excel", "ndjson", "sqlite", "parquet"],
+                               help="保存格式")
+    export_parser.add_argument("--output", help="输出目录")
+
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        frontier = Frontier(args.db)
+        items = seed_urls(args.source, args.category, args.pages)
+        if args.delay is not None:
+            for host in {urlsplit(item["url"]).hostname for item in items}:
+                frontier.set_host_delay(host, args.delay)
+        print(f"已加入 {frontier.add(items, priority=1)} 个种子URL")
+    elif args.command == "serve":
+        frontier = Frontier(args.db, host_delay=args.host_delay)
+        server = CoordinatorServer(frontier, args.host, args.port).start()
+        print(f"协调器已启动: {server.url}，按 Ctrl+C 退出")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+    elif args.command == "work":
+        processes = [
+            multiprocessing.Process(target=_worker_process, args=(args.coordinator, args.db, args.batch, args.lease))
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    elif args.command == "stats":
+        print(json.dumps(Frontier(args.db).stats(), ensure_ascii=False, indent=2))
+    elif args.command == "export":
+        from dytt8.scrapers.base_scraper import save_movies
+        save_movies(Frontier(args.db).results(args.source), args.format, args.output, "crawl_movies",
+                    source=args.source)
+
+
+if __name__ == "__main__":
+    main()
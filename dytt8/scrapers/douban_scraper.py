@@ -3,24 +3,112 @@
 豆瓣电影爬虫实现
 """
 import os
-import time
 import re
-import random
 import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 from .base_scraper import BaseScraper
+from .parser_backends import get_backend, DOUBAN_DETAIL_RULES
+from .pipeline import CrawlPipeline
+from dytt8.utils import metrics, rate_control, retry, tracing
+from dytt8.utils.page_archive import active_mode
+
+# 豆瓣拦截异常请求时返回的页面文字
+BLOCKED_MARKER = "检测到有异常请求"
+# 被拦截后降低速率重试的次数，仍被拦截时停止抓取
+BLOCKED_RETRIES = 3
+
+def parse_detail_page(page_source, url, backend=None):
+    """
+    解析豆瓣电影详情页（模块级函数，可在解析进程池中执行）
+    
+    参数:
+        page_source (str): 详情页HTML
+        url (str): 详情页URL
+        backend (str): 解析后端 (bs4, lxml, selectolax)，默认使用可用的最快后端
+    
+    返回:
+        dict: 电影信息，被反爬拦截时返回None
+    """
+    # 检查是否被反爬
+    if BLOCKED_MARKER in page_source:
+        print("被豆瓣反爬系统拦截，请稍后再试或减慢爬取速度")
+        return None
+    
+    parser = get_backend(backend)
+    fields = parser.extract(parser.parse(page_source), DOUBAN_DETAIL_RULES)
+    
+    def first(name, default=""):
+        value = fields[name]
+        return value.strip() if value is not None else default
+    
+    # 获取标题和年份
+    title = first("title", "未知标题")
+    year = first("year").strip("()")
+    
+    # 获取导演
+    directors = [text.strip() for text in fields["directors"]]
+    director = ", ".join(directors) if directors else "未知"
+    
+    # 获取主演
+    actors = [text.strip() for text in fields["actors"]]
+    actors = ", ".join(actors[:3]) if actors else "未知"  # 只取前3位主演
+    
+    # 获取类别
+    genres = [text.strip() for text in fields["genres"]]
+    category = ", ".join(genres) if genres else ""
+    
+    # 获取国家/地区
+    info_text = fields["info"] or ""
+    country_match = re.search(r'制片国家/地区:\s*([^\n]+)', info_text)
+    country = country_match.group(1).strip() if country_match else ""
+    
+    # 获取语言
+    language_match = re.search(r'语言:\s*([^\n]+)', info_text)
+    language = language_match.group(1).strip() if language_match else ""
+    
+    # 获取上映日期
+    release_dates = [text.strip() for text in fields["release_dates"]]
+    release_date = ", ".join(release_dates) if release_dates else ""
+    
+    # 获取评分
+    rating = first("rating")
+    score = f"{rating}/10" if rating else ""
+    
+    # 获取片长和简介
+    duration = first("duration")
+    summary = first("summary")
+    
+    # 下载链接通常豆瓣不提供，置为空
+    download_link = ""
+    
+    return {
+        "title": title,
+        "year": year,
+        "director": director,
+        "actors": actors,
+        "category": category,
+        "country": country,
+        "language": language,
+        "release_date": release_date,
+        "score": score,
+        "duration": duration,
+        "summary": summary,
+        "download_link": download_link,
+        "size": "",  # 豆瓣不提供大小信息
+        "format": "",  # 豆瓣不提供格式信息
+        "source_url": url,
+        "source": "豆瓣电影"
+    }
+
 
 class DoubanScraper(BaseScraper):
     """豆瓣电影网站爬虫"""
     
-    def __init__(self, pages=3, delay=2.0, category="热门", headless=True):
+    source = "douban"
+    
+    def __init__(self, pages=3, delay=2.0, category="热门", headless=True, driver=None, resume=False):
         """
         初始化豆瓣电影爬虫
         
@@ -29,30 +117,31 @@ class DoubanScraper(BaseScraper):
             delay (float): 爬取延迟(秒)
             category (str): 电影类别 (热门, 最新, 经典, 华语, 欧美, 韩国)
             headless (bool): 是否使用无头模式
+            driver: 复用已有的 WebDriver（由提供方负责关闭），为None时每次爬取新建
+            resume (bool): 是否从上次中断的断点继续
         """
-        super().__init__(pages, delay, category)
+        super().__init__(pages, delay, category, resume)
         self.base_url = "https://movie.douban.com"
         self.headless = headless
         self.driver = None
+        self._shared_driver = driver
+        self.stage_stats = None
+        # 被豆瓣反爬拦截后不再请求，剩余URL留在断点中
+        self.blocked = False
+        # 回放时页面来自归档，按 cached 计数，也无需限速
+        replay = active_mode()[0] == "replay"
+        self._page_result = "cached" if replay else "fetched"
+        # delay 作为没有保存状态时的初始请求间隔，被拦截时自动放慢，正常时逐步加快
+        self.rate = None if replay else rate_control.get_controller()
     
     def _setup_driver(self):
-        """设置WebDriver"""
+        """设置WebDriver，驱动的解析结果由 driver_cache 缓存"""
+        from dytt8.utils.utils import setup_chrome_driver
         print("初始化Chrome浏览器...")
-        chrome_options = Options()
-        if self.headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        
-        # 设置UA
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-        
         try:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            return driver
+            # 设置UA
+            return setup_chrome_driver(headless=self.headless, arguments=[
+                "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"])
         except Exception as e:
             print(f"WebDriver初始化失败: {e}")
             print("请尝试使用 fix_webdriver.py 修复")
@@ -83,141 +172,135 @@ class DoubanScraper(BaseScraper):
             print(f"未知类别: {self.category}，使用默认类别: 热门")
             return self.base_url + category_map["热门"]
     
-    def _extract_movie_info(self, url):
-        """从电影详情页提取信息"""
+    @tracing.traced("fetch")
+    def _fetch_page(self, url):
+        """
+        使用Selenium获取详情页HTML（豆瓣反爬较为严格）
+        
+        参数:
+            url (str): 详情页URL
+        
+        返回:
+            str: 页面HTML
+        """
+        if self.rate is None:
+            return self._load_page(url)
+        # 浏览器只能串行访问，限速器只调整请求间隔
+        with self.rate.slot(url, self.delay, max_concurrency=1) as request:
+            page_source = self._load_page(url)
+            request.blocked = BLOCKED_MARKER in page_source
+        return page_source
+    
+    def _load_page(self, url):
+        """打开页面并等待内容加载"""
         try:
-            # 使用requests获取页面
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            
-            # 豆瓣反爬较为严格，使用Selenium访问
             self.driver.get(url)
-            
-            # 等待页面加载
-            try:
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "content"))
-                )
-            except Exception as e:
-                print(f"页面加载等待超时: {e}")
-            
-            # 获取页面内容
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'lxml')
-            
-            # 检查是否被反爬
-            if "检测到有异常请求" in page_source:
-                print("被豆瓣反爬系统拦截，请稍后再试或减慢爬取速度")
-                return None
-            
-            # 获取标题
-            title_elem = soup.select_one("h1 span[property='v:itemreviewed']")
-            title = title_elem.text.strip() if title_elem else "未知标题"
-            
-            # 获取年份
-            year_elem = soup.select_one("h1 .year")
-            year = year_elem.text.strip("()") if year_elem else ""
-            
-            # 获取导演
-            directors = []
-            director_elems = soup.select("a[rel='v:directedBy']")
-            for elem in director_elems:
-                directors.append(elem.text.strip())
-            director = ", ".join(directors) if directors else "未知"
-            
-            # 获取主演
-            actors = []
-            actor_elems = soup.select("#info .actor .attrs a")
-            for elem in actor_elems:
-                actors.append(elem.text.strip())
-            actors = ", ".join(actors[:3]) if actors else "未知"  # 只取前3位主演
-            
-            # 获取类别
-            genres = []
-            genre_elems = soup.select("span[property='v:genre']")
-            for elem in genre_elems:
-                genres.append(elem.text.strip())
-            category = ", ".join(genres) if genres else ""
-            
-            # 获取国家/地区
-            info_text = soup.select_one("#info").text if soup.select_one("#info") else ""
-            country_match = re.search(r'制片国家/地区:\s*([^\n]+)', info_text)
-            country = country_match.group(1).strip() if country_match else ""
-            
-            # 获取语言
-            language_match = re.search(r'语言:\s*([^\n]+)', info_text)
-            language = language_match.group(1).strip() if language_match else ""
-            
-            # 获取上映日期
-            release_dates = []
-            release_date_elems = soup.select("span[property='v:initialReleaseDate']")
-            for elem in release_date_elems:
-                release_dates.append(elem.text.strip())
-            release_date = ", ".join(release_dates) if release_dates else ""
-            
-            # 获取评分
-            rating_elem = soup.select_one("strong[property='v:average']")
-            rating = rating_elem.text.strip() if rating_elem else ""
-            score = f"{rating}/10" if rating else ""
-            
-            # 获取片长
-            duration_elem = soup.select_one("span[property='v:runtime']")
-            duration = duration_elem.text.strip() if duration_elem else ""
-            
-            # 获取简介
-            summary_elem = soup.select_one("span[property='v:summary']")
-            summary = summary_elem.text.strip() if summary_elem else ""
-            
-            # 下载链接通常豆瓣不提供，置为空
-            download_link = ""
-            
-            return {
-                "title": title,
-                "year": year,
-                "director": director,
-                "actors": actors,
-                "category": category,
-                "country": country,
-                "language": language,
-                "release_date": release_date,
-                "score": score,
-                "duration": duration,
-                "summary": summary,
-                "download_link": download_link,
-                "size": "",  # 豆瓣不提供大小信息
-                "format": "",  # 豆瓣不提供格式信息
-                "source_url": url,
-                "source": "豆瓣电影"
-            }
-            
+        except Exception:
+            metrics.PAGES.inc("douban", "failed")
+            raise
+        metrics.PAGES.inc("douban", self._page_result)
+        
+        # 等待页面加载
+        try:
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.ID, "content"))
+            )
         except Exception as e:
-            print(f"处理页面出错: {url}, 错误: {e}")
+            print(f"页面加载等待超时: {e}")
+        
+        return self.driver.page_source
+    
+    def _fetch_detail_page(self, url):
+        """抓取阶段: 获取详情页，被拦截时由限速器放慢后重试"""
+        if self.blocked:
             return None
+        for attempt in range(BLOCKED_RETRIES + 1):
+            try:
+                page_source = self._fetch_page(url)
+            except Exception:
+                self.checkpoint.mark(url, "failed")
+                raise
+            if BLOCKED_MARKER not in page_source:
+                return page_source
+            if attempt < BLOCKED_RETRIES and self.rate is not None:
+                print(f"检测到豆瓣反爬拦截，降低请求速率后重试 ({attempt + 1}/{BLOCKED_RETRIES})")
+                continue
+            break
+        print("豆瓣持续拦截，停止抓取，以 resume=True 稍后继续")
+        self.blocked = True
+        self.checkpoint.mark(url, "failed")
+        return None
     
+    @tracing.traced("scrape")
     def scrape(self):
         """执行爬取操作"""
         print(f"开始爬取豆瓣电影 - {self.category}...")
-        self.results = []
+        checkpoint = self._open_checkpoint(self.source)
+        self.blocked = False
+        self.budget = retry.FailureBudget()
         
         # 初始化WebDriver
-        self.driver = self._setup_driver()
+        self.driver = self._shared_driver or self._setup_driver()
         if not self.driver:
             print("WebDriver初始化失败，无法继续爬取")
             return self.results
         
         try:
-            # 获取分类URL
-            category_url = self._get_category_url()
-            print(f"分类URL: {category_url}")
+            # 详情页URL已在上次收集完毕时，直接继续抓取详情页
+            if checkpoint.stage == "list":
+                self._collect_movie_links()
+                checkpoint.set_position(stage="detail")
             
-            # 爬取指定页数
-            current_page_url = category_url
+            # 访问每个电影详情页: 浏览器抓取页面的同时，上一页在进程池中解析
+            # WebDriver不支持并发访问，抓取阶段只使用一个线程
+            def store(movie_info):
+                self._store_result(movie_info)
+                print(f"已爬取: {movie_info['title']}")
             
-            # 注意：豆瓣电影的分页机制不同，通常需要点击"加载更多"按钮
-            # 这里简化处理，只获取第一页内容
+            pending = checkpoint.pending()
+            self.budget.extend(len(pending))
+            pipeline = CrawlPipeline(
+                fetch=self._fetch_detail_page,
+                parse=parse_detail_page,
+                store=store,
+                fetch_workers=1,
+                retry=self.retry,
+                budget=self.budget
+            )
+            self.stage_stats = pipeline.run(pending)
             
-            self.driver.get(current_page_url)
+            print(f"爬取完成，共获取 {len(self.results)} 部电影信息")
+            return self.results
+            
+        except Exception as e:
+            print(f"爬取过程中发生错误: {e}")
+            return self.results
+            
+        finally:
+            # 全部完成时删除断点，否则保存进度供 resume 使用
+            checkpoint.finish()
+            if self.rate is not None:
+                self.rate.save()
+            # 关闭WebDriver（共享的驱动由提供方关闭）
+            if self.driver and self.driver is not self._shared_driver:
+                self.driver.quit()
+                print("已关闭WebDriver")
+    
+    @tracing.traced("list_pages")
+    def _collect_movie_links(self):
+        """
+        点击"加载更多"模拟翻页，收集电影详情页链接并逐页记入断点
+        
+        "加载更多"只能从第一页开始点击，继续时会重新加载列表，已登记的链接和状态保持不变
+        """
+        checkpoint = self.checkpoint
+        
+        # 获取分类URL
+        category_url = self._get_category_url()
+        print(f"分类URL: {category_url}")
+        
+        with tracing.span("navigate"):
+            self.driver.get(category_url)
             
             # 等待页面加载
             try:
@@ -226,70 +309,41 @@ class DoubanScraper(BaseScraper):
                 )
             except Exception as e:
                 print(f"页面加载等待超时: {e}")
+        
+        for page in range(1, self.pages + 1):
+            print(f"正在爬取第 {page}/{self.pages} 页...")
             
-            # 点击"加载更多"按钮模拟翻页，爬取多页内容
-            for page in range(1, self.pages + 1):
-                print(f"正在爬取第 {page}/{self.pages} 页...")
-                
-                # 获取电影链接
-                movie_links = []
+            # 获取电影链接
+            with tracing.span("list_page"):
                 try:
                     # 找到所有电影卡片
                     link_elements = self.driver.find_elements(By.XPATH, '//div[contains(@class, "cover-wp")]//a')
-                    for link in link_elements:
-                        href = link.get_attribute("href")
-                        if href and "/subject/" in href:
-                            movie_links.append(href)
+                    hrefs = [link.get_attribute("href") for link in link_elements]
+                    checkpoint.add_urls(href for href in hrefs if href and "/subject/" in href)
                 except Exception as e:
                     print(f"获取电影链接失败: {e}")
-                
-                print(f"找到 {len(movie_links)} 个电影链接")
-                
-                # 访问每个电影详情页
-                for i, link in enumerate(movie_links):
-                    print(f"正在处理第 {i+1}/{len(movie_links)} 个电影: {link}")
-                    
-                    # 提取电影信息
-                    movie_info = self._extract_movie_info(link)
-                    
-                    if movie_info:
-                        self.results.append(movie_info)
-                        print(f"已爬取: {movie_info['title']}")
-                    
-                    # 添加随机延迟
-                    delay_time = self.delay * (1 + random.random())  # 豆瓣反爬严格，增加延迟
-                    print(f"等待 {delay_time:.2f} 秒...")
-                    time.sleep(delay_time)
-                
-                # 如果有下一页，点击"加载更多"按钮
-                if page < self.pages:
-                    try:
-                        # 滚动到页面底部
-                        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                        time.sleep(1)  # 等待页面响应
-                        
-                        # 查找并点击"加载更多"按钮
-                        more_btn = self.driver.find_element(By.CLASS_NAME, "more")
-                        if more_btn.is_displayed():
-                            more_btn.click()
-                            print("点击加载更多...")
-                            time.sleep(2)  # 等待内容加载
-                        else:
-                            print("没有更多内容可加载")
-                            break
-                    except Exception as e:
-                        print(f"加载更多内容失败: {e}")
-                        break
-            
-            print(f"爬取完成，共获取 {len(self.results)} 部电影信息")
-            return self.results
             
-        except Exception as e:
-            print(f"爬取过程中发生错误: {e}")
-            return self.results
+            print(f"已找到 {len(checkpoint.urls())} 个电影链接")
+            checkpoint.set_position(page=max(page, checkpoint.page))
             
-        finally:
-            # 关闭WebDriver
-            if self.driver:
-                self.driver.quit()
-                print("已关闭WebDriver") 
\ No newline at end of file
+            # 如果有下一页，点击"加载更多"按钮
+            if page < self.pages:
+                try:
+                    # 滚动到页面底部
+                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                    tracing.sleep(1)  # 等待页面响应
+                    
+                    # 查找并点击"加载更多"按钮
+                    more_btn = self.driver.find_element(By.CLASS_NAME, "more")
+                    if more_btn.is_displayed():
+                        more_btn.click()
+                        print("点击加载更多...")
+                        tracing.sleep(2)  # 等待内容加载
+                    else:
+                        print("没有更多内容可加载")
+                        break
+                except Exception as e:
+                    print(f"加载更多内容失败: {e}")
+                    break
+        
+        return checkpoint.urls()
\ No newline at end of file
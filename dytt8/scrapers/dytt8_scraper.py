@@ -3,24 +3,131 @@
 电影天堂(dytt8)爬虫实现
 """
 import os
-import time
 import re
-import random
+import threading
 import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from .base_scraper import BaseScraper
+from .parser_backends import get_backend, DYTT8_DETAIL_RULES
+from .pipeline import CrawlPipeline
+from dytt8.utils import links, metrics, rate_control, retry, tracing
+from dytt8.utils.encoding import decode_response
+from dytt8.utils.page_archive import active_mode, instrument_session
+from dytt8.utils.zoom_parser import extract_movie_metadata
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# 分类 -> 列表首页路径
+CATEGORY_PATHS = {
+    "最新电影": "/html/gndy/dyzz/index.html",
+    "国内电影": "/html/gndy/china/index.html",
+    "欧美电影": "/html/gndy/oumei/index.html",
+    "日韩电影": "/html/gndy/rihan/index.html",
+    "华语电视": "/html/tv/hytv/index.html",
+    "日韩电视": "/html/tv/rihantv/index.html",
+    "欧美电视": "/html/tv/oumeitv/index.html"
+}
+
+
+def parse_detail_page(html, url, backend=None):
+    """
+    解析电影详情页（模块级函数，可在解析进程池中执行）
+    
+    参数:
+        html (str): 详情页HTML
+        url (str): 详情页URL
+        backend (str): 解析后端 (bs4, lxml, selectolax)，默认使用可用的最快后端
+    
+    返回:
+        dict: 电影信息，无法解析时返回None
+    """
+    parser = get_backend(backend)
+    fields = parser.extract(parser.parse(html), DYTT8_DETAIL_RULES)
+    
+    # 获取标题
+    title = fields["title"].strip() if fields["title"] is not None else "未知标题"
+    
+    # 获取内容
+    content_text = fields["content"]
+    if content_text is None:
+        print(f"无法找到内容区域: {url}")
+        return None
+    
+    metadata = extract_movie_metadata(content_text)
+    
+    # 提取年份
+    year = metadata.get("year")
+    if not year:
+        year_match = re.search(r'(\d{4})年', title)
+        year = year_match.group(1) if year_match else "未知年份"
+    
+    # 提取类别、格式、大小和下载链接
+    category = fields["category"].strip() if fields["category"] is not None else "未知类别"
+    format = fields["format"].strip() if fields["format"] is not None else "未知格式"
+    size = fields["size"].strip() if fields["size"] is not None else "未知大小"
+    # 页面中的全部下载链接(magnet/ed2k/迅雷等)，download_link 保留第一个
+    download_links = links.extract_links(html)
+    download_link = fields["download_link"]
+    if download_link is None:
+        download_link = download_links[0]["url"] if download_links else "无法获取下载链接"
+    
+    # 提取电影信息
+    return {
+        "title": title,
+        "year": year,
+        "category": category,
+        "format": format,
+        "size": size,
+        "download_link": download_link,
+        "download_links": download_links,
+        # 与豆瓣爬虫保持一致的字段格式
+        "director": metadata.get("director", ""),
+        "actors": ", ".join(metadata.get("actors", [])),
+        "country": metadata.get("country", ""),
+        "language": metadata.get("language", ""),
+        "release_date": metadata.get("release_date", ""),
+        "score": f"{metadata['rating']}/10" if metadata.get("rating") else "",
+        "duration": metadata.get("duration", ""),
+        "summary": metadata.get("summary", ""),
+        "translated_title": metadata.get("translated_title", ""),
+        "genre": metadata.get("genre", ""),
+        "source_url": url
+    }
+
+
+def parse_list_page(html, page_url):
+    """
+    解析分类列表页（模块级函数，分布式抓取的工作进程也使用）
+    
+    参数:
+        html (str): 列表页HTML
+        page_url (str): 列表页URL，用于拼接相对链接
+    
+    返回:
+        tuple: (详情页URL列表, 下一页URL或None)
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    detail_urls = []
+    for link in soup.select("div.co_content8 a.ulink"):
+        href = urljoin(page_url, link.get("href", ""))
+        if href.endswith(".html") and "index" not in href and href not in detail_urls:
+            detail_urls.append(href)
+    
+    next_link = soup.find("a", string=re.compile("下一页"))
+    next_url = urljoin(page_url, next_link["href"]) if next_link and next_link.get("href") else None
+    return detail_urls, next_url
+
 
 class Dytt8Scraper(BaseScraper):
     """电影天堂网站爬虫"""
     
-    def __init__(self, pages=3, delay=2.0, category="最新电影", headless=True):
+    source = "dytt8"
+    
+    def __init__(self, pages=3, delay=2.0, category="最新电影", headless=True, workers=4, session=None,
+                 resume=False):
         """
         初始化电影天堂爬虫
         
@@ -29,27 +136,43 @@ class Dytt8Scraper(BaseScraper):
             delay (float): 爬取延迟(秒)
             category (str): 电影类别
             headless (bool): 是否使用无头模式
+            workers (int): 并发抓取详情页的线程数
+            session (requests.Session): 复用已有的HTTP会话(连接池)，为None时新建
+            resume (bool): 是否从上次中断的断点继续
         """
-        super().__init__(pages, delay, category)
+        super().__init__(pages, delay, category, resume)
         self.base_url = "https://www.dytt8.net"
         self.headless = headless
         self.driver = None
+        self.workers = workers
+        self.stage_stats = None
+        self._pipeline = None
+        self._stopped = threading.Event()
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            # 设置了录制/回放环境变量时从网页归档读写
+            instrument_session(session)
+        self.session = session
+        # 回放时页面来自归档，按 cached 计数，也无需限速
+        replay = active_mode()[0] == "replay"
+        self._page_result = "cached" if replay else "fetched"
+        # delay 作为没有保存状态时的初始请求间隔，之后按站点的响应自适应调整
+        self.rate = None if replay else rate_control.get_controller()
+    
+    def stop(self):
+        """停止爬取(如调度任务被取消或超时)，可在任意线程调用；未完成的部分留在断点中"""
+        self._stopped.set()
+        pipeline = self._pipeline
+        if pipeline is not None:
+            pipeline.stop()
     
     def _setup_driver(self):
-        """设置WebDriver"""
+        """设置WebDriver，驱动的解析结果由 driver_cache 缓存"""
+        from dytt8.utils.utils import setup_chrome_driver
         print("初始化Chrome浏览器...")
-        chrome_options = Options()
-        if self.headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        
         try:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            return driver
+            return setup_chrome_driver(headless=self.headless)
         except Exception as e:
             print(f"WebDriver初始化失败: {e}")
             print("请尝试使用 fix_webdriver.py 修复")
@@ -57,82 +180,124 @@ class Dytt8Scraper(BaseScraper):
     
     def _get_category_url(self):
         """获取分类URL"""
-        category_map = {
-            "最新电影": "/html/gndy/dyzz/index.html",
-            "国内电影": "/html/gndy/china/index.html",
-            "欧美电影": "/html/gndy/oumei/index.html",
-            "日韩电影": "/html/gndy/rihan/index.html",
-            "华语电视": "/html/tv/hytv/index.html",
-            "日韩电视": "/html/tv/rihantv/index.html",
-            "欧美电视": "/html/tv/oumeitv/index.html"
-        }
-        
-        if self.category in category_map:
-            return self.base_url + category_map[self.category]
+        if self.category in CATEGORY_PATHS:
+            return self.base_url + CATEGORY_PATHS[self.category]
         else:
             print(f"未知类别: {self.category}，使用默认类别: 最新电影")
-            return self.base_url + category_map["最新电影"]
+            return self.base_url + CATEGORY_PATHS["最新电影"]
+    
+    @tracing.traced("fetch")
+    def _fetch_page(self, url):
+        """
+        获取页面HTML
+        
+        参数:
+            url (str): 页面URL
+        
+        返回:
+            str: 解码后的HTML，失败时返回None
+        """
+        # 使用requests获取页面，避免频繁启动Selenium
+        try:
+            if self.rate is None:
+                response = self.session.get(url, timeout=15)
+            else:
+                with self.rate.slot(url, self.delay, self.workers) as request:
+                    response = self.session.get(url, timeout=15)
+                    request.status = response.status_code
+        except Exception:
+            metrics.PAGES.inc("dytt8", "failed")
+            raise
+        
+        if response.status_code != 200:
+            metrics.PAGES.inc("dytt8", "failed")
+            kind = retry.classify_status(response.status_code)
+            if kind in retry.RETRYABLE:
+                # 5xx 和限流可以重试，交给调用方的重试策略
+                raise retry.FetchError(f"状态码 {response.status_code}", kind, response.status_code)
+            print(f"获取页面失败: {url}, 状态码: {response.status_code}")
+            return None
+        
+        metrics.PAGES.inc("dytt8", self._page_result)
+        # 按页面声明的编码从原始字节解码一次（GB系列统一按GB18030解码）
+        return decode_response(response)
     
-    def _extract_movie_info(self, url):
-        """从电影详情页提取信息"""
+    def _fetch_detail_page(self, url):
+        """抓取阶段: 获取详情页（请求速率由 _fetch_page 中的限速器控制）"""
         try:
-            # 使用requests获取页面，避免频繁启动Selenium
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers)
-            response.encoding = 'gb2312'  # 设置正确的编码
-            
-            if response.status_code != 200:
-                print(f"获取页面失败: {url}, 状态码: {response.status_code}")
-                return None
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # 获取标题
-            title_elem = soup.select_one("div.title_all h1")
-            title = title_elem.text.strip() if title_elem else "未知标题"
-            
-            # 获取内容
-            content = soup.select_one("div#Zoom")
-            if not content:
-                print(f"无法找到内容区域: {url}")
-                return None
-            
-            content_text = content.text
-            
-            # 提取年份
-            year_match = re.search(r'年\s*代:\s*(\d{4})', content_text) or \
-                        re.search(r'(\d{4})年', title)
-            year = year_match.group(1) if year_match else "未知年份"
-            
-            # 提取类别
-            category_elem = soup.select_one("div.title_all a:nth-child(2)")
-            category = category_elem.text.strip() if category_elem else "未知类别"
-            
-            # 提取格式
-            format_elem = soup.select_one("div.title_all a:nth-child(3)")
-            format = format_elem.text.strip() if format_elem else "未知格式"
-            
-            # 提取大小
-            size_elem = soup.select_one("div.title_all a:nth-child(4)")
-            size = size_elem.text.strip() if size_elem else "未知大小"
+            html = self._fetch_page(url)
+        except Exception:
+            self.checkpoint.mark(url, "failed")
+            raise
+        if html is None:
+            self.checkpoint.mark(url, "failed")
+        return html
+    
+    @tracing.traced("list_pages")
+    def _collect_detail_urls(self):
+        """
+        遍历分类列表页，收集电影详情页URL；每完成一页记入断点，继续时从下一页开始
+        
+        返回:
+            list: 详情页URL列表
+        """
+        checkpoint = self.checkpoint
+        detail_urls = checkpoint.urls()
+        page_url = checkpoint.page_url or self._get_category_url()
+        
+        for page in range(checkpoint.page + 1, self.pages + 1):
+            if not page_url or self._stopped.is_set():
+                break
+            print(f"正在获取第 {page}/{self.pages} 页列表: {page_url}")
             
-            # 提取下载链接
-            download_link_elem = soup.select_one("div.title_all a:nth-child(5)")
-            download_link = download_link_elem['href'] if download_link_elem else "无法获取下载链接"
+            try:
+                html = self.retry.call(self._fetch_page, page_url, budget=self.budget, description=page_url)
+            except Exception as e:
+                print(f"获取列表页失败({retry.classify(e)}): {e}")
+                break
+            if html is None:
+                break
             
-            # 提取电影信息
-            movie_info = {
-                "title": title,
-                "year": year,
-                "category": category,
-                "format": format,
-                "size": size,
-                "download_link": download_link
-            }
+            page_urls, page_url = parse_list_page(html, page_url)
+            detail_urls.extend(href for href in page_urls if href not in detail_urls)
+            checkpoint.add_urls(page_urls)
+            checkpoint.set_position(page=page, page_url=page_url)
+        
+        print(f"找到 {len(detail_urls)} 个电影详情页")
+        return detail_urls
+    
+    @tracing.traced("scrape")
+    def scrape(self):
+        """执行爬取操作: 列表页 → 抓取/解析/存储流水线"""
+        print(f"开始爬取电影天堂 - {self.category}...")
+        checkpoint = self._open_checkpoint(self.source)
+        self.budget = retry.FailureBudget()
+        
+        try:
+            if checkpoint.stage == "list":
+                detail_urls = self._collect_detail_urls()
+                if not detail_urls or self._stopped.is_set():
+                    return self.results
+                checkpoint.set_position(stage="detail")
             
-            return movie_info
-        except Exception as e:
-            print(f"提取电影信息失败: {e}")
-            return None 
\ No newline at end of file
+            pending = checkpoint.pending()
+            self.budget.extend(len(pending))
+            self._pipeline = pipeline = CrawlPipeline(
+                fetch=self._fetch_detail_page,
+                parse=parse_detail_page,
+                store=self._store_result,
+                fetch_workers=self.workers,
+                retry=self.retry,
+                budget=self.budget
+            )
+            # stop() 可能在创建流水线之前调用
+            if self._stopped.is_set():
+                pipeline.stop()
+            self.stage_stats = pipeline.run(pending)
+        finally:
+            checkpoint.finish()
+            if self.rate is not None:
+                self.rate.save()
+        
+        print(f"爬取完成，共获取 {len(self.results)} 部电影信息")
+        return self.results
\ No newline at end of file
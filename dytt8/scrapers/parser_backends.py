@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+HTML解析后端
+为详情页提取规则提供统一接口，支持 BeautifulSoup、lxml(XPath) 和 selectolax 三种实现，
+同一套规则在各后端上得到相同的结果
+"""
+from abc import ABC, abstractmethod
+
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+# selectolax 为可选依赖，速度最快
+try:
+    try:
+        from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+    except ImportError:
+        # 1.0 之前的版本只提供 modest 后端
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+
+class Rule:
+    """单个字段的提取规则"""
+
+    def __init__(self, css, xpath, attr=None, many=False, separator=""):
+        """
+        初始化提取规则
+
+        参数:
+            css (str): CSS选择器（bs4 和 selectolax 使用）
+            xpath (str): 等价的XPath表达式（lxml 使用）
+            attr (str): 提取的属性名，为None时提取文本
+            many (bool): 是否提取所有匹配的节点
+            separator (str): 拼接文本节点时使用的分隔符
+        """
+        self.css = css
+        self.xpath = xpath
+        self.attr = attr
+        self.many = many
+        self.separator = separator
+        self.compiled_xpath = etree.XPath(xpath)
+
+
+class ParserBackend(ABC):
+    """HTML解析后端基类"""
+
+    name = ""
+
+    @abstractmethod
+    def parse(self, html):
+        """解析HTML，返回文档对象"""
+        pass
+
+    @abstractmethod
+    def find(self, doc, rule):
+        """返回规则匹配的节点列表"""
+        pass
+
+    @abstractmethod
+    def text(self, node, separator=""):
+        """获取节点的文本（不含 script/style）"""
+        pass
+
+    @abstractmethod
+    def attr(self, node, name):
+        """获取节点的属性值，不存在时返回None"""
+        pass
+
+    def extract(self, doc, rules):
+        """
+        按规则从文档中提取字段
+
+        参数:
+            doc: parse() 返回的文档对象
+            rules (dict): 字段名到 Rule 的映射
+
+        返回:
+            dict: 字段名到取值的映射，many 规则为列表，未匹配的单值字段为None
+        """
+        fields = {}
+        for name, rule in rules.items():
+            nodes = self.find(doc, rule)
+            if not rule.many:
+                nodes = nodes[:1]
+            if rule.attr:
+                values = [self.attr(node, rule.attr) for node in nodes]
+            else:
+                values = [self.text(node, rule.separator) for node in nodes]
+            fields[name] = values if rule.many else (values[0] if values else None)
+        return fields
+
+
+class BeautifulSoupBackend(ParserBackend):
+    """BeautifulSoup 后端（兼容性最好，速度最慢）"""
+
+    name = "bs4"
+
+    def parse(self, html):
+        return BeautifulSoup(html, 'lxml')
+
+    def find(self, doc, rule):
+        if rule.many:
+            return doc.select(rule.css)
+        node = doc.select_one(rule.css)
+        return [node] if node is not None else []
+
+    def text(self, node, separator=""):
+        return node.get_text(separator)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class LxmlBackend(ParserBackend):
+    """lxml.html 后端，使用预编译的XPath"""
+
+    name = "lxml"
+
+    _TEXT_XPATH = etree.XPath("descendant-or-self::text()[not(ancestor::script) and not(ancestor::style)]")
+
+    def parse(self, html):
+        return lxml.html.fromstring(html)
+
+    def find(self, doc, rule):
+        return rule.compiled_xpath(doc)
+
+    def text(self, node, separator=""):
+        return separator.join(self._TEXT_XPATH(node))
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax 后端（基于 lexbor 的C实现，速度最快）"""
+
+    name = "selectolax"
+
+    def parse(self, html):
+        doc = SelectolaxParser(html)
+        doc.strip_tags(["script", "style"])
+        return doc
+
+    def find(self, doc, rule):
+        if rule.many:
+            return doc.css(rule.css)
+        node = doc.css_first(rule.css)
+        return [node] if node is not None else []
+
+    def text(self, node, separator=""):
+        return node.text(separator=separator)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+
+BACKENDS = {
+    "bs4": BeautifulSoupBackend,
+    "lxml": LxmlBackend,
+}
+if SELECTOLAX_AVAILABLE:
+    BACKENDS["selectolax"] = SelectolaxBackend
+
+# 默认使用可用的最快后端
+DEFAULT_BACKEND = "selectolax" if SELECTOLAX_AVAILABLE else "lxml"
+
+_instances = {}
+
+
+def get_backend(name=None):
+    """
+    获取解析后端实例
+
+    参数:
+        name (str): 后端名称 (bs4, lxml, selectolax)，默认为 DEFAULT_BACKEND
+
+    返回:
+        ParserBackend: 解析后端
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的解析后端: {name}，可用: {', '.join(BACKENDS)}")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
+
+
+def _class_xpath(cls):
+    """CSS类选择器对应的XPath条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+# 电影天堂详情页提取规则
+DYTT8_DETAIL_RULES = {
+    "title": Rule("div.title_all h1", f"//div[{_class_xpath('title_all')}]//h1"),
+    "content": Rule("div#Zoom", "//div[@id='Zoom']", separator="\n"),
+    "category": Rule("div.title_all a:nth-child(2)", f"//div[{_class_xpath('title_all')}]//*[2][self::a]"),
+    "format": Rule("div.title_all a:nth-child(3)", f"//div[{_class_xpath('title_all')}]//*[3][self::a]"),
+    "size": Rule("div.title_all a:nth-child(4)", f"//div[{_class_xpath('title_all')}]//*[4][self::a]"),
+    "download_link": Rule("div.title_all a:nth-child(5)", f"//div[{_class_xpath('title_all')}]//*[5][self::a]",
+                          attr="href"),
+}
+
+# 豆瓣电影详情页提取规则
+DOUBAN_DETAIL_RULES = {
+    "title": Rule("h1 span[property='v:itemreviewed']", "//h1//span[@property='v:itemreviewed']"),
+    "year": Rule("h1 .year", f"//h1//*[{_class_xpath('year')}]"),
+    "directors": Rule("a[rel='v:directedBy']", "//a[@rel='v:directedBy']", many=True),
+    "actors": Rule("#info .actor .attrs a",
+                   f"//*[@id='info']//*[{_class_xpath('actor')}]//*[{_class_xpath('attrs')}]//a", many=True),
+    "genres": Rule("span[property='v:genre']", "//span[@property='v:genre']", many=True),
+    "info": Rule("#info", "//*[@id='info']"),
+    "release_dates": Rule("span[property='v:initialReleaseDate']", "//span[@property='v:initialReleaseDate']",
+                          many=True),
+    "rating": Rule("strong[property='v:average']", "//strong[@property='v:average']"),
+    "duration": Rule("span[property='v:runtime']", "//span[@property='v:runtime']"),
+    "summary": Rule("span[property='v:summary']", "//span[@property='v:summary']"),
+}
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+"""
+抓取流水线 - 抓取(fetch) → 解析(parse) → 存储(store)
+网络抓取在线程中进行，HTML解析交给进程池，两个阶段之间通过有界队列衔接，
+使解析占满所有CPU核心的同时网络请求不会因等待解析而中断
+抓取出错时按重试策略把URL放回队列末尾，退避时间过后再抓取，不阻塞其他URL
+"""
+import os
+import time
+import queue
+import threading
+import contextvars
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from dytt8.utils import retry as retry_module, tracing
+
+# 队列结束标记
+_DONE = object()
+
+# 阻塞等待队列和信号量时检查停止标志的间隔(秒)
+_POLL_INTERVAL = 0.1
+
+
+class _Finished:
+    """解析阶段的结束标记；调度线程异常退出时带上异常"""
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+class StageStats:
+    """单个阶段的吞吐统计"""
+
+    def __init__(self, name):
+        """
+        初始化统计
+
+        参数:
+            name (str): 阶段名称
+        """
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, ok=True):
+        """记录一次处理的耗时"""
+        with self._lock:
+            self.busy += elapsed
+            if ok:
+                self.items += 1
+            else:
+                self.errors += 1
+
+    def to_dict(self, wall_time):
+        """
+        转换为字典
+
+        参数:
+            wall_time (float): 流水线总耗时(秒)
+        """
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy, 3),
+            "items_per_sec": round(self.items / wall_time, 2) if wall_time > 0 else 0.0,
+            "avg_ms": round(self.busy / max(self.items + self.errors, 1) * 1000, 2),
+        }
+
+
+def _timed_call(func, *args):
+    """在工作进程中执行解析函数并计时"""
+    start = time.perf_counter()
+    try:
+        return func(*args), time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+class CrawlPipeline:
+    """抓取 → 解析 → 存储 三阶段流水线"""
+
+    def __init__(self, fetch, parse, store, fetch_workers=4, parse_workers=None,
+                 queue_size=32, use_processes=True, retry=None, budget=None):
+        """
+        初始化流水线
+
+        参数:
+            fetch (callable): 抓取函数 fetch(url) -> 页面内容，返回None表示跳过
+            parse (callable): 解析函数 parse(page, url) -> 电影信息字典或None，
+                              使用进程池时必须是模块级函数
+            store (callable): 存储函数 store(movie)，在调用线程中执行
+            fetch_workers (int): 抓取线程数（Selenium驱动不支持并发，应设为1）
+            parse_workers (int): 解析进程数，默认为CPU核心数
+            queue_size (int): 阶段之间有界队列的容量
+            use_processes (bool): 是否使用进程池解析，False时在线程中解析
+            retry (RetryPolicy): 抓取出错时的重试策略，为None时不重试
+            budget (FailureBudget): 本次运行的失败预算，超出后剩余URL不再抓取
+        """
+        self.fetch = fetch
+        self.parse = parse
+        self.store = store
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.use_processes = use_processes
+        self.retry = retry
+        self.budget = budget
+        self._outstanding = 0
+        self._outstanding_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stop_requested = threading.Event()
+
+        self.stats = {
+            "fetch": StageStats("fetch"),
+            "parse": StageStats("parse"),
+            "store": StageStats("store"),
+        }
+        self.wall_time = 0.0
+
+    def stop(self):
+        """
+        请求停止(如任务被取消)，可在任意线程调用: 正在进行的 run() 不再抓取新的URL，
+        处理完在途页面后返回；之后调用的 run() 直接返回
+        """
+        self._stop_requested.set()
+        self._stopping.set()
+
+    def _finish_url(self, url_queue):
+        """一个URL处理完毕(成功、放弃或跳过)，全部完成后通知抓取线程退出"""
+        with self._outstanding_lock:
+            self._outstanding -= 1
+            finished = self._outstanding == 0
+        if finished:
+            for _ in range(self.fetch_workers):
+                url_queue.put(_DONE)
+
+    def _get(self, q):
+        """从队列取出一项，流水线停止时返回 _DONE"""
+        while not self._stopping.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _put(self, q, item):
+        """放入有界队列，流水线停止时放弃并返回False"""
+        while not self._stopping.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _acquire(self, semaphore):
+        """获取信号量，流水线停止时放弃并返回False"""
+        while not self._stopping.is_set():
+            if semaphore.acquire(timeout=_POLL_INTERVAL):
+                return True
+        return False
+
+    def _fetch_worker(self, url_queue, page_queue):
+        """抓取线程：从URL队列取出URL并抓取，结果放入有界页面队列"""
+        while True:
+            item = self._get(url_queue)
+            if item is _DONE:
+                break
+            url, attempts, ready_at = item
+            if self.budget is not None and self.budget.exhausted:
+                # 超出失败预算，剩余URL留给断点续爬
+                self._finish_url(url_queue)
+                continue
+            wait = ready_at - time.monotonic()
+            if wait > 0:
+                with tracing.span("sleep"):
+                    if self._stopping.wait(wait):
+                        break
+            start = time.perf_counter()
+            error = None
+            try:
+                page = self.fetch(url)
+                ok = page is not None
+            except Exception as e:
+                page, ok, error = None, False, e
+            self.stats["fetch"].record(time.perf_counter() - start, ok)
+            if error is not None:
+                attempts += 1
+                kind = retry_module.classify(error)
+                if self.budget is not None:
+                    self.budget.record(kind)
+                if self.retry is not None and self.retry.should_retry(error, attempts, self.budget):
+                    # 放回队列末尾，其他URL先抓取
+                    print(f"抓取页面出错({kind})，稍后重试: {url}, 错误: {error}")
+                    url_queue.put((url, attempts, time.monotonic() + self.retry.backoff(attempts)))
+                    continue
+                print(f"抓取页面出错({kind}): {url}, 错误: {error}")
+            if ok:
+                # 队列已满时阻塞，避免解析跟不上时内存无限增长
+                if not self._put(page_queue, (page, url)):
+                    break
+            self._finish_url(url_queue)
+
+    def _dispatch_parse(self, page_queue, result_queue, executor):
+        """
+        解析调度线程：把页面提交到进程池，并限制在途任务数量
+        无论如何结束都会放入 _Finished，存储阶段不会一直等待
+        """
+        in_flight = threading.BoundedSemaphore(self.queue_size)
+        # 回调在进程池的管理线程中执行，解析耗时直接记入调用方的追踪
+        trace = tracing.current_trace()
+
+        def finish(url, result):
+            movie, elapsed, error = result
+            if error:
+                print(f"解析页面出错: {url}, 错误: {error}")
+            self.stats["parse"].record(elapsed, error is None)
+            if trace is not None:
+                trace.record("parse", elapsed, failed=error is not None)
+            result_queue.put((movie, in_flight))
+
+        def on_done(future, page, url):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # 解析进程被终止(如内存不足)，在当前线程中重新解析该页面
+                result = _timed_call(self.parse, page, url)
+            except Exception as e:
+                result = None, 0.0, str(e)
+            finish(url, result)
+
+        error = None
+        try:
+            while True:
+                item = self._get(page_queue)
+                if item is _DONE or not self._acquire(in_flight):
+                    break
+                page, url = item
+                if executor is not None:
+                    try:
+                        future = executor.submit(_timed_call, self.parse, page, url)
+                    except BrokenProcessPool as e:
+                        print(f"解析进程池已损坏，改为在线程中解析: {e}")
+                        executor = None
+                    else:
+                        future.add_done_callback(lambda f, page=page, url=url: on_done(f, page, url))
+                        continue
+                finish(url, _timed_call(self.parse, page, url))
+
+            # 等待所有在途解析任务完成
+            for _ in range(self.queue_size):
+                if not self._acquire(in_flight):
+                    break
+        except Exception as e:
+            error = e
+            print(f"解析调度出错: {type(e).__name__}: {e}")
+        finally:
+            result_queue.put(_Finished(error))
+
+    def run(self, urls):
+        """
+        运行流水线直到所有URL处理完毕
+
+        参数:
+            urls (iterable): 待抓取的详情页URL
+
+        返回:
+            dict: 各阶段的吞吐统计
+        """
+        start = time.perf_counter()
+        self._stopping = threading.Event()
+        if self._stop_requested.is_set():
+            self._stopping.set()
+        url_queue = queue.Queue()
+        page_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue()
+
+        executor = None
+        if self.use_processes and self.parse_workers > 1:
+            try:
+                executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+            except (OSError, NotImplementedError) as e:
+                print(f"无法创建解析进程池，改为在线程中解析: {e}")
+
+        # 工作线程继承调用方的上下文，抓取阶段的 span 记入同一个追踪
+        fetchers = [
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self._fetch_worker, url_queue, page_queue), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        dispatcher = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._dispatch_parse, page_queue, result_queue, executor), daemon=True
+        )
+
+        # (URL, 已尝试次数, 可再次抓取的时间)；重试的URL会重新入队，全部完成后才放入结束标记
+        urls = list(urls)
+        self._outstanding = len(urls)
+        for url in urls:
+            url_queue.put((url, 0, 0.0))
+        if not urls:
+            for _ in fetchers:
+                url_queue.put(_DONE)
+
+        for thread in fetchers:
+            thread.start()
+        dispatcher.start()
+
+        # 存储阶段在调用线程中执行，store 函数无需考虑线程安全
+        def close_fetch_stage():
+            for thread in fetchers:
+                thread.join()
+            self._put(page_queue, _DONE)
+
+        closer = threading.Thread(target=close_fetch_stage, daemon=True)
+        closer.start()
+
+        failure = None
+        try:
+            while True:
+                item = result_queue.get()
+                if isinstance(item, _Finished):
+                    failure = item.error
+                    break
+                movie, in_flight = item
+                if movie is not None:
+                    store_start = time.perf_counter()
+                    try:
+                        with tracing.span("store"):
+                            self.store(movie)
+                        self.stats["store"].record(time.perf_counter() - store_start)
+                    except Exception as e:
+                        print(f"保存结果出错: {e}")
+                        self.stats["store"].record(time.perf_counter() - store_start, False)
+                in_flight.release()
+        finally:
+            # 正常结束时各线程已退出；存储阶段被中断(如 Ctrl+C)或调度线程出错时，
+            # 抓取线程可能阻塞在已满的页面队列上，先通知停止再等待
+            self._stopping.set()
+            closer.join()
+            dispatcher.join()
+            if executor is not None:
+                executor.shutdown()
+
+        self.wall_time = time.perf_counter() - start
+        if failure is not None:
+            raise RuntimeError(f"解析阶段异常结束: {failure}") from failure
+        return self.report()
+
+    def report(self):
+        """
+        获取并打印各阶段的吞吐统计
+
+        返回:
+            dict: {"wall_seconds": 总耗时, "stages": [各阶段统计]}
+        """
+        stages = [stats.to_dict(self.wall_time) for stats in self.stats.values()]
+        print(f"流水线完成，耗时 {self.wall_time:.2f} 秒")
+        for stage in stages:
+            print(f"  {stage['stage']:<6} 处理 {stage['items']} 项, 失败 {stage['errors']} 项, "
+                  f"{stage['items_per_sec']} 项/秒, 平均 {stage['avg_ms']} 毫秒/项")
+        return {"wall_seconds": round(self.wall_time, 3), "stages": stages}
@@ -0,0 +1,221 @@
+"""
+爬取断点
+定期把抓取进度(分类、阶段、页码、每个URL的状态)写入 dytt8/data/checkpoints/<名称>.json，
+已得到的结果追加到同名的 .results.ndjson，每次保存只写入新增的结果；
+爬取因浏览器崩溃、断网或被反爬拦截而中断时，以 resume=True 重新运行可从断点继续
+
+用法:
+    checkpoint = Checkpoint("douban_热门", resume=True)
+    for url in checkpoint.pending():
+        checkpoint.mark(url, "done", movie)
+        checkpoint.save()
+    checkpoint.clear()  # 完成后删除
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger("dytt8.checkpoint")
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "checkpoints")
+
+# URL 状态
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)[:80]
+
+
+class Checkpoint:
+    """一次爬取的断点，未完成的部分在下次 resume 时继续"""
+
+    def __init__(self, name, resume=False, directory=None, interval=10.0, every=10):
+        """
+        初始化断点
+
+        Args:
+            name: 断点名称，同一数据源和分类使用同一名称
+            resume: 是否读取已有断点，为False时从头开始(旧断点在第一次保存时被覆盖)
+            directory: 保存目录，默认为 DEFAULT_CHECKPOINT_DIR
+            interval: 两次保存的最长间隔(秒)
+            every: 累计多少次状态变化后保存
+        """
+        self.name = name
+        self.directory = directory or DEFAULT_CHECKPOINT_DIR
+        self.path = os.path.join(self.directory, f"{_safe_name(name)}.json")
+        self.results_path = os.path.join(self.directory, f"{_safe_name(name)}.results.ndjson")
+        self.interval = interval
+        self.every = every
+        self.state = {"stage": "list", "page": 0, "page_url": None, "items": [], "urls": {}}
+        self.resumed = False
+        self._results = {}
+        self._unsaved = []
+        self._torn = False
+        self._changes = 0
+        self._saved_at = time.monotonic()
+        # 抓取线程和存储线程都会更新状态；_save_lock 保证文件按顺序写入
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if resume:
+            self.resumed = self._load()
+        # 不继续时旧的结果文件在第一次保存时清空
+        self._truncate = not self.resumed
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"断点文件无法读取，从头开始: {self.path}: {e}")
+            return False
+        # 旧版本的断点把结果保存在 JSON 中
+        self._results.update(state.pop("results", None) or {})
+        self.state.update(state)
+        self._load_results()
+        done = sum(1 for status in self.state["urls"].values() if status == DONE)
+        print(f"从断点继续: 阶段 {self.stage}, 第 {self.page} 页, 已完成 {done}/{len(self.state['urls'])} 个URL")
+        return True
+
+    def _load_results(self):
+        try:
+            with open(self.results_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # 崩溃时写到一半的最后一行没有换行符，下次追加前先补上
+                    self._torn = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._results[record["url"]] = record["result"]
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"断点结果文件无法读取: {self.results_path}: {e}")
+
+    @property
+    def stage(self):
+        """当前阶段: list (收集列表页) 或 detail (抓取详情页)"""
+        return self.state["stage"]
+
+    @property
+    def page(self):
+        """已完成的列表页数"""
+        return self.state["page"]
+
+    @property
+    def page_url(self):
+        """下一个待抓取的列表页URL"""
+        return self.state["page_url"]
+
+    @property
+    def items(self):
+        """列表阶段收集到的条目"""
+        return self.state["items"]
+
+    def set_position(self, stage=None, page=None, page_url=None, items=None):
+        """记录抓取位置，阶段或页码变化时立即保存"""
+        if stage is not None:
+            self.state["stage"] = stage
+        if page is not None:
+            self.state["page"] = page
+        if page_url is not None:
+            self.state["page_url"] = page_url
+        if items is not None:
+            self.state["items"] = list(items)
+        self.save(force=True)
+
+    def add_urls(self, urls):
+        """登记待抓取的详情页URL，已登记的保持原状态"""
+        with self._lock:
+            for url in urls:
+                self.state["urls"].setdefault(url, PENDING)
+
+    def urls(self):
+        """所有已登记的URL，按登记顺序"""
+        return list(self.state["urls"])
+
+    def pending(self):
+        """尚未完成的URL(含失败的)"""
+        return [url for url, status in self.state["urls"].items() if status != DONE]
+
+    def mark(self, url, status, result=None):
+        """记录一个URL的状态，status 为 done 时同时保存结果"""
+        with self._lock:
+            self.state["urls"][url] = status
+            if result is not None:
+                self._results[url] = result
+                self._unsaved.append({"url": url, "result": result})
+            self._changes += 1
+
+    def result(self, url):
+        """已完成URL的结果"""
+        return self._results.get(url)
+
+    @property
+    def results(self):
+        """所有已得到的结果"""
+        return list(self._results.values())
+
+    def save(self, force=False):
+        """
+        写入断点文件；非强制时仅在累计足够多的变化或超过保存间隔后写入
+
+        Returns:
+            bool: 是否写入
+        """
+        if not force and self._changes < self.every and time.monotonic() - self._saved_at < self.interval:
+            return False
+        with self._save_lock:
+            with self._lock:
+                self.state["name"] = self.name
+                self.state["updated"] = datetime.now().isoformat(timespec="seconds")
+                data = json.dumps(self.state, ensure_ascii=False)
+                unsaved, self._unsaved = self._unsaved, []
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                # 结果先于状态落盘: 中途崩溃时最多重新抓取已有结果的URL，不会丢失结果
+                if unsaved or self._truncate:
+                    with open(self.results_path, "w" if self._truncate else "a", encoding="utf-8") as f:
+                        if self._torn and not self._truncate:
+                            f.write("\n")
+                        self._torn = False
+                        for record in unsaved:
+                            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    self._truncate = False
+                # 状态先写临时文件再替换，中途崩溃不会留下写到一半的断点
+                temp_file = self.path + ".tmp"
+                with open(temp_file, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(temp_file, self.path)
+            except OSError as e:
+                logger.warning(f"保存断点失败: {e}")
+                with self._lock:
+                    self._unsaved[:0] = unsaved
+                return False
+        self._changes = 0
+        self._saved_at = time.monotonic()
+        return True
+
+    def finish(self):
+        """爬取结束: 全部完成时删除断点，否则保存以便下次继续"""
+        if self.pending() or self.stage != "detail":
+            self.save(force=True)
+            print(f"爬取未完成(剩余 {len(self.pending())} 个URL)，断点已保存到: {self.path}")
+        else:
+            self.clear()
+
+    def clear(self):
+        """删除断点文件和结果文件"""
+        for path in (self.path, self.results_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,377 @@
+"""
+电影封面缓存
+并发下载 cover_image 指向的图片，按内容的 SHA-256 存放在 dytt8/data/covers/objects/ 下
+(同一张图片被多个URL引用时只存一份)，索引记录 URL -> 摘要和每个对象的最近访问时间；
+总大小超过上限时按最近最少使用(LRU)淘汰。命中时的访问时间先记在内存中，定期、淘汰前和关闭时批量写入索引。缩略图在进程池中生成(需要 Pillow，未安装时返回原图)
+
+用法:
+    cache = covers.get_cache()
+    cache.fetch_many(movie["cover_image"] for movie in movies)  # 预取
+    cover = cache.get(url)
+    path = cache.thumbnail(cover)
+"""
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+import importlib.util
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from dytt8.utils import metrics, rate_control, retry
+
+# Pillow 为可选依赖，仅生成缩略图需要，在缩略图进程中才导入
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+logger = logging.getLogger("dytt8.covers")
+
+DEFAULT_COVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "covers")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+THUMBNAIL_SIZE = (200, 300)
+# 命中时的访问时间最多在内存中保留多久(秒)才写入索引
+ACCESS_FLUSH_INTERVAL = 30.0
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# 文件头 -> (扩展名, MIME)，图床拦截盗链时常返回 HTML，按内容而不是 Content-Type 判断
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"GIF87a", ".gif", "image/gif"),
+    (b"GIF89a", ".gif", "image/gif"),
+    (b"BM", ".bmp", "image/bmp"),
+)
+
+Cover = namedtuple("Cover", "digest path mime size")
+
+COVER_REQUESTS = metrics.counter("dytt8_cover_requests_total", "封面缓存的请求数", ("result",))
+
+
+def sniff(data):
+    """
+    按文件头判断图片格式
+
+    Returns:
+        tuple: (扩展名, MIME)，不是图片时返回None
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    for signature, extension, mime in _SIGNATURES:
+        if data.startswith(signature):
+            return extension, mime
+    return None
+
+
+def _make_thumbnail(source, target, size):
+    """生成 JPEG 缩略图，在进程池中运行"""
+    from PIL import Image
+    with Image.open(source) as image:
+        image.thumbnail(size)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        temp_file = target + ".tmp"
+        image.save(temp_file, "JPEG", quality=85, optimize=True)
+    os.replace(temp_file, target)
+    return os.path.getsize(target)
+
+
+class CoverCache:
+    """按内容寻址的封面缓存，可在多个线程间共享"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, session=None, workers=8,
+                 thumbnail_workers=2, timeout=15):
+        """
+        初始化封面缓存
+
+        Args:
+            directory: 缓存目录，默认为 DEFAULT_COVER_DIR
+            max_bytes: 原图和缩略图的总大小上限
+            session: requests 会话，为None时新建
+            workers: 并发下载数
+            thumbnail_workers: 生成缩略图的进程数
+            timeout: 下载超时(秒)
+        """
+        self.directory = directory or DEFAULT_COVER_DIR
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.thumbnail_workers = thumbnail_workers
+        self.timeout = timeout
+        if session is None:
+            import requests
+            session = requests.Session()
+            session.headers.update({"User-Agent": USER_AGENT})
+        self.session = session
+        self.retry = retry.RetryPolicy(attempts=2, base=0.5, cap=5.0)
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.directory, "index.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                digest TEXT PRIMARY KEY, extension TEXT NOT NULL, mime TEXT NOT NULL,
+                size INTEGER NOT NULL, accessed REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS objects_accessed ON objects (accessed);
+            CREATE INDEX IF NOT EXISTS urls_digest ON urls (digest);
+        """)
+        self._lock = threading.Lock()
+        # 尚未写入索引的访问时间: 摘要 -> 时间
+        self._accessed = {}
+        self._accessed_flushed = time.monotonic()
+        # 正在下载或生成的项目，同一URL/缩略图的并发请求共用一个 Future
+        self._inflight = {}
+        self._downloader = None
+        self._thumbnailer = None
+
+    def object_path(self, digest, extension):
+        return os.path.join(self.directory, "objects", digest[:2], digest + extension)
+
+    def thumbnail_path(self, digest, size=THUMBNAIL_SIZE):
+        return os.path.join(self.directory, "thumbs", digest[:2], f"{digest}_{size[0]}x{size[1]}.jpg")
+
+    def _cover(self, row, touch=True):
+        digest, extension, mime, size = row
+        path = self.object_path(digest, extension)
+        if not os.path.exists(path):
+            # 文件被手动删除，索引作废
+            self._forget(digest)
+            return None
+        if touch:
+            # 每次命中都写库会让每张封面都等一次磁盘写入，攒起来批量写
+            self._accessed[digest] = time.time()
+            if time.monotonic() - self._accessed_flushed >= ACCESS_FLUSH_INTERVAL:
+                self._flush_access()
+        return Cover(digest, path, mime, size)
+
+    def _flush_access(self, commit=True):
+        """把内存中的访问时间写入索引(调用方需持有 self._lock)"""
+        self._accessed_flushed = time.monotonic()
+        if not self._accessed:
+            return
+        accessed, self._accessed = self._accessed, {}
+        self._db.executemany("UPDATE objects SET accessed = MAX(accessed, ?) WHERE digest = ?",
+                             [(when, digest) for digest, when in accessed.items()])
+        if commit:
+            self._db.commit()
+
+    def lookup(self, url):
+        """已缓存的封面，未缓存时返回None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT o.digest, o.extension, o.mime, o.size FROM urls u JOIN objects o ON o.digest = u.digest "
+                "WHERE u.url = ?", (url,)).fetchone()
+            return self._cover(row) if row else None
+
+    def by_digest(self, digest):
+        """按摘要查找封面"""
+        with self._lock:
+            row = self._db.execute("SELECT digest, extension, mime, size FROM objects WHERE digest = ?",
+                                   (digest,)).fetchone()
+            return self._cover(row) if row else None
+
+    def get(self, url):
+        """
+        获取封面，未缓存时下载；同一URL的并发请求只下载一次
+
+        Returns:
+            Cover
+
+        Raises:
+            FetchError: 下载失败或返回的不是图片
+        """
+        cover = self.lookup(url)
+        if cover is not None:
+            COVER_REQUESTS.inc("hit")
+            return cover
+        return self._submit(("url", url), self._download, url).result()
+
+    def _submit(self, key, function, *args):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                if self._downloader is None:
+                    self._downloader = ThreadPoolExecutor(self.workers, thread_name_prefix="dytt8-cover")
+                future = self._downloader.submit(self._run, key, function, *args)
+                self._inflight[key] = future
+            return future
+
+    def _run(self, key, function, *args):
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _download(self, url):
+        cover = self.lookup(url)
+        if cover is not None:
+            return cover
+        try:
+            data = self.retry.call(self._fetch, url, description=url)
+        except Exception:
+            COVER_REQUESTS.inc("error")
+            raise
+        COVER_REQUESTS.inc("miss")
+        return self._store(url, data)
+
+    def _fetch(self, url):
+        with rate_control.get_controller().slot(url, initial_delay=0.2, max_concurrency=self.workers) as request:
+            response = self.session.get(url, timeout=self.timeout)
+            request.status = response.status_code
+        kind = retry.classify_status(response.status_code)
+        if kind:
+            raise retry.FetchError(f"HTTP {response.status_code}", kind, response.status_code)
+        if sniff(response.content) is None:
+            raise retry.FetchError(f"返回的不是图片: {response.headers.get('Content-Type')}", retry.CLIENT)
+        return response.content
+
+    def _store(self, url, data):
+        """按内容摘要写入对象文件并登记URL"""
+        extension, mime = sniff(data)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest, extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_file = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_file, "wb") as f:
+                f.write(data)
+            os.replace(temp_file, path)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO objects (digest, extension, mime, size, accessed) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET accessed = excluded.accessed",
+                (digest, extension, mime, len(data), time.time()))
+            self._db.execute("INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)", (url, digest))
+            self._db.commit()
+            self._evict(keep=digest)
+            size = self._db.execute("SELECT size FROM objects WHERE digest = ?", (digest,)).fetchone()[0]
+        return Cover(digest, path, mime, size)
+
+    def fetch_many(self, urls):
+        """
+        并发获取多张封面
+
+        Returns:
+            dict: URL -> Cover，失败的为None
+        """
+        futures = {url: self._submit(("url", url), self._download, url) for url in dict.fromkeys(urls) if url}
+        covers = {}
+        for url, future in futures.items():
+            try:
+                covers[url] = future.result()
+            except Exception as e:
+                logger.info(f"封面下载失败: {url}: {e}")
+                covers[url] = None
+        return covers
+
+    def thumbnail(self, cover, size=THUMBNAIL_SIZE):
+        """
+        封面的缩略图，第一次请求时在进程池中生成
+
+        Args:
+            cover: Cover 或图片URL
+            size: 缩略图的最大宽高
+
+        Returns:
+            str: 缩略图路径，未安装 Pillow 时为原图路径
+        """
+        if not isinstance(cover, Cover):
+            cover = self.get(cover)
+        if not PILLOW_AVAILABLE:
+            return cover.path
+        path = self.thumbnail_path(cover.digest, size)
+        if os.path.exists(path):
+            return path
+        return self._submit(("thumbnail", cover.digest, tuple(size)), self._build_thumbnail, cover, path, size).result()
+
+    def _build_thumbnail(self, cover, path, size):
+        if os.path.exists(path):
+            return path
+        with self._lock:
+            if self._thumbnailer is None:
+                # API 服务器是多线程的，fork 可能复制到被其他线程持有的锁，使用 spawn 启动
+                self._thumbnailer = ProcessPoolExecutor(self.thumbnail_workers,
+                                                        mp_context=multiprocessing.get_context("spawn"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        added = self._thumbnailer.submit(_make_thumbnail, cover.path, path, tuple(size)).result()
+        with self._lock:
+            # 缩略图计入原图的大小，随原图一起淘汰
+            self._db.execute("UPDATE objects SET size = size + ? WHERE digest = ?", (added, cover.digest))
+            self._db.commit()
+            self._evict(keep=cover.digest)
+        return path
+
+    def _evict(self, keep=None):
+        """总大小超过上限时删除最近最少使用的对象，直到降到上限的 90%"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        # 按最新的访问时间淘汰
+        self._flush_access(commit=False)
+        rows = self._db.execute("SELECT digest, size FROM objects ORDER BY accessed").fetchall()
+        evicted = 0
+        for digest, size in rows:
+            if total <= target:
+                break
+            if digest == keep:
+                continue
+            self._remove_files(digest)
+            self._forget(digest, commit=False)
+            total -= size
+            evicted += 1
+        self._db.commit()
+        logger.info(f"封面缓存超出上限，淘汰 {evicted} 张，当前 {total / 1024 / 1024:.1f} MB")
+
+    def _remove_files(self, digest):
+        row = self._db.execute("SELECT extension FROM objects WHERE digest = ?", (digest,)).fetchone()
+        paths = [self.object_path(digest, row[0])] if row else []
+        thumbs = os.path.dirname(self.thumbnail_path(digest))
+        if os.path.isdir(thumbs):
+            paths += [os.path.join(thumbs, name) for name in os.listdir(thumbs) if name.startswith(digest + "_")]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _forget(self, digest, commit=True):
+        self._accessed.pop(digest, None)
+        self._db.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        self._db.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+        if commit:
+            self._db.commit()
+
+    def stats(self):
+        """缓存中的图片数和总大小"""
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+        return {"count": count, "bytes": total, "max_bytes": self.max_bytes}
+
+    def close(self):
+        """关闭下载线程池、缩略图进程池和索引"""
+        with self._lock:
+            downloader, self._downloader = self._downloader, None
+            thumbnailer, self._thumbnailer = self._thumbnailer, None
+        if downloader is not None:
+            downloader.shutdown(wait=True)
+        if thumbnailer is not None:
+            thumbnailer.shutdown(wait=True)
+        with self._lock:
+            self._flush_access()
+        self._db.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """进程内共享的封面缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CoverCache()
+        return _cache
@@ -0,0 +1,174 @@
+"""
+Parquet 电影数据集
+按 数据源/分类/爬取日期 分区保存(hive 目录布局)，读取时只解码需要的列，可按分区过滤:
+
+    dytt8/data/dataset/
+        crawl_source=dytt8/crawl_category=最新电影/scrape_date=2024-05-01/part-xxx-00000.parquet
+
+分区列使用 crawl_ 前缀，避免与电影自身的 source / category 字段重名。需要 pyarrow。
+每写完一个分片更新根目录下的 _version 标记文件，检查数据集是否变化时不必遍历分区
+
+用法:
+    path = dataset.write_movies(movies, source="dytt8", category="最新电影")
+    movies = dataset.read_movies(columns=["title", "year", "rating"], source="dytt8")
+"""
+import os
+import time
+from datetime import date
+
+from dytt8.utils import sinks
+
+PARQUET_AVAILABLE = sinks.PYARROW_AVAILABLE
+
+DEFAULT_DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dataset")
+
+# 分区列，按目录层级顺序
+PARTITION_COLUMNS = ("crawl_source", "crawl_category", "scrape_date")
+
+# 版本标记文件，以下划线开头，pyarrow 读取数据集时忽略
+VERSION_FILE = "_version"
+
+
+def _segment(value):
+    """分区值中不能出现路径分隔符和等号"""
+    text = str(value or "unknown")
+    for char in '/\\=':
+        text = text.replace(char, "_")
+    return text
+
+
+def partition_path(root=None, source=None, category=None, scrape_date=None):
+    """
+    一个分区的目录
+
+    Args:
+        root: 数据集根目录，默认为 DEFAULT_DATASET_DIR
+        source: 数据源
+        category: 分类
+        scrape_date: 爬取日期，默认为今天
+
+    Returns:
+        str: 分区目录
+    """
+    scrape_date = scrape_date or date.today().isoformat()
+    return os.path.join(root or DEFAULT_DATASET_DIR,
+                        f"crawl_source={_segment(source)}",
+                        f"crawl_category={_segment(category)}",
+                        f"scrape_date={_segment(scrape_date)}")
+
+
+def open_partition(root=None, source=None, category=None, name="part", **kwargs):
+    """
+    打开一个分区的流式输出，每次运行的分片以 name 和时间戳为前缀，互不覆盖
+
+    Returns:
+        ParquetSink
+    """
+    prefix = f"{_segment(name)}-{time.strftime('%H%M%S')}-{os.getpid()}"
+    marker = os.path.join(root or DEFAULT_DATASET_DIR, VERSION_FILE)
+    return sinks.ParquetSink(partition_path(root, source, category), prefix=prefix, marker=marker, **kwargs)
+
+
+def write_movies(movies, root=None, source=None, category=None, name="part"):
+    """
+    把电影列表写入数据集的当天分区
+
+    Returns:
+        str: 分区目录
+    """
+    with open_partition(root, source, category, name) as sink:
+        sink.write_many(movies)
+    return sink.path
+
+
+def _part_files(root):
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(".parquet"):
+                yield os.path.join(directory, name)
+
+
+def latest_mtime(root=None):
+    """
+    数据集中最新分片的修改时间
+
+    Returns:
+        float: 没有分片时返回None
+    """
+    root = root or DEFAULT_DATASET_DIR
+    if not os.path.isdir(root):
+        return None
+    return max((os.path.getmtime(path) for path in _part_files(root)), default=None)
+
+
+def version(root=None):
+    """
+    数据集的版本: 标记文件的修改时间，只需一次 stat
+
+    没有标记文件时(之前写入的数据集)遍历一次分区，以最新分片的修改时间补建标记
+
+    Returns:
+        float: 没有分片时返回None
+    """
+    root = root or DEFAULT_DATASET_DIR
+    marker = os.path.join(root, VERSION_FILE)
+    try:
+        return os.path.getmtime(marker)
+    except OSError:
+        pass
+    mtime = latest_mtime(root)
+    if mtime is not None:
+        try:
+            sinks.touch(marker, mtime)
+        except OSError:
+            pass
+    return mtime
+
+
+def available(root=None):
+    """数据集是否存在且可以读取"""
+    return PARQUET_AVAILABLE and latest_mtime(root) is not None
+
+
+def read_movies(root=None, columns=None, source=None, category=None, since=None):
+    """
+    读取数据集
+
+    Args:
+        root: 数据集根目录，默认为 DEFAULT_DATASET_DIR
+        columns: 需要的列，为None时读取全部；不存在的列忽略
+        source: 只读取该数据源的分区
+        category: 只读取该分类的分区
+        since: 只读取该日期(YYYY-MM-DD)及之后的分区
+
+    Returns:
+        list: 电影信息字典列表，空值为空字符串
+    """
+    if not PARQUET_AVAILABLE:
+        raise ImportError("读取 Parquet 数据集需要安装 pyarrow: pip install pyarrow")
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    root = root or DEFAULT_DATASET_DIR
+    # 只需知道是否有分片，找到第一个即停止遍历
+    if not os.path.isdir(root) or next(_part_files(root), None) is None:
+        return []
+    partitioning = ds.partitioning(pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]),
+                                   flavor="hive")
+    parts = ds.dataset(root, format="parquet", partitioning=partitioning)
+    # 各分片的列可能不同(流式写入时按行组确定列)，合并为统一的表结构
+    schema = pa.unify_schemas([parts.schema] + [fragment.physical_schema for fragment in parts.get_fragments()])
+    parts = ds.dataset(root, schema=schema, format="parquet", partitioning=partitioning)
+
+    condition = None
+    for field, value in (("crawl_source", source), ("crawl_category", category)):
+        if value is not None:
+            term = ds.field(field) == _segment(value)
+            condition = term if condition is None else condition & term
+    if since is not None:
+        term = ds.field("scrape_date") >= str(since)
+        condition = term if condition is None else condition & term
+    if columns is not None:
+        columns = [column for column in columns if column in schema.names]
+
+    table = parts.to_table(columns=columns, filter=condition)
+    return [{key: "" if value is None else value for key, value in row.items()} for row in table.to_pylist()]
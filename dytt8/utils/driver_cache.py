@@ -0,0 +1,260 @@
+"""
+ChromeDriver 解析缓存
+setup_chrome_driver 第一次成功创建浏览器后，记录可用的驱动路径、浏览器版本和解析方法，
+之后启动直接用缓存的驱动，跳过 Selenium Manager 和 webdriver_manager 的查找与联网检查。
+每次只比较浏览器可执行文件的修改时间和大小；变化时才读取版本，版本变化即作废缓存。
+用缓存的驱动启动失败时同样作废，回到完整的解析流程。
+Selenium Manager 可能自行下载浏览器(Chrome for Testing)并写入 options.binary_location，
+记录的是启动后实际使用的浏览器，缓存命中时把它设置回 options
+
+解析方法:
+    selenium-manager          Selenium 4 自动驱动管理
+    webdriver-manager         ChromeDriverManager().install()
+    webdriver-manager-google  ChromeDriverManager(chrome_type=GOOGLE).install()
+    service                   PATH 中的 chromedriver
+
+用法:
+    cache = DriverCache()
+    binary = options.binary_location
+    entry = cache.lookup(binary)
+    if entry:
+        if not binary and entry["browser_path"]:
+            options.binary_location = entry["browser_path"]
+        driver = Chrome(service=ChromeService(entry["driver_path"]), options=options)
+    ...
+    driver = Chrome(options=options)
+    cache.record(driver, "selenium-manager", binary, browser_path=options.binary_location)
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "driver_cache.json")
+
+# 各平台 Chrome / Chromium 的常见名称和安装位置，按顺序查找
+BROWSER_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+if sys.platform == "win32":
+    BROWSER_PATHS = [os.path.join(os.environ.get(root, ""), "Google", "Chrome", "Application", "chrome.exe")
+                     for root in ("PROGRAMFILES", "PROGRAMFILES(X86)", "LOCALAPPDATA")]
+elif sys.platform == "darwin":
+    BROWSER_PATHS = ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+                     "/Applications/Chromium.app/Contents/MacOS/Chromium"]
+else:
+    BROWSER_PATHS = []
+
+_VERSION = re.compile(r"(\d+(?:\.\d+){1,3})")
+
+
+def find_browser(binary=None):
+    """
+    查找浏览器可执行文件
+
+    Args:
+        binary: ChromeOptions.binary_location，指定时直接使用
+
+    Returns:
+        str: 找不到时返回None
+    """
+    if binary:
+        return binary if os.path.isfile(binary) else None
+    for name in BROWSER_NAMES:
+        path = shutil.which(name)
+        if path:
+            return os.path.realpath(path)
+    for path in BROWSER_PATHS:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def browser_stat(path):
+    """浏览器可执行文件的 (修改时间, 大小)，无法读取时返回None"""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def browser_version(path):
+    """
+    读取浏览器版本，如 126.0.6478.126
+
+    Windows 上 chrome.exe --version 不输出内容，读取注册表
+    """
+    if sys.platform == "win32":
+        try:
+            import winreg
+            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon")
+            return winreg.QueryValueEx(key, "version")[0]
+        except OSError:
+            return None
+    try:
+        output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _VERSION.search(output or "")
+    return match.group(1) if match else None
+
+
+def driver_path_of(driver):
+    """已启动的 WebDriver 使用的驱动文件路径"""
+    service = getattr(driver, "service", None)
+    path = getattr(service, "path", None) or getattr(service, "_path", None)
+    return path if path and os.path.isfile(path) else None
+
+
+class DriverCache:
+    """
+    驱动解析结果，保存在 JSON 文件中，按浏览器可执行文件分别记录
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: 缓存文件，为None时使用 DEFAULT_CACHE_FILE，为False时只在本进程内缓存
+        """
+        self.path = DEFAULT_CACHE_FILE if path is None else path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"驱动缓存文件无法读取: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        data = json.dumps(self._entries, ensure_ascii=False, indent=2)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_file = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.path)
+        except OSError as e:
+            logger.warning(f"保存驱动缓存失败: {e}")
+
+    @staticmethod
+    def _key(browser):
+        # 找不到浏览器时(如通过 PATH 以外的方式安装)仍然缓存，靠启动失败时作废
+        return browser or "default"
+
+    def lookup(self, binary=None):
+        """
+        可直接使用的缓存记录
+
+        浏览器文件未变化且驱动文件仍存在时返回记录；浏览器文件变化但版本相同时更新记录后返回。
+        检查的是记录中实际使用的浏览器 browser_path，它可能与 binary 指向的不同
+
+        Args:
+            binary: 启动前的 ChromeOptions.binary_location
+
+        Returns:
+            dict: driver_path, method, browser_path, browser_version, browser_mtime, browser_size, resolved_at；
+                  没有可用记录时返回None
+        """
+        key = self._key(find_browser(binary))
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            browser = entry.get("browser_path") or find_browser(binary)
+            if not os.path.isfile(entry.get("driver_path") or ""):
+                # 驱动已被删除，如 webdriver_manager 清理了缓存
+                del self._entries[key]
+                self._save()
+                return None
+            stat = browser_stat(browser)
+            if stat is None or stat == (entry.get("browser_mtime"), entry.get("browser_size")):
+                return dict(entry)
+
+        # 浏览器文件变化(升级或重新安装)，版本相同时驱动仍然可用
+        version = browser_version(browser)
+        with self._lock:
+            if version and version == entry.get("browser_version"):
+                entry["browser_mtime"], entry["browser_size"] = stat
+                self._save()
+                return dict(entry)
+            logger.info(f"浏览器版本变化 {entry.get('browser_version')} -> {version}，重新解析驱动")
+            self._entries.pop(key, None)
+            self._save()
+        return None
+
+    def record(self, driver, method, binary=None, driver_path=None, browser_path=None):
+        """
+        记录一次成功的解析
+
+        Args:
+            driver: 已启动的 WebDriver，从中读取驱动路径和浏览器版本
+            method: 解析方法，见模块说明
+            binary: 启动前的 ChromeOptions.binary_location，决定记录的键
+            driver_path: 驱动路径，为None时从 driver.service 读取
+            browser_path: 启动后的 ChromeOptions.binary_location(Selenium Manager 可能已设置)，
+                          为None时按 binary 查找
+
+        Returns:
+            dict: 写入的记录；无法确定驱动路径时返回None
+        """
+        driver_path = driver_path or driver_path_of(driver)
+        if not driver_path:
+            return None
+        browser = find_browser(browser_path or binary)
+        stat = browser_stat(browser) or (None, None)
+        capabilities = getattr(driver, "capabilities", None) or {}
+        version = capabilities.get("browserVersion") or capabilities.get("version")
+        if not version and browser:
+            version = browser_version(browser)
+        entry = {
+            "driver_path": os.path.abspath(driver_path),
+            "method": method,
+            "browser_path": browser,
+            "browser_version": version,
+            "browser_mtime": stat[0],
+            "browser_size": stat[1],
+            "resolved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            self._entries[self._key(find_browser(binary))] = entry
+            self._save()
+        return entry
+
+    def invalidate(self, binary=None):
+        """作废某个浏览器的记录，如缓存的驱动无法启动浏览器时"""
+        with self._lock:
+            if self._entries.pop(self._key(find_browser(binary)), None) is not None:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """进程内共享的驱动缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DriverCache()
+        return _cache
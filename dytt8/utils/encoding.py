@@ -0,0 +1,173 @@
+"""
+网页编码识别与解码
+直接对HTTP响应的原始字节解码一次，替代对每个字符串的乱码修复
+"""
+import re
+import codecs
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+
+# GB2312/GBK 都是 GB18030 的子集，统一按超集解码，避免生僻字解码失败
+_GB_FAMILY = {"gb2312", "gbk", "gb18030", "gb_2312-80", "x-gbk", "cp936", "euc-cn", "hz-gb-2312"}
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-]+)""", re.IGNORECASE)
+_HEADER_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([A-Za-z0-9_\-]+)""", re.IGNORECASE)
+
+# 只在页面开头查找 <meta charset>
+META_SNIFF_BYTES = 4096
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# 每个站点的编码判定结果缓存: host -> charset
+_host_charsets = {}
+_host_lock = threading.Lock()
+
+
+def normalize_charset(charset: Optional[str]) -> Optional[str]:
+    """
+    规范化编码名称，GB系列统一映射为 gb18030，无法识别的编码返回None
+
+    Args:
+        charset: 页面声明的编码名称
+
+    Returns:
+        Python可用的编码名称
+    """
+    if not charset:
+        return None
+    charset = charset.strip().lower()
+    if charset in _GB_FAMILY:
+        return "gb18030"
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def sniff_charset(raw: bytes, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    从BOM、Content-Type头和 <meta charset> 中识别声明的编码
+
+    Args:
+        raw: 页面原始字节
+        content_type: HTTP响应的Content-Type头
+
+    Returns:
+        规范化后的编码名称，未声明时返回None
+    """
+    for bom, charset in _BOMS:
+        if raw.startswith(bom):
+            return charset
+
+    if content_type:
+        match = _HEADER_CHARSET_RE.search(content_type)
+        if match:
+            charset = normalize_charset(match.group(1))
+            if charset:
+                return charset
+
+    match = _META_CHARSET_RE.search(raw[:META_SNIFF_BYTES])
+    if match:
+        return normalize_charset(match.group(1).decode("ascii", "ignore"))
+    return None
+
+
+def _host_of(url: Optional[str]) -> Optional[str]:
+    """获取URL中的主机名"""
+    if not url:
+        return None
+    return urlparse(url).hostname
+
+
+def decode_html(raw: bytes, url: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """
+    将网页原始字节解码为文本
+
+    依次尝试: 声明的编码(BOM/HTTP头/<meta>) -> 该站点已缓存的编码 -> UTF-8 -> GB18030,
+    成功解码后缓存站点编码，同站点未声明编码的页面直接沿用，无需逐个试错
+
+    Args:
+        raw: 页面原始字节
+        url: 页面URL，用于按站点缓存编码
+        content_type: HTTP响应的Content-Type头
+
+    Returns:
+        解码后的文本
+    """
+    if not raw:
+        return ""
+
+    host = _host_of(url)
+    candidates = []
+    for charset in (sniff_charset(raw, content_type),
+                    _host_charsets.get(host) if host else None,
+                    "utf-8", "gb18030"):
+        if charset and charset not in candidates:
+            candidates.append(charset)
+
+    for charset in candidates:
+        try:
+            text = raw.decode(charset)
+        except UnicodeDecodeError:
+            continue
+        if host and _host_charsets.get(host) != charset:
+            with _host_lock:
+                _host_charsets[host] = charset
+        return text
+
+    # 所有编码都无法严格解码时，按声明的编码(或GB18030)替换非法字节
+    return raw.decode(candidates[0], errors="replace")
+
+
+def decode_response(response) -> str:
+    """
+    解码 requests 的响应内容，替代 response.encoding = 'gb2312' 再读取 response.text
+
+    Args:
+        response: requests.Response 对象
+
+    Returns:
+        解码后的文本
+    """
+    headers = getattr(response, "headers", None) or {}
+    return decode_html(response.content, url=response.url, content_type=headers.get("Content-Type"))
+
+
+def fix_mojibake(text: str) -> str:
+    """
+    修复被按 latin1 误解码的中文文本
+
+    浏览器返回的文本已按页面编码正确解码，只有全部字符都在 latin1 范围内时
+    才可能是乱码，其余情况直接返回，不再对每个字符串做两次失败的重新编码
+
+    Args:
+        text: 待修复的文本
+
+    Returns:
+        修复后的文本
+    """
+    if not text:
+        return ""
+    if text.isascii():
+        return text
+    try:
+        raw = text.encode("latin1")
+    except UnicodeEncodeError:
+        return text
+    for charset in ("utf-8", "gb18030"):
+        try:
+            return raw.decode(charset)
+        except UnicodeDecodeError:
+            continue
+    return text
+
+
+def clear_charset_cache():
+    """清空站点编码缓存"""
+    with _host_lock:
+        _host_charsets.clear()
@@ -62,6 +62,9 @@ def main():
                 # 清理缓存
                 shutil.rmtree(str(cache_dir))
                 os.makedirs(str(cache_dir))
+                # setup_chrome_driver 记录的驱动路径也一并作废
+                from dytt8.utils.driver_cache import get_cache
+                get_cache().clear()
                 print("缓存目录已清理")
         else:
             print("缓存目录不存在")
@@ -0,0 +1,267 @@
+"""
+下载链接解析与索引
+从详情页中提取全部下载链接，解码 thunder:// (迅雷)、flashget://、qqdl:// 的 base64 地址，
+解析 magnet 的 btih/dn/xl 和 ed2k 的文件名/大小/哈希，写入 SQLite 的 links 表；
+表按 infohash、ed2k 哈希、(清晰度, 大小) 建索引，“共用同一 infohash 的电影”、
+“最大的 1080p 版本”等查询直接走索引
+
+用法:
+    parsed = links.parse_link("thunder://QUFtYWduZXQ6P3h0PXVybjpidGloOi4uLlpa")
+    with links.LinkIndex() as index:
+        index.write(movie)   # movie["download_links"] 或 movie["download_link"]
+        index.largest("1080p")
+"""
+import os
+import re
+import time
+import html
+import json
+import base64
+import binascii
+import sqlite3
+import threading
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from dytt8.utils.sinks import Sink
+
+DEFAULT_LINKS_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "links.db")
+
+# 页面中的下载链接；href 中的 &amp; 先经 html.unescape 还原
+LINK_PATTERN = re.compile(
+    r"magnet:\?[^\s\"'<>]+"
+    r"|ed2k://\|file\|[^\"'<>]+?\|/"
+    r"|(?:thunder|flashget|qqdl)://[A-Za-z0-9+/=_-]+"
+    r"|(?:https?|ftp)://[^\s\"'<>]+?\.torrent\b"
+    r"|ftp://[^\s\"'<>]+",
+    re.IGNORECASE,
+)
+
+RESOLUTION_PATTERN = re.compile(r"(?<!\d)(2160|1080|720|576|480)[pPiI]|(?<![A-Za-z0-9])4K(?![A-Za-z0-9])")
+
+# 迅雷等专用链接的 base64 内容去掉的前后缀
+_WRAPPERS = {"thunder": ("AA", "ZZ"), "flashget": ("[FLASHGET]", "[FLASHGET]"), "qqdl": ("", "")}
+
+
+def _b64decode(text):
+    text = text.replace("-", "+").replace("_", "/")
+    data = base64.b64decode(text + "=" * (-len(text) % 4))
+    for encoding in ("utf-8", "gbk"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="replace")
+
+
+def decode_wrapped(url):
+    """
+    解码 thunder:// flashget:// qqdl:// 链接
+
+    Returns:
+        str: 原始链接，不是这几类链接或无法解码时原样返回
+    """
+    scheme, _, payload = url.partition("://")
+    wrapper = _WRAPPERS.get(scheme.lower())
+    if wrapper is None:
+        return url
+    # flashget 链接末尾可能带 &来源 参数
+    payload = payload.split("&", 1)[0].rstrip("/")
+    try:
+        decoded = _b64decode(payload)
+    except (binascii.Error, ValueError):
+        return url
+    prefix, suffix = wrapper
+    if decoded.startswith(prefix) and decoded.endswith(suffix):
+        decoded = decoded[len(prefix):len(decoded) - len(suffix)]
+    return decoded.strip()
+
+
+def normalize_infohash(value):
+    """
+    BitTorrent infohash 统一为40位小写十六进制(32位 base32 的转换为十六进制)
+
+    Returns:
+        str: 无法识别时返回None
+    """
+    value = (value or "").strip()
+    if re.fullmatch(r"[0-9a-fA-F]{40}", value):
+        return value.lower()
+    if re.fullmatch(r"[A-Za-z2-7]{32}", value):
+        return base64.b32decode(value.upper()).hex()
+    return None
+
+
+def resolution_of(*texts):
+    """从文件名等文本中识别清晰度，如 1080p"""
+    for text in texts:
+        match = RESOLUTION_PATTERN.search(text or "")
+        if match:
+            return f"{match.group(1) or '2160'}p"
+    return None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_link(url):
+    """
+    解析一个下载链接
+
+    Returns:
+        dict: url(解码后的链接), original(thunder 等原始链接), scheme(magnet/ed2k/torrent/ftp/http),
+              infohash, ed2k_hash, name, size(字节), resolution, trackers；未识别的字段为None
+    """
+    original = html.unescape(url.strip())
+    decoded = decode_wrapped(original)
+    link = {"url": decoded, "original": original if decoded != original else None, "scheme": None,
+            "infohash": None, "ed2k_hash": None, "name": None, "size": None, "resolution": None, "trackers": []}
+    lower = decoded.lower()
+
+    if lower.startswith("magnet:?"):
+        link["scheme"] = "magnet"
+        params = parse_qs(decoded[len("magnet:?"):])
+        for xt in params.get("xt", []):
+            if xt.lower().startswith("urn:btih:"):
+                link["infohash"] = normalize_infohash(xt[len("urn:btih:"):])
+                break
+        link["name"] = (params.get("dn") or [None])[0]
+        link["size"] = _int((params.get("xl") or [None])[0])
+        link["trackers"] = params.get("tr", [])
+    elif lower.startswith("ed2k://"):
+        link["scheme"] = "ed2k"
+        # ed2k://|file|名称|大小|MD4哈希|/
+        parts = decoded.split("|")
+        if len(parts) >= 5 and parts[1].lower() == "file":
+            link["name"] = unquote(parts[2])
+            link["size"] = _int(parts[3])
+            link["ed2k_hash"] = parts[4].lower() if re.fullmatch(r"[0-9a-fA-F]{32}", parts[4]) else None
+    else:
+        path = unquote(urlsplit(decoded).path)
+        link["scheme"] = "torrent" if path.lower().endswith(".torrent") else (urlsplit(decoded).scheme.lower() or None)
+        link["name"] = os.path.basename(path) or None
+
+    link["resolution"] = resolution_of(link["name"], decoded)
+    return link
+
+
+def _key(link):
+    return link["infohash"] or link["ed2k_hash"] or link["url"]
+
+
+def extract_links(text):
+    """
+    提取页面HTML或文本中的全部下载链接，按 infohash / ed2k 哈希 / 链接去重
+
+    Returns:
+        list: parse_link 的结果，按在页面中出现的顺序
+    """
+    found = {}
+    for match in LINK_PATTERN.finditer(html.unescape(text or "")):
+        link = parse_link(match.group(0))
+        found.setdefault(_key(link), link)
+    return list(found.values())
+
+
+def movie_links(movie):
+    """电影的全部下载链接: download_links 字段，没有时解析 download_link"""
+    links = movie.get("download_links")
+    if isinstance(links, str):
+        # 从 CSV 等格式读回的是 JSON 文本
+        try:
+            links = json.loads(links)
+        except ValueError:
+            links = None
+    if links:
+        return [link if isinstance(link, dict) else parse_link(link) for link in links]
+    download_link = movie.get("download_link")
+    return extract_links(download_link) if download_link else []
+
+
+class LinkIndex(Sink):
+    """
+    links 表，可作为流式输出(write 写入一部电影的全部链接)，也提供按索引的查询
+    """
+
+    def __init__(self, path=None, **kwargs):
+        super().__init__(path or DEFAULT_LINKS_DB, **kwargs)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS links (
+                id INTEGER PRIMARY KEY, movie_url TEXT NOT NULL, title TEXT, url TEXT NOT NULL,
+                original TEXT, scheme TEXT, infohash TEXT, ed2k_hash TEXT, name TEXT, size INTEGER,
+                resolution TEXT, added REAL, UNIQUE (movie_url, url));
+            CREATE INDEX IF NOT EXISTS links_infohash ON links (infohash);
+            CREATE INDEX IF NOT EXISTS links_ed2k_hash ON links (ed2k_hash);
+            CREATE INDEX IF NOT EXISTS links_resolution_size ON links (resolution, size);
+            CREATE INDEX IF NOT EXISTS links_movie_url ON links (movie_url);
+        """)
+
+    def _write(self, movie):
+        movie_url = movie.get("source_url") or movie.get("link") or movie.get("url") or movie.get("title")
+        if not movie_url:
+            return
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO links (movie_url, title, url, original, scheme, infohash, ed2k_hash, name, "
+            "size, resolution, added) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(movie_url, movie.get("title"), link["url"], link.get("original"), link.get("scheme"),
+              link.get("infohash"), link.get("ed2k_hash"), link.get("name"), link.get("size"),
+              link.get("resolution"), now) for link in movie_links(movie)])
+
+    def _sync(self):
+        self._db.commit()
+
+    def _close(self):
+        self._db.close()
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, parameters)]
+
+    def movies_by_infohash(self, infohash):
+        """共用同一 infohash 的电影"""
+        return self._query("SELECT DISTINCT movie_url, title FROM links WHERE infohash = ?",
+                           (normalize_infohash(infohash) or infohash.lower(),))
+
+    def movies_by_ed2k_hash(self, ed2k_hash):
+        """共用同一 ed2k 哈希的电影"""
+        return self._query("SELECT DISTINCT movie_url, title FROM links WHERE ed2k_hash = ?", (ed2k_hash.lower(),))
+
+    def largest(self, resolution="1080p", title=None, limit=1):
+        """
+        指定清晰度中文件最大的版本
+
+        Args:
+            resolution: 清晰度，如 1080p
+            title: 只在标题包含该文本的电影中查找
+            limit: 返回条数
+        """
+        sql = "SELECT * FROM links WHERE resolution = ? AND size IS NOT NULL"
+        parameters = [resolution]
+        if title:
+            sql += " AND title LIKE ?"
+            parameters.append(f"%{title}%")
+        return self._query(sql + " ORDER BY size DESC LIMIT ?", parameters + [limit])
+
+    def links_for(self, movie_url):
+        """一部电影的全部链接"""
+        return self._query("SELECT * FROM links WHERE movie_url = ? ORDER BY id", (movie_url,))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """进程内共享的链接索引"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LinkIndex()
+        return _index
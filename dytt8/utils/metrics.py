@@ -0,0 +1,290 @@
+"""
+进程内运行指标
+计数器、仪表和直方图，按 Prometheus 文本格式(0.0.4)输出，供 API 的 /metrics 抓取
+
+计数器和直方图按线程分片: 每个线程只写自己的字典，递增不加锁；
+新线程登记分片和输出时，已结束线程的分片折叠进汇总值，每请求一个线程时分片数也只与存活线程数相当
+
+用法:
+    from dytt8.utils import metrics
+    metrics.PAGES.inc("dytt8", "fetched")
+    print(metrics.render())
+"""
+import math
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认的延迟分桶(秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """指标基类，维护按线程分片的数据"""
+
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # (线程, 分片字典)
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = self._local.values = {}
+            with self._lock:
+                self._retire_dead()
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def _retire_dead(self):
+        """把已结束线程的分片折叠进汇总值，调用方持有 self._lock"""
+        alive = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                alive.append((thread, values))
+            else:
+                for key, value in values.items():
+                    self._merge(self._retired, key, value)
+        self._shards = alive
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {labels}")
+        return tuple(str(label) for label in labels)
+
+    def _merge(self, target, key, value):
+        raise NotImplementedError
+
+    def _collect(self):
+        """合并所有分片，返回 {标签元组: 值}"""
+        with self._lock:
+            self._retire_dead()
+            merged = {}
+            for key, value in self._retired.items():
+                self._merge(merged, key, value)
+            for _, values in self._shards:
+                # dict.copy() 在 GIL 下一次完成，不会与所属线程的写入冲突
+                for key, value in values.copy().items():
+                    self._merge(merged, key, value)
+        return merged
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        """该指标的文本格式"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type_name = "counter"
+
+    def inc(self, *labels, amount=1):
+        """按标签值递增"""
+        values = self._shard()
+        key = self._key(labels)
+        values[key] = values.get(key, 0) + amount
+
+    def _merge(self, target, key, value):
+        target[key] = target.get(key, 0) + value
+
+    def value(self, *labels):
+        """当前合计值"""
+        return self._collect().get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._collect().items())]
+
+
+class Gauge(Counter):
+    """
+    可增可减的仪表
+
+    inc/dec 可以在不同线程中成对调用(分片合计即为当前值)；
+    set_function 注册的回调在输出时调用，返回 {标签元组: 值} 或单个数值
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def dec(self, *labels, amount=1):
+        """按标签值递减"""
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function):
+        """输出时调用 function 取值，替代 inc/dec 的累计值"""
+        self._function = function
+
+    def _collect(self):
+        if self._function is None:
+            return super()._collect()
+        value = self._function()
+        if isinstance(value, dict):
+            return {tuple(str(label) for label in (key if isinstance(key, tuple) else (key,))): v
+                    for key, v in value.items()}
+        return {(): value}
+
+
+class Histogram(_Metric):
+    """累积分桶直方图，同时记录总和与次数"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, *labels):
+        """记录一次观测值"""
+        values = self._shard()
+        key = self._key(labels)
+        counts = values.get(key)
+        if counts is None:
+            # 各桶的计数(非累积)、总和
+            counts = values[key] = [0] * len(self.buckets) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        counts[-1] += value
+
+    def _merge(self, target, key, value):
+        current = target.get(key)
+        if current is None:
+            target[key] = list(value)
+        else:
+            for i, item in enumerate(value):
+                current[i] += item
+
+    def count(self, *labels):
+        """观测次数"""
+        counts = self._collect().get(self._key(labels))
+        return sum(counts[:-1]) if counts else 0
+
+    def _samples(self):
+        lines = []
+        for key, counts in sorted(self._collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """指标集合"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """注册指标，同名时返回已注册的实例"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """所有指标的文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    """在默认集合中创建或取回计数器"""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    """在默认集合中创建或取回仪表"""
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """在默认集合中创建或取回直方图"""
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render():
+    """默认集合的文本格式"""
+    return REGISTRY.render()
+
+
+# 各模块共用的指标
+PAGES = counter("dytt8_pages_total", "按数据源统计的页面抓取结果 (fetched/failed/cached)", ("source", "result"))
+CHROME_SESSIONS = gauge("dytt8_chrome_sessions", "当前打开的 Chrome 会话数")
+SCHEDULER_LAG = histogram("dytt8_scheduler_task_lag_seconds", "调度任务实际开始时间与计划时间之差",
+                          ("task_type",), buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 900))
+
+
+def track_chrome_session(driver):
+    """
+    记录一个 Chrome 会话，会话计数在 driver.quit() 时减一
+
+    Args:
+        driver: Selenium WebDriver 实例
+
+    Returns:
+        原 driver
+    """
+    if driver is None or getattr(driver, "_dytt8_tracked", False):
+        return driver
+    quit_driver = driver.quit
+    closed = threading.Event()
+
+    def quit():
+        if not closed.is_set():
+            closed.set()
+            CHROME_SESSIONS.dec()
+        return quit_driver()
+
+    try:
+        driver.quit = quit
+        driver._dytt8_tracked = True
+    except AttributeError:
+        return driver
+    CHROME_SESSIONS.inc()
+    return driver
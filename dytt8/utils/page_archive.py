@@ -0,0 +1,564 @@
+"""
+网页语料录制与回放
+在真实抓取时把页面(URL、响应头、原始字节)写入 WARC 格式的压缩归档，
+之后通过 requests 回放适配器、Selenium 回放驱动或本地HTTP服务器离线重放，
+使爬虫、解析器和API可以在不访问线上网站的情况下做确定性的压测
+
+通过环境变量启用(子进程会继承设置):
+    DYTT8_RECORD_ARCHIVE=corpus.warc.gz   录制模式
+    DYTT8_REPLAY_ARCHIVE=corpus.warc.gz   回放模式
+    DYTT8_REPLAY_OVER_HTTP=1              回放时 HTTP 引擎也经本地服务器收发(走真实socket)
+
+命令行:
+    python -m dytt8.utils.page_archive list corpus.warc.gz
+    python -m dytt8.utils.page_archive serve corpus.warc.gz --port 8000
+"""
+import os
+import sys
+import time
+import zlib
+import uuid
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.client import responses as HTTP_REASONS
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from dytt8.utils.metrics import track_chrome_session
+
+RECORD_ENV = "DYTT8_RECORD_ARCHIVE"
+REPLAY_ENV = "DYTT8_REPLAY_ARCHIVE"
+REPLAY_HTTP_ENV = "DYTT8_REPLAY_OVER_HTTP"
+
+# 正文已由 requests 解压、解分块，这些头不能原样重放
+_SKIP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+
+# 建立索引时每次读取的字节数
+_SCAN_CHUNK = 1 << 16
+
+
+# 回放时每次加载页面后调用 listener(url, elapsed)，供基准测试统计单页延迟
+fetch_listeners = []
+
+
+def _notify_fetch(url, elapsed):
+    for listener in fetch_listeners:
+        listener(url, elapsed)
+
+
+class ArchivedPage(NamedTuple):
+    """归档中的一个页面"""
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+def _path_key(url: str) -> str:
+    """URL 的 路径?查询 部分，用于忽略协议和主机的查找"""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def _parse_headers(block: bytes) -> Dict[str, str]:
+    """解析 'Name: value' 形式的头部行"""
+    headers = {}
+    for line in block.decode("latin1").split("\r\n"):
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip()] = value.strip()
+    return headers
+
+
+class PageArchive:
+    """
+    WARC 格式的页面归档
+
+    每条记录单独压缩为一个 gzip 成员并追加到文件末尾，打开时只扫描一遍建立
+    URL -> (偏移, 长度) 索引，读取页面时只解压对应的成员
+    """
+
+    def __init__(self, path: str):
+        """
+        打开或创建归档
+
+        Args:
+            path: 归档文件路径 (*.warc.gz)
+        """
+        self.path = path
+        self._index = {}
+        self._path_index = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._build_index()
+
+    def _build_index(self):
+        """
+        扫描文件中的所有 gzip 成员，建立索引
+        按块读取并把上一个成员剩余的数据接着解压，耗时与文件大小成正比
+        """
+        pos = 0
+        with open(self.path, "rb") as f:
+            pending = f.read(_SCAN_CHUNK)
+            while pending:
+                decompressor = zlib.decompressobj(wbits=31)
+                head = b""
+                fed = 0
+                while True:
+                    if not pending:
+                        pending = f.read(_SCAN_CHUNK)
+                        if not pending:
+                            break
+                    fed += len(pending)
+                    output = decompressor.decompress(pending)
+                    # 只保留到 WARC 头部结束，正文不需要
+                    if b"\r\n\r\n" not in head:
+                        head += output
+                    pending = decompressor.unused_data
+                    if decompressor.eof:
+                        break
+                if not decompressor.eof:
+                    print(f"归档文件末尾的记录不完整，已忽略: {self.path}")
+                    break
+                length = fed - len(pending)
+                url = _parse_headers(head.split(b"\r\n\r\n", 1)[0]).get("WARC-Target-URI")
+                if url:
+                    self._add_to_index(url, pos, length)
+                pos += length
+
+    def _add_to_index(self, url, offset, length):
+        """同一URL多次录制时以最后一次为准"""
+        self._index[url] = (offset, length)
+        self._path_index[_path_key(url)] = url
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, url):
+        return self.resolve(url) is not None
+
+    def urls(self):
+        """归档中的全部URL"""
+        return list(self._index)
+
+    def add(self, url: str, body: bytes, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        """
+        追加一条响应记录
+
+        Args:
+            url: 页面URL
+            body: 响应正文原始字节
+            status: HTTP状态码
+            headers: 响应头
+        """
+        http_headers = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}"]
+        for name, value in (headers or {}).items():
+            if name.lower() not in _SKIP_HEADERS:
+                http_headers.append(f"{name}: {value}")
+        http_headers.append(f"Content-Length: {len(body)}")
+        block = ("\r\n".join(http_headers) + "\r\n\r\n").encode("latin1", "replace") + body
+
+        warc_headers = (
+            "WARC/1.0\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            "Content-Type: application/http; msgtype=response\r\n"
+            f"Content-Length: {len(block)}\r\n\r\n"
+        ).encode("utf-8")
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        member = compressor.compress(warc_headers + block + b"\r\n\r\n") + compressor.flush()
+
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(member)
+            self._add_to_index(url, offset, len(member))
+
+    def resolve(self, url: str, host: Optional[str] = None) -> Optional[str]:
+        """
+        查找归档中与URL对应的记录URL
+
+        先按完整URL匹配，再按 路径?查询 匹配(忽略协议和主机，本地服务器和
+        www.dytt8.com/www.dytt8.net 等镜像域名可以共用同一份归档)
+
+        Args:
+            url: 完整URL或以 / 开头的路径
+            host: 请求的主机名，路径查找时优先匹配该主机
+        """
+        if url in self._index:
+            return url
+        key = _path_key(url)
+        if host:
+            for scheme in ("https", "http"):
+                candidate = f"{scheme}://{host}{key}"
+                if candidate in self._index:
+                    return candidate
+        return self._path_index.get(key)
+
+    def get(self, url: str, host: Optional[str] = None) -> Optional[ArchivedPage]:
+        """
+        读取页面
+
+        Args:
+            url: 完整URL或以 / 开头的路径
+            host: 请求的主机名
+
+        Returns:
+            ArchivedPage，不在归档中时返回None
+        """
+        recorded_url = self.resolve(url, host)
+        if recorded_url is None:
+            return None
+        offset, length = self._index[recorded_url]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            record = zlib.decompress(f.read(length), wbits=31)
+
+        _, http_message = record.split(b"\r\n\r\n", 1)
+        head, body = http_message.split(b"\r\n\r\n", 1)
+        status_line, _, header_block = head.partition(b"\r\n")
+        headers = _parse_headers(header_block)
+        body = body[:int(headers.get("Content-Length", len(body)))]
+        return ArchivedPage(recorded_url, int(status_line.split()[1]), headers, body)
+
+
+def record_response(archive: PageArchive):
+    """
+    生成 requests 的 response 钩子，把每个响应写入归档
+
+    用法: session.hooks["response"].append(record_response(archive))
+    """
+    def hook(response, *args, **kwargs):
+        archive.add(response.url, response.content, response.status_code, dict(response.headers))
+        return response
+    return hook
+
+
+try:
+    import requests
+    from requests.adapters import BaseAdapter, HTTPAdapter
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    class ReplayAdapter(BaseAdapter):
+        """requests 传输适配器，从归档返回响应而不访问网络"""
+
+        def __init__(self, archive: PageArchive):
+            super().__init__()
+            self.archive = archive
+
+        def send(self, request, **kwargs):
+            start = time.perf_counter()
+            page = self.archive.get(request.url, urlsplit(request.url).hostname)
+            response = requests.Response()
+            response.url = request.url
+            response.request = request
+            if page is None:
+                response.status_code = 404
+                response.reason = "Not In Archive"
+                response._content = b""
+            else:
+                response.status_code = page.status
+                response.reason = HTTP_REASONS.get(page.status, "")
+                response.headers = CaseInsensitiveDict(page.headers)
+                response._content = page.body
+            response.encoding = get_encoding_from_headers(response.headers)
+            _notify_fetch(request.url, time.perf_counter() - start)
+            return response
+
+        def close(self):
+            pass
+
+    class ServerReplayAdapter(HTTPAdapter):
+        """把请求转发到本地归档服务器的传输适配器，保留原始Host头"""
+
+        def __init__(self, server: "ArchiveServer"):
+            super().__init__()
+            self.server = server
+
+        def send(self, request, **kwargs):
+            url = request.url
+            request.headers["Host"] = urlsplit(url).netloc
+            request.url = self.server.url_for(url)
+            start = time.perf_counter()
+            response = super().send(request, **kwargs)
+            # 读取完整正文，使延迟包含传输时间
+            response.content
+            _notify_fetch(url, time.perf_counter() - start)
+            response.url = url
+            return response
+except ImportError:
+    ReplayAdapter = None
+    ServerReplayAdapter = None
+
+
+def replay_session(session, archive: PageArchive):
+    """让 requests.Session 的所有请求都从归档回放"""
+    adapter = ReplayAdapter(archive)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class _DriverProxy:
+    """WebDriver 代理，除 get() 外的属性和方法都转发给原驱动"""
+
+    def __init__(self, driver):
+        self._driver = driver
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class RecordingDriver(_DriverProxy):
+    """
+    录制 Selenium 打开的页面
+
+    浏览器不暴露原始响应，这里保存渲染后的 page_source(UTF-8)，
+    按原URL写入归档，回放时与 HTTP 引擎录制的页面可以互换使用
+    """
+
+    def __init__(self, driver, archive: PageArchive):
+        super().__init__(driver)
+        self._archive = archive
+
+    def get(self, url):
+        self._driver.get(url)
+        self._archive.add(url, self._driver.page_source.encode("utf-8"), 200,
+                          {"Content-Type": "text/html; charset=utf-8", "X-Dytt8-Recorded-By": "selenium"})
+
+
+class ReplayDriver(_DriverProxy):
+    """让 Selenium 从本地归档服务器加载页面"""
+
+    def __init__(self, driver, server: "ArchiveServer"):
+        super().__init__(driver)
+        self._server = server
+
+    def get(self, url):
+        start = time.perf_counter()
+        self._driver.get(self._server.url_for(url))
+        _notify_fetch(url, time.perf_counter() - start)
+
+
+class _ArchiveRequestHandler(BaseHTTPRequestHandler):
+    """按请求路径(或代理模式下的完整URL)返回归档中的页面"""
+
+    archive = None
+
+    def do_GET(self):
+        host = (self.headers.get("Host") or "").split(":")[0]
+        page = self.archive.get(self.path, host)
+        if page is None:
+            self.server.record_request(0, found=False)
+            self.send_error(404, "Not In Archive")
+            return
+        self.send_response(page.status)
+        for name, value in page.headers.items():
+            if name.lower() not in _SKIP_HEADERS:
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(page.body)))
+        self.end_headers()
+        self.wfile.write(page.body)
+        self.server.record_request(len(page.body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StatsHTTPServer(ThreadingHTTPServer):
+    """统计请求数和发送字节数的HTTP服务器"""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = {"requests": 0, "not_found": 0, "bytes_sent": 0}
+        self._stats_lock = threading.Lock()
+
+    def record_request(self, nbytes, found=True):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_sent"] += nbytes
+            if not found:
+                self.stats["not_found"] += 1
+
+
+class ArchiveServer:
+    """
+    在后台线程中运行的本地HTTP服务器，提供归档中的页面
+
+    页面中的相对链接(如 /html/gndy/...)会落到同一服务器上，因此Selenium可以
+    像访问线上网站一样翻页和点击
+    """
+
+    def __init__(self, archive: PageArchive, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化服务器
+
+        Args:
+            archive: 页面归档
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+        """
+        handler = type("ArchiveRequestHandler", (_ArchiveRequestHandler,), {"archive": archive})
+        self.archive = archive
+        self.httpd = _StatsHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def stats(self):
+        """已处理的请求数、未命中数和发送的正文字节数"""
+        return dict(self.httpd.stats)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, url: str) -> str:
+        """把线上URL转换为本地服务器上的URL"""
+        if url.startswith(self.url):
+            return url
+        return self.url + _path_key(url)
+
+    def start(self):
+        """启动服务器线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+# 由环境变量启用的全局录制/回放设置
+_active = {}
+_active_lock = threading.Lock()
+
+
+def active_mode():
+    """
+    当前进程的录制/回放设置
+
+    Returns:
+        ("record" | "replay", PageArchive)，未启用时返回 (None, None)
+    """
+    replay_path = os.environ.get(REPLAY_ENV)
+    record_path = os.environ.get(RECORD_ENV)
+    if replay_path:
+        mode, path = "replay", replay_path
+    elif record_path:
+        mode, path = "record", record_path
+    else:
+        return None, None
+
+    with _active_lock:
+        if _active.get("key") != (mode, path):
+            if _active.get("server"):
+                _active["server"].stop()
+            _active.clear()
+            _active.update(key=(mode, path), archive=PageArchive(path), server=None)
+            print(f"{'回放' if mode == 'replay' else '录制'}网页归档: {path}")
+        return mode, _active["archive"]
+
+
+def _shared_server(archive):
+    """回放模式下所有Selenium驱动共用的本地服务器"""
+    with _active_lock:
+        if _active.get("server") is None:
+            _active["server"] = ArchiveServer(archive).start()
+        return _active["server"]
+
+
+def replay_server():
+    """回放模式下已启动的本地服务器，未启动时返回None"""
+    return _active.get("server")
+
+
+def instrument_session(session):
+    """
+    按环境变量为 requests.Session 启用录制或回放，未启用时原样返回
+    """
+    mode, archive = active_mode()
+    if mode == "replay" and os.environ.get(REPLAY_HTTP_ENV) == "1":
+        adapter = ServerReplayAdapter(_shared_server(archive))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    elif mode == "replay":
+        replay_session(session, archive)
+    elif mode == "record":
+        session.hooks["response"].append(record_response(archive))
+    return session
+
+
+def instrument_driver(driver):
+    """
+    按环境变量为 Selenium 驱动启用录制或回放，未启用时原样返回
+    """
+    if driver is None:
+        return driver
+    track_chrome_session(driver)
+    mode, archive = active_mode()
+    if mode == "replay":
+        return ReplayDriver(driver, _shared_server(archive))
+    if mode == "record":
+        return RecordingDriver(driver, archive)
+    return driver
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="网页归档工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="列出归档中的页面")
+    list_parser.add_argument("archive", help="归档文件路径")
+
+    serve_parser = subparsers.add_parser("serve", help="用本地HTTP服务器提供归档中的页面")
+    serve_parser.add_argument("archive", help="归档文件路径")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    serve_parser.add_argument("--port", type=int, default=8000, help="监听端口")
+
+    args = parser.parse_args()
+    if not os.path.exists(args.archive):
+        print(f"归档文件不存在: {args.archive}")
+        sys.exit(1)
+    archive = PageArchive(args.archive)
+
+    if args.command == "list":
+        for url in archive.urls():
+            page = archive.get(url)
+            print(f"{page.status}  {len(page.body):>8}  {url}")
+        print(f"共 {len(archive)} 个页面")
+    else:
+        server = ArchiveServer(archive, args.host, args.port)
+        print(f"提供 {len(archive)} 个页面: {server.url}  (Ctrl+C 退出)")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+按需性能剖析
+为单次爬取任务、调度任务或 API 请求生成剖析文件，保存在 dytt8/data/profiles/
+
+两种方式:
+    cprofile  确定性剖析，只覆盖开启剖析的线程，输出 pstats 文件 (*.prof)
+    sample    定时采样所有线程的调用栈，开销小且覆盖流水线的工作线程，
+              输出折叠栈文本 (*.folded)，可直接交给 flamegraph.pl / speedscope；
+              current_thread_only=True 时只采样开启剖析的线程，用于多线程服务器中的单个请求
+
+用法:
+    with profiling.profile("scrape_dytt8", mode="sample") as run:
+        scraper.scrape()
+    print(run.file)
+
+目录中只保留最新的 DYTT8_PROFILE_KEEP 个文件(默认50)
+"""
+import os
+import sys
+import pstats
+import cProfile
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger("dytt8.profiling")
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "profiles")
+MODES = ("cprofile", "sample")
+EXTENSIONS = {"cprofile": ".prof", "sample": ".folded"}
+
+
+def parse_mode(value):
+    """
+    把请求参数或请求头解析为剖析方式
+
+    true/1/yes/cprofile -> "cprofile"，sample -> "sample"，其他 -> None
+    """
+    if value is True:
+        return "cprofile"
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    if value in ("1", "true", "yes", "on", "cprofile"):
+        return "cprofile"
+    if value == "sample":
+        return "sample"
+    return None
+
+
+def _retention():
+    try:
+        return max(1, int(os.environ.get("DYTT8_PROFILE_KEEP", "50")))
+    except ValueError:
+        return 50
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)[:80]
+
+
+class _StackSampler:
+    """后台线程定时读取 sys._current_frames()，按折叠栈计数"""
+
+    def __init__(self, interval, thread_ident=None):
+        """
+        Args:
+            interval: 采样间隔(秒)
+            thread_ident: 只采样该线程，为None时采样所有线程
+        """
+        self.interval = interval
+        self.thread_ident = thread_ident
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dytt8-profiler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ident is not None and ident != self.thread_ident):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items(), key=lambda item: item[1], reverse=True):
+                f.write(f"{stack} {count}\n")
+
+
+class Profile:
+    """一次剖析，with 块结束时写文件并清理旧文件"""
+
+    def __init__(self, name, mode="cprofile", output_dir=None, interval=0.005, current_thread_only=False):
+        """
+        初始化剖析
+
+        Args:
+            name: 任务或请求名称，用于文件名
+            mode: "cprofile" 或 "sample"，为None时不剖析
+            output_dir: 输出目录，默认为 DEFAULT_PROFILE_DIR
+            interval: 采样间隔(秒)，仅 sample 方式使用
+            current_thread_only: sample 方式只采样进入 with 块的线程，
+                                 避免把同时处理的其他请求计入本次剖析
+        """
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"不支持的剖析方式: {mode}，可用: {', '.join(MODES)}")
+        self.name = name
+        self.mode = mode
+        self.output_dir = output_dir or DEFAULT_PROFILE_DIR
+        self.interval = interval
+        self.current_thread_only = current_thread_only
+        self.file = None
+        self._profiler = None
+
+    def __enter__(self):
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError as e:
+                # Python 3.12+ 同一时间只能有一个 cProfile 处于启用状态
+                logger.warning(f"无法启用剖析: {e}")
+                self._profiler = None
+        elif self.mode == "sample":
+            self._profiler = _StackSampler(self.interval,
+                                           threading.get_ident() if self.current_thread_only else None)
+            self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._profiler is None:
+            return False
+        if self.mode == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            self.file = os.path.join(self.output_dir, f"{_safe_name(self.name)}_{stamp}{EXTENSIONS[self.mode]}")
+            if self.mode == "cprofile":
+                self._profiler.dump_stats(self.file)
+            else:
+                self._profiler.dump(self.file)
+            logger.info(f"剖析结果已保存到: {self.file}")
+            prune(self.output_dir)
+        except OSError as e:
+            logger.warning(f"保存剖析结果失败: {e}")
+            self.file = None
+        return False
+
+
+def profile(name, mode="cprofile", output_dir=None, current_thread_only=False):
+    """创建一次剖析，mode 为None时 with 块不做任何事"""
+    return Profile(name, mode, output_dir, current_thread_only=current_thread_only)
+
+
+def output_path(name, mode="cprofile", output_dir=None):
+    """
+    为子进程(python -m cProfile -o)预留的输出路径，同时清理旧文件
+    """
+    output_dir = output_dir or DEFAULT_PROFILE_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    prune(output_dir, reserve=1)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(output_dir, f"{_safe_name(name)}_{stamp}{EXTENSIONS[mode]}")
+
+
+def prune(output_dir=None, keep=None, reserve=0):
+    """
+    只保留最新的 keep 个剖析文件
+
+    Args:
+        output_dir: 剖析目录
+        keep: 保留个数，默认取 DYTT8_PROFILE_KEEP
+        reserve: 额外预留的名额(即将写入的文件数)
+
+    Returns:
+        int: 删除的文件数
+    """
+    output_dir = output_dir or DEFAULT_PROFILE_DIR
+    keep = (keep or _retention()) - reserve
+    files = list_profiles(output_dir)
+    removed = 0
+    for item in files[max(keep, 0):]:
+        try:
+            os.remove(os.path.join(output_dir, item["name"]))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def list_profiles(output_dir=None):
+    """
+    列出剖析文件，最新的在前
+
+    Returns:
+        list: 每项包含 name, mode, size, created
+    """
+    output_dir = output_dir or DEFAULT_PROFILE_DIR
+    if not os.path.isdir(output_dir):
+        return []
+    modes = {ext: mode for mode, ext in EXTENSIONS.items()}
+    files = []
+    for name in os.listdir(output_dir):
+        ext = os.path.splitext(name)[1]
+        if ext not in modes:
+            continue
+        path = os.path.join(output_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append({
+            "name": name,
+            "mode": modes[ext],
+            "size": stat.st_size,
+            "created": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+            "_mtime": stat.st_mtime,
+        })
+    files.sort(key=lambda item: item["_mtime"], reverse=True)
+    for item in files:
+        del item["_mtime"]
+    return files
+
+
+def top_functions(path, limit=30, sort="cumulative"):
+    """
+    剖析文件中耗时最多的函数
+
+    Args:
+        path: *.prof 或 *.folded 文件
+        limit: 返回条数
+        sort: pstats 排序键 (cumulative / tottime / ncalls)，仅 *.prof 使用
+
+    Returns:
+        list: *.prof 每项为 function, ncalls, tottime, cumtime；
+              *.folded 每项为 function, samples, self_samples
+    """
+    if path.endswith(EXTENSIONS["sample"]):
+        total, own = {}, {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                frames = stack.split(";")[1:]  # 第一项是线程名
+                count = int(count)
+                for frame in set(frames):
+                    total[frame] = total.get(frame, 0) + count
+                if frames:
+                    own[frames[-1]] = own.get(frames[-1], 0) + count
+        ranked = sorted(total.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{"function": name, "samples": count, "self_samples": own.get(name, 0)} for name, count in ranked]
+
+    stats = pstats.Stats(path)
+    keys = {"cumulative": 3, "tottime": 2, "ncalls": 1}
+    index = keys.get(sort, 3)
+    rows = []
+    for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append((f"{function} ({os.path.basename(filename)}:{line})", ncalls, tottime, cumtime))
+    rows.sort(key=lambda row: row[index], reverse=True)
+    return [{"function": name, "ncalls": ncalls, "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+            for name, ncalls, tottime, cumtime in rows[:limit]]
+
@@ -0,0 +1,276 @@
+"""
+按主机的自适应限速(AIMD)
+每个主机维护请求间隔和并发上限:
+    加性增: 连续若干次请求延迟正常且无错误时，并发上限加一、请求间隔按比例缩短(至少一个步长)
+    乘性减: 遇到 403/429/503、反爬验证页或延迟突增时，并发上限减半、请求间隔加倍，并冷却一个间隔
+各主机的状态保存在 dytt8/data/rate_state.json，下次运行从上次收敛到的速率开始；
+保存的间隔比调用方指定的间隔长时(上次被限流)，按保存后经过的时间逐渐恢复到指定的间隔
+
+用法:
+    controller = rate_control.get_controller()
+    with controller.slot(url, initial_delay=2.0) as request:
+        response = session.get(url)
+        request.status = response.status_code
+"""
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+from urllib.parse import urlsplit
+
+from dytt8.utils import metrics, tracing
+
+logger = logging.getLogger("dytt8.rate_control")
+
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rate_state.json")
+
+# 视为被限流的状态码
+THROTTLE_STATUS = (403, 429, 503)
+
+
+def host_of(url):
+    """URL 的主机名，传入的已是主机名时原样返回"""
+    return (urlsplit(url).hostname or url) if "//" in url else url
+
+
+class HostState:
+    """单个主机的限速状态"""
+
+    def __init__(self, delay, concurrency=1, baseline=None):
+        self.delay = delay
+        self.concurrency = concurrency
+        # 正常情况下的延迟(慢速指数平均)，用于判断延迟突增
+        self.baseline = baseline
+        self.latency = baseline
+        self.successes = 0
+        self.inflight = 0
+        self.next_at = 0.0
+
+    def to_dict(self):
+        return {"delay": round(self.delay, 3), "concurrency": self.concurrency,
+                "baseline": round(self.baseline, 3) if self.baseline is not None else None,
+                "updated": round(time.time(), 3)}
+
+
+class Request:
+    """slot() 中的一次请求，调用方填入状态码或是否被拦截"""
+
+    def __init__(self):
+        self.status = None
+        self.blocked = False
+
+
+class RateController:
+    """按主机的 AIMD 限速器，可在多个线程间共享"""
+
+    def __init__(self, state_file=None, min_delay=0.1, max_delay=60.0, max_concurrency=8,
+                 increase_every=5, step=0.1, recovery=0.1, recovery_half_life=600.0,
+                 spike_factor=3.0, spike_floor=1.0, decrease_factor=0.5):
+        """
+        初始化限速器
+
+        Args:
+            state_file: 状态文件，为None时使用 DEFAULT_STATE_FILE，为False时不保存
+            min_delay: 最小请求间隔(秒)
+            max_delay: 最大请求间隔(秒)
+            max_concurrency: 单个主机的最大并发数
+            increase_every: 连续多少次正常请求后加性增一次
+            step: 每次加性增至少减少的请求间隔(秒)
+            recovery: 每次加性增按比例减少的请求间隔，被限流后的长间隔几十次请求即可恢复
+            recovery_half_life: 保存的过长间隔恢复一半所需的时间(秒)，下次运行时按经过的时间计算
+            spike_factor: 延迟超过基线的多少倍视为突增
+            spike_floor: 延迟至少超过多少秒才视为突增，避免基线很小时的抖动被误判
+            decrease_factor: 乘性减的系数
+        """
+        self.state_file = DEFAULT_STATE_FILE if state_file is None else state_file
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.increase_every = increase_every
+        self.step = step
+        self.recovery = recovery
+        self.recovery_half_life = recovery_half_life
+        self.spike_factor = spike_factor
+        self.spike_floor = spike_floor
+        self.decrease_factor = decrease_factor
+        self.hosts = {}
+        self._saved = {}
+        self._dirty = 0
+        self._cond = threading.Condition()
+        self._load()
+
+    def _load(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                self._saved = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"限速状态文件无法读取: {e}")
+
+    def _state(self, host, initial_delay=None):
+        state = self.hosts.get(host)
+        if state is None:
+            saved = self._saved.get(host)
+            if saved:
+                state = HostState(self._restored_delay(saved, initial_delay),
+                                  saved.get("concurrency", 1), saved.get("baseline"))
+            else:
+                delay = self.min_delay if initial_delay is None else initial_delay
+                state = HostState(min(max(delay, self.min_delay), self.max_delay))
+            self.hosts[host] = state
+        return state
+
+    def _restored_delay(self, saved, initial_delay=None):
+        """
+        保存的请求间隔在本次运行的起点
+
+        调用方指定了间隔时以它为准，只有比它长的保存值(上次被限流)仍然生效，
+        并按保存后经过的时间以半衰期 recovery_half_life 向指定的间隔恢复
+        """
+        target = self.min_delay if initial_delay is None else max(initial_delay, self.min_delay)
+        delay = saved["delay"]
+        if delay > target:
+            age = max(time.time() - saved.get("updated", time.time()), 0.0)
+            delay = target + (delay - target) * 0.5 ** (age / self.recovery_half_life)
+        elif initial_delay is not None:
+            delay = target
+        return min(delay, self.max_delay)
+
+    def acquire(self, host, initial_delay=None, max_concurrency=None):
+        """
+        等待直到该主机允许发出下一个请求
+
+        Args:
+            host: 主机名或URL
+            initial_delay: 初始请求间隔，优先于保存的状态(见 _restored_delay)
+            max_concurrency: 调用方实际的并发上限(如抓取线程数)，并发数不会增长到超过它
+        """
+        host = host_of(host)
+        with self._cond:
+            state = self._state(host, initial_delay)
+            limit = min(self.max_concurrency, max_concurrency or self.max_concurrency)
+            while True:
+                now = time.monotonic()
+                if state.inflight < min(state.concurrency, limit) and now >= state.next_at:
+                    break
+                timeout = state.next_at - now if state.next_at > now else None
+                with tracing.span("sleep"):
+                    self._cond.wait(timeout)
+            state.inflight += 1
+            state.next_at = now + state.delay
+
+    def release(self, host, latency=None, status=None, blocked=False, max_concurrency=None):
+        """
+        报告请求结果并调整速率
+
+        Args:
+            host: 主机名或URL
+            latency: 请求耗时(秒)，请求出错时为None
+            status: HTTP 状态码
+            blocked: 是否返回了反爬验证页
+            max_concurrency: 调用方实际的并发上限
+        """
+        host = host_of(host)
+        with self._cond:
+            state = self._state(host)
+            state.inflight = max(state.inflight - 1, 0)
+            throttled = blocked or status in THROTTLE_STATUS
+            spike = (latency is not None and state.baseline is not None
+                     and latency > max(state.baseline * self.spike_factor, self.spike_floor))
+            if throttled or spike or latency is None:
+                self._decrease(host, state, "限流" if throttled else "延迟突增" if spike else "请求出错")
+            else:
+                self._increase(state, latency, max_concurrency)
+            self._cond.notify_all()
+        if self._dirty >= 20:
+            self.save()
+
+    def _increase(self, state, latency, max_concurrency):
+        state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+        state.baseline = latency if state.baseline is None else 0.95 * state.baseline + 0.05 * latency
+        state.successes += 1
+        if state.successes >= self.increase_every:
+            state.successes = 0
+            limit = min(self.max_concurrency, max_concurrency or self.max_concurrency)
+            state.concurrency = min(state.concurrency + 1, limit)
+            state.delay = max(state.delay - max(state.delay * self.recovery, self.step), self.min_delay)
+            self._dirty += 1
+
+    def _decrease(self, host, state, reason):
+        state.successes = 0
+        state.concurrency = max(int(state.concurrency * self.decrease_factor), 1)
+        state.delay = min(max(state.delay / self.decrease_factor, self.min_delay), self.max_delay)
+        # 冷却: 下一个请求至少等待一个新的间隔
+        state.next_at = max(state.next_at, time.monotonic() + state.delay)
+        logger.info(f"{host} {reason}，并发降为 {state.concurrency}，间隔增至 {state.delay:.2f} 秒")
+        self._dirty = max(self._dirty, 20)
+
+    @contextlib.contextmanager
+    def slot(self, url, initial_delay=None, max_concurrency=None):
+        """
+        包裹一次请求: 进入时按速率等待，退出时按耗时和结果调整速率；块内抛出异常视为请求出错
+
+        Yields:
+            Request: 调用方设置 status / blocked
+        """
+        request = Request()
+        self.acquire(url, initial_delay, max_concurrency)
+        start = time.perf_counter()
+        try:
+            yield request
+        except BaseException:
+            self.release(url, None, request.status, request.blocked, max_concurrency)
+            raise
+        self.release(url, time.perf_counter() - start, request.status, request.blocked, max_concurrency)
+
+    def snapshot(self):
+        """各主机当前的状态"""
+        with self._cond:
+            return {host: state.to_dict() for host, state in self.hosts.items()}
+
+    def save(self):
+        """把各主机的状态写入状态文件"""
+        if not self.state_file or not self.hosts:
+            return
+        with self._cond:
+            self._saved.update({host: state.to_dict() for host, state in self.hosts.items()})
+            data = json.dumps(self._saved, ensure_ascii=False, indent=2)
+            self._dirty = 0
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            temp_file = self.state_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.state_file)
+        except OSError as e:
+            logger.warning(f"保存限速状态失败: {e}")
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    """进程内共享的限速器"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = RateController()
+        return _controller
+
+
+def _gauge_values(field):
+    if _controller is None:
+        return {}
+    return {host: state[field] for host, state in _controller.snapshot().items()}
+
+
+metrics.gauge("dytt8_rate_delay_seconds", "自适应限速的当前请求间隔", ("host",)).set_function(
+    lambda: _gauge_values("delay"))
+metrics.gauge("dytt8_rate_concurrency", "自适应限速的当前并发上限", ("host",)).set_function(
+    lambda: _gauge_values("concurrency"))
@@ -0,0 +1,273 @@
+"""
+抓取与浏览器操作的重试
+按异常类型把错误分为超时、连接中断、元素失效、服务器错误、反爬拦截等类别，
+可重试的错误按带随机抖动的指数退避重试；失败的URL放回队列末尾，不阻塞其他URL；
+每次运行有失败预算，超出后停止重试，剩余URL留给断点续爬
+
+用法:
+    policy = RetryPolicy(attempts=3)
+    html = policy.call(fetch, url, budget=budget)
+
+    retry.run_queue(urls, fetch, on_success=store, policy=policy, budget=FailureBudget(len(urls)))
+"""
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+from dytt8.utils import tracing
+
+logger = logging.getLogger("dytt8.retry")
+
+# 错误类别
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+STALE = "stale_element"
+SERVER = "server_error"
+ANTI_BOT = "anti_bot"
+CLIENT = "client_error"
+FATAL = "fatal"
+
+# 可重试的类别
+RETRYABLE = frozenset({TIMEOUT, CONNECTION, STALE, SERVER, ANTI_BOT})
+
+# 按异常类名分类，避免为了判断类型而导入 selenium / requests
+_NAME_KINDS = {
+    "TimeoutException": TIMEOUT,
+    "Timeout": TIMEOUT,
+    "ReadTimeout": TIMEOUT,
+    "ConnectTimeout": TIMEOUT,
+    "ReadTimeoutError": TIMEOUT,
+    "TimeoutError": TIMEOUT,
+    "timeout": TIMEOUT,
+    "ConnectionError": CONNECTION,
+    "ConnectionResetError": CONNECTION,
+    "ConnectionAbortedError": CONNECTION,
+    "ChunkedEncodingError": CONNECTION,
+    "ProtocolError": CONNECTION,
+    "RemoteDisconnected": CONNECTION,
+    "StaleElementReferenceException": STALE,
+    "ElementNotInteractableException": STALE,
+    "ElementClickInterceptedException": STALE,
+}
+
+# WebDriverException 消息中表示网络问题的片段
+_NETWORK_MARKERS = ("net::ERR_", "ERR_CONNECTION", "ERR_TIMED_OUT", "timed out")
+
+
+class FetchError(Exception):
+    """带错误类别的抓取错误，如服务器返回 5xx 或反爬页面"""
+
+    def __init__(self, message, kind=FATAL, status=None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+
+
+class BudgetExhausted(Exception):
+    """本次运行的失败次数超出预算"""
+
+
+def classify_status(status):
+    """
+    按 HTTP 状态码分类
+
+    Returns:
+        str: 错误类别，2xx/3xx 返回None
+    """
+    if status is None or status < 400:
+        return None
+    if status in (403, 429):
+        return ANTI_BOT
+    if status >= 500:
+        return SERVER
+    return CLIENT
+
+
+def classify(error):
+    """
+    判断异常属于哪一类错误
+
+    Args:
+        error: 异常实例
+
+    Returns:
+        str: 错误类别
+    """
+    if isinstance(error, FetchError):
+        return error.kind
+    response = getattr(error, "response", None)
+    kind = classify_status(getattr(response, "status_code", None))
+    if kind:
+        return kind
+    names = [cls.__name__ for cls in type(error).__mro__]
+    for name in names:
+        if name in _NAME_KINDS:
+            return _NAME_KINDS[name]
+    if "WebDriverException" in names and any(marker in str(error) for marker in _NETWORK_MARKERS):
+        return CONNECTION
+    return FATAL
+
+
+def is_retryable(error):
+    """异常是否值得重试"""
+    return classify(error) in RETRYABLE
+
+
+class FailureBudget:
+    """一次运行允许的失败次数，可在多个线程间共享"""
+
+    def __init__(self, total=0, ratio=0.25, minimum=10):
+        """
+        初始化失败预算
+
+        Args:
+            total: 本次运行计划处理的项目数
+            ratio: 允许失败的次数占计划项目数的比例
+            minimum: 至少允许的失败次数
+        """
+        self.ratio = ratio
+        self.limit = max(minimum, int(total * ratio))
+        self.failures = 0
+        self.by_kind = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind):
+        """记录一次失败(含会重试的失败)"""
+        with self._lock:
+            self.failures += 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            if self.failures == self.limit + 1:
+                logger.warning(f"失败次数超出预算({self.limit})，停止重试: {self.by_kind}")
+
+    def extend(self, total):
+        """计划处理的项目数确定(如列表页收集完毕)后放宽预算"""
+        with self._lock:
+            self.limit = max(self.limit, int(total * self.ratio))
+
+    @property
+    def exhausted(self):
+        """失败次数是否已超出预算"""
+        return self.failures > self.limit
+
+    def check(self):
+        """超出预算时抛出 BudgetExhausted"""
+        if self.exhausted:
+            raise BudgetExhausted(f"失败 {self.failures} 次，超出预算 {self.limit}: {self.by_kind}")
+
+    def summary(self):
+        return {"failures": self.failures, "limit": self.limit, "by_kind": dict(self.by_kind)}
+
+
+class RetryPolicy:
+    """重试策略: 最大尝试次数和带抖动的指数退避"""
+
+    def __init__(self, attempts=3, base=0.5, cap=30.0, retry_on=RETRYABLE):
+        """
+        初始化重试策略
+
+        Args:
+            attempts: 最多尝试次数(含第一次)
+            base: 第一次重试的退避上限(秒)，之后每次加倍
+            cap: 退避上限(秒)
+            retry_on: 可重试的错误类别
+        """
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.cap = cap
+        self.retry_on = frozenset(retry_on)
+
+    def backoff(self, attempt):
+        """
+        第 attempt 次失败后的等待时间(秒)，在 [0, min(cap, base*2^(attempt-1))] 中均匀取值(full jitter)，
+        避免多个工作线程同时重试
+        """
+        return random.uniform(0, min(self.cap, self.base * 2 ** max(attempt - 1, 0)))
+
+    def should_retry(self, error, attempt, budget=None):
+        """第 attempt 次尝试失败后是否重试"""
+        return (attempt < self.attempts and classify(error) in self.retry_on
+                and (budget is None or not budget.exhausted))
+
+    def call(self, function, *args, budget=None, description=None, **kwargs):
+        """
+        调用 function，可重试的错误按退避等待后重试
+
+        Args:
+            function: 被调用的函数
+            budget: 失败预算，每次失败都计入，超出后不再重试
+            description: 日志中显示的对象(如URL)
+
+        Returns:
+            function 的返回值；重试用尽时抛出最后一次的异常
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if budget is not None:
+                    budget.record(kind)
+                if not self.should_retry(e, attempt, budget):
+                    raise
+                delay = self.backoff(attempt)
+                logger.info(f"{description or getattr(function, '__name__', function)} {kind} 错误，"
+                            f"{delay:.2f} 秒后重试 ({attempt}/{self.attempts - 1}): {e}")
+                tracing.sleep(delay)
+
+
+def run_queue(items, function, on_success=None, on_failure=None, policy=None, budget=None, key=None):
+    """
+    依次处理队列中的项目，可重试的失败放回队列末尾并在退避时间后再处理，
+    因此一个出错的页面不会挡住后面的页面
+
+    Args:
+        items: 待处理项目
+        function: 处理函数 function(item) -> 结果，出错时抛出异常
+        on_success: 成功回调 on_success(item, result)
+        on_failure: 最终失败回调 on_failure(item, error)，预算用尽后未处理的项目 error 为 BudgetExhausted
+        policy: 重试策略，默认为 RetryPolicy()
+        budget: 失败预算，默认按项目数创建
+        key: 日志中显示项目的函数
+
+    Returns:
+        FailureBudget: 本次的失败统计
+    """
+    items = list(items)
+    policy = policy or RetryPolicy()
+    budget = budget or FailureBudget(len(items))
+    key = key or str
+    # (可再次处理的时间, 已尝试次数, 项目)
+    queue = deque((0.0, 0, item) for item in items)
+    while queue:
+        if budget.exhausted:
+            error = BudgetExhausted(f"失败次数超出预算 {budget.limit}")
+            for _, _, item in queue:
+                if on_failure:
+                    on_failure(item, error)
+            break
+        ready_at, attempts, item = queue.popleft()
+        wait = ready_at - time.monotonic()
+        if wait > 0:
+            tracing.sleep(wait)
+        attempts += 1
+        try:
+            result = function(item)
+        except Exception as e:
+            kind = classify(e)
+            budget.record(kind)
+            if policy.should_retry(e, attempts, budget):
+                delay = policy.backoff(attempts)
+                logger.info(f"{key(item)} {kind} 错误，放回队列末尾，{delay:.2f} 秒后重试: {e}")
+                queue.append((time.monotonic() + delay, attempts, item))
+            else:
+                print(f"处理失败({kind}): {key(item)}: {e}")
+                if on_failure:
+                    on_failure(item, e)
+            continue
+        if on_success:
+            on_success(item, result)
+    return budget
@@ -0,0 +1,329 @@
+"""
+流式输出
+每解析出一部电影就写入文件，不在内存中累积全部结果；定期 flush + fsync，
+爬取中途崩溃时已写入的部分仍然完整可读
+
+支持的格式:
+    csv      逐行写入，表头取自 DEFAULT_FIELDS 和第一部电影的字段
+    ndjson   每行一个 JSON 对象
+    sqlite   movies 表，按URL去重，定期提交事务
+    parquet  写入目录，每满一个行组就写成一个完整的分片文件(part-00000.parquet ...)，
+             可用 pandas.read_parquet(目录) 读取；需要 pyarrow
+
+用法:
+    with open_sink("csv", "movies.csv") as sink:
+        scraper.stream_to(sink)
+        scraper.scrape()
+"""
+import os
+import csv
+import json
+import time
+import sqlite3
+import threading
+import importlib.util
+
+# pyarrow 为可选依赖，仅 parquet 格式需要；导入较慢，写入时才加载
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# 常见字段，CSV 表头和 Parquet 列的固定部分
+DEFAULT_FIELDS = ["title", "year", "category", "rating", "director", "actors", "region", "language",
+                  "release_date", "description", "download_link", "cover_image", "source_url", "source"]
+
+# 格式 -> 扩展名
+EXTENSIONS = {"csv": ".csv", "ndjson": ".ndjson", "sqlite": ".db", "parquet": ".parquet"}
+
+
+def touch(path, mtime=None):
+    """创建文件或更新其修改时间，mtime 为None时为当前时间"""
+    with open(path, "a"):
+        pass
+    os.utime(path, None if mtime is None else (mtime, mtime))
+
+
+def _scalar(value):
+    """列表和字典转为 JSON 文本，便于写入按列存储的格式"""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class Sink:
+    """流式输出基类，可在多个线程中调用 write"""
+
+    extension = ""
+
+    def __init__(self, path, flush_every=50, flush_interval=5.0):
+        """
+        初始化输出
+
+        Args:
+            path: 输出路径
+            flush_every: 每写入多少部电影落盘一次
+            flush_interval: 两次落盘的最长间隔(秒)
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, movie):
+        """写入一部电影，按间隔自动落盘"""
+        with self._lock:
+            self._write(movie)
+            self.count += 1
+            self._pending += 1
+            if (self._pending >= self.flush_every
+                    or time.monotonic() - self._flushed_at >= self.flush_interval):
+                self._flush()
+
+    def write_many(self, movies):
+        for movie in movies:
+            self.write(movie)
+
+    def flush(self):
+        """立即落盘"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._sync()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        """落盘并关闭文件"""
+        with self._lock:
+            self._flush()
+            self._close()
+
+    def _write(self, movie):
+        raise NotImplementedError
+
+    def _sync(self):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class _FileSink(Sink):
+    """文本文件输出，落盘时 flush 并 fsync"""
+
+    encoding = "utf-8"
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self._file = open(path, "w", newline="", encoding=self.encoding)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _close(self):
+        self._file.close()
+
+
+class CSVSink(_FileSink):
+    """逐行写入 CSV"""
+
+    extension = ".csv"
+    # 带 BOM，Excel 可直接打开
+    encoding = "utf-8-sig"
+
+    def __init__(self, path, fieldnames=None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.fieldnames = fieldnames
+        self._writer = None
+
+    def _write(self, movie):
+        if self._writer is None:
+            fieldnames = self.fieldnames or DEFAULT_FIELDS + [key for key in movie if key not in DEFAULT_FIELDS]
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow({key: _scalar(value) for key, value in movie.items()})
+
+
+class NDJSONSink(_FileSink):
+    """每行一个 JSON 对象"""
+
+    extension = ".ndjson"
+
+    def _write(self, movie):
+        self._file.write(json.dumps(movie, ensure_ascii=False))
+        self._file.write("\n")
+
+
+class SQLiteSink(Sink):
+    """写入 SQLite 的 movies 表，同一URL只保留最新一条"""
+
+    extension = ".db"
+
+    def __init__(self, path, table="movies", **kwargs):
+        super().__init__(path, **kwargs)
+        self.table = table
+        # write 可能来自抓取线程，连接由锁保护
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "url TEXT PRIMARY KEY, title TEXT, year TEXT, source TEXT, data TEXT NOT NULL, written_at REAL)"
+        )
+
+    def _write(self, movie):
+        url = movie.get("source_url") or movie.get("link") or movie.get("url") or f"#{self.count}"
+        self._db.execute(
+            f"INSERT OR REPLACE INTO {self.table} (url, title, year, source, data, written_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (url, movie.get("title"), _scalar(movie.get("year")), movie.get("source"),
+             json.dumps(movie, ensure_ascii=False), time.time())
+        )
+
+    def _sync(self):
+        # 提交事务即落盘(WAL 模式下 synchronous=FULL 时提交会 fsync)
+        self._db.commit()
+
+    def _close(self):
+        self._db.close()
+
+
+class ParquetSink(Sink):
+    """
+    按行组写入 Parquet 目录，每个行组是一个完整的分片文件
+
+    Parquet 的文件尾在关闭时才写入，单个文件中途崩溃会整个不可读；
+    分片写完即关闭并 fsync，崩溃时最多丢失当前未满的行组
+    """
+
+    extension = ".parquet"
+
+    def __init__(self, path, row_group_size=500, compression="zstd", prefix="part", marker=None, **kwargs):
+        """
+        Args:
+            path: 输出目录
+            row_group_size: 每个分片的行数
+            compression: 压缩算法
+            prefix: 分片文件名前缀，多次写入同一目录时用于区分
+            marker: 每写完一个分片更新修改时间的标记文件，读取方只需检查它即可知道数据是否变化
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Parquet 格式需要安装 pyarrow: pip install pyarrow")
+        kwargs.setdefault("flush_every", row_group_size)
+        kwargs.setdefault("flush_interval", float("inf"))
+        super().__init__(path, **kwargs)
+        os.makedirs(path, exist_ok=True)
+        self.compression = compression
+        self.prefix = prefix
+        self.marker = marker
+        self._rows = []
+        self._parts = len([name for name in os.listdir(path)
+                           if name.startswith(prefix + "-") and name.endswith(".parquet")])
+
+    def _write(self, movie):
+        self._rows.append(movie)
+
+    def _sync(self):
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = DEFAULT_FIELDS + sorted({key for row in self._rows for key in row} - set(DEFAULT_FIELDS))
+        table = pa.table({
+            column: pa.array([None if row.get(column) is None else str(_scalar(row[column])) for row in self._rows],
+                             type=pa.string())
+            for column in columns
+        })
+        part = os.path.join(self.path, f"{self.prefix}-{self._parts:05d}.parquet")
+        temp_file = part + ".tmp"
+        pq.write_table(table, temp_file, compression=self.compression)
+        with open(temp_file, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(temp_file, part)
+        self._parts += 1
+        self._rows = []
+        if self.marker:
+            touch(self.marker)
+
+
+class Tee:
+    """同时写入多个输出，如文件和下载链接索引"""
+
+    def __init__(self, *targets):
+        self.targets = targets
+
+    @property
+    def count(self):
+        return self.targets[0].count
+
+    @property
+    def path(self):
+        return self.targets[0].path
+
+    def write(self, movie):
+        for target in self.targets:
+            target.write(movie)
+
+    def write_many(self, movies):
+        for movie in movies:
+            self.write(movie)
+
+    def flush(self):
+        for target in self.targets:
+            target.flush()
+
+    def close(self):
+        for target in self.targets:
+            target.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def remove_output(path):
+    """删除没有任何结果的输出文件；Parquet 目录中可能有其他运行的分片，只在为空时删除"""
+    if os.path.isdir(path):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+        return
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+SINKS = {"csv": CSVSink, "ndjson": NDJSONSink, "sqlite": SQLiteSink, "parquet": ParquetSink}
+
+
+def open_sink(format, path, **kwargs):
+    """
+    按格式创建流式输出
+
+    Args:
+        format: csv / ndjson / sqlite / parquet
+        path: 输出路径(parquet 为目录)
+
+    Returns:
+        Sink
+    """
+    if format not in SINKS:
+        raise ValueError(f"不支持的流式输出格式: {format}，可用: {', '.join(SINKS)}")
+    return SINKS[format](path, **kwargs)
@@ -0,0 +1,247 @@
+"""
+轻量级耗时追踪
+用上下文管理器标记抓取过程中的各个阶段(驱动启动、页面导航、等待、提取、导出)，
+按阶段汇总次数和耗时，运行结束后写入JSON文件并输出到日志
+
+没有活动的 Trace 时 span() 直接返回共享的空对象，只多一次 ContextVar 读取，
+因此可以放在热路径上
+
+用法:
+    with tracing.trace("dytt8") as run:
+        with tracing.span("navigate"):
+            driver.get(url)
+    print(run.summary())
+
+设置环境变量 DYTT8_TRACE=0 可完全关闭追踪
+"""
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import contextvars
+from datetime import datetime
+
+logger = logging.getLogger("dytt8.tracing")
+
+DEFAULT_TRACE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "traces")
+
+_active_trace = contextvars.ContextVar("dytt8_trace", default=None)
+
+
+class _NoopSpan:
+    """未启用追踪时使用的空 span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    """一次计时，结束时把总耗时和自身耗时(扣除子 span)记入 Trace"""
+
+    __slots__ = ("trace", "name", "start", "child_time")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+        self.child_time = 0.0
+
+    def __enter__(self):
+        self.trace._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        stack = self.trace._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_time += elapsed
+        self.trace._record(self.name, elapsed, elapsed - self.child_time, exc_type is not None)
+        return False
+
+
+class _SpanStats:
+    """单个阶段的汇总"""
+
+    __slots__ = ("count", "errors", "total", "self_total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.self_total = 0.0
+        self.max = 0.0
+
+
+class Trace:
+    """一次运行的耗时追踪，按 span 名称汇总"""
+
+    def __init__(self, name, output_dir=DEFAULT_TRACE_DIR, enabled=True):
+        """
+        初始化追踪
+
+        Args:
+            name: 运行名称，用于日志和文件名
+            output_dir: JSON文件输出目录，为None时不写文件
+            enabled: 为False时不激活，span() 全部为空操作
+        """
+        self.name = name
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.started = None
+        self.start = None
+        self.wall = None
+        self.file = None
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._token = None
+
+    def _stack(self):
+        """当前线程的 span 栈"""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, elapsed, self_time, failed):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _SpanStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.self_total += self_time
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if failed:
+                stats.errors += 1
+
+    def record(self, name, elapsed, failed=False):
+        """
+        记录在别处测得的耗时(如进程池中的解析)，不参与嵌套扣除
+
+        Args:
+            name: 阶段名称
+            elapsed: 耗时(秒)
+            failed: 是否失败
+        """
+        self._record(name, elapsed, elapsed, failed)
+
+    def __enter__(self):
+        if self.enabled:
+            self.started = datetime.now()
+            self.start = time.perf_counter()
+            self._token = _active_trace.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.enabled:
+            return False
+        _active_trace.reset(self._token)
+        self.wall = time.perf_counter() - self.start
+        summary = self.summary()
+        self._log(summary)
+        if self.output_dir:
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                filename = f"trace_{self.name}_{self.started.strftime('%Y%m%d_%H%M%S_%f')}.json"
+                self.file = os.path.join(self.output_dir, filename)
+                with open(self.file, "w", encoding="utf-8") as f:
+                    json.dump(summary, f, ensure_ascii=False, indent=2)
+            except OSError as e:
+                logger.warning(f"保存耗时追踪失败: {e}")
+        return False
+
+    def summary(self):
+        """
+        各阶段的耗时汇总，运行中调用时返回截至当前的数据
+
+        Returns:
+            dict: name, started, wall_seconds, spans (按总耗时降序)
+        """
+        if not self.enabled or self.start is None:
+            return {"name": self.name, "enabled": False, "spans": []}
+        wall = self.wall if self.wall is not None else time.perf_counter() - self.start
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1].total, reverse=True)
+            spans = [
+                {
+                    "name": name,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "total_seconds": round(stats.total, 4),
+                    "self_seconds": round(stats.self_total, 4),
+                    "avg_ms": round(stats.total / stats.count * 1000, 2),
+                    "max_ms": round(stats.max * 1000, 2),
+                    # 自身耗时占总时长的比例，嵌套的 span 不会重复计算；多线程并发时总和可能超过1
+                    "share": round(stats.self_total / wall, 4) if wall > 0 else 0.0,
+                }
+                for name, stats in items
+            ]
+        return {
+            "name": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "wall_seconds": round(wall, 3),
+            "running": self.wall is None,
+            "spans": spans,
+        }
+
+    def _log(self, summary):
+        logger.info(f"[{self.name}] 总耗时 {summary['wall_seconds']} 秒")
+        for item in summary["spans"]:
+            logger.info(f"[{self.name}]   {item['name']:<20} {item['count']:>5} 次  "
+                        f"共 {item['total_seconds']:.3f} 秒  自身 {item['share']:.1%}  "
+                        f"平均 {item['avg_ms']} 毫秒  最长 {item['max_ms']} 毫秒")
+
+
+def trace(name, output_dir=DEFAULT_TRACE_DIR):
+    """
+    创建一次运行的追踪，在 with 块内调用的 span() 都会记入该追踪
+
+    环境变量 DYTT8_TRACE=0 时返回未激活的追踪
+    """
+    return Trace(name, output_dir, enabled=os.environ.get("DYTT8_TRACE", "1") != "0")
+
+
+def span(name):
+    """标记一个阶段，没有活动的追踪时为空操作"""
+    active = _active_trace.get()
+    if active is None:
+        return _NOOP_SPAN
+    return _Span(active, name)
+
+
+def traced(name):
+    """把整个函数作为一个 span 的装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = _active_trace.get()
+            if active is None:
+                return func(*args, **kwargs)
+            with _Span(active, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def sleep(seconds):
+    """记入 'sleep' 阶段的 time.sleep"""
+    with span("sleep"):
+        time.sleep(seconds)
+
+
+def current_trace():
+    """当前上下文中活动的追踪，没有时返回None"""
+    return _active_trace.get()
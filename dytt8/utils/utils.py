@@ -2,6 +2,7 @@
 Utility functions for Selenium web automation
 """
 import time
+import importlib.util
 from typing import Tuple, Any, List, Optional
 
 from selenium import webdriver
@@ -21,13 +22,15 @@ from selenium.common.exceptions import (
     ElementNotInteractableException,
     StaleElementReferenceException
 )
-# 尝试导入webdriver_manager，但不再将其作为必需依赖
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-    from webdriver_manager.firefox import GeckoDriverManager
-    WEBDRIVER_MANAGER_AVAILABLE = True
 
-    # 尝试从不同的位置导入ChromeType，适应不同版本的webdriver_manager
+from dytt8.utils import driver_cache, retry, tracing
+from dytt8.utils.page_archive import instrument_driver
+# webdriver_manager 不再是必需依赖，只在 Selenium 自动驱动管理失败时才导入
+WEBDRIVER_MANAGER_AVAILABLE = importlib.util.find_spec("webdriver_manager") is not None
+
+
+def _chrome_type():
+    """从不同的位置导入ChromeType，适应不同版本的webdriver_manager"""
     try:
         # 较新版本的webdriver_manager
         from webdriver_manager.core.utils import ChromeType
@@ -41,19 +44,21 @@ try:
                 GOOGLE = "GOOGLE"
                 CHROMIUM = "CHROMIUM"
                 MSEDGE = "MSEDGE"
-except ImportError:
-    WEBDRIVER_MANAGER_AVAILABLE = False
-    print("webdriver_manager 未安装，将使用 Selenium 自动驱动管理")
+    return ChromeType
 
 
-def setup_chrome_driver(headless: bool = False, disable_images: bool = False) -> Chrome:
+@tracing.traced("driver_setup")
+def setup_chrome_driver(headless: bool = False, disable_images: bool = False,
+                        arguments: Optional[List[str]] = None) -> Chrome:
     """
     Set up Chrome WebDriver with optional configurations
-    使用 Selenium 4 自动驱动管理功能，不再依赖 webdriver_manager
+    使用 Selenium 4 自动驱动管理功能，不再依赖 webdriver_manager；
+    成功解析的驱动记录在 driver_cache 中，浏览器版本不变时之后直接使用
     
     Args:
         headless: Run browser in headless mode (no UI)
         disable_images: Disable image loading for faster browsing
+        arguments: Extra Chrome command-line arguments, e.g. a custom user-agent
         
     Returns:
         Configured Chrome WebDriver instance
@@ -69,6 +74,8 @@ def setup_chrome_driver(headless: bool = False, disable_images: bool = False) ->
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--remote-allow-origins=*")  # 解决跨域问题
+    for argument in arguments or ():
+        options.add_argument(argument)
     
     # 禁用webdriver特征标识，避免被网站检测
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -78,12 +85,32 @@ def setup_chrome_driver(headless: bool = False, disable_images: bool = False) ->
         prefs = {"profile.managed_default_content_settings.images": 2}
         options.add_experimental_option("prefs", prefs)
     
+    cache = driver_cache.get_cache()
+    binary = options.binary_location or None
+
+    # 上次解析成功的驱动，跳过下面的逐个尝试
+    entry = cache.lookup(binary)
+    if entry:
+        try:
+            # 使用上次实际启动的浏览器(可能是 Selenium Manager 下载的 Chrome for Testing)
+            if not binary and entry.get("browser_path"):
+                options.binary_location = entry["browser_path"]
+            driver = Chrome(service=ChromeService(entry["driver_path"]), options=options)
+            print(f"使用缓存的驱动 ({entry['method']}): {entry['driver_path']}")
+            return instrument_driver(driver)
+        except Exception as e:
+            print(f"缓存的驱动无法使用，重新解析: {e}")
+            cache.invalidate(binary)
+            options.binary_location = binary or ""
+
     # 方法1：直接使用 Selenium 4 的自动驱动管理（推荐）
     try:
         print("使用 Selenium 4 自动驱动管理功能...")
         driver = Chrome(options=options)
         print("成功创建 Chrome WebDriver 实例")
-        return driver
+        # Selenium Manager 可能自行下载浏览器并设置 binary_location，启动后再读取
+        cache.record(driver, "selenium-manager", binary, browser_path=options.binary_location or None)
+        return instrument_driver(driver)
     except Exception as e:
         print(f"使用自动驱动管理创建 WebDriver 失败: {e}")
         
@@ -91,20 +118,25 @@ def setup_chrome_driver(headless: bool = False, disable_images: bool = False) ->
         if WEBDRIVER_MANAGER_AVAILABLE:
             try:
                 print("尝试使用 webdriver_manager...")
+                from webdriver_manager.chrome import ChromeDriverManager
                 # 尝试各种安装方法
                 try:
                     service = ChromeService(ChromeDriverManager().install())
+                    method = "webdriver-manager"
                 except Exception as e2:
                     print(f"标准安装方法失败: {e2}")
                     try:
-                        service = ChromeService(ChromeDriverManager(chrome_type=ChromeType.GOOGLE).install())
+                        service = ChromeService(ChromeDriverManager(chrome_type=_chrome_type().GOOGLE).install())
+                        method = "webdriver-manager-google"
                     except Exception:
                         print("所有 webdriver_manager 方法都失败，使用基本 Service")
                         service = ChromeService()
+                        method = "service"
                 
                 driver = Chrome(service=service, options=options)
                 print("使用 webdriver_manager 成功创建 WebDriver")
-                return driver
+                cache.record(driver, method, binary, browser_path=options.binary_location or None)
+                return instrument_driver(driver)
             except Exception as e3:
                 print(f"所有方法都失败: {e3}")
                 raise
@@ -115,7 +147,8 @@ def setup_chrome_driver(headless: bool = False, disable_images: bool = False) ->
                 service = ChromeService()
                 driver = Chrome(service=service, options=options)
                 print("成功创建 Chrome WebDriver 实例")
-                return driver
+                cache.record(driver, "service", binary, browser_path=options.binary_location or None)
+                return instrument_driver(driver)
             except Exception as e4:
                 print(f"所有创建 WebDriver 方法都失败: {e4}")
                 raise
@@ -146,6 +179,7 @@ def setup_firefox_driver(headless: bool = False) -> Firefox:
         # 尝试使用 webdriver_manager
         if WEBDRIVER_MANAGER_AVAILABLE:
             try:
+                from webdriver_manager.firefox import GeckoDriverManager
                 service = FirefoxService(GeckoDriverManager().install())
                 driver = Firefox(service=service, options=options)
                 driver.set_window_size(1920, 1080)
@@ -194,28 +228,29 @@ def safe_click(driver: WebDriver, element: WebElement, retries: int = 3) -> bool
     """
     Safely click an element with retries and error handling
     
+    Transient errors (stale/not interactable/intercepted element, timeouts) are
+    retried with jittered exponential backoff; other errors fail immediately.
+    
     Args:
         driver: WebDriver instance
         element: WebElement to click
-        retries: Number of retry attempts
+        retries: Number of attempts
         
     Returns:
         True if click was successful, False otherwise
     """
-    for attempt in range(retries):
-        try:
-            # Scroll element into view
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
-            time.sleep(0.5)  # Small delay after scrolling
-            element.click()
-            return True
-        except (ElementNotInteractableException, StaleElementReferenceException) as e:
-            if attempt == retries - 1:
-                print(f"Failed to click element after {retries} attempts: {e}")
-                return False
-            time.sleep(1)  # Wait before retrying
+    def click():
+        # Scroll element into view
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
+        time.sleep(0.5)  # Small delay after scrolling
+        element.click()
     
-    return False
+    try:
+        retry.RetryPolicy(attempts=retries, base=0.5, cap=4.0).call(click, description="click")
+        return True
+    except Exception as e:
+        print(f"Failed to click element ({retry.classify(e)}): {e}")
+        return False
 
 
 def fill_form_field(
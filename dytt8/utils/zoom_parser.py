@@ -0,0 +1,131 @@
+"""
+电影天堂详情页 ◎ 字段解析器
+将 div#Zoom 中 "◎译　　名　xxx" 形式的描述文本一次性拆分为字段字典
+"""
+import re
+import functools
+from typing import Dict, Any, List, Optional
+
+# 标签（去除空白后）到字段名的映射
+FIELD_LABELS = {
+    "译名": "translated_title",
+    "片名": "original_title",
+    "年代": "year",
+    "产地": "country",
+    "国家": "country",
+    "类别": "genre",
+    "语言": "language",
+    "字幕": "subtitles",
+    "上映日期": "release_date",
+    "IMDb评分": "imdb_rating",
+    "IMDB评分": "imdb_rating",
+    "豆瓣评分": "douban_rating",
+    "文件格式": "file_format",
+    "视频尺寸": "video_size",
+    "文件大小": "file_size",
+    "片长": "duration",
+    "集数": "episodes",
+    "导演": "director",
+    "编剧": "writers",
+    "主演": "actors",
+    "标签": "tags",
+    "简介": "summary",
+    "获奖情况": "awards",
+}
+
+# 多行取值的字段，按行拆分为列表
+LIST_FIELDS = ("director", "writers", "actors")
+
+# 单个正则完成整段扫描: ◎ + 标签 + 取值(直到下一个 ◎)
+# 四字标签通常连写(上映日期)，两字标签中间夹全角空格(导　　演)；取值可能紧跟标签(◎上映日期2023-01-01)，
+# 因此标签按已知写法明确列出，字符间允许空白，长的在前，避免把取值的开头当作标签
+_LABEL_PATTERN = "|".join(
+    r"[\s　]*".join(re.escape(char) for char in label)
+    for label in sorted(FIELD_LABELS, key=len, reverse=True)
+)
+_FIELD_RE = re.compile(rf"◎[\s　]*({_LABEL_PATTERN})[\s　]*([^◎]*)")
+_RATING_RE = re.compile(r"(\d+(?:\.\d+)?)")
+_YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+
+
+# 原始标签(含空格) -> 字段名 有缓存，各页面的标签写法有限，避免重复规范化
+@functools.lru_cache(maxsize=256)
+def _field_name(raw_label: str) -> Optional[str]:
+    """将原始标签规范化为字段名，未知标签返回None"""
+    return FIELD_LABELS.get("".join(raw_label.split()))
+
+
+def parse_zoom_fields(text: str) -> Dict[str, str]:
+    """
+    单次线性扫描，将 ◎ 描述文本拆分为字段字典
+
+    Args:
+        text: div#Zoom 的文本内容
+
+    Returns:
+        字段名到原始取值的字典（未出现的字段不包含在内）
+    """
+    fields = {}
+    if not text or "◎" not in text:
+        return fields
+
+    for raw_label, value in _FIELD_RE.findall(text):
+        name = _field_name(raw_label)
+        # 未知标签忽略；同一字段重复出现时保留第一次的取值
+        if name is None or name in fields:
+            continue
+        value = value.rstrip()
+        if value:
+            fields[name] = value
+    return fields
+
+
+def _split_lines(value: str) -> List[str]:
+    """按行拆分多值字段"""
+    return [line.strip() for line in value.splitlines() if line and not line.isspace()]
+
+
+def extract_movie_metadata(text: str) -> Dict[str, Any]:
+    """
+    从 ◎ 描述文本中提取结构化的电影元数据
+
+    兼容各爬虫原有的字段: director 为字符串, actors 为列表,
+    rating 取豆瓣评分或IMDb评分中较早出现的数值
+
+    Args:
+        text: div#Zoom 的文本内容
+
+    Returns:
+        包含电影元数据的字典
+    """
+    fields = parse_zoom_fields(text)
+    if not fields:
+        return {}
+
+    metadata = {}
+    for name, value in fields.items():
+        if name in LIST_FIELDS:
+            metadata[name] = _split_lines(value)
+        elif name == "summary":
+            # 简介之后通常紧跟下载地址区域
+            metadata[name] = " ".join(value.split("下载地址", 1)[0].rstrip("【").split())
+        else:
+            # 单行字段只保留第一行，避免吞入后续的图片说明或下载提示
+            metadata[name] = value.split("\n", 1)[0].strip()
+
+    if "director" in metadata:
+        metadata["director"] = " / ".join(metadata["director"])
+
+    if "year" in metadata:
+        year_match = _YEAR_RE.search(metadata["year"])
+        metadata["year"] = year_match.group(0) if year_match else metadata["year"]
+
+    # 评分按在文本中出现的先后取第一个
+    for name in fields:
+        if name in ("douban_rating", "imdb_rating"):
+            rating_match = _RATING_RE.search(metadata[name])
+            if rating_match:
+                metadata["rating"] = rating_match.group(1)
+                break
+
+    return metadata
@@ -20,7 +20,7 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     install_requires=[
         "selenium>=4.0.0",
         "webdriver-manager>=3.8.0",
@@ -33,6 +33,18 @@ setup(
         "apscheduler>=3.9.0",
     ],
     extras_require={
+        "fast": [
+            "selectolax>=0.3.0",
+        ],
+        "parquet": [
+            "pyarrow>=10.0.0",
+        ],
+        "covers": [
+            "Pillow>=9.0.0",
+        ],
+        "bench": [
+            "psutil>=5.8.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "black>=22.0.0",
@@ -42,5 +42,1263 @@ class TestDytt8(unittest.TestCase):
             except ImportError as e:
                 self.fail(f"无法导入模块 {module_name}: {e}")
 
+
+class TestZoomParser(unittest.TestCase):
+    """◎ 字段解析测试"""
+    
+    DESCRIPTION = (
+        "◎译　　名　速度与激情10\n"
+        "◎年　　代　2023\n"
+        "◎上映日期　2023-05-17(中国大陆)\n"
+        "◎豆瓣评分　6.0/10 from 100,000 users\n"
+        "◎IMDb评分　5.8/10 from 95,123 users\n"
+        "◎片　　长　141分钟\n"
+        "◎导　　演　路易斯·莱特里尔\n"
+        "◎主　　演　范·迪塞尔\n"
+        "　　　　　　杰森·斯坦森\n"
+        "◎简　　介\n\n　　唐老大一家……\n"
+    )
+    
+    def test_parse_fields(self):
+        """测试字段拆分与规范化"""
+        from dytt8.utils.zoom_parser import extract_movie_metadata
+        metadata = extract_movie_metadata(self.DESCRIPTION)
+        self.assertEqual(metadata["translated_title"], "速度与激情10")
+        self.assertEqual(metadata["year"], "2023")
+        self.assertEqual(metadata["release_date"], "2023-05-17(中国大陆)")
+        self.assertEqual(metadata["duration"], "141分钟")
+        self.assertEqual(metadata["director"], "路易斯·莱特里尔")
+        self.assertEqual(metadata["actors"], ["范·迪塞尔", "杰森·斯坦森"])
+        self.assertEqual(metadata["rating"], "6.0")
+        self.assertEqual(metadata["summary"], "唐老大一家……")
+    
+    def test_value_without_space(self):
+        """测试取值紧跟标签、没有空白分隔的写法"""
+        from dytt8.utils.zoom_parser import parse_zoom_fields
+        fields = parse_zoom_fields("◎上映日期2023-01-01\n◎导演张艺谋\n◎IMDb评分7.5/10\n◎未知字段xx\n◎片　　长120分钟")
+        self.assertEqual(fields["release_date"], "2023-01-01")
+        self.assertEqual(fields["director"], "张艺谋")
+        self.assertEqual(fields["imdb_rating"], "7.5/10")
+        self.assertEqual(fields["duration"], "120分钟")
+    
+    def test_plain_text(self):
+        """测试没有 ◎ 字段的描述"""
+        from dytt8.utils.zoom_parser import extract_movie_metadata
+        self.assertEqual(extract_movie_metadata("普通简介"), {})
+        self.assertEqual(extract_movie_metadata(""), {})
+
+
+class TestEncoding(unittest.TestCase):
+    """网页解码测试"""
+    
+    def test_decode_declared_charset(self):
+        """测试按 <meta charset> 以GB18030超集解码"""
+        from dytt8.utils.encoding import decode_html, clear_charset_cache
+        clear_charset_cache()
+        html = '<meta http-equiv="Content-Type" content="text/html; charset=gb2312">䶮电影'
+        self.assertEqual(decode_html(html.encode('gb18030'), 'https://www.dytt8.net/a.html'), html)
+        # 同站点未声明编码的页面沿用缓存的编码
+        self.assertEqual(decode_html('电影'.encode('gbk'), 'https://www.dytt8.net/b.html'), '电影')
+    
+    def test_fix_mojibake(self):
+        """测试乱码修复的快速路径"""
+        from dytt8.utils.encoding import fix_mojibake
+        self.assertEqual(fix_mojibake('中文'), '中文')
+        self.assertEqual(fix_mojibake('中文'.encode('utf-8').decode('latin1')), '中文')
+        self.assertEqual(fix_mojibake(None), '')
+
+
+class TestCrawlPipeline(unittest.TestCase):
+    """抓取流水线测试"""
+    
+    def test_pipeline_process_pool(self):
+        """测试抓取 → 进程池解析 → 存储"""
+        import operator
+        from dytt8.scrapers.pipeline import CrawlPipeline
+        
+        results = []
+        urls = [f"u{i}" for i in range(20)]
+        pipeline = CrawlPipeline(
+            fetch=lambda url: None if url == "u3" else "page-",
+            parse=operator.add,
+            store=results.append,
+            fetch_workers=3,
+            parse_workers=2,
+            queue_size=4
+        )
+        report = pipeline.run(urls)
+        
+        self.assertEqual(sorted(results), sorted(f"page-{u}" for u in urls if u != "u3"))
+        stages = {stage["stage"]: stage for stage in report["stages"]}
+        self.assertEqual(stages["fetch"]["items"], 19)
+        self.assertEqual(stages["fetch"]["errors"], 1)
+        self.assertEqual(stages["parse"]["items"], 19)
+        self.assertEqual(stages["store"]["items"], 19)
+    
+    def test_interrupted_store(self):
+        """测试存储阶段被中断时，阻塞在已满队列上的抓取和解析线程能够退出"""
+        import time
+        from dytt8.scrapers.pipeline import CrawlPipeline
+        
+        def store(movie):
+            raise KeyboardInterrupt()
+        
+        pipeline = CrawlPipeline(fetch=lambda url: url, parse=lambda page, url: page, store=store,
+                                 fetch_workers=4, queue_size=2, use_processes=False)
+        start = time.monotonic()
+        with self.assertRaises(KeyboardInterrupt):
+            pipeline.run([f"u{i}" for i in range(100)])
+        self.assertLess(time.monotonic() - start, 5)
+    
+    def test_stop(self):
+        """测试从其他线程停止正在运行的流水线，以及停止后的运行直接返回"""
+        import time
+        import threading
+        from dytt8.scrapers.pipeline import CrawlPipeline
+        
+        def fetch(url):
+            time.sleep(0.05)
+            return url
+        
+        results = []
+        pipeline = CrawlPipeline(fetch=fetch, parse=lambda page, url: page, store=results.append,
+                                 fetch_workers=2, use_processes=False)
+        threading.Timer(0.3, pipeline.stop).start()
+        start = time.monotonic()
+        pipeline.run([f"u{i}" for i in range(200)])
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertLess(len(results), 200)
+        
+        count = len(results)
+        pipeline.run(["late"])
+        self.assertEqual(len(results), count)
+
+class TestParserBackends(unittest.TestCase):
+    """HTML解析后端测试"""
+    
+    def test_backends_agree(self):
+        """测试同一规则在各后端上提取结果一致"""
+        from dytt8.scrapers.parser_backends import BACKENDS
+        from dytt8.scrapers.dytt8_scraper import parse_detail_page
+        
+        html = ("<html><head><script>var x = 1;</script></head><body>"
+                "<div class='title_all'><h1>测试电影</h1><a>最新电影</a><a>MKV</a>"
+                "<a>1.5GB</a><a href='magnet:?xt=urn:btih:abc'>下载</a></div>"
+                "<div id='Zoom'>◎年　　代　2023<br/>◎导　　演　张三<br/>◎主　　演　李四<br/>　　　　　　王五<br/></div>"
+                "</body></html>")
+        results = {name: parse_detail_page(html, "https://www.dytt8.net/a.html", backend=name)
+                   for name in BACKENDS}
+        
+        expected = results["bs4"]
+        self.assertEqual(expected["title"], "测试电影")
+        self.assertEqual(expected["download_link"], "magnet:?xt=urn:btih:abc")
+        self.assertEqual(expected["year"], "2023")
+        for name, movie in results.items():
+            self.assertEqual(movie, expected, name)
+
+
+class TestPageArchive(unittest.TestCase):
+    """网页归档录制与回放测试"""
+    
+    def test_record_and_replay(self):
+        """测试归档写入、重新打开、requests回放和本地服务器"""
+        import os
+        import tempfile
+        import requests
+        from dytt8.utils.page_archive import PageArchive, ArchiveServer, replay_session
+        
+        path = os.path.join(tempfile.mkdtemp(), "corpus.warc.gz")
+        body = "<html><body>电影</body></html>".encode("gbk")
+        archive = PageArchive(path)
+        archive.add("https://www.dytt8.net/html/1.html", body, 200,
+                    {"Content-Type": "text/html; charset=gbk", "Content-Encoding": "gzip"})
+        archive.add("https://www.dytt8.net/html/2.html", b"old")
+        archive.add("https://www.dytt8.net/html/2.html", b"new")
+        
+        archive = PageArchive(path)
+        self.assertEqual(len(archive), 2)
+        page = archive.get("https://www.dytt8.net/html/1.html")
+        self.assertEqual(page.body, body)
+        self.assertNotIn("Content-Encoding", page.headers)
+        self.assertEqual(archive.get("/html/2.html").body, b"new")
+        
+        session = replay_session(requests.Session(), archive)
+        response = session.get("https://www.dytt8.com/html/1.html")
+        self.assertEqual(response.content, body)
+        self.assertEqual(session.get("https://www.dytt8.net/missing.html").status_code, 404)
+        
+        with ArchiveServer(archive) as server:
+            response = requests.get(server.url_for("https://www.dytt8.net/html/1.html"), timeout=5)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, body)
+            self.assertEqual(server.stats["bytes_sent"], len(body))
+
+
+class TestRecommender(unittest.TestCase):
+    """推荐系统测试"""
+    
+    def test_recommendations(self):
+        """测试按喜好、年代和来源推荐"""
+        from dytt8.recommender.recommender import MovieRecommender
+        
+        movies = [
+            {"title": "A", "year": "2021", "genre": "动作/犯罪", "country": "中国大陆", "score": "7.5/10"},
+            {"title": "B", "year": "1995", "genre": "剧情", "score": "9.7/10"},
+            {"title": "C", "year": "2022", "genre": "喜剧", "score": "8.0", "source": "豆瓣电影"},
+        ]
+        recommender = MovieRecommender(movies=movies)
+        recommender.set_preferences(genres=["动作"], year_range="2020-至今", regions=["中国大陆"], persist=False)
+        
+        self.assertEqual([m["title"] for m in recommender.get_recommendations(count=5)], ["A", "C"])
+        self.assertEqual([m["title"] for m in recommender.get_recommendations(count=5, source="douban")], ["C"])
+        self.assertEqual(len(recommender.get_recommendations(count=1)), 1)
+
+
+class TestTracing(unittest.TestCase):
+    """耗时追踪测试"""
+    
+    def test_spans(self):
+        """测试嵌套 span 的汇总和未启用时的空操作"""
+        from dytt8.utils import tracing
+        
+        self.assertIsNone(tracing.current_trace())
+        with tracing.span("ignored"):
+            pass
+        
+        @tracing.traced("outer")
+        def work():
+            with tracing.span("inner"):
+                tracing.sleep(0.01)
+        
+        with tracing.trace("test", output_dir=None) as run:
+            work()
+            work()
+            run.record("parse", 0.5)
+        
+        spans = {item["name"]: item for item in run.summary()["spans"]}
+        self.assertEqual(set(spans), {"outer", "inner", "sleep", "parse"})
+        self.assertEqual(spans["outer"]["count"], 2)
+        self.assertLess(spans["outer"]["self_seconds"], spans["outer"]["total_seconds"])
+        self.assertGreaterEqual(spans["sleep"]["total_seconds"], 0.02)
+        self.assertIsNone(tracing.current_trace())
+
+
+class TestMetrics(unittest.TestCase):
+    """运行指标测试"""
+    
+    def test_render(self):
+        """测试跨线程计数合并和文本格式"""
+        import threading
+        from dytt8.utils.metrics import Registry, Counter, Histogram
+        
+        registry = Registry()
+        pages = registry.register(Counter("test_pages_total", "pages", ("source",)))
+        latency = registry.register(Histogram("test_latency_seconds", "latency", buckets=(0.1, 1)))
+        
+        threads = [threading.Thread(target=lambda: [pages.inc("dytt8") for _ in range(100)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latency.observe(0.05)
+        latency.observe(5)
+        
+        text = registry.render()
+        self.assertEqual(pages.value("dytt8"), 400)
+        self.assertIn('test_pages_total{source="dytt8"} 400', text)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('test_latency_seconds_count 2', text)
+    
+    def test_short_lived_threads(self):
+        """测试每次一个短命线程时分片不随线程数增长"""
+        import threading
+        from dytt8.utils.metrics import Counter
+        
+        requests = Counter("test_requests_total", "requests")
+        for _ in range(200):
+            thread = threading.Thread(target=requests.inc)
+            thread.start()
+            thread.join()
+        self.assertLessEqual(len(requests._shards), 2)
+        self.assertEqual(requests.value(), 200)
+    
+    def test_endpoint(self):
+        """测试 API 的 /metrics 路由"""
+        try:
+            from dytt8.api import api_server
+        except ImportError as e:
+            self.skipTest(f"缺少依赖: {e}")
+        
+        client = api_server.app.test_client()
+        client.get('/')
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        self.assertIn('dytt8_http_requests_total{method="GET",route="/",status="200"}', text)
+        self.assertIn('dytt8_job_queue_depth', text)
+        self.assertIn('# TYPE dytt8_chrome_sessions gauge', text)
+
+
+class TestProfiling(unittest.TestCase):
+    """按需剖析测试"""
+    
+    def test_profiles(self):
+        """测试两种剖析方式、保留数量和 API 请求头"""
+        import time
+        import tempfile
+        from unittest import mock
+        from dytt8.utils import profiling
+        
+        def work():
+            return sum(i * i for i in range(200000))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            with profiling.profile("job", "cprofile", output_dir=tmp) as run:
+                work()
+            functions = [item["function"] for item in profiling.top_functions(run.file)]
+            self.assertTrue(any(name.startswith("work ") for name in functions))
+            
+            with profiling.profile("job", "sample", output_dir=tmp) as run:
+                time.sleep(0.05)
+            self.assertTrue(run.file.endswith(".folded"))
+            
+            # 只采样当前线程时，其他线程的调用栈不计入
+            import threading
+            stop = threading.Event()
+            other = threading.Thread(target=stop.wait, name="other-request")
+            other.start()
+            with profiling.profile("request", "sample", output_dir=tmp, current_thread_only=True) as run:
+                time.sleep(0.05)
+            stop.set()
+            other.join()
+            with open(run.file, encoding="utf-8") as f:
+                threads = {line.split(";", 1)[0] for line in f}
+            self.assertEqual(threads, {threading.current_thread().name})
+            
+            with profiling.profile("noop", None, output_dir=tmp) as run:
+                work()
+            self.assertIsNone(run.file)
+            
+            profiling.prune(tmp, keep=1)
+            self.assertEqual(len(profiling.list_profiles(tmp)), 1)
+            
+            try:
+                from dytt8.api import api_server
+            except ImportError:
+                return
+            with mock.patch.object(profiling, "DEFAULT_PROFILE_DIR", tmp):
+                client = api_server.app.test_client()
+                response = client.get('/', headers={'X-Dytt8-Profile': '1'})
+                name = response.headers['X-Dytt8-Profile-File']
+                listed = client.get('/profiles').get_json()
+                self.assertIn(name, [item['name'] for item in listed['profiles']])
+                self.assertEqual(client.get(f'/profiles/{name}').status_code, 200)
+                self.assertEqual(client.get('/profiles/missing.prof').status_code, 404)
+                response = client.get(f'/profiles/{name}?limit=abc')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+                with mock.patch.object(profiling, "top_functions", return_value=[]) as top:
+                    client.get(f'/profiles/{name}?limit=100000')
+                    self.assertEqual(top.call_args.kwargs['limit'], api_server.PROFILE_MAX_LIMIT)
+
+
+class TestScheduler(unittest.TestCase):
+    """定时任务调度测试"""
+    
+    def test_timer(self):
+        """测试按时触发、删除后不触发，以及空闲时不写配置"""
+        import os
+        import time
+        import tempfile
+        import threading
+        from datetime import datetime, timedelta
+        from unittest import mock
+        from dytt8.scheduler.scheduler import TaskScheduler
+        
+        def next_second(schedule_type, time_params):
+            # 下一个整秒之后再过 offset 秒
+            due = datetime.now().replace(microsecond=0) + timedelta(seconds=1 + time_params['offset'])
+            return due.strftime('%Y-%m-%d %H:%M:%S')
+        
+        fired = []
+        done = threading.Event()
+        
+        def execute(task, planned=None, context=None):
+            fired.append((task['id'], time.time() - datetime.strptime(planned, '%Y-%m-%d %H:%M:%S').timestamp()))
+            done.set()
+        
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(TaskScheduler, '_calculate_next_run', side_effect=next_second), \
+                mock.patch.object(TaskScheduler, '_execute_task', side_effect=execute):
+            scheduler = TaskScheduler()
+            scheduler.tasks = []
+            scheduler.config_file = os.path.join(tmp, 'scheduler.json')
+            scheduler.executor.history_file = None
+            scheduler.start()
+            try:
+                keep = scheduler.add_task('recommend', 'daily', {'offset': 0})
+                dropped = scheduler.add_task('recommend', 'daily', {'offset': 0})
+                scheduler.delete_task(dropped)
+                mtime = os.path.getmtime(scheduler.config_file)
+                self.assertTrue(done.wait(3))
+            finally:
+                executor = scheduler.executor
+                scheduler.stop()
+            
+            self.assertEqual([task_id for task_id, _ in fired], [keep])
+            self.assertLess(fired[0][1], 0.5)
+            # 执行被替换，没有保存动作；空闲时也不应写配置
+            self.assertEqual(os.path.getmtime(scheduler.config_file), mtime)
+            # 停止时关闭执行器后换上新的，立即运行的计划时间为提交时刻
+            self.assertTrue(executor.closed)
+            self.assertFalse(scheduler.executor.closed)
+            done.clear()
+            run = scheduler.run_task_now(keep)
+            self.assertTrue(done.wait(3))
+            self.assertIsNotNone(run['planned'])
+            self.assertLess(fired[-1][1], 1.5)
+    
+    def test_executor(self):
+        """测试类型并发上限、重叠策略和超时终止子进程"""
+        import sys
+        import time
+        import threading
+        import subprocess
+        from dytt8.scheduler.executor import TaskExecutor, popen_kwargs
+        
+        executor = TaskExecutor(max_workers=4, type_limits={'scrape': 1})
+        release = threading.Event()
+        active = []
+        peak = []
+        
+        def slow(task, planned, context):
+            active.append(task['id'])
+            peak.append(sum(1 for item in active if item.startswith('scrape')))
+            release.wait(2)
+            active.remove(task['id'])
+        
+        def hung(task, planned, context):
+            process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'], **popen_kwargs())
+            context.register_process(process)
+            process.wait()
+        
+        try:
+            executor.submit({'id': 'scrape_a', 'type': 'scrape'}, slow)
+            executor.submit({'id': 'scrape_b', 'type': 'scrape'}, slow)
+            skipped = executor.submit({'id': 'scrape_a', 'type': 'scrape'}, slow)
+            self.assertEqual(skipped['status'], 'skipped')
+            
+            start = time.time()
+            executor.submit({'id': 'hung', 'type': 'other', 'task_params': {'timeout': 0.3}}, hung)
+            time.sleep(0.1)
+            release.set()
+            deadline = time.time() + 5
+            while len(executor.history()) < 4 and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            executor.shutdown()
+        
+        statuses = {run['task_id']: run['status'] for run in executor.history() if run['status'] != 'skipped'}
+        self.assertEqual(statuses, {'scrape_a': 'success', 'scrape_b': 'success', 'hung': 'timeout'})
+        self.assertEqual(max(peak), 1)
+        self.assertLess(time.time() - start, 10)
+    
+    def test_runner(self):
+        """测试进程内运行复用驱动池和取消，以及常驻工作进程的错误返回"""
+        import os
+        import time
+        import tempfile
+        import threading
+        from unittest import mock
+        from dytt8.scheduler import runner
+        from dytt8.scheduler.executor import RunContext, TaskCancelled
+        
+        class FakeDriver:
+            current_url = 'about:blank'
+            quits = 0
+            
+            def quit(self):
+                FakeDriver.quits += 1
+        
+        used = []
+        
+        def fake_scraper(params, driver, session, sink=None, context=None):
+            used.append(driver)
+            return [{'title': '测试电影', 'year': '2024'}]
+        
+        def http_scraper(params, driver, session, sink=None, context=None):
+            # 不使用浏览器的爬虫通过取消回调停止
+            stopped = threading.Event()
+            context.on_cancel(stopped.set)
+            stopped.wait(10)
+            return []
+        
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.dict(runner.SCRAPERS, {'fake': (fake_scraper, True)}):
+            inprocess = runner.InProcessRunner(driver_factory=FakeDriver)
+            params = {'version': 'fake', 'format': 'json', 'output': tmp, 'links_db': os.path.join(tmp, 'links.db')}
+            first = inprocess.run(params)
+            inprocess.run(params)
+            self.assertEqual(first['count'], 1)
+            self.assertTrue(os.path.exists(first['file']))
+            self.assertIs(used[0], used[1])
+            
+            with mock.patch.dict(runner.SCRAPERS, {'fake_http': (http_scraper, False)}):
+                context = RunContext({})
+                threading.Timer(0.2, context.cancel).start()
+                start = time.monotonic()
+                with self.assertRaises(TaskCancelled):
+                    inprocess.run(dict(params, version='fake_http'), context)
+                self.assertLess(time.monotonic() - start, 5)
+            inprocess.close()
+            self.assertEqual(FakeDriver.quits, 1)
+        
+        worker = runner.WorkerProcess()
+        try:
+            with self.assertRaises(RuntimeError):
+                worker.run({'version': 'missing'})
+            self.assertTrue(worker.alive)
+        finally:
+            worker.close()
+        self.assertFalse(worker.alive)
+
+
+class TestCoordinator(unittest.TestCase):
+    """分布式抓取协调器测试"""
+    
+    def test_frontier(self):
+        """测试去重、按主机限速、租约过期重新分配和HTTP访问"""
+        import os
+        import tempfile
+        from unittest import mock
+        from dytt8.scrapers import coordinator
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            frontier = coordinator.Frontier(os.path.join(tmp, 'crawl.db'), host_delay=60, max_attempts=2)
+            items = [{'url': f'http://a.test/{i}', 'source': 'fake', 'kind': 'detail'} for i in range(3)]
+            items.append({'url': 'http://b.test/0', 'source': 'fake', 'kind': 'detail'})
+            self.assertEqual(frontier.add(items), 4)
+            self.assertEqual(frontier.add(items[:2]), 0)
+            
+            # 每个主机一次只分配一个，之后受限速间隔约束
+            leased = frontier.lease('w1', count=10)
+            self.assertEqual(sorted(task['url'] for task in leased['tasks']), ['http://a.test/0', 'http://b.test/0'])
+            blocked = frontier.lease('w1', count=10)
+            self.assertEqual(blocked['tasks'], [])
+            self.assertFalse(blocked['done'])
+            
+            # 租约过期后由其他工作进程领取，原工作进程的结果被拒绝
+            frontier.set_host_delay('a.test', 0)
+            frontier.set_host_delay('b.test', 0)
+            frontier._db().execute("UPDATE hosts SET next_allowed = 0")
+            frontier._db().execute("UPDATE urls SET lease_expires = 0 WHERE url = 'http://b.test/0'")
+            reclaimed = frontier.lease('w2', count=10)
+            self.assertIn('http://b.test/0', [task['url'] for task in reclaimed['tasks']])
+            self.assertFalse(frontier.complete('http://b.test/0', 'w1', {'title': 'stale'}))
+            self.assertTrue(frontier.complete('http://b.test/0', 'w2', {'title': 'b'}))
+            
+            # 工作进程跑完整个队列，发现的新链接去重后加入
+            def process(task, session):
+                if task['url'].endswith('/1'):
+                    return {'title': task['url']}, [{'url': 'http://a.test/0', 'source': 'fake', 'kind': 'detail'},
+                                                    {'url': 'http://b.test/1', 'source': 'fake', 'kind': 'detail'}]
+                return {'title': task['url']}, []
+            with mock.patch.object(coordinator.time, 'sleep'):
+                frontier._db().execute("UPDATE urls SET lease_expires = 0 WHERE status = 'leased'")
+                counts = coordinator.run_worker(frontier, 'w3', batch=2, process=process)
+            stats = frontier.stats()
+            self.assertEqual(stats['urls'], {'done': 5})
+            self.assertEqual(stats['results'], 5)
+            self.assertGreaterEqual(counts['completed'], 4)
+            
+            # 通过HTTP访问同一个队列
+            with coordinator.CoordinatorServer(frontier, '127.0.0.1', 0) as server:
+                remote = coordinator.RemoteFrontier(server.url)
+                self.assertEqual(remote.add([('http://c.test/0', 'fake', 'detail')]), 1)
+                task = remote.lease('w4')['tasks'][0]
+                self.assertTrue(remote.fail(task['url'], 'w4', 'boom'))
+                self.assertEqual(remote.stats()['urls']['pending'], 1)
+                remote.close()
+            frontier.close()
+
+
+class TestCheckpoint(unittest.TestCase):
+    """爬取断点测试"""
+    
+    def test_resume(self):
+        """测试中断后保存断点，resume 时只抓取未完成的详情页"""
+        import os
+        import tempfile
+        from unittest import mock
+        from dytt8.utils import checkpoint
+        from dytt8.scrapers.dytt8_scraper import Dytt8Scraper
+        
+        list_html = ("<div class='co_content8'>" +
+                     "".join(f"<a class='ulink' href='/html/{i}.html'>电影{i}</a>" for i in range(3)) + "</div>")
+        fetched = []
+        
+        def fetch(url, fail=None):
+            fetched.append(url)
+            if url.endswith("dyzz/index.html"):
+                return list_html
+            if url == fail:
+                raise ConnectionError("网络中断")
+            return f"<div class='title_all'><h1>{url[-6]}</h1></div><div id='Zoom'>◎年　　代　2023</div>"
+        
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(checkpoint, "DEFAULT_CHECKPOINT_DIR", tmp):
+            scraper = Dytt8Scraper(pages=1, delay=0, workers=1)
+            scraper._fetch_page = lambda url: fetch(url, fail="https://www.dytt8.net/html/2.html")
+            self.assertEqual(len(scraper.scrape()), 2)
+            saved = scraper.checkpoint
+            self.assertTrue(os.path.exists(saved.path))
+            self.assertEqual(saved.pending(), ["https://www.dytt8.net/html/2.html"])
+            
+            fetched.clear()
+            scraper = Dytt8Scraper(pages=1, delay=0, workers=1, resume=True)
+            scraper._fetch_page = fetch
+            movies = scraper.scrape()
+            self.assertEqual(fetched, ["https://www.dytt8.net/html/2.html"])
+            self.assertEqual(sorted(movie["source_url"][-6:] for movie in movies), ["0.html", "1.html", "2.html"])
+            self.assertFalse(os.path.exists(saved.path))
+            self.assertFalse(os.path.exists(saved.results_path))
+    
+    def test_results_appended(self):
+        """测试结果追加到 NDJSON 文件，断点 JSON 只保存位置和状态"""
+        import os
+        import json
+        import tempfile
+        from dytt8.utils.checkpoint import Checkpoint
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = Checkpoint("test", directory=tmp, every=1)
+            urls = [f"https://a.test/{i}" for i in range(25)]
+            checkpoint.add_urls(urls)
+            for url in urls[:20]:
+                checkpoint.mark(url, "done", {"source_url": url})
+                checkpoint.save()
+            with open(checkpoint.path, encoding="utf-8") as f:
+                self.assertNotIn("results", json.load(f))
+            with open(checkpoint.results_path, encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 20)
+            # 崩溃时写到一半的最后一行被忽略
+            with open(checkpoint.results_path, "a", encoding="utf-8") as f:
+                f.write('{"url": "https://a.test/2')
+            
+            resumed = Checkpoint("test", resume=True, directory=tmp)
+            self.assertEqual(len(resumed.results), 20)
+            self.assertEqual(resumed.pending(), urls[20:])
+            self.assertEqual(resumed.result(urls[3]), {"source_url": urls[3]})
+            resumed.mark(urls[20], "done", {"source_url": urls[20]})
+            resumed.save(force=True)
+            self.assertEqual(len(Checkpoint("test", resume=True, directory=tmp).results), 21)
+            
+            # 不继续时旧结果在第一次保存时清空
+            fresh = Checkpoint("test", directory=tmp)
+            fresh.save(force=True)
+            self.assertEqual(os.path.getsize(fresh.results_path), 0)
+
+
+class TestRateControl(unittest.TestCase):
+    """自适应限速测试"""
+    
+    def test_aimd(self):
+        """测试正常时加性增、限流时乘性减，以及状态保存"""
+        import os
+        import tempfile
+        from dytt8.utils.rate_control import RateController
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rate.json")
+            controller = RateController(path, min_delay=0.01, increase_every=2, step=0.01)
+            for _ in range(6):
+                with controller.slot("https://a.test/1", initial_delay=0.05, max_concurrency=4) as request:
+                    request.status = 200
+            state = controller.snapshot()["a.test"]
+            self.assertEqual(state["concurrency"], 4)
+            self.assertAlmostEqual(state["delay"], 0.02)
+            
+            controller.release("a.test", 0.01, status=429)
+            state = controller.snapshot()["a.test"]
+            self.assertEqual(state["concurrency"], 2)
+            self.assertAlmostEqual(state["delay"], 0.04)
+            
+            # 延迟突增同样触发乘性减
+            controller.hosts["a.test"].baseline = 0.5
+            controller.release("a.test", 5.0)
+            self.assertEqual(controller.snapshot()["a.test"]["concurrency"], 1)
+            
+            controller.save()
+            restored = RateController(path)
+            restored.acquire("a.test")
+            self.assertAlmostEqual(restored.snapshot()["a.test"]["delay"], 0.08)
+            # 调用方指定的间隔优先于保存的较短间隔
+            restored = RateController(path)
+            restored.acquire("a.test", initial_delay=0.5)
+            self.assertAlmostEqual(restored.snapshot()["a.test"]["delay"], 0.5)
+    
+    def test_recovery(self):
+        """测试被限流后的长间隔按比例恢复，并随保存后经过的时间衰减"""
+        import time
+        from dytt8.utils.rate_control import RateController
+        
+        controller = RateController(False, increase_every=1)
+        controller.acquire("a.test", initial_delay=60)
+        requests = 0
+        while controller.snapshot()["a.test"]["delay"] > 2:
+            controller.release("a.test", 0.1, status=200)
+            requests += 1
+        self.assertLess(requests, 40)
+        
+        # 一小时前保存的 60 秒间隔，半衰期10分钟后接近指定的 2 秒
+        saved = {"delay": 60, "concurrency": 1, "updated": time.time() - 3600}
+        self.assertLess(controller._restored_delay(saved, 2.0), 3)
+        saved["updated"] = time.time()
+        self.assertAlmostEqual(controller._restored_delay(saved, 2.0), 60, places=1)
+
+
+class TestRetry(unittest.TestCase):
+    """重试与失败预算测试"""
+    
+    def test_classify_and_queue(self):
+        """测试错误分类、失败项目放回队列末尾以及失败预算"""
+        from dytt8.utils import retry
+        
+        class StaleElementReferenceException(Exception):
+            pass
+        
+        self.assertEqual(retry.classify(TimeoutError()), retry.TIMEOUT)
+        self.assertEqual(retry.classify(ConnectionResetError()), retry.CONNECTION)
+        self.assertEqual(retry.classify(StaleElementReferenceException()), retry.STALE)
+        self.assertEqual(retry.classify(retry.FetchError("x", retry.classify_status(503))), retry.SERVER)
+        self.assertEqual(retry.classify_status(429), retry.ANTI_BOT)
+        self.assertEqual(retry.classify(ValueError()), retry.FATAL)
+        
+        order, failed = [], []
+        attempts = {}
+        
+        def work(item):
+            order.append(item)
+            attempts[item] = attempts.get(item, 0) + 1
+            if item == "a" and attempts[item] < 3:
+                raise ConnectionResetError("reset")
+            if item == "b":
+                raise ValueError("bad page")
+            return item.upper()
+        
+        done = {}
+        policy = retry.RetryPolicy(attempts=3, base=0.001)
+        budget = retry.run_queue("abc", work, on_success=done.__setitem__,
+                                 on_failure=lambda item, e: failed.append(item), policy=policy)
+        self.assertEqual(order, ["a", "b", "c", "a", "a"])
+        self.assertEqual(done, {"a": "A", "c": "C"})
+        self.assertEqual(failed, ["b"])
+        self.assertEqual(budget.by_kind, {retry.CONNECTION: 2, retry.FATAL: 1})
+        
+        # 超出预算后剩余项目不再处理
+        failed.clear()
+        budget = retry.FailureBudget(minimum=1)
+        retry.run_queue(["b", "b", "c"], work, on_failure=lambda item, e: failed.append(type(e).__name__),
+                        policy=policy, budget=budget)
+        self.assertEqual(failed, ["ValueError", "ValueError", "BudgetExhausted"])
+    
+    def test_pipeline_requeue(self):
+        """测试流水线抓取出错的URL重新入队"""
+        from dytt8.utils import retry
+        from dytt8.scrapers.pipeline import CrawlPipeline
+        
+        calls = []
+        
+        def fetch(url):
+            calls.append(url)
+            if url == "u0" and calls.count(url) == 1:
+                raise retry.FetchError("状态码 503", retry.SERVER, 503)
+            return url
+        
+        results = []
+        pipeline = CrawlPipeline(fetch, lambda page, url: page, results.append, fetch_workers=1,
+                                 use_processes=False, retry=retry.RetryPolicy(base=0.001))
+        pipeline.run(["u0", "u1", "u2"])
+        self.assertEqual(calls, ["u0", "u1", "u2", "u0"])
+        self.assertEqual(sorted(results), ["u0", "u1", "u2"])
+
+
+class TestSinks(unittest.TestCase):
+    """流式输出测试"""
+    
+    def test_partial_output(self):
+        """测试未关闭(模拟崩溃)时已落盘的部分完整可读"""
+        import os
+        import csv
+        import json
+        import sqlite3
+        import tempfile
+        from dytt8.utils import sinks
+        
+        movies = [{"title": f"电影{i}", "year": "2023", "source_url": f"https://example.com/{i}.html",
+                   "actors": ["甲", "乙"]} for i in range(5)]
+        with tempfile.TemporaryDirectory() as tmp:
+            opened = {}
+            for format in ("csv", "ndjson", "sqlite"):
+                sink = sinks.open_sink(format, os.path.join(tmp, "movies" + sinks.EXTENSIONS[format]),
+                                       flush_every=2, flush_interval=3600)
+                sink.write_many(movies)
+                opened[format] = sink
+            
+            with open(opened["csv"].path, encoding="utf-8-sig", newline="") as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual([row["title"] for row in rows], ["电影0", "电影1", "电影2", "电影3"])
+            self.assertEqual(json.loads(rows[0]["actors"]), ["甲", "乙"])
+            with open(opened["ndjson"].path, encoding="utf-8") as f:
+                self.assertEqual(len(f.read().splitlines()), 4)
+            db = sqlite3.connect(opened["sqlite"].path)
+            self.assertEqual(db.execute("SELECT COUNT(*) FROM movies").fetchone()[0], 4)
+            db.close()
+            
+            for sink in opened.values():
+                sink.close()
+                self.assertEqual(sink.count, 5)
+            with open(opened["ndjson"].path, encoding="utf-8") as f:
+                self.assertEqual(json.loads(f.read().splitlines()[-1])["title"], "电影4")
+    
+    def test_scraper_stream(self):
+        """测试爬虫边爬边写，不保留结果"""
+        import os
+        import json
+        import tempfile
+        from unittest import mock
+        from dytt8.utils import checkpoint, sinks
+        from dytt8.scrapers.dytt8_scraper import Dytt8Scraper
+        
+        list_html = ("<div class='co_content8'>" +
+                     "".join(f"<a class='ulink' href='/html/{i}.html'>电影{i}</a>" for i in range(3)) + "</div>")
+        
+        def fetch(url):
+            if url.endswith("dyzz/index.html"):
+                return list_html
+            return f"<div class='title_all'><h1>{url[-6]}</h1></div><div id='Zoom'>◎年　　代　2023</div>"
+        
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(checkpoint, "DEFAULT_CHECKPOINT_DIR", tmp):
+            path = os.path.join(tmp, "movies.ndjson")
+            with sinks.NDJSONSink(path) as sink:
+                scraper = Dytt8Scraper(pages=1, delay=0, workers=1)
+                scraper._fetch_page = fetch
+                scraper.stream_to(sink, keep_results=False)
+                self.assertEqual(scraper.scrape(), [])
+            with open(path, encoding="utf-8") as f:
+                movies = [json.loads(line) for line in f]
+            self.assertEqual(sorted(movie["source_url"][-6:] for movie in movies), ["0.html", "1.html", "2.html"])
+
+
+class TestDataset(unittest.TestCase):
+    """Parquet 数据集测试"""
+    
+    def test_partitions(self):
+        """测试按数据源/分类/日期分区写入，读取时按列投影和分区过滤"""
+        import os
+        import tempfile
+        from dytt8.utils import dataset
+        from dytt8.scrapers.base_scraper import save_movies
+        if not dataset.PARQUET_AVAILABLE:
+            self.skipTest("未安装 pyarrow")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, "dataset")
+            save_movies([{"title": "电影A", "year": "2023", "rating": "8.1"}], "parquet", tmp, "movies",
+                        source="dytt8", category="最新电影")
+            dataset.write_movies([{"title": "电影B", "year": "2022", "region": "美国"}], root,
+                                 source="douban", category="热门")
+            self.assertTrue(os.path.isdir(dataset.partition_path(root, "dytt8", "最新电影")))
+            # 版本标记随分片写入更新，读取数据集时被忽略
+            marker = os.path.join(root, dataset.VERSION_FILE)
+            self.assertGreaterEqual(dataset.version(root), dataset.latest_mtime(root))
+            os.remove(marker)
+            self.assertEqual(dataset.version(root), dataset.latest_mtime(root))
+            self.assertTrue(os.path.exists(marker))
+            
+            movies = dataset.read_movies(root, columns=["title", "region", "missing"])
+            self.assertEqual(sorted(movie["title"] for movie in movies), ["电影A", "电影B"])
+            self.assertEqual(set(movies[0]), {"title", "region"})
+            douban = dataset.read_movies(root, source="douban")
+            self.assertEqual([(movie["title"], movie["region"]) for movie in douban], [("电影B", "美国")])
+            self.assertEqual(dataset.read_movies(root, since="9999-01-01"), [])
+    
+    def test_api_cache(self):
+        """测试 API 按数据版本缓存电影，数据变化后重新读取"""
+        import os
+        import json
+        import tempfile
+        from unittest import mock
+        try:
+            from dytt8.api import api_server
+        except ImportError as e:
+            self.skipTest(f"缺少依赖: {e}")
+        
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(api_server, "data_dir", tmp), \
+                mock.patch.object(api_server, "_movies_cache", {}):
+            data_file = os.path.join(tmp, "movies_cache.json")
+            with open(data_file, "w", encoding="utf-8") as f:
+                json.dump([{"id": "movie_0", "title": "电影A"}], f)
+            with mock.patch.object(api_server, "_read_movies", wraps=api_server._read_movies) as read:
+                movies = api_server._load_movies()
+                movies.append({"id": "movie_1"})
+                self.assertEqual(api_server._load_movies(), [{"id": "movie_0", "title": "电影A"}])
+                # 电影缓存不能按列读取，各种列组合共用一份列表
+                self.assertEqual(api_server._find_movie("movie_0", columns=["title", "cover_image"])["title"], "电影A")
+                api_server._load_movies(columns=["title"])
+                self.assertEqual(read.call_count, 1)
+                self.assertEqual(len(api_server._movies_cache), 1)
+                
+                with open(data_file, "w", encoding="utf-8") as f:
+                    json.dump([{"id": "movie_0", "title": "电影B"}], f)
+                os.utime(data_file, (os.path.getmtime(data_file) + 10,) * 2)
+                self.assertEqual(api_server._load_movies()[0]["title"], "电影B")
+                self.assertEqual(read.call_count, 2)
+                # 指标使用同一份缓存
+                self.assertEqual(api_server._dataset_metrics(),
+                                 {"size": 1, "version": int(os.path.getmtime(data_file))})
+                self.assertEqual(read.call_count, 2)
+
+
+class TestCovers(unittest.TestCase):
+    """封面缓存测试"""
+    
+    def test_cache(self):
+        """测试按内容寻址去重、不重复下载、LRU淘汰和带缓存头的封面接口"""
+        import io
+        import tempfile
+        from unittest import mock
+        from dytt8.utils import covers, rate_control
+        from dytt8.api import api_server
+        
+        def image(color):
+            if not covers.PILLOW_AVAILABLE:
+                return b"\x89PNG\r\n\x1a\n" + bytes([color]) * 2000
+            from PIL import Image
+            output = io.BytesIO()
+            Image.new("RGB", (400, 600), (color, 0, 0)).save(output, "PNG")
+            return output.getvalue()
+        
+        images = {"https://img.example.com/a.png": image(10), "https://img.example.com/a2.png": image(10),
+                  "https://img.example.com/b.png": image(200), "https://img.example.com/c.html": b"<html></html>"}
+        requested = []
+        
+        class FakeSession:
+            def get(self, url, timeout=None):
+                requested.append(url)
+                return mock.Mock(status_code=200, content=images[url], headers={"Content-Type": "image/png"})
+        
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(rate_control, "_controller", rate_control.RateController(state_file=False, min_delay=0)):
+            cache = covers.CoverCache(tmp, session=FakeSession(), max_bytes=len(images["https://img.example.com/a.png"]) * 3 // 2)
+            found = cache.fetch_many(["https://img.example.com/a.png", "https://img.example.com/a2.png",
+                                      "https://img.example.com/c.html", "https://img.example.com/a.png"])
+            self.assertEqual(found["https://img.example.com/a.png"].digest, found["https://img.example.com/a2.png"].digest)
+            self.assertIsNone(found["https://img.example.com/c.html"])
+            self.assertEqual(cache.stats()["count"], 1)
+            # 超出上限后较早访问的 a 被淘汰
+            cache.get("https://img.example.com/b.png")
+            self.assertEqual(sorted(requested), sorted(images))
+            self.assertEqual(cache.stats()["count"], 1)
+            self.assertIsNone(cache.lookup("https://img.example.com/a.png"))
+            
+            requested.clear()
+            cover = cache.get("https://img.example.com/b.png")
+            self.assertEqual(requested, [])
+            # 命中时只在内存中记录访问时间，批量写入索引
+            query = "SELECT accessed FROM objects WHERE digest = ?"
+            stored = cache._db.execute(query, (cover.digest,)).fetchone()[0]
+            cache.lookup("https://img.example.com/b.png")
+            self.assertEqual(cache._db.execute(query, (cover.digest,)).fetchone()[0], stored)
+            with cache._lock:
+                cache._flush_access()
+            self.assertGreater(cache._db.execute(query, (cover.digest,)).fetchone()[0], stored)
+            
+            with mock.patch.object(covers, "_cache", cache), \
+                    mock.patch.object(api_server, "_find_movie",
+                                      return_value={"id": "movie_0", "cover_image": "https://img.example.com/b.png"}):
+                client = api_server.app.test_client()
+                response = client.get("/movies/movie_0/cover?size=original")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, images["https://img.example.com/b.png"])
+                self.assertIn("max-age", response.headers["Cache-Control"])
+                etag = response.headers["ETag"]
+                response.close()
+                response = client.get(f"/covers/{cover.digest}?size=original", headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+                self.assertIn("immutable", response.headers["Cache-Control"])
+                response.close()
+                if covers.PILLOW_AVAILABLE:
+                    response = client.get("/movies/movie_0/cover")
+                    self.assertEqual(response.mimetype, "image/jpeg")
+                    self.assertLess(len(response.data), len(images["https://img.example.com/b.png"]))
+                    response.close()
+                
+                # 缩略图生成失败时返回JSON错误；带 If-None-Match 时不生成缩略图
+                with mock.patch.object(covers, "PILLOW_AVAILABLE", True), \
+                        mock.patch.object(cache, "thumbnail", side_effect=OSError("cannot identify image")):
+                    response = client.get("/movies/movie_0/cover")
+                    self.assertEqual(response.status_code, 502)
+                    self.assertIn("error", response.get_json())
+                    response = client.get("/movies/movie_0/cover", headers={"If-None-Match": f'"{cover.digest}-thumb"'})
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.headers["ETag"], f'"{cover.digest}-thumb"')
+            cache.close()
+
+
+class TestLinks(unittest.TestCase):
+    """下载链接解析与索引测试"""
+    
+    def test_parse_and_index(self):
+        """测试迅雷链接解码、magnet/ed2k 解析、按 infohash 去重和索引查询"""
+        import base64
+        import os
+        import tempfile
+        from unittest import mock
+        from dytt8.utils import links
+        from dytt8.api import api_server
+        
+        infohash = "c12fe1c06bba254a9dc9f519b335aa7c1367a88a"
+        magnet = f"magnet:?xt=urn:btih:{infohash.upper()}&dn=Movie.2024.1080p.BluRay.mkv&xl=4000000000"
+        thunder = "thunder://" + base64.b64encode(f"AA{magnet}ZZ".encode()).decode()
+        ed2k = "ed2k://|file|Movie.2024.720p.mkv|1500000000|0123456789ABCDEF0123456789ABCDEF|/"
+        
+        parsed = links.parse_link(thunder)
+        self.assertEqual(parsed["url"], magnet)
+        self.assertEqual(parsed["original"], thunder)
+        self.assertEqual((parsed["infohash"], parsed["size"], parsed["resolution"]), (infohash, 4000000000, "1080p"))
+        parsed = links.parse_link(ed2k)
+        self.assertEqual((parsed["scheme"], parsed["size"], parsed["resolution"]), ("ed2k", 1500000000, "720p"))
+        self.assertEqual(parsed["ed2k_hash"], "0123456789abcdef0123456789abcdef")
+        
+        page = f'<a href="{magnet.replace("&", "&amp;")}">磁力</a><a href="{thunder}">迅雷</a><a href="{ed2k}">电驴</a>'
+        found = links.extract_links(page)
+        self.assertEqual([link["scheme"] for link in found], ["magnet", "ed2k"])
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            index = links.LinkIndex(os.path.join(tmp, "links.db"))
+            index.write({"title": "电影A", "source_url": "https://a", "download_links": found})
+            index.write({"title": "电影B", "source_url": "https://b", "download_link": thunder})
+            index.flush()
+            self.assertEqual(sorted(m["title"] for m in index.movies_by_infohash(infohash)), ["电影A", "电影B"])
+            self.assertEqual(index.largest("1080p", limit=1)[0]["size"], 4000000000)
+            self.assertEqual(len(index.links_for("https://a")), 2)
+            
+            with mock.patch.object(links, "_index", index):
+                client = api_server.app.test_client()
+                response = client.get(f"/links/{infohash}")
+                self.assertEqual(response.get_json()["count"], 2)
+                response = client.get("/links/largest?resolution=720p")
+                self.assertEqual(response.get_json()["links"][0]["ed2k_hash"], parsed["ed2k_hash"])
+                response = client.get("/links/largest?limit=abc")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.get_json()["count"], 1)
+                with mock.patch.object(index, "largest", return_value=[]) as largest:
+                    client.get("/links/largest?limit=100000")
+                    self.assertEqual(largest.call_args.kwargs["limit"], api_server.LINKS_MAX_LIMIT)
+                with mock.patch.object(index, "movies_by_infohash", side_effect=RuntimeError("database is locked")):
+                    response = client.get(f"/links/{infohash}")
+                    self.assertEqual(response.status_code, 500)
+                    self.assertIn("error", response.get_json())
+            index.close()
+
+
+class TestGuiTasks(unittest.TestCase):
+    """GUI 后台任务层测试(不需要显示器)"""
+    
+    def test_dispatch_and_cancel(self):
+        """测试按帧预算执行界面更新和取消令牌"""
+        import threading
+        from dytt8.gui import tasks
+        
+        class FakeWidget:
+            def after(self, ms, callback):
+                pass
+        
+        ui = tasks.UIDispatcher(FakeWidget(), frame_budget=10)
+        updates = []
+        worker = threading.Thread(target=lambda: [ui.post(updates.append, i) for i in range(100)])
+        worker.start()
+        worker.join()
+        self.assertEqual(updates, [])
+        self.assertEqual(ui.drain(), 100)
+        self.assertEqual(updates, list(range(100)))
+        
+        # 预算用完时剩余的更新留到下一帧
+        ui.frame_budget = 0
+        ui.post(updates.append, "x")
+        self.assertEqual(ui.drain(), 0)
+        ui.frame_budget = 10
+        self.assertEqual(ui.drain(), 1)
+        
+        runner = tasks.TaskRunner(ui)
+        done, cancelled, killed = [], [], []
+        started = threading.Event()
+        
+        def work(token):
+            token.on_cancel(lambda: killed.append(True))
+            started.set()
+            while not token.sleep(0.01):
+                pass
+            token.check()
+        
+        token = runner.submit(work, on_done=done.append, on_cancel=lambda: cancelled.append(True))
+        started.wait(5)
+        token.cancel()
+        runner.shutdown()
+        runner._pool.shutdown(wait=True)
+        ui.drain()
+        self.assertEqual((done, cancelled, killed), ([], [True], [True]))
+    
+    def test_row_store(self):
+        """测试虚拟表格数据的排序索引、筛选和按行ID取回电影"""
+        from dytt8.gui.table import RowStore, sort_key
+        
+        self.assertLess(sort_key("700MB"), sort_key("1.5GB"))
+        self.assertLess(sort_key("9"), sort_key("10"))
+        
+        store = RowStore(("title", "year", "size"))
+        movies = [{"title": f"电影{i}", "year": str(2000 + i % 25), "size": f"{i % 7 + 1}GB",
+                   "download_link": f"magnet:?xt=urn:btih:{i}"} for i in range(10000)]
+        ids = store.extend(movies)
+        self.assertEqual(len(store), 10000)
+        self.assertIs(store.get(ids[42]), movies[42])
+        
+        store.sort("year", reverse=True)
+        self.assertEqual(store.get(store.order[0])["year"], "2024")
+        store.sort("year")
+        self.assertEqual(store.get(store.order[0])["year"], "2000")
+        self.assertIs(store.index("year"), store.index("year"))
+        
+        store.filter("电影12")
+        self.assertEqual(len(store), 111)
+        self.assertTrue(all("电影12" in store.get(row_id)["title"] for row_id in store.order))
+        # 新增的行按当前排序和筛选加入视图，排序列的索引就地插入而不是重建
+        index = store.index("year")
+        store.index("size")
+        store.extend([{"title": "电影12345", "year": "1999", "size": "1GB"},
+                      {"title": "电影12346", "year": "2010", "size": "2GB"}])
+        self.assertEqual(store.get(store.order[0])["title"], "电影12345")
+        self.assertIs(store.index("year"), index)
+        self.assertEqual(index, sorted(store._ids, key=lambda row_id: sort_key(store.get(row_id)["year"])))
+        self.assertNotIn("size", store._indexes)
+        store.filter("")
+        self.assertEqual(len(store), 10002)
+
+
+class TestLazyImports(unittest.TestCase):
+    """延迟导入测试"""
+    
+    def test_no_heavy_imports(self):
+        """测试导入包和API时不加载 pandas/selenium/pyarrow，访问爬虫类时才导入"""
+        import os
+        import sys
+        import json
+        import subprocess
+        
+        code = (
+            "import sys, json\n"
+            "import dytt8, dytt8.core, dytt8.scrapers.base_scraper, dytt8.recommender.recommender, dytt8.api.api_server\n"
+            "heavy = [m for m in ('pandas', 'selenium', 'webdriver_manager', 'pyarrow', 'PIL') if m in sys.modules]\n"
+            "scraper = dytt8.core.MovieScraperV2\n"
+            "print(json.dumps([heavy, dytt8.core.ScraperV2 is scraper, 'selenium' in sys.modules]))\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)))
+        heavy, alias, selenium_loaded = json.loads(output.decode().strip().splitlines()[-1])
+        self.assertEqual(heavy, [])
+        self.assertTrue(alias)
+        self.assertTrue(selenium_loaded)
+        with self.assertRaises(AttributeError):
+            import dytt8.core
+            dytt8.core.NoSuchScraper
+
+
+class TestDriverCache(unittest.TestCase):
+    """ChromeDriver 解析缓存测试"""
+    
+    def test_reuse_and_revalidate(self):
+        """测试缓存命中、浏览器文件变化但版本相同时继续使用、版本变化时作废"""
+        import os
+        import sys
+        import stat
+        import tempfile
+        from types import SimpleNamespace
+        from unittest import mock
+        from dytt8.utils.driver_cache import DriverCache
+        
+        if sys.platform == "win32":
+            self.skipTest("用 shell 脚本模拟浏览器")
+        with tempfile.TemporaryDirectory() as tmp:
+            browser = os.path.join(tmp, "chrome")
+            driver_path = os.path.join(tmp, "chromedriver")
+            open(driver_path, "w").close()
+            
+            def install(version, mtime):
+                with open(browser, "w") as f:
+                    f.write(f"#!/bin/sh\necho 'Google Chrome {version} '\n")
+                os.chmod(browser, os.stat(browser).st_mode | stat.S_IEXEC)
+                os.utime(browser, (mtime, mtime))
+            
+            install("126.0.6478.126", 1000)
+            cache_file = os.path.join(tmp, "driver_cache.json")
+            driver = SimpleNamespace(service=SimpleNamespace(path=driver_path),
+                                     capabilities={"browserVersion": "126.0.6478.126"})
+            self.assertIsNone(DriverCache(cache_file).lookup(browser))
+            entry = DriverCache(cache_file).record(driver, "selenium-manager", browser)
+            self.assertEqual(entry["method"], "selenium-manager")
+            
+            # 新进程读取缓存文件，浏览器未变化
+            cached = DriverCache(cache_file).lookup(browser)
+            self.assertEqual(cached["driver_path"], os.path.abspath(driver_path))
+            self.assertEqual(cached["browser_version"], "126.0.6478.126")
+            
+            # 重新安装同一版本: 修改时间变化，版本相同，仍然使用
+            install("126.0.6478.126", 2000)
+            self.assertIsNotNone(DriverCache(cache_file).lookup(browser))
+            self.assertEqual(DriverCache(cache_file).lookup(browser)["browser_mtime"], 2000)
+            
+            # 浏览器升级: 作废
+            install("127.0.6533.72", 3000)
+            self.assertIsNone(DriverCache(cache_file).lookup(browser))
+            self.assertIsNone(DriverCache(cache_file).lookup(browser))
+            
+            # 驱动文件被删除: 作废
+            DriverCache(cache_file).record(driver, "webdriver-manager", browser)
+            os.remove(driver_path)
+            self.assertIsNone(DriverCache(cache_file).lookup(browser))
+            
+            # 未指定浏览器，Selenium Manager 启动后设置了 binary_location: 按未指定记录，检查实际使用的浏览器
+            open(driver_path, "w").close()
+            install("127.0.6533.72", 4000)
+            with mock.patch("dytt8.utils.driver_cache.find_browser",
+                            side_effect=lambda binary=None: binary if binary else None):
+                DriverCache(cache_file).record(driver, "selenium-manager", None, browser_path=browser)
+                cached = DriverCache(cache_file).lookup(None)
+                self.assertEqual(cached["browser_path"], browser)
+                self.assertEqual(cached["browser_mtime"], 4000)
+                install("128.0.6613.84", 5000)
+                self.assertIsNone(DriverCache(cache_file).lookup(None))
+    
+    def test_scrapers_use_cache(self):
+        """测试爬虫自建浏览器时经由 setup_chrome_driver(即驱动缓存)，不再直接调用 webdriver_manager"""
+        from unittest import mock
+        try:
+            from dytt8.utils import utils
+            from dytt8.scrapers.douban_scraper import DoubanScraper
+            from dytt8.scrapers.dytt8_scraper import Dytt8Scraper
+        except ImportError as e:
+            self.skipTest(f"缺少依赖: {e}")
+        
+        driver = object()
+        with mock.patch.object(utils, "setup_chrome_driver", return_value=driver) as setup:
+            self.assertIs(DoubanScraper(headless=True)._setup_driver(), driver)
+            self.assertTrue(setup.call_args.kwargs["headless"])
+            self.assertTrue(any(argument.startswith("user-agent=") for argument in setup.call_args.kwargs["arguments"]))
+            self.assertIs(Dytt8Scraper(headless=False)._setup_driver(), driver)
+            self.assertFalse(setup.call_args.kwargs["headless"])
+
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file